@@ -15,7 +15,7 @@ from PySide6.QtWidgets import QApplication, QMessageBox
 from gfglock.ui.boot_thread import BootThread
 from gfglock.ui.splash_screen import SplashScreen
 from gfglock.utils.helpers import resource_path
-from gfglock.utils.logging import write_log
+from gfglock.utils.logging import write_fatal_startup_log, write_log
 
 _ENC_EXTS = (".gfglock", ".gfglck", ".gfgcha")
 
@@ -94,7 +94,7 @@ class _Startup:
 
     def _on_failed(self, message: str) -> None:
         """Show a real error dialog and quit instead of hanging silently."""
-        write_log(f"Startup failed: {message}", level="critical")
+        write_fatal_startup_log(f"Startup failed: {message}")
         self._splash.set_error(message)
         QMessageBox.critical(None, "gfgLock", f"Failed to start:\n\n{message}")
         self._splash.close()
@@ -23,6 +23,7 @@ from gfglock.config.ui_config import (
     ThemeColors,
     EncryptionModes,
     ChunkSizeOptions,
+    MemoryBudgetOptions,
     FileItemSizes,
     FileItemColors,
     get_scaled_window_size,
@@ -50,6 +51,7 @@ __all__ = [
     "ThemeColors",
     "EncryptionModes",
     "ChunkSizeOptions",
+    "MemoryBudgetOptions",
     "FileItemSizes",
     "FileItemColors",
     "get_scaled_window_size",
@@ -41,6 +41,9 @@ class EncryptionDefaults:
     DEFAULT_THREADS = _get_cpu_thread_count()
     DEFAULT_CHUNK_SIZE = 16 * 1024 * 1024
     DEFAULT_ENCRYPT_FILENAMES = False
+    DEFAULT_BATCH_KEYS = False
+    DEFAULT_KDF_ITERATIONS = 200000
+    DEFAULT_KDF_TARGET_MS = 500
 
 
 class DecryptionDefaults:
@@ -63,12 +66,30 @@ class LoggingDefaults:
     ENABLE_LOGS = False
     DEFAULT_LOG_LEVEL = "critical"
     SUPPORTED_LOG_LEVELS = ["critical", "all"]
+    MAX_LOG_MB = 64          # a log is rotated before it grows past this
+    LOG_ARCHIVES = 5         # gzip-compressed generations kept per log
 
 
 class PerformanceDefaults:
     """Default performance preferences."""
 
     CLAMP_CPU_THREADS = True
+    MEMORY_BUDGET_MB = 256   # per-file cap on I/O buffers, every engine
+    MMAP_IO = False          # Python fallback maps large files instead of reading them
+
+
+class DiagnosticsDefaults:
+    """Default diagnostics preferences."""
+
+    TRACE_TIMELINE = False   # write a Chrome trace-event timeline of each operation
+    TRACE_ENV = "GFGLOCK_TRACE"
+    EXPORT_METRICS = False   # keep an OpenMetrics text file of counters and latency histograms
+    METRICS_ENV = "GFGLOCK_METRICS_FILE"
+    METRICS_INTERVAL = 15.0  # seconds between metrics file rewrites during an operation
+    PROFILE_OPERATIONS = False   # save a cProfile .prof of each operation and of startup
+    PROFILE_MEMORY = False       # add tracemalloc allocation reports to those profiles
+    PROFILE_ENV = "GFGLOCK_PROFILE"
+    PROFILE_TOP_ALLOCATIONS = 30
 
 
 class NotificationDefaults:
@@ -88,6 +109,9 @@ def get_default_settings() -> Dict[str, Any]:
             "cpu_threads": EncryptionDefaults.DEFAULT_THREADS,
             "chunk_size": EncryptionDefaults.DEFAULT_CHUNK_SIZE,
             "encrypt_filenames": EncryptionDefaults.DEFAULT_ENCRYPT_FILENAMES,
+            "batch_keys": EncryptionDefaults.DEFAULT_BATCH_KEYS,
+            "kdf_iterations": EncryptionDefaults.DEFAULT_KDF_ITERATIONS,
+            "kdf_target_ms": EncryptionDefaults.DEFAULT_KDF_TARGET_MS,
         },
         "decryption": {
             "cpu_threads": DecryptionDefaults.DEFAULT_THREADS,
@@ -98,6 +122,12 @@ def get_default_settings() -> Dict[str, Any]:
             "enable_logs": LoggingDefaults.ENABLE_LOGS,
             "log_level": LoggingDefaults.DEFAULT_LOG_LEVEL,
             "clamp_cpu_threads": PerformanceDefaults.CLAMP_CPU_THREADS,
+            "memory_budget_mb": PerformanceDefaults.MEMORY_BUDGET_MB,
+            "mmap_io": PerformanceDefaults.MMAP_IO,
+            "trace_timeline": DiagnosticsDefaults.TRACE_TIMELINE,
+            "export_metrics": DiagnosticsDefaults.EXPORT_METRICS,
+            "profile_operations": DiagnosticsDefaults.PROFILE_OPERATIONS,
+            "profile_memory": DiagnosticsDefaults.PROFILE_MEMORY,
             "operation_notifications": NotificationDefaults.OPERATION_NOTIFICATIONS,
         },
     }
@@ -147,6 +147,24 @@ class ChunkSizeOptions:
         return ChunkSizeOptions.OPTIONS
 
 
+class MemoryBudgetOptions:
+    """Per-file memory budget options (label, megabytes)."""
+
+    OPTIONS = [
+        ("64 MB (low memory)", 64),
+        ("128 MB", 128),
+        ("256 MB (default)", 256),
+        ("512 MB", 512),
+        ("1 GB", 1024),
+        ("2 GB", 2048),
+    ]
+
+    @staticmethod
+    def get_options() -> list:
+        """Return list of (label, megabytes) tuples."""
+        return MemoryBudgetOptions.OPTIONS
+
+
 class FileItemSizes:
     """Size constants for file list items."""
 
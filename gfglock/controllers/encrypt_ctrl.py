@@ -6,12 +6,12 @@ from PySide6.QtCore import Property, QObject, QThreadPool, QUrl, Signal, Slot
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QApplication
 
-from gfglock.config.defaults import NotificationDefaults, PerformanceDefaults
+from gfglock.config.defaults import EncryptionDefaults, NotificationDefaults, PerformanceDefaults
 
 from gfglock.models.file_model import FileListModel
 from gfglock.services.notifier import send_notification
 from gfglock.services.worker import EncryptDecryptWorker
-from gfglock.utils.logging import write_log, write_session_separator
+from gfglock.utils.logging import write_log, write_logs, write_session_separator
 from gfglock.utils.settings import load_settings
 
 _ENC_EXTS = frozenset((".gfglock", ".gfglck", ".gfgcha"))
@@ -28,8 +28,8 @@ class EncryptController(QObject):
     # Progress and status signals (forwarded from worker)
     progressChanged = Signal(float, float)              # (processed_bytes, total_bytes)
     filesProgressChanged = Signal(int, int)            # (done_files, total_files)
-    currentFileChanged = Signal(str)                   # current file path
-    statusChanged = Signal(str)                        # status/log message
+    currentFileChanged = Signal(str)                   # last finished file path
+    statusChanged = Signal(str)                        # status/log message(s), one per line
     errorOccurred = Signal(str)                        # error message
     operationFinished = Signal(float, int, int, int, int)  # elapsed, total, ok, fail, skip
     operationStarted = Signal()
@@ -165,6 +165,16 @@ class EncryptController(QObject):
                 threads=threads,
                 chunk_size=chunk_size,
                 enc_algo=enc_algo,
+                batch_keys=settings.get("encryption", {}).get(
+                    "batch_keys", EncryptionDefaults.DEFAULT_BATCH_KEYS
+                ),
+                kdf_iterations=settings.get("encryption", {}).get(
+                    "kdf_iterations", EncryptionDefaults.DEFAULT_KDF_ITERATIONS
+                ),
+                memory_budget=settings.get("advanced", {}).get(
+                    "memory_budget_mb", PerformanceDefaults.MEMORY_BUDGET_MB
+                ) * 1024 * 1024,
+                use_mmap=settings.get("advanced", {}).get("mmap_io", PerformanceDefaults.MMAP_IO),
             )
             self._connect_worker()
             self._set_busy(True)
@@ -224,17 +234,25 @@ class EncryptController(QObject):
         sigs = self._worker.signals
         sigs.progress.connect(self.progressChanged, conn)
         sigs.files_progress.connect(self.filesProgressChanged, conn)
-        sigs.file_changed.connect(self.currentFileChanged, conn)
         sigs.status.connect(self.statusChanged, conn)
         sigs.error.connect(self.errorOccurred, conn)
-        sigs.file_result.connect(self._log_file_result, conn)
+        sigs.results.connect(self._on_results, conn)
         sigs.finished.connect(self._on_finished, conn)
 
-    def _log_file_result(self, success: bool, msg: str) -> None:
-        """Log per-file result to general log; failures also go to critical."""
-        write_log(msg, "general")
-        if not success:
-            write_log(msg, "critical")
+    def _on_results(self, results: list) -> None:
+        """Forward one batch of (path, ok, message) file results to QML and the logs.
+
+        QML gets a single status update with one line per message; every message
+        goes to the general log and failures also to critical, one write each.
+        """
+        if not results:
+            return
+        messages = [msg for _, _, msg in results if msg]
+        if messages:
+            self.statusChanged.emit("\n".join(messages))
+        self.currentFileChanged.emit(results[-1][0])
+        write_logs(messages, "general")
+        write_logs([msg for _, ok, msg in results if msg and not ok], "critical")
 
 
     def _on_finished(self, elapsed, total, succeeded, failed, skipped) -> None:
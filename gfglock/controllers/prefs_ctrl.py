@@ -13,16 +13,22 @@ from gfglock.config.defaults import (
     AlgorithmDefaults,
     AppearanceDefaults,
     DecryptionDefaults,
+    DiagnosticsDefaults,
     EncryptionDefaults,
     LoggingDefaults,
     NotificationDefaults,
     PerformanceDefaults,
     ThemeDefaults,
 )
-from gfglock.config.ui_config import ChunkSizeOptions, EncryptionModes
+from gfglock.config.ui_config import ChunkSizeOptions, EncryptionModes, MemoryBudgetOptions
 from gfglock.core import native_bridge
 from gfglock.utils.logging import clear_logs, get_logs_dir
-from gfglock.utils.settings import get_default_settings, load_settings, save_settings
+from gfglock.utils.settings import (
+    get_default_settings,
+    invalidate_settings_cache,
+    load_settings,
+    save_settings,
+)
 
 
 class PrefsController(QObject):
@@ -88,6 +94,21 @@ class PrefsController(QObject):
     def encFilenames(self) -> bool:
         return self._get("encryption", "encrypt_filenames", default=False)
 
+    @Property(bool, notify=settingsChanged)
+    def batchKeys(self) -> bool:
+        """True when a batch derives one PBKDF2 master key and HKDF keys per file."""
+        return self._get("encryption", "batch_keys", default=EncryptionDefaults.DEFAULT_BATCH_KEYS)
+
+    @Property(int, notify=settingsChanged)
+    def kdfIterations(self) -> int:
+        """PBKDF2 iteration count recorded in newly encrypted files."""
+        return self._get("encryption", "kdf_iterations", default=EncryptionDefaults.DEFAULT_KDF_ITERATIONS)
+
+    @Property(int, notify=settingsChanged)
+    def kdfTargetMs(self) -> int:
+        """Key-derivation latency that calibrateKdf aims for, in milliseconds."""
+        return self._get("encryption", "kdf_target_ms", default=EncryptionDefaults.DEFAULT_KDF_TARGET_MS)
+
     @Property(int, notify=settingsChanged)
     def decThreads(self) -> int:
         return self._get("decryption", "cpu_threads", default=DecryptionDefaults.DEFAULT_THREADS)
@@ -114,6 +135,36 @@ class PrefsController(QObject):
         """True when one CPU thread is reserved for the OS (default on)."""
         return self._get("advanced", "clamp_cpu_threads", default=PerformanceDefaults.CLAMP_CPU_THREADS)
 
+    @Property(int, notify=settingsChanged)
+    def memoryBudgetMb(self) -> int:
+        """Most I/O buffer memory one file may hold while encrypting or decrypting, in MB."""
+        return self._get("advanced", "memory_budget_mb", default=PerformanceDefaults.MEMORY_BUDGET_MB)
+
+    @Property(bool, notify=settingsChanged)
+    def mmapIo(self) -> bool:
+        """True when the Python fallback reads large files through a memory mapping."""
+        return self._get("advanced", "mmap_io", default=PerformanceDefaults.MMAP_IO)
+
+    @Property(bool, notify=settingsChanged)
+    def traceTimeline(self) -> bool:
+        """True when each operation writes a Chrome trace-event timeline to the logs folder."""
+        return self._get("advanced", "trace_timeline", default=DiagnosticsDefaults.TRACE_TIMELINE)
+
+    @Property(bool, notify=settingsChanged)
+    def exportMetrics(self) -> bool:
+        """True when operations keep an OpenMetrics file of counters and latencies in the logs folder."""
+        return self._get("advanced", "export_metrics", default=DiagnosticsDefaults.EXPORT_METRICS)
+
+    @Property(bool, notify=settingsChanged)
+    def profileOperations(self) -> bool:
+        """True when operations and startup save a cProfile profile to the logs folder."""
+        return self._get("advanced", "profile_operations", default=DiagnosticsDefaults.PROFILE_OPERATIONS)
+
+    @Property(bool, notify=settingsChanged)
+    def profileMemory(self) -> bool:
+        """True when those profiles also include tracemalloc allocation reports."""
+        return self._get("advanced", "profile_memory", default=DiagnosticsDefaults.PROFILE_MEMORY)
+
     @Property(bool, notify=settingsChanged)
     def logTextWrap(self) -> bool:
         """True when the logs panel wraps long lines (default on)."""
@@ -143,6 +194,11 @@ class PrefsController(QObject):
             for label, val in ChunkSizeOptions.get_options()
         ]
 
+    @Property(list, constant=True)
+    def memoryBudgetOptions(self) -> list:
+        """Return list of {label, value} dicts for the memory budget dropdown."""
+        return [{"label": label, "value": val} for label, val in MemoryBudgetOptions.get_options()]
+
     @Property(bool, constant=True)
     def nativeAvailable(self) -> bool:
         """True when the native C++ extension (.pyd) is loaded."""
@@ -154,6 +210,7 @@ class PrefsController(QObject):
     def loadSettings(self) -> None:
         """Reload settings from disk and notify QML."""
         try:
+            invalidate_settings_cache()
             self._settings = load_settings()
             self.settingsChanged.emit()
         except Exception:
@@ -198,6 +255,18 @@ class PrefsController(QObject):
         except Exception:
             pass
 
+    @Slot(int, result=int)
+    def calibrateKdf(self, target_ms: int) -> int:
+        """Measure PBKDF2 speed here and return the iteration count for target_ms.
+
+        Nothing is saved; the window stores the result with its other values.
+        Returns the current setting if the measurement fails.
+        """
+        try:
+            return native_bridge.calibrate_iterations(target_ms)
+        except Exception:
+            return self.kdfIterations
+
     @Slot()
     def clearLogs(self) -> None:
         """Delete all log file contents."""
@@ -1,5 +1,10 @@
 # core - encryption algorithm implementations
 
 from gfglock.core import native_bridge
+from gfglock.core.reader import decrypt_range, open_encrypted
+from gfglock.core.segmented import decrypt_buffer, encrypt_buffer, encrypt_stream
 
-__all__ = ["aes256_gcm_cfb", "chacha20_poly1305", "native_bridge"]
+__all__ = [
+    "aes256_gcm_cfb", "chacha20_poly1305", "native_bridge",
+    "decrypt_range", "open_encrypted", "encrypt_stream", "encrypt_buffer", "decrypt_buffer",
+]
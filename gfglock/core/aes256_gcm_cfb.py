@@ -8,7 +8,7 @@ from functools import partial
 from multiprocessing import Pool, freeze_support
 from typing import Callable, Optional
 
-from gfglock.core import native_bridge
+from gfglock.core import native_bridge, segmented
 from gfglock.utils.helpers import (
     clamp_threads,
     format_duration,
@@ -23,19 +23,37 @@ def encrypt_file(
     chunk_size=None,
     AEAD: bool = True,
     progress_callback: Optional[Callable] = None,
+    threads: int = 1,
+    keys: Optional[segmented.KeySession] = None,
+    iterations: int = native_bridge.KDF_ITERATIONS,
+    memory_budget: int = segmented.DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[segmented.FileStats] = None,
 ) -> tuple[bool, str]:
-    """Encrypt a single file using AES-256 GCM (AEAD) or CFB."""
+    """Encrypt a single file using AES-256 GCM (AEAD) or CFB.
+
+    The payload is written as a segmented container; threads > 1 seals
+    segments of this one file in parallel. Passing a KeySession shares one
+    PBKDF2 run across every file of a batch. iterations is the PBKDF2 count
+    recorded in the header (a KeySession's own count takes precedence).
+    memory_budget caps the bytes of I/O buffers held for the file. use_mmap lets
+    the Python fallback read large files through a memory mapping. stats, if
+    given, collects the phase timings.
+    """
     cs = 0 if chunk_size is None else int(chunk_size)
     mode = "GCM" if AEAD else "CFB"
     if native_bridge.NATIVE_AVAILABLE:
         safe_print(f"[AES-{mode}] Encrypt: native C++ path  →  {os.path.basename(path)}")
         fn = native_bridge.encrypt_gcm if AEAD else native_bridge.encrypt_cfb
-        ok, msg = fn(path, password, encrypt_name, cs, progress_callback)
+        ok, msg = fn(path, password, encrypt_name, cs, progress_callback, threads=threads,
+                     memory_budget=memory_budget, stats=stats,
+                     **segmented.native_key_args(keys, iterations=iterations))
         if msg:
             safe_print(msg)
         return ok, msg
     safe_print(f"[AES-{mode}] Encrypt: Python fallback path  →  {os.path.basename(path)}")
-    return _encrypt_file_py(path, password, encrypt_name, chunk_size, AEAD, progress_callback)
+    return _encrypt_file_py(path, password, encrypt_name, chunk_size, AEAD, progress_callback, threads, keys,
+                            iterations, memory_budget, use_mmap, stats)
 
 
 def decrypt_file(
@@ -43,32 +61,43 @@ def decrypt_file(
     password: str,
     chunk_size=None,
     progress_callback: Optional[Callable] = None,
+    threads: int = 1,
+    keys: Optional[segmented.KeySession] = None,
+    memory_budget: int = segmented.DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[segmented.FileStats] = None,
 ) -> tuple[bool, str]:
-    """Decrypt a single AES-256 GCM or CFB encrypted file."""
+    """Decrypt a single AES-256 GCM or CFB encrypted file (segmented or legacy layout).
+
+    memory_budget caps the bytes of I/O buffers held for the file; legacy
+    payloads too large to decrypt in one piece are streamed instead. use_mmap
+    lets the Python fallback read large files through a memory mapping. stats,
+    if given, collects the phase timings (Python legacy layouts: delete only).
+    """
     if native_bridge.NATIVE_AVAILABLE:
         is_gcm = path.lower().endswith(".gfglock")
         mode = "GCM" if is_gcm else "CFB"
         safe_print(f"[AES-{mode}] Decrypt: native C++ path  →  {os.path.basename(path)}")
         fn = native_bridge.decrypt_gcm if is_gcm else native_bridge.decrypt_cfb
-        ok, msg = fn(path, password, progress_callback)
+        ok, msg = fn(path, password, progress_callback, threads=threads, memory_budget=memory_budget,
+                     stats=stats, **segmented.native_key_args(keys, path))
         if msg:
             safe_print(msg)
         return ok, msg
     safe_print(f"[AES] Decrypt: Python fallback path  →  {os.path.basename(path)}")
-    return _decrypt_file_py(path, password, chunk_size, progress_callback)
+    return _decrypt_file_py(path, password, chunk_size, progress_callback, threads, keys, memory_budget,
+                            use_mmap, stats)
 
 
 # ── Python fallback (used when .pyd is not available) ────────────────────────
 
 import io
 import struct
-from secrets import token_bytes
 from typing import cast
 
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
-from gfglock.core.chunk_processing import FileChunker
 from gfglock.utils.helpers import (
     derive_key,
     generate_encrypted_name,
@@ -82,13 +111,17 @@ CHUNK_FIELD_SIZE = 4
 BUFFER_SIZE = 512 * 1024
 SMALL_FILE_THRESHOLD = 10 * 1024 * 1024
 PROGRESS_UPDATE_INTERVAL = 100 * 1024 * 1024
+# update_into() wants room for a block beyond the input (AES block size - 1)
+UPDATE_INTO_SLACK = 15
 
 
-def _encrypt_file_py(path, password, encrypt_name, chunk_size, AEAD, progress_callback):
+def _encrypt_file_py(path, password, encrypt_name, chunk_size, AEAD, progress_callback, threads=1, keys=None,
+                     iterations=native_bridge.KDF_ITERATIONS, memory_budget=segmented.DEFAULT_MEMORY_BUDGET,
+                     use_mmap=False, stats=None):
     """Python-level AES-256-GCM/CFB encrypt (fallback when native is unavailable)."""
+    stats = stats if stats is not None else segmented.FileStats()
     logs = []
     out_path = None
-    chunker = None
     try:
         if not os.path.exists(path):
             msg = f"Critical error: {path} not found"
@@ -97,79 +130,16 @@ def _encrypt_file_py(path, password, encrypt_name, chunk_size, AEAD, progress_ca
             msg = f"{path} is already encrypted"
             logs.append(msg); safe_print(msg); return False, "\n".join(logs)
 
-        file_size = os.path.getsize(path)
-        if file_size < SMALL_FILE_THRESHOLD:
-            chunk_size = None
-
-        ext = ".gfglock" if AEAD else ".gfglck"
-        out_name = generate_encrypted_name(path, encrypt_name, ext)
+        suite = segmented.GCM if AEAD else segmented.CFB
+        out_name = generate_encrypted_name(path, encrypt_name, suite.ext)
         out_path = os.path.join(os.path.dirname(path), out_name)
+        segmented.encrypt_path(path, out_path, password, suite, threads, chunk_size, progress_callback, keys,
+                               iterations, memory_budget, use_mmap, stats)
 
-        with open(path, "rb", buffering=BUFFER_SIZE) as fin, open(out_path, "wb", buffering=BUFFER_SIZE) as fout:
-            chunker = FileChunker()
-            if AEAD:
-                salt = token_bytes(SALT_SIZE); nonce = token_bytes(NONCE_SIZE)
-                key = derive_key(password, salt)
-                cipher = Cipher(algorithms.AES(key), modes.GCM(nonce), backend=default_backend())
-                encryptor = cipher.encryptor()
-                fout.write(salt); fout.write(nonce)
-                cs = 0 if chunk_size is None else int(chunk_size)
-                fout.write(struct.pack(">I", cs))
-                name_meta = os.path.basename(path).encode("utf-8") + b"\0"
-                fout.write(encryptor.update(name_meta))
-                if progress_callback:
-                    progress_callback(float(len(name_meta)))
-                if chunk_size is None:
-                    file_data = fin.read()
-                    fout.write(encryptor.update(file_data))
-                    if progress_callback:
-                        progress_callback(float(len(file_data)))
-                else:
-                    effective_chunk = max(chunk_size, BUFFER_SIZE)
-                    progress_batch = 0.0
-                    for data in chunker.stream_chunks(fin, None, effective_chunk):
-                        fout.write(encryptor.update(data))
-                        progress_batch += len(data)
-                        if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
-                            progress_callback(float(progress_batch)); progress_batch = 0.0
-                    if progress_batch > 0 and progress_callback:
-                        progress_callback(float(progress_batch))
-                fout.write(encryptor.finalize()); fout.write(encryptor.tag)
-            else:
-                salt = token_bytes(SALT_SIZE); iv = token_bytes(16)
-                key = derive_key(password, salt)
-                cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
-                encryptor = cipher.encryptor()
-                fout.write(salt); fout.write(iv)
-                cs = 0 if chunk_size is None else int(chunk_size)
-                fout.write(struct.pack(">I", cs))
-                name_meta = os.path.basename(path).encode("utf-8") + b"\0"
-                fout.write(encryptor.update(name_meta))
-                if progress_callback:
-                    progress_callback(float(len(name_meta)))
-                if chunk_size is None:
-                    file_data = fin.read()
-                    fout.write(encryptor.update(file_data))
-                    if progress_callback:
-                        progress_callback(float(len(file_data)))
-                else:
-                    effective_chunk = max(chunk_size, BUFFER_SIZE)
-                    progress_batch = 0.0
-                    for data in chunker.stream_chunks(fin, None, effective_chunk):
-                        fout.write(encryptor.update(data))
-                        progress_batch += len(data)
-                        if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
-                            progress_callback(float(progress_batch)); progress_batch = 0.0
-                    if progress_batch > 0 and progress_callback:
-                        progress_callback(float(progress_batch))
-
-        os.remove(path)
+        with stats.phase("delete"):
+            os.remove(path)
         msg = f"Encrypted: {path} -> {out_path}"
         logs.append(msg); safe_print(msg)
-        try:
-            chunker.cleanup_temp_dir()  # type: ignore[union-attr]
-        except Exception:
-            pass
         return True, "\n".join(logs)
     except Exception as e:
         msg = f"Critical error while encrypting {path}: {e}"
@@ -179,16 +149,13 @@ def _encrypt_file_py(path, password, encrypt_name, chunk_size, AEAD, progress_ca
                 os.remove(out_path)
         except Exception:
             pass
-        if chunker:
-            try:
-                chunker.cleanup_temp_dir()
-            except Exception:
-                pass
         return False, "\n".join(logs)
 
 
-def _decrypt_file_py(path, password, chunk_size, progress_callback):
+def _decrypt_file_py(path, password, chunk_size, progress_callback, threads=1, keys=None,
+                     memory_budget=segmented.DEFAULT_MEMORY_BUDGET, use_mmap=False, stats=None):
     """Python-level AES-256-GCM/CFB decrypt (fallback when native is unavailable)."""
+    stats = stats if stats is not None else segmented.FileStats()
     logs = []
     out_path = None
     try:
@@ -204,10 +171,21 @@ def _decrypt_file_py(path, password, chunk_size, progress_callback):
             msg = f"Critical error: {path} is too small or corrupted"
             logs.append(msg); safe_print(msg); return False, "\n".join(logs)
 
+        if segmented.is_segmented(path):
+            out_path = segmented.decrypt_path(path, password, threads, chunk_size, progress_callback, keys,
+                                              memory_budget, use_mmap, stats)
+            with stats.phase("delete"):
+                os.remove(path)
+            msg = f"Decrypted: {path} -> {out_path}"
+            logs.append(msg); safe_print(msg)
+            return True, "\n".join(logs)
+
         if total_size < SMALL_FILE_THRESHOLD:
             chunk_size = None
 
-        with open(path, "rb", buffering=BUFFER_SIZE) as fin:
+        # Unbuffered: the chunk loops readinto() their own buffers, so a BufferedReader
+        # would only add a second copy of every byte.
+        with open(path, "rb", buffering=0) as fin:
             if path.endswith(".gfglock"):
                 if total_size < SALT_SIZE + NONCE_SIZE + TAG_SIZE + 1:
                     msg = f"Critical error: {path} is too small or corrupted"
@@ -221,8 +199,8 @@ def _decrypt_file_py(path, password, chunk_size, progress_callback):
                 except Exception:
                     file_chunk_size = None
                 data_len = total_size - SALT_SIZE - NONCE_SIZE - CHUNK_FIELD_SIZE - TAG_SIZE
-                key = derive_key(password, salt)
-                chunk_size = file_chunk_size
+                key = keys.base_key(salt) if keys else derive_key(password, salt)
+                chunk_size = segmented.legacy_chunk_size(file_chunk_size, data_len, memory_budget)
 
                 if chunk_size is None:
                     encrypted_data = fin.read(data_len); tag = fin.read(TAG_SIZE)
@@ -242,41 +220,41 @@ def _decrypt_file_py(path, password, chunk_size, progress_callback):
                     original_name = decrypted[:idx].decode("utf-8")
                     out_path = os.path.join(os.path.dirname(path), original_name)
                     with open(out_path, "wb", buffering=BUFFER_SIZE) as fout:
-                        fout.write(decrypted[idx + 1:])
+                        fout.write(memoryview(decrypted)[idx + 1:])
                 else:
                     effective_chunk = max(chunk_size, BUFFER_SIZE)
                     cipher = Cipher(algorithms.AES(key), modes.GCM(nonce), backend=default_backend())
                     decryptor = cipher.decryptor()
-                    meta = b""; got_meta = False
+                    out_buf = bytearray(effective_chunk + UPDATE_INTO_SLACK)
+                    out_view = memoryview(out_buf)
+                    meta = bytearray(); got_meta = False
                     temp_out: Optional[io.BufferedWriter] = None
-                    remaining = data_len; progress_batch = 0.0
+                    progress_batch = 0.0
                     try:
-                        while remaining > 0:
-                            to_read = min(remaining, effective_chunk)
-                            enc_chunk = fin.read(to_read)
-                            if not enc_chunk:
-                                break
-                            remaining -= len(enc_chunk)
-                            progress_batch += len(enc_chunk)
-                            dec = decryptor.update(enc_chunk)
-                            if not got_meta:
-                                idx = dec.find(b"\0")
-                                if idx != -1:
-                                    meta += dec[:idx]
-                                    original_name = meta.decode("utf-8")
-                                    out_path = os.path.join(os.path.dirname(path), original_name)
-                                    temp_out = cast(io.BufferedWriter, open(out_path, "wb", buffering=BUFFER_SIZE))
-                                    rest = dec[idx + 1:]
-                                    if rest and temp_out is not None:
-                                        temp_out.write(rest)
-                                    got_meta = True
+                        with segmented.mapped_file(fin, use_mmap) as mapped:
+                            for src in segmented.read_views(fin, data_len, effective_chunk, mapped):
+                                n = len(src)
+                                progress_batch += n
+                                dec = out_view[:decryptor.update_into(src, out_view)]
+                                if not got_meta:
+                                    idx = out_buf.find(b"\0", 0, len(dec))
+                                    if idx != -1:
+                                        meta += dec[:idx]
+                                        original_name = meta.decode("utf-8")
+                                        out_path = os.path.join(os.path.dirname(path), original_name)
+                                        temp_out = cast(io.BufferedWriter,
+                                                        open(out_path, "wb", buffering=BUFFER_SIZE))
+                                        rest = dec[idx + 1:]
+                                        if rest and temp_out is not None:
+                                            temp_out.write(rest)
+                                        got_meta = True
+                                    else:
+                                        meta += dec
                                 else:
-                                    meta += dec
-                            else:
-                                if temp_out:
-                                    temp_out.write(dec)
-                            if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
-                                progress_callback(float(progress_batch)); progress_batch = 0.0
+                                    if temp_out:
+                                        temp_out.write(dec)
+                                if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
+                                    progress_callback(float(progress_batch)); progress_batch = 0.0
                         if progress_batch > 0 and progress_callback:
                             progress_callback(float(progress_batch))
                         tag = fin.read(TAG_SIZE)
@@ -308,11 +286,11 @@ def _decrypt_file_py(path, password, chunk_size, progress_callback):
                 except Exception:
                     file_chunk_size = None
                 data_len = total_size - SALT_SIZE - 16 - CHUNK_FIELD_SIZE
-                chunk_size = file_chunk_size
-                key = derive_key(password, salt)
+                chunk_size = segmented.legacy_chunk_size(file_chunk_size, data_len, memory_budget)
+                key = keys.base_key(salt) if keys else derive_key(password, salt)
                 cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
                 decryptor = cipher.decryptor()
-                meta = b""; got_meta = False
+                meta = bytearray(); got_meta = False
                 temp_out = None
 
                 if chunk_size is None:
@@ -327,37 +305,37 @@ def _decrypt_file_py(path, password, chunk_size, progress_callback):
                     original_name = dec[:idx].decode("utf-8")
                     out_path = os.path.join(os.path.dirname(path), original_name)
                     with open(out_path, "wb", buffering=BUFFER_SIZE) as fout:
-                        fout.write(dec[idx + 1:])
+                        fout.write(memoryview(dec)[idx + 1:])
                 else:
                     effective_chunk = max(chunk_size, BUFFER_SIZE)
-                    remaining = data_len; progress_batch = 0.0
+                    out_buf = bytearray(effective_chunk + UPDATE_INTO_SLACK)
+                    out_view = memoryview(out_buf)
+                    progress_batch = 0.0
                     try:
-                        while remaining > 0:
-                            to_read = min(remaining, effective_chunk)
-                            enc_chunk = fin.read(to_read)
-                            if not enc_chunk:
-                                break
-                            remaining -= len(enc_chunk)
-                            progress_batch += len(enc_chunk)
-                            dec = decryptor.update(enc_chunk)
-                            if not got_meta:
-                                idx = dec.find(b"\0")
-                                if idx != -1:
-                                    meta += dec[:idx]
-                                    original_name = meta.decode("utf-8")
-                                    out_path = os.path.join(os.path.dirname(path), original_name)
-                                    temp_out = cast(io.BufferedWriter, open(out_path, "wb", buffering=BUFFER_SIZE))
-                                    rest = dec[idx + 1:]
-                                    if rest and temp_out is not None:
-                                        temp_out.write(rest)
-                                    got_meta = True
+                        with segmented.mapped_file(fin, use_mmap) as mapped:
+                            for src in segmented.read_views(fin, data_len, effective_chunk, mapped):
+                                n = len(src)
+                                progress_batch += n
+                                dec = out_view[:decryptor.update_into(src, out_view)]
+                                if not got_meta:
+                                    idx = out_buf.find(b"\0", 0, len(dec))
+                                    if idx != -1:
+                                        meta += dec[:idx]
+                                        original_name = meta.decode("utf-8")
+                                        out_path = os.path.join(os.path.dirname(path), original_name)
+                                        temp_out = cast(io.BufferedWriter,
+                                                        open(out_path, "wb", buffering=BUFFER_SIZE))
+                                        rest = dec[idx + 1:]
+                                        if rest and temp_out is not None:
+                                            temp_out.write(rest)
+                                        got_meta = True
+                                    else:
+                                        meta += dec
                                 else:
-                                    meta += dec
-                            else:
-                                if temp_out is not None:
-                                    temp_out.write(dec)
-                            if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
-                                progress_callback(float(progress_batch)); progress_batch = 0.0
+                                    if temp_out is not None:
+                                        temp_out.write(dec)
+                                if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
+                                    progress_callback(float(progress_batch)); progress_batch = 0.0
                         if progress_batch > 0 and progress_callback:
                             progress_callback(float(progress_batch))
                         decryptor.finalize()
@@ -382,7 +360,8 @@ def _decrypt_file_py(path, password, chunk_size, progress_callback):
                 logs.append(msg); safe_print(msg); return False, "\n".join(logs)
 
         try:
-            os.remove(path)
+            with stats.phase("delete"):
+                os.remove(path)
         except Exception:
             pass
         msg = f"Decrypted: {path} -> {out_path}"
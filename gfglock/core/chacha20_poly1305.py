@@ -7,7 +7,7 @@ import time
 from multiprocessing import Pool, freeze_support
 from typing import Callable, Optional
 
-from gfglock.core import native_bridge
+from gfglock.core import native_bridge, segmented
 from gfglock.utils.helpers import (
     clamp_threads,
     format_duration,
@@ -21,17 +21,33 @@ def encrypt_file(
     encrypt_name: bool = False,
     chunk_size=None,
     progress_callback: Optional[Callable] = None,
+    threads: int = 1,
+    keys: Optional[segmented.KeySession] = None,
+    iterations: int = native_bridge.KDF_ITERATIONS,
+    memory_budget: int = segmented.DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[segmented.FileStats] = None,
 ) -> tuple[bool, str]:
-    """Encrypt a single file using ChaCha20-Poly1305."""
+    """Encrypt a single file using ChaCha20-Poly1305 (segmented container).
+
+    Passing a KeySession shares one PBKDF2 run across every file of a batch.
+    iterations is the PBKDF2 count recorded in the header (a KeySession's own
+    count takes precedence). memory_budget caps the bytes of I/O buffers held
+    for the file. use_mmap lets the Python fallback read large files through a
+    memory mapping. stats, if given, collects the phase timings.
+    """
     cs = 0 if chunk_size is None else int(chunk_size)
     if native_bridge.NATIVE_AVAILABLE:
         safe_print(f"[ChaCha20] Encrypt: native C++ path  →  {os.path.basename(path)}")
-        ok, msg = native_bridge.encrypt_chacha(path, password, encrypt_name, cs, progress_callback)
+        ok, msg = native_bridge.encrypt_chacha(path, password, encrypt_name, cs, progress_callback,
+                                               threads=threads, memory_budget=memory_budget, stats=stats,
+                                               **segmented.native_key_args(keys, iterations=iterations))
         if msg:
             safe_print(msg)
         return ok, msg
     safe_print(f"[ChaCha20] Encrypt: Python fallback path  →  {os.path.basename(path)}")
-    return _encrypt_file_py(path, password, encrypt_name, chunk_size, progress_callback)
+    return _encrypt_file_py(path, password, encrypt_name, chunk_size, progress_callback, threads, keys, iterations,
+                            memory_budget, use_mmap, stats)
 
 
 def decrypt_file(
@@ -39,27 +55,38 @@ def decrypt_file(
     password: str,
     chunk_size=None,
     progress_callback: Optional[Callable] = None,
+    threads: int = 1,
+    keys: Optional[segmented.KeySession] = None,
+    memory_budget: int = segmented.DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[segmented.FileStats] = None,
 ) -> tuple[bool, str]:
-    """Decrypt a single ChaCha20-Poly1305 encrypted file."""
+    """Decrypt a single ChaCha20-Poly1305 encrypted file (segmented or legacy layout).
+
+    memory_budget caps the bytes of I/O buffers held for the file; legacy
+    payloads too large to decrypt in one piece are streamed instead. use_mmap
+    lets the Python fallback read large files through a memory mapping. stats,
+    if given, collects the phase timings (Python legacy layouts: delete only).
+    """
     if native_bridge.NATIVE_AVAILABLE:
         safe_print(f"[ChaCha20] Decrypt: native C++ path  →  {os.path.basename(path)}")
-        ok, msg = native_bridge.decrypt_chacha(path, password, progress_callback)
+        ok, msg = native_bridge.decrypt_chacha(path, password, progress_callback, threads=threads,
+                                               memory_budget=memory_budget, stats=stats,
+                                               **segmented.native_key_args(keys, path))
         if msg:
             safe_print(msg)
         return ok, msg
     safe_print(f"[ChaCha20] Decrypt: Python fallback path  →  {os.path.basename(path)}")
-    return _decrypt_file_py(path, password, chunk_size, progress_callback)
+    return _decrypt_file_py(path, password, chunk_size, progress_callback, threads, keys, memory_budget,
+                            use_mmap, stats)
 
 
 # ── Python fallback (used when .pyd is not available) ────────────────────────
 
 import io
 import struct
-from secrets import token_bytes
-
 from Crypto.Cipher import ChaCha20_Poly1305  # type: ignore[import]
 
-from gfglock.core.chunk_processing import FileChunker
 from gfglock.utils.helpers import (
     derive_key,
     generate_encrypted_name,
@@ -81,11 +108,17 @@ def _encrypt_file_py(
     encrypt_name: bool = False,
     chunk_size=None,
     progress_callback: Optional[Callable] = None,
+    threads: int = 1,
+    keys: Optional[segmented.KeySession] = None,
+    iterations: int = native_bridge.KDF_ITERATIONS,
+    memory_budget: int = segmented.DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[segmented.FileStats] = None,
 ) -> tuple[bool, str]:
     """Python fallback: encrypt a file using ChaCha20-Poly1305 via pycryptodome."""
+    stats = stats if stats is not None else segmented.FileStats()
     logs = []
     out_path = None
-    chunker = None
     try:
         if not os.path.exists(path):
             msg = f"Critical error: {path} not found"
@@ -94,61 +127,16 @@ def _encrypt_file_py(
             msg = f"{path} is already encrypted"
             logs.append(msg); safe_print(msg); return False, "\n".join(logs)
 
-        file_size = os.path.getsize(path)
-        if file_size < SMALL_FILE_THRESHOLD:
-            chunk_size = None
-
-        salt = token_bytes(SALT_SIZE)
-        nonce = token_bytes(NONCE_SIZE)
-        key = derive_key(password, salt)
-        cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
-        out_name = generate_encrypted_name(path, encrypt_name, ".gfgcha")
+        out_name = generate_encrypted_name(path, encrypt_name, segmented.CHACHA.ext)
         out_path = os.path.join(os.path.dirname(path), out_name)
-        chunker = FileChunker()
-
-        with open(path, "rb", buffering=BUFFER_SIZE) as fin, open(out_path, "wb", buffering=BUFFER_SIZE) as fout:
-            fout.write(salt); fout.write(nonce)
-            cs = 0 if chunk_size is None else int(chunk_size)
-            fout.write(struct.pack(">I", cs))
-            name_meta = os.path.basename(path).encode("utf-8") + b"\0"
-            fout.write(cipher.encrypt(name_meta))
-            if progress_callback:
-                progress_callback(float(len(name_meta)))
+        segmented.encrypt_path(path, out_path, password, segmented.CHACHA,
+                               threads, chunk_size, progress_callback, keys, iterations, memory_budget, use_mmap,
+                               stats)
 
-            if chunk_size is None:
-                file_data = fin.read()
-                fout.write(cipher.encrypt(file_data))
-                if progress_callback:
-                    progress_callback(float(len(file_data)))
-            else:
-                effective_chunk = max(chunk_size, BUFFER_SIZE)
-                chunks = chunker.split_file(path, effective_chunk)
-                for cpath in chunks:
-                    with open(cpath, "rb") as cf:
-                        progress_batch = 0.0
-                        while True:
-                            data = cf.read(BUFFER_SIZE)
-                            if not data:
-                                break
-                            fout.write(cipher.encrypt(data))
-                            progress_batch += len(data)
-                            if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
-                                progress_callback(float(progress_batch)); progress_batch = 0.0
-                        if progress_batch > 0 and progress_callback:
-                            progress_callback(float(progress_batch))
-                    try:
-                        os.remove(cpath)
-                    except Exception:
-                        pass
-            fout.write(cipher.digest())
-
-        os.remove(path)
+        with stats.phase("delete"):
+            os.remove(path)
         msg = f"Encrypted: {path} -> {out_path}"
         logs.append(msg); safe_print(msg)
-        try:
-            chunker.cleanup_temp_dir()
-        except Exception:
-            pass
         return True, "\n".join(logs)
     except Exception as e:
         msg = f"Critical error while encrypting {path}: {e}"
@@ -158,11 +146,6 @@ def _encrypt_file_py(
                 os.remove(out_path)
         except Exception:
             pass
-        if chunker:
-            try:
-                chunker.cleanup_temp_dir()
-            except Exception:
-                pass
         return False, "\n".join(logs)
 
 
@@ -171,8 +154,14 @@ def _decrypt_file_py(
     password: str,
     chunk_size=None,
     progress_callback: Optional[Callable] = None,
+    threads: int = 1,
+    keys: Optional[segmented.KeySession] = None,
+    memory_budget: int = segmented.DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[segmented.FileStats] = None,
 ) -> tuple[bool, str]:
     """Python fallback: decrypt a ChaCha20-Poly1305 file via pycryptodome."""
+    stats = stats if stats is not None else segmented.FileStats()
     logs = []
     try:
         if not os.path.exists(path):
@@ -187,10 +176,21 @@ def _decrypt_file_py(
             msg = f"Critical error: {path} is too small or corrupted"
             logs.append(msg); safe_print(msg); return False, "\n".join(logs)
 
+        if segmented.is_segmented(path):
+            out_path = segmented.decrypt_path(path, password, threads, chunk_size, progress_callback, keys,
+                                              memory_budget, use_mmap, stats)
+            with stats.phase("delete"):
+                os.remove(path)
+            msg = f"Decrypted: {path} -> {out_path}"
+            logs.append(msg); safe_print(msg)
+            return True, "\n".join(logs)
+
         if total_size < SMALL_FILE_THRESHOLD:
             chunk_size = None
 
-        with open(path, "rb", buffering=BUFFER_SIZE) as fin:
+        # Unbuffered: the chunk loop readinto()s its own buffer, so a BufferedReader
+        # would only add a second copy of every byte.
+        with open(path, "rb", buffering=0) as fin:
             salt = fin.read(SALT_SIZE)
             nonce = fin.read(NONCE_SIZE)
             cs_bytes = fin.read(CHUNK_FIELD_SIZE)
@@ -201,12 +201,12 @@ def _decrypt_file_py(
             except Exception:
                 file_chunk_size = None
             data_len = total_size - SALT_SIZE - NONCE_SIZE - CHUNK_FIELD_SIZE - TAG_SIZE
-            key = derive_key(password, salt)
+            key = keys.base_key(salt) if keys else derive_key(password, salt)
             cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
-            meta = b""; got_meta = False
+            meta = bytearray(); got_meta = False
             out_path = None
             temp_out: Optional[io.BufferedWriter] = None
-            chunk_size = file_chunk_size
+            chunk_size = segmented.legacy_chunk_size(file_chunk_size, data_len, memory_budget)
 
             if chunk_size is None:
                 encrypted_data = fin.read(data_len)
@@ -236,41 +236,41 @@ def _decrypt_file_py(
                     logs.append(msg); safe_print(msg); return False, "\n".join(logs)
                 out_path = os.path.join(os.path.dirname(path), original_name)
                 with open(out_path, "wb", buffering=BUFFER_SIZE) as fout:
-                    fout.write(dec[idx + 1:])
+                    fout.write(memoryview(dec)[idx + 1:])
                 got_meta = True
             else:
                 effective_chunk = max(chunk_size, BUFFER_SIZE)
-                remaining = data_len; progress_batch = 0.0
-                while remaining > 0:
-                    to_read = min(remaining, effective_chunk)
-                    chunk = fin.read(to_read)
-                    if not chunk:
-                        break
-                    remaining -= len(chunk)
-                    progress_batch += len(chunk)
-                    dec = cipher.decrypt(chunk)
-                    if not got_meta:
-                        idx = dec.find(b"\0")
-                        if idx != -1:
-                            meta += dec[:idx]
-                            try:
-                                original_name = meta.decode("utf-8")
-                            except Exception as e:
-                                msg = f"Critical error while decrypting {path}: failed to decode metadata ({e})"
-                                logs.append(msg); safe_print(msg); return False, "\n".join(logs)
-                            out_path = os.path.join(os.path.dirname(path), original_name)
-                            temp_out = open(out_path, "wb", buffering=BUFFER_SIZE)  # type: ignore[assignment]
-                            rest = dec[idx + 1:]
-                            if rest:
-                                temp_out.write(rest)  # type: ignore[union-attr]
-                            got_meta = True
+                out_buf = bytearray(effective_chunk)
+                out_view = memoryview(out_buf)
+                progress_batch = 0.0
+                with segmented.mapped_file(fin, use_mmap) as mapped:
+                    for src in segmented.read_views(fin, data_len, effective_chunk, mapped):
+                        n = len(src)
+                        progress_batch += n
+                        dec = out_view[:n]
+                        cipher.decrypt(src, output=dec)
+                        if not got_meta:
+                            idx = out_buf.find(b"\0", 0, n)
+                            if idx != -1:
+                                meta += dec[:idx]
+                                try:
+                                    original_name = meta.decode("utf-8")
+                                except Exception as e:
+                                    msg = f"Critical error while decrypting {path}: failed to decode metadata ({e})"
+                                    logs.append(msg); safe_print(msg); return False, "\n".join(logs)
+                                out_path = os.path.join(os.path.dirname(path), original_name)
+                                temp_out = open(out_path, "wb", buffering=BUFFER_SIZE)  # type: ignore[assignment]
+                                rest = dec[idx + 1:]
+                                if rest:
+                                    temp_out.write(rest)  # type: ignore[union-attr]
+                                got_meta = True
+                            else:
+                                meta += dec
                         else:
-                            meta += dec
-                    else:
-                        assert temp_out is not None
-                        temp_out.write(dec)
-                    if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
-                        progress_callback(float(progress_batch)); progress_batch = 0.0
+                            assert temp_out is not None
+                            temp_out.write(dec)
+                        if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
+                            progress_callback(float(progress_batch)); progress_batch = 0.0
                 if progress_batch > 0 and progress_callback:
                     progress_callback(float(progress_batch))
                 if not got_meta:
@@ -293,7 +293,8 @@ def _decrypt_file_py(
                     try: temp_out.close()
                     except Exception: pass
 
-        os.remove(path)
+        with stats.phase("delete"):
+            os.remove(path)
         msg = f"Decrypted: {path} -> {out_path}"
         logs.append(msg); safe_print(msg)
         return True, "\n".join(logs)
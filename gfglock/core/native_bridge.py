@@ -4,7 +4,11 @@
 import hashlib
 import os
 import sys
-from typing import Callable, Optional
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
 # ── Locate and load the .pyd ──────────────────────────────────────────────────
 
@@ -42,9 +46,76 @@ except ImportError:
     _native = None
     NATIVE_AVAILABLE = False
 
+# ── Progress counters ─────────────────────────────────────────────────────────
+
+class ProgressCounters:
+    """Shared progress block: bytes processed, files finished and a cancel flag.
+
+    Pass it wherever an engine takes a progress callback. Native engines add to
+    C++ atomics on every write without touching the GIL; Python engines call it
+    like any other callback. Readers sample the totals at their own pace.
+    """
+
+    _BYTES, _FILES, _CANCEL = range(3)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._native = _native.ProgressCounters() if NATIVE_AVAILABLE and _native is not None else None
+        self._slots = memoryview(self._native if self._native is not None else array("Q", [0, 0, 0]))
+
+    def __call__(self, nbytes: float) -> None:
+        """Progress-callback form: count nbytes more processed bytes."""
+        self._add(self._BYTES, int(nbytes))
+
+    def add_file(self) -> None:
+        """Count one more finished file."""
+        self._add(self._FILES, 1)
+
+    def cancel(self) -> None:
+        """Ask batch calls using these counters not to start further files."""
+        self._slots[self._CANCEL] = 1
+
+    @property
+    def bytes(self) -> int:
+        return self._slots[self._BYTES]
+
+    @property
+    def files(self) -> int:
+        return self._slots[self._FILES]
+
+    @property
+    def cancelled(self) -> bool:
+        return bool(self._slots[self._CANCEL])
+
+    def _add(self, slot: int, n: int) -> None:
+        if self._native is not None:
+            self._native.add(slot, n)
+        else:
+            with self._lock:
+                self._slots[slot] += n
+
+
+def _callback_arg(callback):
+    """What to hand the extension for callback: the native block behind counters."""
+    if isinstance(callback, ProgressCounters) and callback._native is not None:
+        return callback._native
+    return callback
+
+
+def _require_native() -> None:
+    """Raise RuntimeError unless the extension is loaded (an explicit check, so -O keeps it)."""
+    if not NATIVE_AVAILABLE or _native is None:
+        raise RuntimeError("native module not loaded")
+
 # ── KDF ───────────────────────────────────────────────────────────────────────
 
-def derive_key(password: str, salt: bytes, iterations: int = 200000) -> bytes:
+KDF_ITERATIONS = 200000        # files without a recorded count (legacy and pre-0x0004)
+MIN_KDF_ITERATIONS = 100000    # floor for calibrated counts and for counts written to new files
+MAX_KDF_ITERATIONS = 10000000  # ceiling for calibrated counts and for counts read from headers
+_CALIBRATION_PROBE = 20000
+
+
+def derive_key(password: str, salt: bytes, iterations: int = KDF_ITERATIONS) -> bytes:
     """Derive a 32-byte key via PBKDF2-HMAC-SHA256 (native when available)."""
     try:
         if NATIVE_AVAILABLE and _native is not None:
@@ -53,6 +124,45 @@ def derive_key(password: str, salt: bytes, iterations: int = 200000) -> bytes:
         pass
     return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=32)
 
+
+def derive_keys(password: str, salts: list, iterations: int = KDF_ITERATIONS, threads: int = 0) -> list:
+    """Derive one 32-byte key per salt in parallel, in the order given.
+
+    The native batch runs entirely without the GIL; the fallback spreads hashlib
+    calls (which also drop the GIL) over a thread pool. threads=0 uses every core.
+    """
+    salts = [bytes(s) for s in salts]
+    if not salts:
+        return []
+    try:
+        if NATIVE_AVAILABLE and _native is not None:
+            return [bytes(k) for k in _native.pbkdf2_sha256_batch(password, salts, iterations, 32, threads)]
+    except Exception:
+        pass
+    pw = password.encode("utf-8")
+    workers = min(len(salts), threads if threads > 0 else (os.cpu_count() or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda s: hashlib.pbkdf2_hmac("sha256", pw, s, iterations, dklen=32), salts))
+
+
+def calibrate_iterations(target_ms: int, rounds: int = 3) -> int:
+    """PBKDF2 iteration count that takes about target_ms on this machine.
+
+    Times the same derive_key path encryption uses (best of rounds), scales to
+    the target, rounds to 10,000 and clamps to [MIN_KDF_ITERATIONS, MAX_KDF_ITERATIONS].
+    """
+    best = float("inf")
+    for _ in range(max(1, rounds)):
+        start = time.perf_counter()
+        derive_key("gfglock calibration", b"\0" * 16, _CALIBRATION_PROBE)
+        best = min(best, time.perf_counter() - start)
+    per_second = _CALIBRATION_PROBE / max(best, 1e-9)
+    count = int(round(per_second * target_ms / 1000.0, -4))
+    return max(MIN_KDF_ITERATIONS, min(MAX_KDF_ITERATIONS, count))
+
+# The single-file functions below pass the call's phase timings and buffer sizes
+# to stats.update() when given stats: a dict or a segmented.FileStats.
+
 # ── AES-256-GCM ───────────────────────────────────────────────────────────────
 
 def encrypt_gcm(
@@ -61,11 +171,19 @@ def encrypt_gcm(
     encrypt_name: bool = False,
     chunk_size: int = 0,
     callback: Optional[Callable[[float], None]] = None,
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[Any] = None,
 ) -> tuple[bool, str]:
     """Encrypt a file with AES-256-GCM via the native module."""
     try:
-        assert NATIVE_AVAILABLE and _native is not None
-        result = _native.encrypt_gcm(path, password, encrypt_name, chunk_size, callback)
+        _require_native()
+        cb = _callback_arg(callback)
+        result = _native.encrypt_gcm(path, password, encrypt_name, chunk_size, cb, threads,
+                                     base_salt, base_key, iterations, memory_budget, stats)
         return bool(result[0]), str(result[1])
     except Exception as e:
         return False, f"Critical error while encrypting {path}: {e}"
@@ -75,11 +193,19 @@ def decrypt_gcm(
     path: str,
     password: str,
     callback: Optional[Callable[[float], None]] = None,
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[Any] = None,
 ) -> tuple[bool, str]:
     """Decrypt a .gfglock file with AES-256-GCM via the native module."""
     try:
-        assert NATIVE_AVAILABLE and _native is not None
-        result = _native.decrypt_gcm(path, password, callback)
+        _require_native()
+        cb = _callback_arg(callback)
+        result = _native.decrypt_gcm(path, password, cb, threads, base_salt, base_key,
+                                     iterations, memory_budget, stats)
         return bool(result[0]), str(result[1])
     except Exception as e:
         return False, f"Critical error while decrypting {path}: {e}"
@@ -92,11 +218,19 @@ def encrypt_cfb(
     encrypt_name: bool = False,
     chunk_size: int = 0,
     callback: Optional[Callable[[float], None]] = None,
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[Any] = None,
 ) -> tuple[bool, str]:
     """Encrypt a file with AES-256-CFB via the native module."""
     try:
-        assert NATIVE_AVAILABLE and _native is not None
-        result = _native.encrypt_cfb(path, password, encrypt_name, chunk_size, callback)
+        _require_native()
+        cb = _callback_arg(callback)
+        result = _native.encrypt_cfb(path, password, encrypt_name, chunk_size, cb, threads,
+                                     base_salt, base_key, iterations, memory_budget, stats)
         return bool(result[0]), str(result[1])
     except Exception as e:
         return False, f"Critical error while encrypting {path}: {e}"
@@ -106,11 +240,19 @@ def decrypt_cfb(
     path: str,
     password: str,
     callback: Optional[Callable[[float], None]] = None,
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[Any] = None,
 ) -> tuple[bool, str]:
     """Decrypt a .gfglck file with AES-256-CFB via the native module."""
     try:
-        assert NATIVE_AVAILABLE and _native is not None
-        result = _native.decrypt_cfb(path, password, callback)
+        _require_native()
+        cb = _callback_arg(callback)
+        result = _native.decrypt_cfb(path, password, cb, threads, base_salt, base_key,
+                                     iterations, memory_budget, stats)
         return bool(result[0]), str(result[1])
     except Exception as e:
         return False, f"Critical error while decrypting {path}: {e}"
@@ -123,11 +265,19 @@ def encrypt_chacha(
     encrypt_name: bool = False,
     chunk_size: int = 0,
     callback: Optional[Callable[[float], None]] = None,
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[Any] = None,
 ) -> tuple[bool, str]:
     """Encrypt a file with ChaCha20-Poly1305 via the native module."""
     try:
-        assert NATIVE_AVAILABLE and _native is not None
-        result = _native.encrypt_chacha(path, password, encrypt_name, chunk_size, callback)
+        _require_native()
+        cb = _callback_arg(callback)
+        result = _native.encrypt_chacha(path, password, encrypt_name, chunk_size, cb, threads,
+                                        base_salt, base_key, iterations, memory_budget, stats)
         return bool(result[0]), str(result[1])
     except Exception as e:
         return False, f"Critical error while encrypting {path}: {e}"
@@ -137,12 +287,192 @@ def decrypt_chacha(
     path: str,
     password: str,
     callback: Optional[Callable[[float], None]] = None,
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[Any] = None,
 ) -> tuple[bool, str]:
     """Decrypt a .gfgcha file with ChaCha20-Poly1305 via the native module."""
     try:
-        assert NATIVE_AVAILABLE and _native is not None
-        result = _native.decrypt_chacha(path, password, callback)
+        _require_native()
+        cb = _callback_arg(callback)
+        result = _native.decrypt_chacha(path, password, cb, threads, base_salt, base_key,
+                                        iterations, memory_budget, stats)
         return bool(result[0]), str(result[1])
     except Exception as e:
         return False, f"Critical error while decrypting {path}: {e}"
 
+
+# ── Batches of files ──────────────────────────────────────────────────────────
+
+class BatchCompletions:
+    """Per-file results of an encrypt_files/decrypt_files call, as each file finishes.
+
+    Pass it as completed=; while the batch runs, any thread may drain() the
+    (index, success, message, stats) entries that arrived since its previous
+    call, instead of waiting for the whole list. stats is the file's
+    phase-timing dict, or None when the engine reported none.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._native = _native.CompletionQueue() if NATIVE_AVAILABLE and _native is not None else None
+        self._pending: list = []
+        self._finished: dict = {}
+
+    def add(self, index: int, success: bool, message: str, stats: Optional[dict] = None) -> None:
+        """Queue the result of the file at index (the native engine queues its own)."""
+        with self._lock:
+            self._pending.append((index, success, message, stats))
+
+    def drain(self) -> list:
+        """Entries queued since the previous call, in completion order."""
+        with self._lock:
+            self._collect()
+            entries, self._pending = self._pending, []
+        return entries
+
+    def _collect(self) -> None:
+        # Caller holds _lock. Remembers every outcome so a failed call can still return them.
+        if self._native is not None:
+            self._pending += self._native.drain()
+        for index, success, message, _ in self._pending:
+            self._finished.setdefault(index, (bool(success), str(message)))
+
+    def _fail_unfinished(self, paths: list, message: Callable[[str], str]) -> list:
+        """Results so far, in order, with every file that never finished failed with message(path).
+
+        The failures are queued too, so a caller draining this object sees them.
+        """
+        with self._lock:
+            self._collect()
+            for index, path in enumerate(paths):
+                if index not in self._finished:
+                    self._finished[index] = (False, message(path))
+                    self._pending.append((index, False, self._finished[index][1], None))
+            return [self._finished[i] for i in range(len(paths))]
+
+
+def encrypt_files(
+    paths: list,
+    password: str,
+    algo: str = "aes256_gcm",
+    encrypt_name: bool = False,
+    chunk_size: int = 0,
+    callback: Optional[Callable[[float, int], Optional[bool]]] = None,
+    threads: int = 0,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[list] = None,
+    completed: Optional[BatchCompletions] = None,
+) -> list:
+    """Encrypt every path in one native call on a C++ thread pool (GIL released once).
+
+    Returns one (success, message) per path, in order, or None for files never
+    started because callback(bytes_since_last_call, files_done) returned True.
+    callback may also be a ProgressCounters, whose cancel() stops the batch.
+    A stats list gets one phase-timing dict per path appended (None when not started).
+    completed, a BatchCompletions, receives each file's result as it finishes. If
+    the call itself fails, files that already finished keep their results and
+    only the rest are marked failed.
+    """
+    paths = list(paths)
+    completed = completed if completed is not None else BatchCompletions()
+    try:
+        _require_native()
+        cb = _callback_arg(callback)
+        return list(_native.encrypt_files(paths, password, algo, encrypt_name, chunk_size, cb, threads,
+                                          base_salt, base_key, iterations, memory_budget, stats,
+                                          completed._native))
+    except Exception as e:
+        return completed._fail_unfinished(paths, lambda p: f"Critical error while encrypting {p}: {e}")
+
+
+def decrypt_files(
+    paths: list,
+    password: str,
+    callback: Optional[Callable[[float, int], Optional[bool]]] = None,
+    threads: int = 0,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = 0,
+    stats: Optional[list] = None,
+    completed: Optional[BatchCompletions] = None,
+) -> list:
+    """Decrypt every path in one native call, choosing the cipher by extension.
+
+    PBKDF2 runs once per distinct (salt, iteration count) in the batch. Results
+    are as for encrypt_files; unknown extensions come back as skip messages.
+    """
+    paths = list(paths)
+    completed = completed if completed is not None else BatchCompletions()
+    try:
+        _require_native()
+        cb = _callback_arg(callback)
+        return list(_native.decrypt_files(paths, password, cb, threads, base_salt, base_key,
+                                          iterations, memory_budget, stats, completed._native))
+    except Exception as e:
+        return completed._fail_unfinished(paths, lambda p: f"Critical error while decrypting {p}: {e}")
+
+
+# ── In-memory containers ──────────────────────────────────────────────────────
+
+def encrypt_buffer(
+    data,
+    password: str,
+    algo: str = "aes256_gcm",
+    name: str = "",
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+) -> Optional[bytes]:
+    """Encrypt a buffer-protocol object into container bytes natively; None means
+    use the Python path. data is read in place with the GIL released."""
+    if not NATIVE_AVAILABLE or _native is None:
+        return None
+    return _native.encrypt_buffer(data, password, algo, name, threads, base_salt, base_key, iterations)
+
+
+def decrypt_buffer(
+    data,
+    password: str,
+    algo: str = "aes256_gcm",
+    threads: int = 1,
+    base_salt: bytes = b"",
+    base_key: bytes = b"",
+    iterations: int = KDF_ITERATIONS,
+) -> Optional[bytes]:
+    """Decrypt in-memory container bytes natively; None means use the Python path.
+
+    Raises ValueError("authentication failed") on a wrong password or tampering.
+    """
+    if not NATIVE_AVAILABLE or _native is None:
+        return None
+    return _native.decrypt_buffer(data, password, algo, threads, base_salt, base_key, iterations)
+
+
+# ── Segment batches ───────────────────────────────────────────────────────────
+
+def seal_segments(
+    algo: str,
+    key: bytes,
+    nonce: bytes,
+    first_index: int,
+    segments: list,
+    final: bool,
+    threads: int = 1,
+) -> Optional[list]:
+    """Seal a batch of container segments natively; None means use the Python path."""
+    try:
+        if NATIVE_AVAILABLE and _native is not None:
+            return list(_native.seal_segments(algo, key, nonce, first_index,
+                                              [bytes(s) for s in segments], final, threads))
+    except Exception:
+        pass
+    return None
@@ -0,0 +1,127 @@
+# reader.py - read plaintext out of segmented containers without writing it to disk.
+# Only the segments covering the requested bytes are read and authenticated, so
+# pulling a few MB out of a multi-GB .gfglock/.gfgcha costs a few MB of I/O.
+
+import io
+import os
+from typing import BinaryIO
+
+from gfglock.core import segmented
+
+
+def _open_container(fin: BinaryIO, path: str, password: str) -> tuple:
+    """Parse and authenticate a container's header; returns (header, key, data_len).
+
+    The key check rejects a wrong password straight after key derivation; opening
+    the name block then verifies every header field before segment offsets are trusted.
+    """
+    suite = segmented.suite_for_path(path)
+    total_size = os.fstat(fin.fileno()).st_size
+    header = segmented.read_header(fin, suite)
+    if header is None:
+        raise ValueError(f"{path} uses the legacy single-stream layout; random access "
+                         "needs the segmented format (decrypt and re-encrypt it once)")
+    if total_size < header.data_offset:
+        raise ValueError("file is too small or corrupted")
+    key = segmented.derive_header_key(password, header)
+    segmented.open_name(fin, header, key)
+    return header, key, total_size - header.data_offset
+
+
+def decrypt_range(path: str, password: str, offset: int, length: int) -> bytes:
+    """Return up to length plaintext bytes starting at offset.
+
+    Reads past the end of the plaintext are truncated, as with file.read().
+    Raises ValueError("authentication failed") on a wrong password or when a
+    touched segment has been tampered with, and ValueError for legacy files.
+    """
+    if offset < 0 or length < 0:
+        raise ValueError("offset and length must be non-negative")
+    with open(path, "rb") as fin:
+        header, key, data_len = _open_container(fin, path, password)
+        end = min(offset + length, segmented.plaintext_size(data_len, header))
+        if offset >= end:
+            return b""
+        seg = header.segment_size
+        first, last = offset // seg + 1, (end - 1) // seg + 1
+        parts = [segmented.read_segment(fin, header, key, i, data_len) for i in range(first, last + 1)]
+    start = offset - (first - 1) * seg
+    return b"".join(parts)[start:start + (end - offset)]
+
+
+class EncryptedReader(io.RawIOBase):
+    """Seekable raw stream of a container's plaintext, decrypted one segment at a time.
+
+    Every segment is authenticated before any of its bytes are returned; at most
+    one decrypted segment is held in memory.
+    """
+
+    def __init__(self, path: str, password: str):
+        super().__init__()
+        self.name = path
+        self._fin = open(path, "rb")
+        try:
+            self._header, self._key, self._data_len = _open_container(self._fin, path, password)
+        except Exception:
+            self._fin.close()
+            raise
+        self._size = segmented.plaintext_size(self._data_len, self._header)
+        self._pos = 0
+        self._cached_index = 0
+        self._cached = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if self._pos >= self._size:
+            return 0
+        seg = self._header.segment_size
+        index = self._pos // seg + 1
+        if index != self._cached_index:
+            self._cached = segmented.read_segment(self._fin, self._header, self._key, index, self._data_len)
+            self._cached_index = index
+        start = self._pos - (index - 1) * seg
+        view = memoryview(b).cast("B")
+        n = min(len(view), len(self._cached) - start)
+        view[:n] = self._cached[start:start + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self._size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence!r})")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if not self.closed:
+            self._fin.close()
+            self._cached = b""
+        super().close()
+
+
+def open_encrypted(path: str, password: str, buffer_size: int = io.DEFAULT_BUFFER_SIZE) -> io.BufferedReader:
+    """Open an encrypted file for reading its plaintext in memory.
+
+    Plaintext is never written to disk and the container is left in place; use the
+    result as a context manager. Raises like decrypt_range() for bad passwords or
+    legacy files.
+    """
+    return io.BufferedReader(EncryptedReader(path, password), buffer_size)
@@ -0,0 +1,1059 @@
+# segmented.py - seekable segmented container shared by every cipher.
+# The payload is split into fixed-size segments, each sealed under its own
+# derived nonce and bound to its index and a final-segment flag, so segments
+# can be encrypted and decrypted independently on a thread pool.
+#
+# Layout (all integers big-endian):
+#   salt(16) | nonce(12, or 16-byte IV for CFB)
+#   marker(1)=0x80 | version(1) | flags(2) | segment_size(4) | name_len(4)
+#   optional fields, present per flag bit, in bit order:
+#     0x0001 key check(16) = HMAC-SHA256(key, "gfglock key check")[:16]
+#     0x0002 file salt(16): salt is a batch salt; key = HKDF(PBKDF2(salt), file salt)
+#     0x0004 kdf iterations(4): PBKDF2 iteration count (200,000 when absent)
+#   name block  = seal(filename)            index 0, AAD = header + index/flag
+#   segment 1…N = seal(segment_size bytes)  last one shorter and flagged final
+#
+# Legacy files carry a 4-byte chunk-size field where the marker sits; chunk
+# sizes never reach 2**31, so a set top bit unambiguously selects this layout.
+
+import hashlib
+import hmac
+import io
+import mmap
+import os
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from secrets import token_bytes
+from typing import BinaryIO, Callable, Iterable, Iterator, Optional
+
+from Crypto.Cipher import ChaCha20_Poly1305  # type: ignore[import]
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from gfglock.core import native_bridge, tracing
+from gfglock.core.chunk_processing import FileChunker
+
+SALT_SIZE = 16
+TAG_SIZE = 16
+EXT_MARKER = 0x80
+FORMAT_VERSION = 2
+SEGMENT_SIZE = 1024 * 1024
+PROGRESS_UPDATE_INTERVAL = 100 * 1024 * 1024
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024   # bytes of I/O buffers one file may hold
+MMAP_THRESHOLD = 64 * 1024 * 1024           # smallest input the mmap read path maps
+
+FLAG_KEY_CHECK = 0x0001
+FLAG_SESSION_KEY = 0x0002
+FLAG_KDF_ITERATIONS = 0x0004
+KEY_CHECK_SIZE = 16
+KDF_ITERATIONS = native_bridge.KDF_ITERATIONS
+_KEY_CHECK_LABEL = b"gfglock key check"
+_FILE_KEY_INFO = b"gfglock file key"
+
+_EXT_FIELDS = struct.Struct(">BBHII")  # marker, version, flags, segment_size, name_len
+_SEGMENT_AAD = struct.Struct(">QB")    # segment index, final flag
+# Optional header fields in on-disk order:
+# (flag bit, size in bytes, SegmentHeader attribute, type: bytes or big-endian int)
+_OPTIONAL_FIELDS = (
+    (FLAG_KEY_CHECK, KEY_CHECK_SIZE, "key_check", bytes),
+    (FLAG_SESSION_KEY, SALT_SIZE, "file_salt", bytes),
+    (FLAG_KDF_ITERATIONS, 4, "kdf_iterations", int),
+)
+_KNOWN_FLAGS = sum(flag for flag, _, _, _ in _OPTIONAL_FIELDS)
+DEFAULT_FLAGS = FLAG_KEY_CHECK | FLAG_KDF_ITERATIONS   # flags every newly written file carries
+
+
+def _fixed_header_size(nonce_size: int, flags: int) -> int:
+    """Header bytes before the name block for the given flag set."""
+    optional = sum(size for flag, size, _, _ in _OPTIONAL_FIELDS if flags & flag)
+    return SALT_SIZE + nonce_size + _EXT_FIELDS.size + optional
+
+
+# ── Cipher suites ─────────────────────────────────────────────────────────────
+
+def _gcm_seal_into(key: bytes, nonce: bytes, aad: bytes, data, out) -> int:
+    """AES-256-GCM seal into out (exactly len(data) + 16 bytes): ciphertext then tag."""
+    return AESGCM(key).encrypt_into(nonce, data, aad, out)
+
+
+def _gcm_open_into(key: bytes, nonce: bytes, aad: bytes, data, out) -> int:
+    """AES-256-GCM open into out; raises ValueError when the tag does not verify."""
+    try:
+        return AESGCM(key).decrypt_into(nonce, data, aad, out)
+    except InvalidTag:
+        raise ValueError("authentication failed") from None
+
+
+def _cfb_apply_into(key: bytes, iv: bytes, data, out, encrypt: bool) -> int:
+    """AES-256-CFB transform of one segment into out (no tag, AAD is not applicable)."""
+    cipher = Cipher(algorithms.AES(key), modes.CFB(iv), backend=default_backend())
+    ctx = cipher.encryptor() if encrypt else cipher.decryptor()
+    written = ctx.update_into(data, out)
+    ctx.finalize()
+    return written
+
+
+def _chacha_seal_into(key: bytes, nonce: bytes, aad: bytes, data, out) -> int:
+    """ChaCha20-Poly1305 seal into out: ciphertext followed by the 16-byte tag."""
+    view = memoryview(out)
+    size = len(data)
+    cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
+    cipher.update(aad)
+    cipher.encrypt(data, output=view[:size])
+    view[size:size + TAG_SIZE] = cipher.digest()
+    return size + TAG_SIZE
+
+
+def _chacha_open_into(key: bytes, nonce: bytes, aad: bytes, data, out) -> int:
+    """ChaCha20-Poly1305 open into out; raises ValueError when the tag does not verify."""
+    view = memoryview(data)
+    size = len(view) - TAG_SIZE
+    cipher = ChaCha20_Poly1305.new(key=key, nonce=nonce)
+    cipher.update(aad)
+    cipher.decrypt(view[:size], output=memoryview(out)[:size])
+    try:
+        cipher.verify(view[size:])
+    except ValueError:
+        raise ValueError("authentication failed") from None
+    return size
+
+
+@dataclass(frozen=True)
+class CipherSuite:
+    """One algorithm's parameters and per-segment seal/open primitives.
+
+    The *_into primitives write into a caller-provided writable buffer so the
+    segment loops can reuse preallocated memory; seal()/open() wrap them for
+    one-off blocks such as the name.
+    """
+
+    algo: str
+    ext: str
+    nonce_size: int
+    tag_size: int
+    seal_into: Callable[[bytes, bytes, bytes, object, object], int]
+    open_into: Callable[[bytes, bytes, bytes, object, object], int]
+
+    def seal(self, key: bytes, nonce: bytes, aad: bytes, data) -> bytes:
+        """Seal data; returns ciphertext followed by the tag."""
+        out = bytearray(len(data) + self.tag_size)
+        self.seal_into(key, nonce, aad, data, out)
+        return bytes(out)
+
+    def open(self, key: bytes, nonce: bytes, aad: bytes, data) -> bytes:
+        """Open ciphertext plus tag; raises ValueError("authentication failed")."""
+        if len(data) < self.tag_size:
+            raise ValueError("file is too small or corrupted")
+        out = bytearray(len(data) - self.tag_size)
+        self.open_into(key, nonce, aad, data, out)
+        return bytes(out)
+
+
+GCM = CipherSuite("aes256_gcm", ".gfglock", 12, TAG_SIZE, _gcm_seal_into, _gcm_open_into)
+CFB = CipherSuite(
+    "aes256_cfb", ".gfglck", 16, 0,
+    lambda key, iv, _aad, data, out: _cfb_apply_into(key, iv, data, out, True),
+    lambda key, iv, _aad, data, out: _cfb_apply_into(key, iv, data, out, False),
+)
+CHACHA = CipherSuite("chacha20_poly1305", ".gfgcha", 12, TAG_SIZE, _chacha_seal_into, _chacha_open_into)
+
+SUITES = {s.algo: s for s in (GCM, CFB, CHACHA)}
+
+
+def suite_for_path(path: str) -> CipherSuite:
+    """Return the cipher suite implied by an encrypted file's extension."""
+    low = path.lower()
+    for suite in SUITES.values():
+        if low.endswith(suite.ext):
+            return suite
+    raise ValueError(f"unknown encrypted file format: {path}")
+
+
+# ── Header ────────────────────────────────────────────────────────────────────
+
+@dataclass
+class SegmentHeader:
+    """Parsed segmented-container header."""
+
+    suite: CipherSuite
+    salt: bytes
+    nonce: bytes
+    segment_size: int
+    name_len: int
+    flags: int = 0
+    key_check: bytes = b""
+    file_salt: bytes = b""
+    kdf_iterations: int = KDF_ITERATIONS
+
+    def pack(self) -> bytes:
+        """Serialize the header; these bytes are authenticated by the name block."""
+        out = self.salt + self.nonce + _EXT_FIELDS.pack(
+            EXT_MARKER, FORMAT_VERSION, self.flags, self.segment_size, self.name_len
+        )
+        for flag, size, attr, kind in _OPTIONAL_FIELDS:
+            if self.flags & flag:
+                value = getattr(self, attr)
+                out += value.to_bytes(size, "big") if kind is int else value
+        return out
+
+    @property
+    def header_size(self) -> int:
+        return _fixed_header_size(self.suite.nonce_size, self.flags)
+
+    @property
+    def data_offset(self) -> int:
+        """Byte offset of the first data segment."""
+        return self.header_size + self.name_len + self.suite.tag_size
+
+    @property
+    def stored_segment_size(self) -> int:
+        """On-disk size of one full segment (ciphertext plus tag)."""
+        return self.segment_size + self.suite.tag_size
+
+
+def new_header(suite: CipherSuite, name: str, segment_size: int = SEGMENT_SIZE,
+               iterations: int = KDF_ITERATIONS) -> SegmentHeader:
+    """Build a header with a fresh random salt and base nonce that records iterations."""
+    _check_new_iterations(iterations)
+    return SegmentHeader(
+        suite=suite,
+        salt=token_bytes(SALT_SIZE),
+        nonce=token_bytes(suite.nonce_size),
+        segment_size=segment_size,
+        name_len=len(name.encode("utf-8")),
+        flags=FLAG_KDF_ITERATIONS,
+        kdf_iterations=iterations,
+    )
+
+
+def _check_iterations(iterations: int) -> None:
+    """Reject iteration counts outside what files may record (0 or absurdly slow)."""
+    if not 1 <= iterations <= native_bridge.MAX_KDF_ITERATIONS:
+        raise ValueError(f"unsupported KDF iteration count {iterations}")
+
+
+def _check_new_iterations(iterations: int) -> None:
+    """Reject counts new files may not use: below MIN_KDF_ITERATIONS is too weak to write.
+
+    Smaller counts stay readable (see _check_iterations) so existing files still decrypt.
+    """
+    if iterations < native_bridge.MIN_KDF_ITERATIONS:
+        raise ValueError(f"KDF iteration count {iterations} is below the minimum of "
+                         f"{native_bridge.MIN_KDF_ITERATIONS} for new files")
+    _check_iterations(iterations)
+
+
+def read_header(fin: BinaryIO, suite: CipherSuite) -> Optional[SegmentHeader]:
+    """Parse a segmented header from fin; returns None for the legacy layout.
+
+    The stream is left positioned at the name block on success.
+    """
+    prefix = fin.read(SALT_SIZE + suite.nonce_size + _EXT_FIELDS.size)
+    if len(prefix) < SALT_SIZE + suite.nonce_size + 4:
+        raise ValueError("file is too small or corrupted")
+    fields = prefix[SALT_SIZE + suite.nonce_size:]
+    if fields[0] != EXT_MARKER:
+        return None
+    if len(fields) < _EXT_FIELDS.size:
+        raise ValueError("file is too small or corrupted")
+    _marker, version, flags, segment_size, name_len = _EXT_FIELDS.unpack(fields)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported format version {version}")
+    if flags & ~_KNOWN_FLAGS:
+        raise ValueError(f"unsupported header flags 0x{flags:04x}")
+    if segment_size == 0:
+        raise ValueError("file is too small or corrupted")
+    optional: dict = {}
+    for flag, size, attr, kind in _OPTIONAL_FIELDS:
+        if flags & flag:
+            raw = fin.read(size)
+            if len(raw) != size:
+                raise ValueError("file is too small or corrupted")
+            optional[attr] = int.from_bytes(raw, "big") if kind is int else raw
+    if "kdf_iterations" in optional:
+        _check_iterations(optional["kdf_iterations"])
+    return SegmentHeader(
+        suite=suite,
+        salt=prefix[:SALT_SIZE],
+        nonce=prefix[SALT_SIZE:SALT_SIZE + suite.nonce_size],
+        segment_size=segment_size,
+        name_len=name_len,
+        flags=flags,
+        **optional,
+    )
+
+
+# ── Keys ──────────────────────────────────────────────────────────────────────
+
+def key_check_value(key: bytes) -> bytes:
+    """Short MAC of the derived key stored in the header to reject wrong passwords early."""
+    return hmac.new(key, _KEY_CHECK_LABEL, hashlib.sha256).digest()[:KEY_CHECK_SIZE]
+
+
+class KeySession:
+    """PBKDF2 results shared by every file of one operation.
+
+    Each (salt, iteration count) derivation runs at most once per session. With
+    session keys on, new files share the session salt and get their own key via
+    HKDF from a random per-file salt, so a batch pays for PBKDF2 exactly once.
+    `iterations` is the count recorded in files this session writes.
+    """
+
+    def __init__(self, password: str, iterations: int = KDF_ITERATIONS):
+        _check_iterations(iterations)
+        self.password = password
+        self.iterations = iterations
+        self.salt = token_bytes(SALT_SIZE)
+        self._keys: dict = {}
+        self._locks: dict = {}
+        self._lock = threading.Lock()
+
+    def base_key(self, salt: bytes, iterations: int = KDF_ITERATIONS) -> bytes:
+        """PBKDF2(password, salt, iterations), derived once and cached."""
+        params = (salt, iterations)
+        with self._lock:
+            params_lock = self._locks.setdefault(params, threading.Lock())
+        with params_lock:
+            key = self._keys.get(params)
+            if key is None:
+                with tracing.span("pbkdf2", "kdf", iterations=iterations):
+                    key = native_bridge.derive_key(self.password, salt, iterations)
+                self._keys[params] = key
+        return key
+
+    def prefetch(self, salts: Iterable, iterations: int = KDF_ITERATIONS, threads: int = 0) -> None:
+        """Derive every salt not yet cached in one parallel batch (see derive_keys)."""
+        with self._lock:
+            missing = list(dict.fromkeys(bytes(s) for s in salts if (bytes(s), iterations) not in self._keys))
+        if not missing:
+            return
+        derived = native_bridge.derive_keys(self.password, missing, iterations, threads=threads)
+        for salt, key in zip(missing, derived):
+            with self._lock:
+                self._keys.setdefault((salt, iterations), key)
+
+    def evict(self, salt: bytes, iterations: int = KDF_ITERATIONS) -> None:
+        """Drop a cached key once no file still needs it; a later request derives it again."""
+        with self._lock:
+            self._keys.pop((bytes(salt), iterations), None)
+            self._locks.pop((bytes(salt), iterations), None)
+
+
+def file_key(base_key: bytes, file_salt: bytes) -> bytes:
+    """Expand a session's PBKDF2 output into one file's key (HKDF-SHA256)."""
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=file_salt, info=_FILE_KEY_INFO).derive(base_key)
+
+
+def derive_header_key(password: str, header: SegmentHeader, keys: Optional[KeySession] = None) -> bytes:
+    """Derive the file key for header; raises ValueError("authentication failed")
+    right away when the header's key check does not match."""
+    if keys is not None:
+        key = keys.base_key(header.salt, header.kdf_iterations)
+    else:
+        key = native_bridge.derive_key(password, header.salt, header.kdf_iterations)
+    if header.flags & FLAG_SESSION_KEY:
+        key = file_key(key, header.file_salt)
+    if header.flags & FLAG_KEY_CHECK and not hmac.compare_digest(key_check_value(key), header.key_check):
+        raise ValueError("authentication failed")
+    return key
+
+
+def new_file_key(password: str, header: SegmentHeader, keys: Optional[KeySession] = None) -> bytes:
+    """Derive the key for a header being written and record its key check.
+
+    With a session, the header switches to the session salt and iteration count
+    plus a per-file salt.
+    """
+    if keys is not None:
+        _check_new_iterations(keys.iterations)
+        header.salt = keys.salt
+        header.file_salt = token_bytes(SALT_SIZE)
+        header.flags |= FLAG_SESSION_KEY | FLAG_KDF_ITERATIONS
+        header.kdf_iterations = keys.iterations
+        key = file_key(keys.base_key(keys.salt, keys.iterations), header.file_salt)
+    else:
+        key = native_bridge.derive_key(password, header.salt, header.kdf_iterations)
+    header.flags |= FLAG_KEY_CHECK
+    header.key_check = key_check_value(key)
+    return key
+
+
+def native_key_args(keys: Optional[KeySession], path: Optional[str] = None,
+                    iterations: int = KDF_ITERATIONS) -> dict:
+    """Keyword arguments handing KDF parameters and a session's PBKDF2 result to
+    the native engine.
+
+    Without path (encrypt): the iteration count to record, plus the session's
+    own salt and key. With path (decrypt): that file's salt and count, in either
+    layout, so the engine can skip its own PBKDF2 run.
+    """
+    if path is None:
+        if keys is None:
+            return {"iterations": iterations}
+        salt, iterations = keys.salt, keys.iterations
+    else:
+        params = read_kdf_params(path) if keys is not None else None
+        if params is None:
+            return {}
+        salt, iterations = params
+    return {"base_salt": salt, "base_key": keys.base_key(salt, iterations), "iterations": iterations}
+
+
+def read_kdf_params(path: str) -> Optional[tuple]:
+    """(salt, iteration count) of an encrypted file in either layout, or None when
+    path is unreadable, corrupt or not a known container extension."""
+    try:
+        suite = suite_for_path(path)
+        with open(path, "rb") as fin:
+            header = read_header(fin, suite)
+            if header is not None:
+                return header.salt, header.kdf_iterations
+            fin.seek(0)
+            salt = fin.read(SALT_SIZE)
+    except (OSError, ValueError):
+        return None
+    return (salt, KDF_ITERATIONS) if len(salt) == SALT_SIZE else None
+
+
+def is_segmented(path: str) -> bool:
+    """True when path holds a segmented container (False for the legacy layout)."""
+    suite = suite_for_path(path)
+    with open(path, "rb") as fin:
+        try:
+            return read_header(fin, suite) is not None
+        except ValueError:
+            return False
+
+
+# ── Segment arithmetic ────────────────────────────────────────────────────────
+
+def segment_nonce(base: bytes, index: int) -> bytes:
+    """Derive a segment's nonce by XOR-ing its index into the base nonce's low 8 bytes."""
+    low = int.from_bytes(base[-8:], "big") ^ index
+    return base[:-8] + low.to_bytes(8, "big")
+
+
+def segment_aad(index: int, final: bool) -> bytes:
+    """Associated data binding a segment to its position and the final flag."""
+    return _SEGMENT_AAD.pack(index, 1 if final else 0)
+
+
+def segment_count(data_len: int, header: SegmentHeader) -> int:
+    """Number of stored segments in data_len bytes (AEAD files always have one)."""
+    stored = header.stored_segment_size
+    count = -(-data_len // stored)
+    return max(count, 1) if header.suite.tag_size else count
+
+
+def plaintext_size(data_len: int, header: SegmentHeader) -> int:
+    """Plaintext bytes held by data_len bytes of stored segments."""
+    return data_len - segment_count(data_len, header) * header.suite.tag_size
+
+
+def encrypted_size(plain_size: int, name_len: int, suite: CipherSuite,
+                   segment_size: int = SEGMENT_SIZE, flags: int = DEFAULT_FLAGS) -> int:
+    """Exact on-disk size of a container holding plain_size bytes."""
+    segments = -(-plain_size // segment_size)
+    if suite.tag_size:
+        segments = max(segments, 1)
+    header = _fixed_header_size(suite.nonce_size, flags)
+    return header + name_len + suite.tag_size + plain_size + segments * suite.tag_size
+
+
+def _batch_segments(threads: int, chunk_size, segment_size: int,
+                    memory_budget: int = DEFAULT_MEMORY_BUDGET) -> int:
+    """Segments read per I/O batch: enough to feed every thread, or one chunk's worth.
+
+    Capped so a batch's input and output buffers, plus one spare segment pair for
+    the encrypt ring's extra slots, stay within memory_budget. Raises ValueError
+    when not even a single segment fits.
+    """
+    per_chunk = int(chunk_size) // segment_size if chunk_size else 0
+    fits = int(memory_budget) // (2 * (segment_size + TAG_SIZE)) - 1
+    if fits < 1:
+        raise ValueError("segment size exceeds the memory budget")
+    return min(max(int(threads), per_chunk, 1), fits)
+
+
+def legacy_chunk_size(file_chunk_size, data_len: int, memory_budget: int = DEFAULT_MEMORY_BUDGET):
+    """Read size for a legacy single-stream payload; None means read it whole.
+
+    A whole read holds the ciphertext and two copies of the plaintext, so it is
+    only taken when those fit in memory_budget. Anything larger, including a
+    chunk size recorded in the file, streams in chunks of at most half the budget.
+    """
+    limit = max(int(memory_budget) // 2, 1)
+    if not file_chunk_size:
+        return None if 3 * data_len <= memory_budget else limit
+    return min(int(file_chunk_size), limit)
+
+
+# ── Phase timings ─────────────────────────────────────────────────────────────
+
+PHASES = ("kdf", "read", "cipher", "write", "delete")
+
+
+class FileStats:
+    """Where one file's time went: nanoseconds per phase plus bytes read and written.
+
+    Engines given one add to it as they go. Phases are timed on the thread that
+    drives the file, so cipher time is the wall time of each parallel batch;
+    elapsed_ns is the caller's wall time for the whole file, when it records one.
+    The native engine reports through update(), adding its buffer sizes to extra.
+    """
+
+    def __init__(self):
+        self.ns = dict.fromkeys(PHASES, 0)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.elapsed_ns = 0
+        self.extra: dict = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the time spent in the with-block to phase name (and the trace, when tracing)."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            self.ns[name] += end - start
+            tracing.record(name, "phase", start, end)
+
+    def write(self, fout: BinaryIO, data) -> None:
+        """fout.write(data), timed as the write phase and counted in bytes_out."""
+        with self.phase("write"):
+            fout.write(data)
+        self.bytes_out += len(data)
+
+    def reads(self, chunks: Iterable) -> Iterator:
+        """Pass chunks through, timing each fetch as the read phase and counting bytes_in."""
+        it = iter(chunks)
+        while True:
+            with self.phase("read"):
+                data = next(it, None)
+            if data is None:
+                return
+            self.bytes_in += len(data)
+            yield data
+
+    def update(self, fields: dict) -> None:
+        """Add counters in as_dict() form; unknown keys are kept in extra."""
+        for key, value in fields.items():
+            phase = key[:-3] if key.endswith("_ns") else None
+            if phase in self.ns:
+                self.ns[phase] += value
+            elif key in ("bytes_in", "bytes_out", "elapsed_ns"):
+                setattr(self, key, getattr(self, key) + value)
+            else:
+                self.extra[key] = value
+
+    def as_dict(self) -> dict:
+        """Flat {bytes_in, bytes_out, elapsed_ns, <phase>_ns..., extra...} for journals and reports."""
+        fields = {"bytes_in": self.bytes_in, "bytes_out": self.bytes_out, "elapsed_ns": self.elapsed_ns}
+        fields.update((f"{name}_ns", ns) for name, ns in self.ns.items())
+        fields.update(self.extra)
+        return fields
+
+
+def _read_into(fin: BinaryIO, view: memoryview) -> int:
+    """readinto() until view is full or EOF; returns the bytes read."""
+    filled = 0
+    while filled < len(view):
+        n = fin.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+@contextmanager
+def mapped_file(fin: BinaryIO, enabled: bool = True) -> Iterator[Optional[memoryview]]:
+    """Yield a read-only memoryview of all of fin, or None to fall back to reads.
+
+    None is yielded when mmap I/O is off, the file is smaller than MMAP_THRESHOLD
+    or it cannot be mapped (pipes, some network shares). Slices of the view must
+    be dropped before the block ends; one still alive defers the unmap to GC.
+    Mapped pages live in the page cache, outside the memory budget.
+    """
+    mapping = None
+    if enabled:
+        try:
+            if os.fstat(fin.fileno()).st_size >= MMAP_THRESHOLD:
+                mapping = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            mapping = None
+    if mapping is None:
+        yield None
+        return
+    view = memoryview(mapping)
+    try:
+        yield view
+    finally:
+        view.release()
+        try:
+            mapping.close()
+        except BufferError:
+            pass
+
+
+def read_views(fin: BinaryIO, length: int, chunk: int,
+               mapped: Optional[memoryview] = None) -> Iterator[memoryview]:
+    """Yield views over the next length bytes of fin, at most chunk bytes each.
+
+    With a mapping (see mapped_file) the views are slices of it and fin is
+    advanced past them afterwards; otherwise one buffer is refilled with
+    readinto(). Either way a view is only valid until the next is requested.
+    """
+    if mapped is None:
+        buf = memoryview(bytearray(chunk))
+        while length > 0:
+            n = fin.readinto(buf[:min(length, chunk)])
+            if not n:
+                return
+            length -= n
+            yield buf[:n]
+        return
+    pos = fin.tell()
+    end = min(pos + length, len(mapped))
+    try:
+        while pos < end:
+            n = min(end - pos, chunk)
+            with mapped[pos:pos + n] as piece:
+                yield piece
+            pos += n
+    finally:
+        fin.seek(pos)
+
+
+def _mapped_segments(mapped: memoryview, segment_size: int) -> Iterator[memoryview]:
+    """Yield segment_size slices of a mapped input (see mapped_file)."""
+    for start in range(0, len(mapped), segment_size):
+        yield mapped[start:start + segment_size]
+
+
+def _read_segments(fin: BinaryIO, segment_size: int, slots: int) -> Iterator[memoryview]:
+    """Yield segment_size views of fin, read with readinto() into a ring of slots
+    preallocated segments; a view stays valid until slots - 1 more are yielded."""
+    ring = memoryview(bytearray(slots * segment_size))
+    slot = 0
+    while True:
+        view = ring[slot * segment_size:(slot + 1) * segment_size]
+        n = _read_into(fin, view)
+        if not n:
+            return
+        yield view[:n]
+        if n < segment_size:
+            return
+        slot = (slot + 1) % slots
+
+
+def _exact_chunks(pieces: Iterable, size: int) -> Iterator[bytes]:
+    """Regroup arbitrarily sized pieces into size-byte chunks (the last may be shorter)."""
+    buf = bytearray()
+    for piece in pieces:
+        if not buf and len(piece) == size:
+            yield bytes(piece)
+            continue
+        buf += piece
+        while len(buf) >= size:
+            yield bytes(buf[:size])
+            del buf[:size]
+    if buf:
+        yield bytes(buf)
+
+
+def _with_final(chunks: Iterable, aead: bool) -> Iterator[tuple]:
+    """Yield (data, final) with one segment of look-ahead to flag the last one."""
+    pending = None
+    for data in chunks:
+        if not data:
+            continue
+        if pending is not None:
+            yield pending, False
+        pending = data
+    if pending is not None:
+        yield pending, True
+    elif aead:
+        yield b"", True
+
+
+# ── Engine ────────────────────────────────────────────────────────────────────
+
+def seal_name(header: SegmentHeader, key: bytes, name: str) -> bytes:
+    """Seal the original filename; its AAD authenticates the whole header."""
+    aad = header.pack() + segment_aad(0, False)
+    return header.suite.seal(key, segment_nonce(header.nonce, 0), aad, name.encode("utf-8"))
+
+
+def open_name(fin: BinaryIO, header: SegmentHeader, key: bytes) -> str:
+    """Read and open the name block; fin must be positioned right after the header."""
+    block = fin.read(header.name_len + header.suite.tag_size)
+    if len(block) != header.name_len + header.suite.tag_size:
+        raise ValueError("file is too small or corrupted")
+    aad = header.pack() + segment_aad(0, False)
+    name = header.suite.open(key, segment_nonce(header.nonce, 0), aad, block)
+    return name.decode("utf-8")
+
+
+def read_segment(fin: BinaryIO, header: SegmentHeader, key: bytes, index: int, data_len: int) -> bytes:
+    """Seek to, read and open the single data segment at index (1-based)."""
+    count = segment_count(data_len, header)
+    if not 1 <= index <= count:
+        raise IndexError(f"segment {index} out of range 1..{count}")
+    stored = header.stored_segment_size
+    size = stored if index < count else data_len - (count - 1) * stored
+    fin.seek(header.data_offset + (index - 1) * stored)
+    data = fin.read(size)
+    if len(data) != size or size < header.suite.tag_size:
+        raise ValueError("file is too small or corrupted")
+    final = index == count
+    return header.suite.open(key, segment_nonce(header.nonce, index), segment_aad(index, final), data)
+
+
+def seal_segments(
+    chunks: Iterable,
+    fout: BinaryIO,
+    header: SegmentHeader,
+    key: bytes,
+    threads: int = 1,
+    chunk_size=None,
+    progress_callback: Optional[Callable] = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    stats: Optional[FileStats] = None,
+) -> int:
+    """Seal plaintext segments from chunks into fout; returns plaintext bytes written.
+
+    Chunks may be views into reused buffers (see _read_segments): each batch is
+    sealed into one preallocated output buffer and written before more are read.
+    """
+    stats = stats if stats is not None else FileStats()
+    suite = header.suite
+    batch_size = _batch_segments(threads, chunk_size, header.segment_size, memory_budget)
+    stored = header.stored_segment_size
+    out_view = None
+    total = 0
+    progress_batch = 0.0
+
+    def _seal(item) -> int:
+        index, data, final = item
+        offset = (index - 1) % batch_size * stored
+        dst = out_view[offset:offset + len(data) + suite.tag_size]
+        return suite.seal_into(key, segment_nonce(header.nonce, index), segment_aad(index, final), data, dst)
+
+    with ThreadPoolExecutor(max_workers=max(1, int(threads))) as pool:
+        batch: list = []
+        index = 1
+        for data, final in _with_final(chunks, bool(suite.tag_size)):
+            batch.append((index, data, final))
+            index += 1
+            if len(batch) < batch_size and not final:
+                continue
+            plain = sum(len(d) for _, d, _ in batch)
+            with stats.phase("cipher"):
+                sealed_batch = native_bridge.seal_segments(
+                    suite.algo, key, header.nonce, batch[0][0], [d for _, d, _ in batch], final, threads
+                )
+                if sealed_batch is None:
+                    if out_view is None:   # only the Python path seals into a reused buffer
+                        out_view = memoryview(bytearray(batch_size * stored))
+                    sealed_batch = [out_view[:sum(pool.map(_seal, batch))]]
+            for sealed in sealed_batch:
+                stats.write(fout, sealed)
+            total += plain
+            progress_batch += plain
+            batch = []
+            if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
+                progress_callback(float(progress_batch)); progress_batch = 0.0
+    if progress_batch > 0 and progress_callback:
+        progress_callback(float(progress_batch))
+    return total
+
+
+def open_segments(
+    fin: BinaryIO,
+    fout: BinaryIO,
+    header: SegmentHeader,
+    key: bytes,
+    data_len: int,
+    threads: int = 1,
+    chunk_size=None,
+    progress_callback: Optional[Callable] = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    mapped: Optional[memoryview] = None,
+    stats: Optional[FileStats] = None,
+) -> int:
+    """Open data_len bytes of stored segments from fin into fout; returns plaintext size.
+
+    With mapped (a mapping of fin's file, see mapped_file) segments are opened
+    straight out of the mapping instead of being read into a buffer first.
+    """
+    stats = stats if stats is not None else FileStats()
+    suite = header.suite
+    stored = header.stored_segment_size
+    count = segment_count(data_len, header)
+    if suite.tag_size and data_len - (count - 1) * stored < suite.tag_size:
+        raise ValueError("file is too small or corrupted")
+    batch_size = min(_batch_segments(threads, chunk_size, header.segment_size, memory_budget), count)
+    if mapped is not None and len(mapped) < fin.tell() + data_len:
+        raise ValueError("file is too small or corrupted")
+    # One read and one write per batch, through buffers reused for the whole file.
+    base = fin.tell() if mapped is not None else 0
+    source = mapped if mapped is not None else memoryview(bytearray(batch_size * stored))
+    out_view = memoryview(bytearray(batch_size * header.segment_size))
+    total = 0
+    progress_batch = 0.0
+
+    def _open(item) -> int:
+        index, start, slot, size = item
+        src = source[start:start + size]
+        offset = slot * header.segment_size
+        dst = out_view[offset:offset + size - suite.tag_size]
+        final = index == count
+        return suite.open_into(key, segment_nonce(header.nonce, index), segment_aad(index, final), src, dst)
+
+    with ThreadPoolExecutor(max_workers=max(1, int(threads))) as pool:
+        index = 1
+        while index <= count:
+            last = min(index + batch_size, count + 1) - 1
+            batch_bytes = min((last - index + 1) * stored, data_len - (index - 1) * stored)
+            if mapped is None:
+                with stats.phase("read"):
+                    got = _read_into(fin, source[:batch_bytes])
+                if got != batch_bytes:
+                    raise ValueError("file is too small or corrupted")
+                first = 0
+            else:
+                first = base + (index - 1) * stored
+            stats.bytes_in += batch_bytes
+            batch = [
+                (i, first + (i - index) * stored, i - index,
+                 stored if i < count else data_len - (count - 1) * stored)
+                for i in range(index, last + 1)
+            ]
+            with stats.phase("cipher"):
+                plain = sum(pool.map(_open, batch))
+            stats.write(fout, out_view[:plain])
+            total += plain
+            progress_batch += batch_bytes
+            index = last + 1
+            if progress_batch >= PROGRESS_UPDATE_INTERVAL and progress_callback:
+                progress_callback(float(progress_batch)); progress_batch = 0.0
+    if progress_batch > 0 and progress_callback:
+        progress_callback(float(progress_batch))
+    if mapped is not None:
+        fin.seek(base + data_len)
+    return total
+
+
+# ── File-level helpers ────────────────────────────────────────────────────────
+
+def encrypt_path(
+    path: str,
+    out_path: str,
+    password: str,
+    suite: CipherSuite,
+    threads: int = 1,
+    chunk_size=None,
+    progress_callback: Optional[Callable] = None,
+    keys: Optional[KeySession] = None,
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[FileStats] = None,
+) -> None:
+    """Encrypt path into a segmented container at out_path (raises on failure).
+
+    Pass a KeySession to derive the key from the session's batch key (and use
+    its iteration count instead of iterations). Buffers stay within memory_budget
+    bytes however large the file or chunk_size is. use_mmap seals segments
+    straight out of a mapping of large inputs (see mapped_file). stats, if
+    given, collects the file's phase timings.
+    """
+    stats = stats if stats is not None else FileStats()
+    name = os.path.basename(path)
+    header = new_header(suite, name, iterations=iterations)
+    with stats.phase("kdf"):
+        key = new_file_key(password, header, keys)
+    with open(path, "rb") as fin, open(out_path, "wb") as fout:
+        stats.write(fout, header.pack())
+        stats.write(fout, seal_name(header, key, name))
+        if progress_callback:
+            progress_callback(float(header.name_len))
+        with mapped_file(fin, use_mmap) as mapped:
+            if mapped is not None:
+                chunks = _mapped_segments(mapped, header.segment_size)
+            else:
+                # Ring slots: one batch in flight, plus _with_final's look-ahead and the read in progress.
+                slots = _batch_segments(threads, chunk_size, header.segment_size, memory_budget) + 2
+                chunks = _read_segments(fin, header.segment_size, slots)
+            seal_segments(stats.reads(chunks), fout, header, key, threads, chunk_size, progress_callback,
+                          memory_budget, stats)
+
+
+def _suite_for_algo(algo: str) -> CipherSuite:
+    suite = SUITES.get(algo)
+    if suite is None:
+        raise ValueError(f"unknown algorithm: {algo}")
+    return suite
+
+
+def encrypt_stream(
+    src,
+    dst: BinaryIO,
+    password: str,
+    algo: str = "aes256_gcm",
+    name: Optional[str] = None,
+    threads: int = 1,
+    progress_callback: Optional[Callable] = None,
+    keys: Optional[KeySession] = None,
+    iterations: int = KDF_ITERATIONS,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+) -> int:
+    """Encrypt a binary file object or an iterable of bytes chunks into dst.
+
+    Writes the same container encrypt_file() produces, so decrypt_file(),
+    decrypt_range() and open_encrypted() all read the result. name is the
+    filename restored on decrypt; it defaults to src.name when src has one,
+    otherwise the container's own stem is used at decrypt time. Returns the
+    number of plaintext bytes encrypted.
+    """
+    suite = _suite_for_algo(algo)
+    if name is None:
+        src_name = getattr(src, "name", "")
+        name = os.path.basename(src_name) if isinstance(src_name, str) else ""
+    header = new_header(suite, name, iterations=iterations)
+    key = new_file_key(password, header, keys)
+    dst.write(header.pack())
+    dst.write(seal_name(header, key, name))
+    if hasattr(src, "readinto"):
+        slots = _batch_segments(threads, None, header.segment_size, memory_budget) + 2
+        chunks = _read_segments(src, header.segment_size, slots)
+    elif hasattr(src, "read"):
+        chunks = _exact_chunks(FileChunker().stream_chunks(src, None, SEGMENT_SIZE), header.segment_size)
+    else:
+        chunks = _exact_chunks(iter(src), header.segment_size)
+    return seal_segments(chunks, dst, header, key, threads, None, progress_callback, memory_budget)
+
+
+def encrypt_buffer(
+    data,
+    password: str,
+    algo: str = "aes256_gcm",
+    name: str = "",
+    threads: int = 1,
+    keys: Optional[KeySession] = None,
+    iterations: int = KDF_ITERATIONS,
+) -> bytes:
+    """Encrypt an in-memory payload and return the container bytes.
+
+    data is any buffer-protocol object (bytes, bytearray, memoryview, mmap) and
+    is read in place. The result is exactly what encrypt_file() writes for a
+    file named name, so it can be stored as a .gfglock/.gfglck/.gfgcha file.
+    """
+    suite = _suite_for_algo(algo)
+    sealed = native_bridge.encrypt_buffer(data, password, algo, name, threads,
+                                          **native_key_args(keys, iterations=iterations))
+    if sealed is not None:
+        return sealed
+    header = new_header(suite, name, iterations=iterations)
+    key = new_file_key(password, header, keys)
+    out = io.BytesIO()
+    out.write(header.pack())
+    out.write(seal_name(header, key, name))
+    with memoryview(data) as raw, raw.cast("B") as view:
+        seal_segments(_mapped_segments(view, header.segment_size), out, header, key, threads)
+    return out.getvalue()
+
+
+def decrypt_buffer(
+    data,
+    password: str,
+    algo: str = "aes256_gcm",
+    threads: int = 1,
+    keys: Optional[KeySession] = None,
+) -> bytes:
+    """Decrypt in-memory container bytes (any buffer-protocol object, read in
+    place) and return the plaintext.
+
+    Raises ValueError("authentication failed") on a wrong password or tampering,
+    and ValueError for legacy single-stream containers.
+    """
+    suite = _suite_for_algo(algo)
+    with memoryview(data) as raw, raw.cast("B") as view:
+        prefix = io.BytesIO(view[:_fixed_header_size(suite.nonce_size, _KNOWN_FLAGS)])
+        header = read_header(prefix, suite)
+        if header is None:
+            raise ValueError("legacy single-stream containers cannot be decrypted in memory")
+        if len(view) < header.data_offset:
+            raise ValueError("file is too small or corrupted")
+        kdf_args = {} if keys is None else {
+            "base_salt": header.salt,
+            "base_key": keys.base_key(header.salt, header.kdf_iterations),
+            "iterations": header.kdf_iterations,
+        }
+        plain = native_bridge.decrypt_buffer(view, password, algo, threads, **kdf_args)
+        if plain is not None:
+            return plain
+        key = derive_header_key(password, header, keys)
+        fin = io.BytesIO(view[:header.data_offset])
+        fin.seek(header.header_size)
+        open_name(fin, header, key)
+        out = io.BytesIO()
+        open_segments(fin, out, header, key, len(view) - header.data_offset, threads, mapped=view)
+    return out.getvalue()
+
+
+def decrypt_path(
+    path: str,
+    password: str,
+    threads: int = 1,
+    chunk_size=None,
+    progress_callback: Optional[Callable] = None,
+    keys: Optional[KeySession] = None,
+    memory_budget: int = DEFAULT_MEMORY_BUDGET,
+    use_mmap: bool = False,
+    stats: Optional[FileStats] = None,
+) -> str:
+    """Decrypt a segmented container next to itself and return the output path.
+
+    Raises ValueError("authentication failed") on a wrong password or tampering;
+    a partially written output file is removed before the error propagates.
+    use_mmap opens segments straight out of a mapping of large containers.
+    stats, if given, collects the file's phase timings.
+    """
+    stats = stats if stats is not None else FileStats()
+    suite = suite_for_path(path)
+    total_size = os.path.getsize(path)
+    out_path = None
+    with open(path, "rb") as fin:
+        header = read_header(fin, suite)
+        if header is None:
+            raise ValueError("not a segmented file")
+        if total_size < header.data_offset:
+            raise ValueError("file is too small or corrupted")
+        with stats.phase("kdf"):
+            key = derive_header_key(password, header, keys)
+        original_name = (os.path.basename(open_name(fin, header, key))
+                         or os.path.splitext(os.path.basename(path))[0])
+        stats.bytes_in += header.data_offset
+        out_path = os.path.join(os.path.dirname(path), original_name)
+        try:
+            with open(out_path, "wb") as fout, mapped_file(fin, use_mmap) as mapped:
+                open_segments(fin, fout, header, key, total_size - header.data_offset,
+                              threads, chunk_size, progress_callback, memory_budget, mapped, stats)
+        except Exception:
+            try:
+                os.remove(out_path)
+            except Exception:
+                pass
+            raise
+    return out_path
@@ -0,0 +1,95 @@
+# tracing.py - opt-in timeline of worker and engine spans in Chrome trace-event format
+#
+# While a Tracer is active, record() and span() collect complete ("X") events
+# tagged with the OS thread id, and Tracer.save() writes them as JSON that
+# chrome://tracing and https://ui.perfetto.dev load as they are. With no active
+# tracer both cost one global check, so engines call them unconditionally.
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+MAX_TRACE_EVENTS = 1_000_000   # spans kept per trace; later ones are only counted
+
+
+class Tracer:
+    """Spans from every thread, kept in memory until save()."""
+
+    def __init__(self):
+        self._origin_ns = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._events: list = []
+        self._threads: dict = {}
+        self.dropped = 0
+
+    def record(self, name: str, cat: str, start_ns: int, end_ns: int, args: Optional[dict] = None) -> None:
+        """Add a span on the calling thread; times are time.perf_counter_ns() values."""
+        if len(self._events) >= MAX_TRACE_EVENTS:
+            self.dropped += 1
+            return
+        tid = threading.get_native_id()
+        if tid not in self._threads:
+            self._threads[tid] = threading.current_thread().name
+        event = {
+            "name": name, "cat": cat, "ph": "X", "pid": self._pid, "tid": tid,
+            "ts": (start_ns - self._origin_ns) / 1000, "dur": (end_ns - start_ns) / 1000,
+        }
+        if args:
+            event["args"] = args
+        self._events.append(event)
+
+    def events(self) -> list:
+        """Every recorded span plus process and thread name metadata, in trace-event form."""
+        meta = [{"name": "process_name", "ph": "M", "pid": self._pid, "tid": 0, "args": {"name": "gfgLock"}}]
+        meta += [
+            {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+            for tid, name in list(self._threads.items())
+        ]
+        return meta + list(self._events)
+
+    def save(self, path: str) -> None:
+        """Write the trace as a JSON object file."""
+        trace = {"traceEvents": self.events(), "displayTimeUnit": "ms",
+                 "otherData": {"dropped_events": self.dropped}}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f, separators=(",", ":"))
+
+
+_active: Optional[Tracer] = None
+
+
+def start() -> Tracer:
+    """Begin collecting spans process-wide into a new Tracer and return it."""
+    global _active
+    _active = Tracer()
+    return _active
+
+
+def stop() -> Optional[Tracer]:
+    """Stop collecting; returns the tracer that was active, if any."""
+    global _active
+    tracer, _active = _active, None
+    return tracer
+
+
+def record(name: str, cat: str, start_ns: int, end_ns: int, **args) -> None:
+    """Add an already-timed span to the active tracer, if there is one."""
+    tracer = _active
+    if tracer is not None:
+        tracer.record(name, cat, start_ns, end_ns, args)
+
+
+@contextmanager
+def span(name: str, cat: str, **args) -> Iterator[None]:
+    """Record the with-block as a span when tracing is on."""
+    if _active is None:
+        yield
+        return
+    start_ns = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, cat, start_ns, time.perf_counter_ns(), **args)
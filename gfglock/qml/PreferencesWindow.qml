@@ -29,8 +29,10 @@ ApplicationWindow {
     onClosing: prefsWin.destroy()
 
     property bool _dirty: false
+    property int  _kdfIterations: 200000
     property var  _algOpts:   prefsController.encryptionModeOptions
     property var  _chunkOpts: prefsController.chunkSizeOptions
+    property var  _memOpts:   prefsController.memoryBudgetOptions
 
     Connections {
         target: prefsController
@@ -218,6 +220,32 @@ ApplicationWindow {
                                 font.pixelSize: 12
                                 onCheckedChanged: prefsWin._dirty = true
                             }
+
+                            CheckBox {
+                                id: batchKeysCheck
+                                text: "One key derivation per batch (faster for many small files)"
+                                font.pixelSize: 12
+                                onCheckedChanged: prefsWin._dirty = true
+                            }
+
+                            RowLayout {
+                                Layout.fillWidth: true
+                                Text {
+                                    text: "Key derivation: " + prefsWin._kdfIterations.toLocaleString(Qt.locale(), "f", 0) + " iterations"
+                                    font.pixelSize: 12
+                                    color: Material.foreground
+                                    Layout.fillWidth: true
+                                }
+                                Button {
+                                    text: "Calibrate"
+                                    flat: true
+                                    font.pixelSize: 11
+                                    onClicked: {
+                                        prefsWin._kdfIterations = prefsController.calibrateKdf(prefsController.kdfTargetMs)
+                                        prefsWin._dirty = true
+                                    }
+                                }
+                            }
                         }
                     }
 
@@ -358,6 +386,45 @@ ApplicationWindow {
                                 wrapMode: Text.WordWrap
                                 color: Material.theme === Material.Dark ? "#888888" : "#777777"
                             }
+
+                            RowLayout {
+                                Layout.fillWidth: true
+                                Text {
+                                    text: "Memory per file"
+                                    font.pixelSize: 12
+                                    color: Material.foreground
+                                    Layout.fillWidth: true
+                                }
+                                StyledComboBox {
+                                    id:                     memBudgetCombo
+                                    font.pixelSize:         12
+                                    Layout.preferredWidth:  155
+                                    Layout.preferredHeight: 34
+                                    model:                  prefsWin._memOpts.map(o => o.label)
+                                    onCurrentIndexChanged: prefsWin._dirty = true
+                                }
+                            }
+                            Text {
+                                Layout.fillWidth: true
+                                text: "Upper bound on buffers held for any one file. Larger files and chunk sizes are streamed within it."
+                                font.pixelSize: 11
+                                wrapMode: Text.WordWrap
+                                color: Material.theme === Material.Dark ? "#888888" : "#777777"
+                            }
+
+                            CheckBox {
+                                id: mmapIoCheck
+                                text: "Memory-mapped reads (Python engine)"
+                                font.pixelSize: 12
+                                onCheckedChanged: prefsWin._dirty = true
+                            }
+                            Text {
+                                Layout.fillWidth: true
+                                text: "When the native module is unavailable, files of 64 MB and up are mapped and encrypted straight from the page cache."
+                                font.pixelSize: 11
+                                wrapMode: Text.WordWrap
+                                color: Material.theme === Material.Dark ? "#888888" : "#777777"
+                            }
                         }
                     }
 
@@ -420,6 +487,65 @@ ApplicationWindow {
                         }
                     }
 
+                    GroupBox {
+                        Layout.fillWidth: true
+                        title: "Diagnostics"
+                        font.pixelSize: 12
+
+                        ColumnLayout {
+                            anchors.fill: parent
+                            spacing: 8
+
+                            CheckBox {
+                                id: traceTimelineCheck
+                                text: "Record operation timelines"
+                                font.pixelSize: 12
+                                onCheckedChanged: prefsWin._dirty = true
+                            }
+                            Text {
+                                Layout.fillWidth: true
+                                text: "Saves a trace of every operation to the logs folder, showing per thread when files were scheduled and how long key derivation, reads, encryption and writes took. Open it in chrome://tracing or ui.perfetto.dev."
+                                font.pixelSize: 11
+                                wrapMode: Text.WordWrap
+                                color: Material.theme === Material.Dark ? "#888888" : "#777777"
+                            }
+                            CheckBox {
+                                id: exportMetricsCheck
+                                text: "Export performance metrics"
+                                font.pixelSize: 12
+                                onCheckedChanged: prefsWin._dirty = true
+                            }
+                            Text {
+                                Layout.fillWidth: true
+                                text: "Keeps gfglock.prom in the logs folder up to date with files and bytes processed, failures, skips and latency histograms, in the OpenMetrics text format Prometheus node_exporter's textfile collector reads. GFGLOCK_METRICS_FILE points it elsewhere."
+                                font.pixelSize: 11
+                                wrapMode: Text.WordWrap
+                                color: Material.theme === Material.Dark ? "#888888" : "#777777"
+                            }
+                            CheckBox {
+                                id: profileOperationsCheck
+                                text: "Profile operations"
+                                font.pixelSize: 12
+                                onCheckedChanged: prefsWin._dirty = true
+                            }
+                            CheckBox {
+                                id: profileMemoryCheck
+                                text: "Include memory allocations"
+                                font.pixelSize: 12
+                                enabled: profileOperationsCheck.checked
+                                Layout.leftMargin: 24
+                                onCheckedChanged: prefsWin._dirty = true
+                            }
+                            Text {
+                                Layout.fillWidth: true
+                                text: "Saves a cProfile .prof of startup and of every operation to the logs folder, plus a report of the top memory allocations when included. Attach them when reporting slow batches. Slows operations down while on."
+                                font.pixelSize: 11
+                                wrapMode: Text.WordWrap
+                                color: Material.theme === Material.Dark ? "#888888" : "#777777"
+                            }
+                        }
+                    }
+
                     GroupBox {
                         Layout.fillWidth: true
                         title: "Notifications"
@@ -510,8 +636,15 @@ ApplicationWindow {
             decThreadsCombo.currentIndex = Math.min(
                 Math.max(0, prefsController.decThreads - 1), decThreadsCombo.count - 1)
             encFilenamesCheck.checked   = prefsController.encFilenames
+            batchKeysCheck.checked      = prefsController.batchKeys
+            prefsWin._kdfIterations     = prefsController.kdfIterations
             logTextWrapCheck.checked    = prefsController.logTextWrap
             disableClampCheck.checked   = !prefsController.clampThreads
+            mmapIoCheck.checked         = prefsController.mmapIo
+            traceTimelineCheck.checked  = prefsController.traceTimeline
+            exportMetricsCheck.checked  = prefsController.exportMetrics
+            profileOperationsCheck.checked = prefsController.profileOperations
+            profileMemoryCheck.checked  = prefsController.profileMemory
             enableLogsCheck.checked     = prefsController.enableLogs
             logLevelCombo.currentIndex  = prefsController.logLevel === "all" ? 1 : 0
             opNotificationsCheck.checked = prefsController.operationNotifications
@@ -524,6 +657,10 @@ ApplicationWindow {
             for (var j = 0; j < _chunkOpts.length; j++) {
                 if (_chunkOpts[j].value === decChunk) { decChunkCombo.currentIndex = j; break }
             }
+            var memBudget = prefsController.memoryBudgetMb
+            for (var m = 0; m < _memOpts.length; m++) {
+                if (_memOpts[m].value === memBudget) { memBudgetCombo.currentIndex = m; break }
+            }
             var encMode = prefsController.encMode
             for (var k = 0; k < _algOpts.length; k++) {
                 if (_algOpts[k].value === encMode) { algCombo.currentIndex = k; break }
@@ -546,12 +683,20 @@ ApplicationWindow {
                 "encryption.cpu_threads":             encThreadsCombo.currentIndex + 1,
                 "encryption.chunk_size":              encChunkVal,
                 "encryption.encrypt_filenames":       encFilenamesCheck.checked,
+                "encryption.batch_keys":              batchKeysCheck.checked,
+                "encryption.kdf_iterations":          prefsWin._kdfIterations,
                 "decryption.cpu_threads":             decThreadsCombo.currentIndex + 1,
                 "decryption.chunk_size":              decChunkVal,
                 "advanced.encryption_mode":           _algOpts[algCombo.currentIndex].value,
                 "advanced.enable_logs":               enableLogsCheck.checked,
                 "advanced.log_level":                 logLevelCombo.currentIndex === 1 ? "all" : "critical",
                 "advanced.clamp_cpu_threads":         !disableClampCheck.checked,
+                "advanced.memory_budget_mb":          _memOpts[memBudgetCombo.currentIndex].value,
+                "advanced.mmap_io":                   mmapIoCheck.checked,
+                "advanced.trace_timeline":            traceTimelineCheck.checked,
+                "advanced.export_metrics":            exportMetricsCheck.checked,
+                "advanced.profile_operations":        profileOperationsCheck.checked,
+                "advanced.profile_memory":            profileMemoryCheck.checked,
                 "advanced.operation_notifications":   opNotificationsCheck.checked
             }
             prefsController.saveSettings(updates)
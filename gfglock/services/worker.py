@@ -1,31 +1,159 @@
 # worker.py - background encryption/decryption worker (PySide6)
 
 import os
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 from functools import partial
-from typing import Callable
+from typing import Callable, Optional
 
 from PySide6.QtCore import QObject, QRunnable, Signal, Slot
 
+from gfglock.config.defaults import DiagnosticsDefaults
 from gfglock.core import aes256_gcm_cfb as aes_core
 from gfglock.core import chacha20_poly1305 as xchacha_core
-from gfglock.utils import load_settings, predict_encrypted_size
+from gfglock.core import native_bridge, tracing
+from gfglock.core.segmented import (
+    DEFAULT_FLAGS,
+    DEFAULT_MEMORY_BUDGET,
+    FLAG_SESSION_KEY,
+    KDF_ITERATIONS,
+    FileStats,
+    KeySession,
+    native_key_args,
+    read_kdf_params,
+)
+from gfglock.utils import (
+    Profiler,
+    get_metrics_file,
+    get_trace_file,
+    load_settings,
+    logs_enabled,
+    observe_file,
+    predict_encrypted_size,
+    start_profiler,
+    trace_enabled,
+    write_journal,
+    write_metrics,
+)
+
+# Seconds between event flushes: progress samples and batched file results (20 Hz).
+EVENT_INTERVAL = 0.05
+# Decrypt headers the KDF stage reads and keys per batch; it stays within two
+# windows of the I/O workers so memory does not grow with the input list.
+KDF_WINDOW = 64
+_ALGO_BY_EXT = {".gfglock": "aes256_gcm", ".gfglck": "aes256_cfb", ".gfgcha": "chacha20_poly1305"}
 
 
 class WorkerSignals(QObject):
     progress = Signal(float, float)
     # files_progress: (completed_files, total_files)
     files_progress = Signal(int, int)
-    file_changed = Signal(str)
     status = Signal(str)
     error = Signal(str)
-    # file_result: (success, message) - emitted once per file on completion
-    file_result = Signal(bool, str)
+    # results: [(path, ok, message), ...] - files finished since the previous
+    # flush, in completion order; ok is False only for failures (skips are ok)
+    results = Signal(list)
     # finished: (elapsed_time, total_files, succeeded, failed, skipped)
     finished = Signal(float, int, int, int, int)
 
 
+def _after_key(key_ready: threading.Event, job: Callable):
+    """Run job once the KDF stage has keyed its window; if that stage failed or
+    stopped early the job simply derives the key itself and reports any error."""
+    with tracing.span("wait for key", "schedule"):
+        key_ready.wait()
+    return job()
+
+
+class _KdfStage:
+    """Decrypt KDF prefetch, one window of paths at a time, on its own thread.
+
+    Each window's headers are read and every (salt, iteration count) not yet
+    cached is derived in one derive_keys batch per count. A window starts only
+    while it is less than two windows ahead of the files finished so far, and a
+    key leaves the KeySession once every file that needed it has finished.
+    """
+
+    def __init__(self, keys: KeySession, paths: list, window: int, wrap: Callable = lambda fn: fn):
+        self._keys = keys
+        self._paths = paths
+        self._window = window
+        self._ready = [threading.Event() for _ in range(0, len(paths), window)]
+        self._params: dict = {}    # path -> (salt, iterations), until the file finishes
+        self._users: dict = {}     # (salt, iterations) -> files keyed and not yet finished
+        self._finished = 0
+        self._stopped = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=wrap(self._run), name="gfglock-kdf", daemon=True)
+        self._thread.start()
+
+    def ready(self, index: int) -> threading.Event:
+        """Set once the window holding paths[index] is keyed (or the stage stopped)."""
+        return self._ready[index // self._window]
+
+    def file_done(self, path: str) -> None:
+        """Count a finished file and evict its key if no other pending file uses it."""
+        with self._cond:
+            self._finished += 1
+            params = self._params.pop(path, None)
+            if params is not None:
+                self._users[params] -= 1
+                if not self._users[params]:
+                    del self._users[params]
+                    self._keys.evict(*params)
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        """Stop before the next window and release every job still waiting on one."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        try:
+            for n, start in enumerate(range(0, len(self._paths), self._window)):
+                with self._cond:
+                    self._cond.wait_for(lambda: self._stopped or start < self._finished + 2 * self._window)
+                    if self._stopped:
+                        return
+                self._key_window(self._paths[start:start + self._window])
+                self._ready[n].set()
+        finally:
+            for ready in self._ready:
+                ready.set()
+
+    def _key_window(self, paths: list) -> None:
+        with tracing.span("kdf prefetch", "kdf", files=len(paths)):
+            found = {p: read_kdf_params(p) for p in paths}
+            by_count: dict = {}
+            with self._cond:
+                for p, params in found.items():
+                    if params is None or p in self._params:
+                        continue
+                    self._params[p] = params
+                    self._users[params] = self._users.get(params, 0) + 1
+                    by_count.setdefault(params[1], []).append(params[0])
+            for iterations, salts in by_count.items():
+                try:
+                    self._keys.prefetch(salts, iterations)
+                except Exception:
+                    pass   # the jobs derive (and report) it themselves
+
+
+def _timed(job: Callable, stats: FileStats, path: str = ""):
+    """Run job, recording its wall time as stats.elapsed_ns (and a file span, when tracing)."""
+    start = time.perf_counter_ns()
+    try:
+        return job()
+    finally:
+        end = time.perf_counter_ns()
+        stats.elapsed_ns = end - start
+        tracing.record("file", "worker", start, end, path=path)
+
+
 class EncryptDecryptWorker(QRunnable):
     def __init__(
         self,
@@ -37,6 +165,10 @@ class EncryptDecryptWorker(QRunnable):
         chunk_size=None,
         show_password: bool = False,
         enc_algo: str | None = None,
+        batch_keys: bool = False,
+        kdf_iterations: int = KDF_ITERATIONS,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        use_mmap: bool = False,
     ):
         super().__init__()
         self.paths = list(paths)
@@ -47,9 +179,28 @@ class EncryptDecryptWorker(QRunnable):
         self.chunk_size = None if chunk_size is None else int(chunk_size)
         self._cancelled = False
         self.enc_algo = enc_algo
+        self.batch_keys = batch_keys
+        # Count written into new files; a hand-edited setting can't go below the floor.
+        self.kdf_iterations = max(native_bridge.MIN_KDF_ITERATIONS,
+                                  min(native_bridge.MAX_KDF_ITERATIONS, int(kdf_iterations)))
+        # Per-file cap on I/O buffers, honoured by every engine (see segmented).
+        self.memory_budget = int(memory_budget)
+        self.use_mmap = bool(use_mmap)
+        # Decrypt always shares PBKDF2 results across files with the same salt;
+        # encrypt does so only in batch mode, where new files get session keys.
+        self._keys = KeySession(password, self.kdf_iterations)
         self.total_bytes = float(self._calc_total_size())
-        self.processed_bytes = 0.0
-        self._files_completed = 0
+        # Engines add bytes and finished files here; run() samples it on a timer
+        # rather than emitting a signal from every engine callback.
+        self._counters = native_bridge.ProgressCounters()
+        self._pending_results: list = []
+        self._pending_journal: list = []
+        self._pending_lock = threading.Lock()
+        # Set by a native batch run; the event thread drains finished files from it.
+        self._completions: Optional[native_bridge.BatchCompletions] = None
+        self._journal = False
+        self._metrics_file: Optional[str] = None
+        self._profiler: Optional[Profiler] = None
         self.signals = WorkerSignals()
 
     def _calc_total_size(self) -> float:
@@ -57,18 +208,13 @@ class EncryptDecryptWorker(QRunnable):
         total = 0.0
         self._per_file_sizes: dict = {}
         if self.mode == "encrypt":
-            algo = self.enc_algo
-            if not algo:
-                try:
-                    settings = load_settings()
-                    algo = settings.get("advanced", {}).get("encryption_mode", "aes256_gcm")
-                except Exception:
-                    algo = "aes256_gcm"
-            size_mode = {"aes256_cfb": "CFB", "chacha20_poly1305": "CHACHA"}.get(algo, "GCM")
+            size_mode = {"aes256_cfb": "CFB", "chacha20_poly1305": "CHACHA"}.get(self._encrypt_algo(), "GCM")
+            # Batch keys add each file's HKDF salt to its header.
+            flags = DEFAULT_FLAGS | (FLAG_SESSION_KEY if self.batch_keys else 0)
             for path in self.paths:
                 if os.path.exists(path) and os.path.isfile(path):
                     try:
-                        predicted = float(predict_encrypted_size(path, size_mode))
+                        predicted = float(predict_encrypted_size(path, size_mode, flags))
                         total += predicted
                         self._per_file_sizes[path] = predicted
                     except Exception:
@@ -89,114 +235,286 @@ class EncryptDecryptWorker(QRunnable):
                         self._per_file_sizes[path] = 0.0
         return max(total, 1.0)
 
-    def _make_progress_callback(self, file_index: int, total_files: int) -> Callable[[float], None]:
-        """Create a per-file chunk progress callback."""
-        def callback(chunk_bytes: float) -> None:
-            self.processed_bytes = min(
-                self.processed_bytes + float(chunk_bytes), self.total_bytes
-            )
-            self.signals.progress.emit(self.processed_bytes, self.total_bytes)
-        return callback
+    def _encrypt_algo(self) -> str:
+        """The algorithm new files use: enc_algo, else the saved setting, else AES-256-GCM."""
+        if self.enc_algo:
+            return self.enc_algo
+        try:
+            settings = load_settings()
+            return settings.get("advanced", {}).get("encryption_mode", "aes256_gcm")
+        except Exception:
+            return "aes256_gcm"
 
     @Slot()
     def cancel(self) -> None:
         """Request cancellation of the running operation."""
         self._cancelled = True
+        self._counters.cancel()
+
+    def _emit_events(self, stop: threading.Event) -> None:
+        """Flush results and progress every EVENT_INTERVAL until stop is set, then once more.
+
+        Signals go out only when something changed, so idle stretches cost
+        nothing and a burst of small files becomes one results list and one
+        progress update per interval instead of several signals per file.
+        """
+        total = len(self.paths)
+        last_bytes, last_files = 0.0, 0
+        metrics_due = time.monotonic() + DiagnosticsDefaults.METRICS_INTERVAL
+        while True:
+            stopping = stop.wait(EVENT_INTERVAL)
+            self._drain_completions()
+            with self._pending_lock:
+                results, self._pending_results = self._pending_results, []
+                journal, self._pending_journal = self._pending_journal, []
+            if results:
+                self.signals.results.emit(results)
+            if journal:
+                write_journal(journal)
+            processed = min(float(self._counters.bytes), self.total_bytes)
+            files = self._counters.files
+            if processed != last_bytes:
+                self.signals.progress.emit(processed, self.total_bytes)
+                last_bytes = processed
+            if files != last_files:
+                self.signals.files_progress.emit(files, total)
+                last_files = files
+            if self._metrics_file and (stopping or time.monotonic() >= metrics_due):
+                write_metrics(self._metrics_file)
+                metrics_due = time.monotonic() + DiagnosticsDefaults.METRICS_INTERVAL
+            if stopping:
+                return
 
     def run(self) -> None:
         """Execute the encrypt/decrypt operation on the thread pool."""
         total = len(self.paths)
-        done = 0
         start_time = time.time()
-        succeeded = failed = skipped_already_encrypted = 0
-        failed_files: list = []
+        self._succeeded = self._failed = self._skipped = 0
+        self._native = native_bridge.NATIVE_AVAILABLE and bool(self.paths)
+        self._journal = logs_enabled()
+        self._metrics_file = get_metrics_file()
+        self._profiler = start_profiler("worker")
+        tracer = tracing.start() if trace_enabled() else None
+        run_start_ns = time.perf_counter_ns()
+        stop_events = threading.Event()
+        emitter = threading.Thread(target=self._emit_events, args=(stop_events,),
+                                   name="gfglock-events", daemon=True)
+        emitter.start()
 
         try:
-            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            if self._native:
+                self._run_native_batch()
+            else:
+                self._run_jobs()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        finally:
+            stop_events.set()
+            emitter.join()
+
+        try:
+            self.signals.progress.emit(self.total_bytes, self.total_bytes)
+        except Exception:
+            pass
+        if tracer is not None:
+            tracing.record("run", "worker", run_start_ns, time.perf_counter_ns(), mode=self.mode, files=total)
+            self._save_trace(tracer)
+        if self._profiler is not None:
+            self._save_profile()
+        elapsed = time.time() - start_time
+        self.signals.status.emit(f"Completed in {elapsed:.1f}s")
+        self.signals.finished.emit(elapsed, total, self._succeeded, self._failed, self._skipped)
+
+    def _run_jobs(self) -> None:
+        """Run one Python job per file on the thread pool (fallback engines)."""
+        kdf = self._start_kdf_stage()
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            try:
                 future_to_path: dict = {}
-                for file_index, p in enumerate(self.paths):
+                for i, p in enumerate(self.paths):
                     if self._cancelled:
                         break
-                    progress_cb = self._make_progress_callback(file_index, len(self.paths))
-                    job = self._build_job(p, progress_cb)
+                    stats = FileStats()
+                    job = partial(_timed, self._build_job(p, self._counters, stats), stats, p)
+                    if kdf is not None:
+                        job = partial(_after_key, kdf.ready(i), job)
+                    if self._profiler is not None:
+                        job = self._profiler.wrap(job)
                     fut = executor.submit(job)
-                    future_to_path[fut] = p
+                    future_to_path[fut] = (p, stats)
 
                 for fut in as_completed(future_to_path):
                     if self._cancelled:
                         break
-                    p = future_to_path.get(fut, "")
+                    p, stats = future_to_path[fut]
                     try:
                         result = fut.result()
                         success, msg = result if isinstance(result, tuple) else (bool(result), "")
-                        if msg:
-                            self.signals.status.emit(msg)
-                        if success:
-                            succeeded += 1
-                            if msg:
-                                self.signals.file_result.emit(True, msg)
-                        else:
-                            if self._is_skip(p, msg):
-                                skipped_already_encrypted += 1
-                                if msg:
-                                    self.signals.file_result.emit(True, msg)
-                            else:
-                                failed += 1
-                                failed_files.append(p)
-                                if msg:
-                                    self.signals.file_result.emit(False, msg)
+                        self._record_result(p, success, msg, stats)
                     except Exception as e:
-                        failed += 1
-                        failed_files.append(p)
-                        err_msg = f"Critical error while processing {p}: {e}"
+                        self._failed += 1
                         self.signals.error.emit(str(e))
-                        self.signals.file_result.emit(False, err_msg)
+                        self._queue_result(p, False, f"Critical error while processing {p}: {e}")
+                        self._report_file(p, "failed", stats)
 
-                    done += 1
-                    self._files_completed += 1
-                    try:
-                        self.signals.progress.emit(self.processed_bytes, self.total_bytes)
-                        self.signals.files_progress.emit(self._files_completed, total)
-                    except Exception:
-                        pass
-                    self.signals.file_changed.emit(p)
+                    self._counters.add_file()
+                    if kdf is not None:
+                        kdf.file_done(p)
+            finally:
+                # Before the executor waits on its queue: jobs still waiting on a window need the stage to let go.
+                if kdf is not None:
+                    kdf.stop()
+
+    def _run_native_batch(self) -> None:
+        """Hand the whole list to the native engine in one call.
+
+        Files run on a C++ thread pool without per-file futures or GIL round
+        trips; the engine writes progress straight into the shared counters and
+        reads cancellation from them. Each file's result, with its native phase
+        timings, is queued as soon as that file finishes and reported by the
+        event thread, so nothing waits for the batch to return.
+        """
+        chunk_size = self.chunk_size or 0
+        self._completions = native_bridge.BatchCompletions()
+        batch_start_ns = time.perf_counter_ns()
+        if self.mode == "encrypt":
+            keys = self._keys if self.batch_keys else None
+            native_bridge.encrypt_files(
+                self.paths, self.password, self._encrypt_algo(), self.encrypt_name, chunk_size, self._counters,
+                threads=self.threads, memory_budget=self.memory_budget, completed=self._completions,
+                **native_key_args(keys, iterations=self.kdf_iterations),
+            )
+        else:
+            native_bridge.decrypt_files(self.paths, self.password, self._counters, threads=self.threads,
+                                        memory_budget=self.memory_budget, completed=self._completions)
+        tracing.record("native batch", "engine", batch_start_ns, time.perf_counter_ns(), files=len(self.paths))
+
+    def _drain_completions(self) -> None:
+        """Record the native batch's files finished since the last call (none before a batch starts)."""
+        if self._completions is None:
+            return
+        for index, success, msg, fields in self._completions.drain():
+            stats = None
+            if fields is not None:
+                stats = FileStats()
+                stats.update(fields)
+            self._record_result(self.paths[index], success, msg, stats)
+
+    def _record_result(self, p: str, success: bool, msg: str, stats: Optional[FileStats] = None) -> None:
+        """Count one finished file as succeeded, skipped or failed and queue its result."""
+        if success:
+            self._succeeded += 1
+            outcome = "ok"
+        elif self._is_skip(p, msg):
+            self._skipped += 1
+            outcome = "skipped"
+        else:
+            self._failed += 1
+            outcome = "failed"
+        self._queue_result(p, outcome != "failed", msg)
+        self._report_file(p, outcome, stats)
+
+    def _queue_result(self, p: str, ok: bool, msg: str) -> None:
+        """Add one file's outcome to the next results flush."""
+        with self._pending_lock:
+            self._pending_results.append((p, ok, msg))
 
+    def _report_file(self, p: str, outcome: str, stats: Optional[FileStats]) -> None:
+        """Feed one finished file to the metrics and, when logging is on, the journal.
+
+        Journal records carry the engine's byte counts and per-phase nanoseconds
+        (plus buffer sizes from the native engine) when it reported them; the
+        metrics take sizes, total and KDF time from the same figures.
+        """
+        if not (self._journal or self._metrics_file):
+            return
+        algo = (self._encrypt_algo() if self.mode == "encrypt"
+                else _ALGO_BY_EXT.get(os.path.splitext(p)[1].lower()))
+        fields = stats.as_dict() if stats is not None else None
+        if self._metrics_file:
+            observe_file(self.mode, algo, outcome, fields)
+        if not self._journal:
+            return
+        record = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "op": self.mode,
+            "path": p,
+            "result": outcome,
+            "algo": algo,
+            "engine": "native" if self._native else "python",
+        }
+        if fields is not None:
+            record.update(fields)
+        with self._pending_lock:
+            self._pending_journal.append(record)
+
+    def _start_kdf_stage(self) -> Optional[_KdfStage]:
+        """The KDF prefetch stage for a decrypt run (encrypt salts are new, so it has none)."""
+        if self.mode != "decrypt" or not self.paths:
+            return None
+        window = max(KDF_WINDOW, self.threads)   # every running job's window may start
+        wrap = self._profiler.wrap if self._profiler is not None else (lambda fn: fn)
+        return _KdfStage(self._keys, self.paths, window, wrap)
+
+    def _save_trace(self, tracer: tracing.Tracer) -> None:
+        """Stop tracing and write the timeline to the logs folder."""
+        tracing.stop()
+        try:
+            path = get_trace_file()
+            tracer.save(path)
+            self.signals.status.emit(f"Trace saved: {path}")
         except Exception as e:
-            self.signals.error.emit(str(e))
+            self.signals.status.emit(f"Could not save trace: {e}")
 
+    def _save_profile(self) -> None:
+        """Stop profiling and write the profile (and memory report) to the logs folder."""
         try:
-            self.signals.progress.emit(self.total_bytes, self.total_bytes)
-        except Exception:
-            pass
-        elapsed = time.time() - start_time
-        self.signals.status.emit(f"Completed in {elapsed:.1f}s")
-        self.signals.finished.emit(elapsed, total, succeeded, failed, skipped_already_encrypted)
+            paths = self._profiler.save()
+            self.signals.status.emit(f"Profile saved: {', '.join(paths)}")
+        except Exception as e:
+            self.signals.status.emit(f"Could not save profile: {e}")
+        self._profiler = None
+
+    def _segment_threads(self) -> int:
+        """Threads each file may use for its own segments.
 
-    def _build_job(self, p: str, progress_cb: Callable) -> Callable:
-        """Return the correct encrypt/decrypt callable for the file."""
+        The pool runs up to self.threads files at once; when there are fewer files
+        than threads, the spare threads are split across the files in flight.
+        """
+        in_flight = max(1, min(len(self.paths), self.threads))
+        return max(1, self.threads // in_flight)
+
+    def _build_job(self, p: str, progress_cb: Callable, stats: Optional[FileStats] = None) -> Callable:
+        """Return the correct encrypt/decrypt callable for the file; stats collects its phase timings."""
+        seg_threads = self._segment_threads()
         if self.mode == "encrypt":
-            algo = self.enc_algo
-            if not algo:
-                try:
-                    settings = load_settings()
-                    algo = settings.get("advanced", {}).get("encryption_mode", "aes256_gcm")
-                except Exception:
-                    algo = "aes256_gcm"
+            keys = self._keys if self.batch_keys else None
+            algo = self._encrypt_algo()
             if algo == "aes256_cfb":
                 return partial(aes_core.encrypt_file, p, self.password,
-                               self.encrypt_name, self.chunk_size, False, progress_cb)
+                               self.encrypt_name, self.chunk_size, False, progress_cb,
+                               threads=seg_threads, keys=keys, iterations=self.kdf_iterations,
+                               memory_budget=self.memory_budget, use_mmap=self.use_mmap, stats=stats)
             elif algo == "chacha20_poly1305":
                 return partial(xchacha_core.encrypt_file, p, self.password,
-                               self.encrypt_name, self.chunk_size, progress_cb)
+                               self.encrypt_name, self.chunk_size, progress_cb,
+                               threads=seg_threads, keys=keys, iterations=self.kdf_iterations,
+                               memory_budget=self.memory_budget, use_mmap=self.use_mmap, stats=stats)
             else:
                 return partial(aes_core.encrypt_file, p, self.password,
-                               self.encrypt_name, self.chunk_size, True, progress_cb)
+                               self.encrypt_name, self.chunk_size, True, progress_cb,
+                               threads=seg_threads, keys=keys, iterations=self.kdf_iterations,
+                               memory_budget=self.memory_budget, use_mmap=self.use_mmap, stats=stats)
         else:
             low = (p or "").lower()
             if low.endswith(".gfglock") or low.endswith(".gfglck"):
-                return partial(aes_core.decrypt_file, p, self.password, self.chunk_size, progress_cb)
+                return partial(aes_core.decrypt_file, p, self.password, self.chunk_size, progress_cb,
+                               threads=seg_threads, keys=self._keys,
+                               memory_budget=self.memory_budget, use_mmap=self.use_mmap, stats=stats)
             elif low.endswith(".gfgcha"):
-                return partial(xchacha_core.decrypt_file, p, self.password, self.chunk_size, progress_cb)
+                return partial(xchacha_core.decrypt_file, p, self.password, self.chunk_size, progress_cb,
+                               threads=seg_threads, keys=self._keys,
+                               memory_budget=self.memory_budget, use_mmap=self.use_mmap, stats=stats)
             else:
                 def _unknown(path, password, chunk_size=None):
                     return False, f"Skipping unknown encrypted file format: {path}"
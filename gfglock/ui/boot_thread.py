@@ -10,6 +10,7 @@
 from PySide6.QtCore import QThread, Signal
 
 from gfglock.utils.logging import write_log
+from gfglock.utils.profiling import start_profiler
 
 
 class BootThread(QThread):
@@ -21,6 +22,7 @@ class BootThread(QThread):
 
     def run(self) -> None:
         """Load the native bridge and cipher backends, then controllers."""
+        profiler = start_profiler("boot")
         try:
             self.stage_changed.emit("Loading encryption engine...", 40)
             import gfglock.core.native_bridge  # noqa: F401
@@ -36,3 +38,9 @@ class BootThread(QThread):
         except Exception as e:
             write_log(f"Startup failed: {e}", level="critical")
             self.boot_failed.emit(str(e))
+        finally:
+            if profiler is not None:
+                try:
+                    write_log(f"Startup profile saved: {', '.join(profiler.save())}", level="general")
+                except Exception as e:
+                    write_log(f"Could not save startup profile: {e}", level="critical")
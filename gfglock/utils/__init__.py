@@ -18,6 +18,7 @@ from gfglock.utils.settings import (
     get_settings_file,
     get_default_settings,
     load_settings,
+    invalidate_settings_cache,
     merge_settings,
     save_settings,
 )
@@ -27,9 +28,27 @@ from gfglock.utils.logging import (
     get_general_log_file,
     write_critical_log,
     write_general_log,
+    write_fatal_startup_log,
     write_log,
+    write_logs,
+    write_journal,
+    get_journal_file,
+    logs_enabled,
+    get_trace_file,
+    trace_enabled,
+    flush_logs,
     clear_logs,
 )
+from gfglock.utils.metrics import (
+    get_metrics_file,
+    observe_file,
+    write_metrics,
+)
+from gfglock.utils.profiling import (
+    Profiler,
+    profiling_mode,
+    start_profiler,
+)
 
 __all__ = [
     "resource_path",
@@ -47,6 +66,7 @@ __all__ = [
     "get_settings_file",
     "get_default_settings",
     "load_settings",
+    "invalidate_settings_cache",
     "merge_settings",
     "save_settings",
     "get_logs_dir",
@@ -54,6 +74,20 @@ __all__ = [
     "get_general_log_file",
     "write_critical_log",
     "write_general_log",
+    "write_fatal_startup_log",
     "write_log",
+    "write_logs",
+    "write_journal",
+    "get_journal_file",
+    "logs_enabled",
+    "get_trace_file",
+    "trace_enabled",
+    "flush_logs",
     "clear_logs",
+    "get_metrics_file",
+    "observe_file",
+    "write_metrics",
+    "Profiler",
+    "profiling_mode",
+    "start_profiler",
 ]
@@ -7,6 +7,7 @@ from multiprocessing import cpu_count
 from secrets import token_hex
 
 from gfglock.core import native_bridge as _bridge
+from gfglock.core import segmented as _segmented
 from gfglock.utils.console import safe_print
 
 
@@ -100,18 +101,19 @@ def calculate_files_total_size(file_paths: list) -> float:
     return total
 
 
-def predict_encrypted_size(file_path: str, mode: str = "GCM") -> int:
-    """Return the exact expected size of the encrypted output file."""
+def predict_encrypted_size(file_path: str, mode: str = "GCM", flags: int = _segmented.DEFAULT_FLAGS) -> int:
+    """Return the exact expected size of the encrypted (segmented) output file.
+
+    flags are the header flags the file will be written with; add
+    FLAG_SESSION_KEY when it is encrypted with batch (session) keys.
+    """
     original_size = os.path.getsize(file_path)
     filename_len = len(os.path.basename(file_path).encode("utf-8"))
-    mode_upper = mode.upper()
-    if mode_upper in ("GCM", "CHACHA"):
-        total_overhead = 49  # salt(16) + nonce(12) + tag(16) + chunk_field(4) + null(1)
-    elif mode_upper == "CFB":
-        total_overhead = 37  # salt(16) + iv(16) + chunk_field(4) + null(1)
-    else:
+    suites = {"GCM": _segmented.GCM, "CHACHA": _segmented.CHACHA, "CFB": _segmented.CFB}
+    suite = suites.get(mode.upper())
+    if suite is None:
         raise ValueError(f"Unknown mode: {mode}. Use 'GCM', 'CFB', or 'CHACHA'.")
-    return original_size + filename_len + total_overhead
+    return _segmented.encrypted_size(original_size, filename_len, suite, flags=flags)
 
 
 def derive_key(password: str, salt: bytes, iterations: int = 200000) -> bytes:
@@ -1,11 +1,26 @@
 # logging.py - log file management utilities
 
+import atexit
+import glob
+import gzip
+import json
 import os
+import queue
+import shutil
 import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 
+from gfglock.config.defaults import DiagnosticsDefaults, LoggingDefaults
 from gfglock.utils.settings import load_settings
 
+LOG_FLUSH_INTERVAL = 0.5   # seconds a queued entry may wait for others to share its write
+LOG_QUEUE_SIZE = 10000     # queued writes before callers block; entries are never dropped
+LOG_MAX_BYTES = LoggingDefaults.MAX_LOG_MB * 1024 * 1024
+LOG_ARCHIVES = LoggingDefaults.LOG_ARCHIVES
+
 
 def get_logs_dir() -> str:
     """Return the logs directory path, creating it if needed."""
@@ -37,44 +52,251 @@ def get_general_log_file() -> str:
     return os.path.join(get_logs_dir(), "gfglock_full_activity.log")
 
 
-def write_critical_log(message: str) -> bool:
-    """Append a timestamped critical log entry."""
+def _archive_path(log_file: str, generation: int) -> str:
+    """Path of a compressed archive; generation 1 is the most recent."""
+    return f"{log_file}.{generation}.gz"
+
+
+def _archive_rotated(log_file: str, rotated: str) -> None:
+    """Compress a rotated-out log into generation 1, shifting older archives up.
+
+    Runs on the archiver thread, one rotation at a time; archives past
+    LOG_ARCHIVES are deleted. If compression fails the rotated file is kept.
+    """
+    for generation in range(LOG_ARCHIVES, 0, -1):
+        src = _archive_path(log_file, generation)
+        if not os.path.exists(src):
+            continue
+        if generation >= LOG_ARCHIVES:
+            os.remove(src)
+        else:
+            os.replace(src, _archive_path(log_file, generation + 1))
+    if LOG_ARCHIVES > 0:
+        with open(rotated, "rb") as src, gzip.open(_archive_path(log_file, 1), "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.remove(rotated)
+
+
+class _LogWriter:
+    """Background thread that appends queued log text, one write per file per batch.
+
+    A batch is whatever arrives within LOG_FLUSH_INTERVAL of its first entry;
+    flush() cuts the wait short and returns once everything queued is on disk.
+    A log that would grow past LOG_MAX_BYTES is renamed aside first and handed
+    to a separate archiver thread for compression, so writing never waits on gzip.
+    """
+
+    _FLUSH = None   # queue marker: write the current batch now
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._archiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gfglock-log-archive")
+        self._archiving: Future | None = None
+
+    def submit(self, log_file: str, text: str) -> None:
+        """Queue text for appending to log_file, blocking while the queue is full."""
+        self._ensure_started()
+        self._queue.put((log_file, text))
+
+    def flush(self) -> None:
+        """Write everything queued so far and wait until it is done."""
+        if self._thread is None:
+            return
+        self._queue.put(self._FLUSH)
+        self._queue.join()
+        if self._archiving is not None:
+            try:
+                self._archiving.result()
+            except Exception:
+                pass
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="gfglock-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while batch[-1] is not self._FLUSH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch: list) -> None:
+        """Append each file's queued text, in arrival order, with a single write."""
+        by_file: dict = {}
+        for entry in batch:
+            if entry is not self._FLUSH:
+                by_file.setdefault(entry[0], []).append(entry[1])
+        for log_file, texts in by_file.items():
+            text = "".join(texts)
+            self._rotate_if_full(log_file, len(text))
+            try:
+                with open(log_file, "a", encoding="utf-8") as f:
+                    f.write(text)
+            except Exception:
+                pass
+
+    def _rotate_if_full(self, log_file: str, incoming: int) -> None:
+        """Move log_file aside for archiving if appending incoming bytes would pass LOG_MAX_BYTES.
+
+        Best effort: if the file can't be moved (on Windows, while another handle
+        has it open) it stays in place and keeps growing until a later rotation
+        succeeds, so entries are never dropped for the sake of rotation.
+        """
+        try:
+            size = os.path.getsize(log_file)
+        except OSError:
+            return
+        if size == 0 or size + incoming <= LOG_MAX_BYTES:
+            return
+        rotated = f"{log_file}.{time.time_ns()}.rotated"
+        try:
+            os.replace(log_file, rotated)
+        except OSError:
+            return
+        try:
+            self._archiving = self._archiver.submit(_archive_rotated, log_file, rotated)
+        except RuntimeError:   # interpreter shutting down: keep appending to the full log
+            os.replace(rotated, log_file)
+
+
+_writer = _LogWriter()
+atexit.register(_writer.flush)
+
+
+def flush_logs() -> None:
+    """Block until every entry queued by write_log/write_logs is written and archived."""
+    _writer.flush()
+
+
+def _format_entries(messages: list) -> str:
+    """Log lines for messages, all with the current timestamp."""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return "".join(f"[{timestamp}] {message}\n" for message in messages)
+
+
+def get_journal_file() -> str:
+    """Return the path to the per-file operation journal (one JSON object per line)."""
+    return os.path.join(get_logs_dir(), "gfglock_journal.jsonl")
+
+
+def get_trace_file() -> str:
+    """Return a new timestamped path for an operation's Chrome trace-event timeline."""
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return os.path.join(get_logs_dir(), f"gfglock_trace_{stamp}.json")
+
+
+def trace_enabled() -> bool:
+    """True when operations should record a timeline.
+
+    The GFGLOCK_TRACE environment variable wins when set ("0" turns tracing off);
+    otherwise the advanced.trace_timeline setting decides.
+    """
+    env = os.environ.get(DiagnosticsDefaults.TRACE_ENV, "").strip()
+    if env:
+        return env != "0"
     try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(get_critical_log_file(), "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
-        return True
+        return bool(load_settings().get("advanced", {}).get("trace_timeline", DiagnosticsDefaults.TRACE_TIMELINE))
+    except Exception:
+        return False
+
+
+def logs_enabled() -> bool:
+    """True when the user has turned logging on."""
+    try:
+        return bool(load_settings().get("advanced", {}).get("enable_logs", False))
     except Exception:
         return False
 
 
+def _queue_entries(log_file: str, messages: list) -> bool:
+    """Hand messages to the background writer; they reach log_file by the next flush."""
+    _writer.submit(log_file, _format_entries(messages))
+    return True
+
+
+def write_critical_log(message: str) -> bool:
+    """Queue a timestamped critical log entry."""
+    return _queue_entries(get_critical_log_file(), [message])
+
+
 def write_general_log(message: str) -> bool:
-    """Append a timestamped general log entry."""
+    """Queue a timestamped general log entry."""
+    return _queue_entries(get_general_log_file(), [message])
+
+
+def write_fatal_startup_log(message: str) -> bool:
+    """Write a critical entry before returning, for a startup failure the process may not outlive.
+
+    Entries queued earlier are flushed first so the log keeps its order, and
+    the log is rotated like any batch. Like write_log, it needs logging on.
+    """
+    if not logs_enabled():
+        return False
+    flush_logs()
+    log_file = get_critical_log_file()
+    text = _format_entries([message])
     try:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(get_general_log_file(), "a", encoding="utf-8") as f:
-            f.write(f"[{timestamp}] {message}\n")
+        _writer._rotate_if_full(log_file, len(text))
+        with open(log_file, "a", encoding="utf-8") as f:
+            f.write(text)
         return True
     except Exception:
         return False
 
 
 def write_log(message: str, level: str = "general") -> bool:
-    """Write a log entry to disk, respecting the enabled flag and log-level setting.
+    """Queue a log entry for disk, respecting the enabled flag and log-level setting.
 
     level='critical' → always written to the critical log (when logging is on).
     level='general'  → written to the general log only when log_level is 'all'.
+    Entries are written by a background thread; flush_logs() waits for them.
     """
+    return write_logs([message], level)
+
+
+def write_logs(messages: list, level: str = "general") -> bool:
+    """Queue a batch of entries like write_log, reading settings once for all of them."""
+    if not messages:
+        return False
     try:
         settings = load_settings()
-        if not settings.get("advanced", {}).get("enable_logs", False):
+        adv = settings.get("advanced", {})
+        if not adv.get("enable_logs", False):
             return False
         if level == "critical":
-            return write_critical_log(message)
-        log_level = settings.get("advanced", {}).get("log_level", "critical")
-        if log_level == "all":
-            return write_general_log(message)
+            return _queue_entries(get_critical_log_file(), messages)
+        if adv.get("log_level", "critical") == "all":
+            return _queue_entries(get_general_log_file(), messages)
+        return False
+    except Exception:
+        return False
+
+
+def write_journal(records: list) -> bool:
+    """Queue per-file journal records (JSON-serialisable dicts), when logging is on.
+
+    Records go to get_journal_file() through the background writer, so they
+    share its batching and rotation.
+    """
+    if not records or not logs_enabled():
         return False
+    try:
+        _writer.submit(get_journal_file(), "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records))
+        return True
     except Exception:
         return False
 
@@ -92,21 +314,28 @@ def write_session_separator() -> None:
         if log_level == "all":
             targets.append(get_general_log_file())
         for log_file in targets:
-            try:
-                with open(log_file, "a", encoding="utf-8") as f:
-                    f.write(sep)
-            except Exception:
-                pass
+            _writer.submit(log_file, sep)
     except Exception:
         pass
 
 
 def clear_logs() -> bool:
-    """Clear all log files. Returns True if both cleared successfully."""
+    """Clear all log files, the journal, their archives, saved traces and profiles. Returns True if all were cleared."""
     try:
-        for log_file in [get_critical_log_file(), get_general_log_file()]:
+        flush_logs()
+        stale = []
+        for log_file in [get_critical_log_file(), get_general_log_file(), get_journal_file()]:
             if os.path.exists(log_file):
                 open(log_file, "w", encoding="utf-8").close()
+            stale += glob.glob(glob.escape(log_file) + ".*.gz")
+        logs_dir = glob.escape(os.path.dirname(get_trace_file()))
+        stale += glob.glob(os.path.join(logs_dir, "gfglock_trace_*.json"))
+        stale += glob.glob(os.path.join(logs_dir, "gfglock_profile_*"))
+        for old in stale:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
         return True
     except Exception:
         return False
@@ -0,0 +1,184 @@
+# metrics.py - process-wide counters and histograms exported as a metrics text file
+#
+# The worker feeds REGISTRY one observation per finished file (sizes and phase
+# timings come from the engines' FileStats). write_metrics() renders it in the
+# text exposition format node_exporter's textfile collector scrapes (OpenMetrics
+# compatible, ending in "# EOF") and swaps it into place atomically, so the
+# collector never reads a half-written file.
+
+import math
+import os
+import threading
+from typing import Optional
+
+from gfglock.config.defaults import DiagnosticsDefaults
+from gfglock.utils.logging import get_logs_dir
+from gfglock.utils.settings import load_settings
+
+# Upper bounds of the histogram buckets (+Inf is implicit).
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+THROUGHPUT_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    """{a="x",b="y"} for a sample, with label values escaped."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic total per label set."""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self._values: dict = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def render(self) -> list:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        lines += [f"{self.name}{_labels(self.labelnames, key)} {_number(v)}" for key, v in values]
+        return lines
+
+
+class Histogram:
+    """Bucketed observations per label set, with their sum and count."""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = DURATION_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict = {}   # labels -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(labels[name] for name in self.labelnames))
+        return series[2] if series else 0
+
+    def render(self) -> list:
+        with self._lock:
+            series = sorted((key, (list(b), s, c)) for key, (b, s, c) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (buckets, total, count) in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets, buckets):
+                cumulative += n
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    """The metrics gfgLock exports, in registration order."""
+
+    def __init__(self):
+        self._metrics: list = []
+
+    def counter(self, name: str, help_text: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, help_text, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, labelnames: tuple = (),
+                  buckets: tuple = DURATION_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Every metric in text exposition form, terminated by # EOF."""
+        lines = [line for metric in self._metrics for line in metric.render()]
+        return "\n".join(lines + ["# EOF"]) + "\n"
+
+
+REGISTRY = Registry()
+_FILE_LABELS = ("op", "algo")
+FILES = REGISTRY.counter("gfglock_files_total", "Files finished, by outcome (ok, failed, skipped).",
+                         _FILE_LABELS + ("result",))
+BYTES = REGISTRY.counter("gfglock_bytes_total", "Input bytes of successfully processed files.", _FILE_LABELS)
+FILE_SECONDS = REGISTRY.histogram("gfglock_file_duration_seconds", "Wall time per successful file.",
+                                  _FILE_LABELS)
+KDF_SECONDS = REGISTRY.histogram("gfglock_kdf_duration_seconds", "Key derivation time per successful file.",
+                                 _FILE_LABELS)
+THROUGHPUT = REGISTRY.histogram("gfglock_file_throughput_mbps", "Input MB/s per successful file.",
+                                _FILE_LABELS, THROUGHPUT_BUCKETS)
+
+
+def observe_file(op: str, algo: Optional[str], result: str, fields: Optional[dict] = None) -> None:
+    """Count one finished file; fields is its FileStats.as_dict(), when the engine reported one."""
+    algo = algo or "unknown"
+    FILES.inc(op=op, algo=algo, result=result)
+    if result != "ok" or not fields:
+        return
+    BYTES.inc(fields.get("bytes_in", 0), op=op, algo=algo)
+    elapsed = fields.get("elapsed_ns", 0) / 1e9
+    if elapsed > 0:
+        FILE_SECONDS.observe(elapsed, op=op, algo=algo)
+        THROUGHPUT.observe(fields.get("bytes_in", 0) / (1024 * 1024) / elapsed, op=op, algo=algo)
+    KDF_SECONDS.observe(fields.get("kdf_ns", 0) / 1e9, op=op, algo=algo)
+
+
+def get_metrics_file() -> Optional[str]:
+    """Where to export metrics, or None when exporting is off.
+
+    GFGLOCK_METRICS_FILE names the file (point it into node_exporter's textfile
+    directory; the name should end in .prom) and turns exporting on. Otherwise
+    the advanced.export_metrics setting writes gfglock.prom to the logs folder.
+    """
+    env = os.environ.get(DiagnosticsDefaults.METRICS_ENV, "").strip()
+    if env:
+        return env
+    try:
+        enabled = load_settings().get("advanced", {}).get("export_metrics", DiagnosticsDefaults.EXPORT_METRICS)
+    except Exception:
+        return None
+    return os.path.join(get_logs_dir(), "gfglock.prom") if enabled else None
+
+
+def write_metrics(path: str, registry: Registry = REGISTRY) -> bool:
+    """Render registry to path via a temporary file and an atomic rename."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(registry.render())
+        os.replace(tmp, path)
+        return True
+    except Exception:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        return False
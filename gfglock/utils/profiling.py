@@ -0,0 +1,136 @@
+# profiling.py - opt-in cProfile and tracemalloc capture around long-running work
+#
+# A Profiler started on a thread profiles that thread; wrap() extends it to
+# pool threads (before Python 3.12 cProfile only sees the thread it was enabled
+# on, so each pool thread gets its own profile and save() merges them). With
+# memory on, tracemalloc snapshots taken at start() and save() become a report
+# of the allocation sites that grew and the largest live ones. Both files go to
+# the logs folder, so a user can send them in without any developer setup.
+
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Optional
+
+from gfglock.config.defaults import DiagnosticsDefaults
+from gfglock.utils.logging import get_logs_dir
+from gfglock.utils.settings import load_settings
+
+# From Python 3.12 cProfile hooks sys.monitoring, which covers every thread and
+# allows only one active profiler, so per-thread profiles are neither needed nor possible.
+_PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+
+def profiling_mode() -> str:
+    """"" when profiling is off, "cpu" for cProfile alone, "memory" to add tracemalloc.
+
+    The GFGLOCK_PROFILE environment variable wins when set ("0" turns profiling
+    off, "memory" adds allocation snapshots, anything else profiles CPU only);
+    otherwise the advanced.profile_operations and profile_memory settings decide.
+    """
+    env = os.environ.get(DiagnosticsDefaults.PROFILE_ENV, "").strip().lower()
+    if env:
+        return "" if env == "0" else "memory" if env == "memory" else "cpu"
+    try:
+        advanced = load_settings().get("advanced", {})
+    except Exception:
+        return ""
+    if not advanced.get("profile_operations", DiagnosticsDefaults.PROFILE_OPERATIONS):
+        return ""
+    return "memory" if advanced.get("profile_memory", DiagnosticsDefaults.PROFILE_MEMORY) else "cpu"
+
+
+class Profiler:
+    """cProfile (and optionally tracemalloc) data for one named run."""
+
+    def __init__(self, name: str, memory: bool = False):
+        self.name = name
+        self.memory = memory
+        self._profiles: list = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._owns_tracemalloc = False
+        self._first_snapshot: Optional[tracemalloc.Snapshot] = None
+
+    def start(self) -> "Profiler":
+        """Take the starting memory snapshot, if wanted, and profile the calling thread."""
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._first_snapshot = tracemalloc.take_snapshot()
+        self._enable()
+        return self
+
+    def _enable(self) -> cProfile.Profile:
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        profile.enable()
+        return profile
+
+    def wrap(self, fn: Callable) -> Callable:
+        """fn, profiled on whichever pool thread runs it."""
+        if _PROFILES_ALL_THREADS:
+            return fn
+
+        @functools.wraps(fn)
+        def profiled(*args, **kwargs):
+            profile = self._enable()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profile.disable()
+
+        return profiled
+
+    def save(self) -> list:
+        """Stop profiling and write the reports to the logs folder; returns their paths.
+
+        Call from the thread that called start(). Writes <prefix>.prof (load it
+        with pstats, snakeviz or similar) and, with memory on,
+        <prefix>_memory.txt.
+        """
+        self._local.profile.disable()
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        prefix = os.path.join(get_logs_dir(), f"gfglock_profile_{self.name}_{stamp}")
+        with self._lock:
+            profiles = list(self._profiles)
+        pstats.Stats(*profiles).dump_stats(prefix + ".prof")
+        paths = [prefix + ".prof"]
+        if self._first_snapshot is not None:
+            paths.append(self._save_memory(prefix + "_memory.txt"))
+        return paths
+
+    def _save_memory(self, path: str) -> str:
+        last = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        top = DiagnosticsDefaults.PROFILE_TOP_ALLOCATIONS
+        lines = [
+            f"gfgLock memory profile: {self.name}",
+            f"Traced memory at end: {current / 1024:.1f} KiB, peak during run: {peak / 1024:.1f} KiB",
+            "",
+            f"Top {top} allocation sites by growth since start:",
+        ]
+        lines += [f"  {stat}" for stat in last.compare_to(self._first_snapshot, "lineno")[:top]]
+        lines += ["", f"Top {top} allocation sites live at end:"]
+        lines += [f"  {stat}" for stat in last.statistics("lineno")[:top]]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+
+def start_profiler(name: str) -> Optional[Profiler]:
+    """A started Profiler for the calling thread when profiling is on, else None."""
+    mode = profiling_mode()
+    return Profiler(name, memory=mode == "memory").start() if mode else None
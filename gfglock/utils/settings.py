@@ -1,9 +1,11 @@
 # settings.py - settings file load, save, and merge utilities
 
+import copy
 import json
 import os
 import sys
-from typing import Any, Dict
+import threading
+from typing import Any, Dict, Optional, Tuple
 
 from gfglock.config.defaults import get_default_settings as _get_defaults
 
@@ -27,9 +29,22 @@ def get_default_settings() -> Dict[str, Any]:
     return _get_defaults()
 
 
-def load_settings() -> Dict[str, Any]:
-    """Load settings from settings.json, merging with defaults for any missing keys."""
-    path = get_settings_file()
+# Last parsed settings, keyed by (path, mtime_ns, size) of settings.json.
+_cache: Optional[Tuple[tuple, Dict[str, Any]]] = None
+_cache_lock = threading.Lock()
+
+
+def _file_key(path: str) -> tuple:
+    """Identify the current on-disk version of path; a missing file has its own key."""
+    try:
+        st = os.stat(path)
+        return path, st.st_mtime_ns, st.st_size
+    except OSError:
+        return path, None, None
+
+
+def _read_settings(path: str) -> Dict[str, Any]:
+    """Parse settings.json at path and merge it onto the defaults."""
     if os.path.exists(path):
         try:
             with open(path, "r", encoding="utf-8") as f:
@@ -40,6 +55,31 @@ def load_settings() -> Dict[str, Any]:
     return get_default_settings()
 
 
+def load_settings() -> Dict[str, Any]:
+    """Load settings from settings.json, merging with defaults for any missing keys.
+
+    The parsed result is cached until the file's mtime or size changes (or
+    invalidate_settings_cache() is called); callers get their own copy.
+    """
+    global _cache
+    path = get_settings_file()
+    key = _file_key(path)
+    with _cache_lock:
+        if _cache is not None and _cache[0] == key:
+            return copy.deepcopy(_cache[1])
+    settings = _read_settings(path)
+    with _cache_lock:
+        _cache = (key, settings)
+    return copy.deepcopy(settings)
+
+
+def invalidate_settings_cache() -> None:
+    """Forget the cached settings so the next load_settings() re-reads the file."""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
 def save_settings(settings: Dict[str, Any]) -> bool:
     """Persist settings to settings.json. Returns True on success."""
     try:
@@ -48,6 +88,8 @@ def save_settings(settings: Dict[str, Any]) -> bool:
         return True
     except Exception:
         return False
+    finally:
+        invalidate_settings_cache()
 
 
 def merge_settings(defaults: Dict[str, Any], overrides: Dict[str, Any]) -> Dict[str, Any]:
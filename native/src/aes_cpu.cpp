@@ -1,19 +1,32 @@
 // aes_cpu.cpp - AES-256-GCM / AES-256-CFB / ChaCha20-Poly1305 via OpenSSL EVP.
 // C++ owns the full file I/O loop; Python overhead = one function call per file.
+//
+// New files use the segmented container (layout documented in
+// gfglock/core/segmented.py): the payload is split into fixed-size segments,
+// each sealed under a nonce derived from its index and bound to a final flag,
+// so the segments of one file are sealed/opened on a thread pool. Reading,
+// the cipher and writing run as a three-stage pipeline (pipeline.hpp), so disk
+// I/O overlaps the cipher instead of alternating with it.
 
 #include "aes_cpu.hpp"
 #include "kdf.hpp"
+#include "pipeline.hpp"
+#include "thread_pool.hpp"
 
 #include <openssl/evp.h>
+#include <openssl/crypto.h>
 #include <openssl/rand.h>
 
+#include <algorithm>
 #include <array>
+#include <atomic>
 #include <cstring>
 #include <filesystem>
 #include <fstream>
 #include <iomanip>
 #include <sstream>
 #include <stdexcept>
+#include <vector>
 
 namespace fs = std::filesystem;
 namespace gfglock {
@@ -26,10 +39,18 @@ constexpr int    NONCE_SIZE         = 12;
 constexpr int    IV_SIZE            = 16;
 constexpr int    TAG_SIZE           = 16;
 constexpr size_t BUFFER_SIZE        = 512  * 1024;
-constexpr size_t SMALL_THRESHOLD    = 10   * 1024 * 1024;
 constexpr size_t PROGRESS_INTERVAL  = 100  * 1024 * 1024;
-constexpr int    KDF_ITERATIONS     = 200000;
 constexpr int    KEY_SIZE           = 32;
+constexpr uint8_t  EXT_MARKER       = 0x80;
+constexpr uint8_t  FORMAT_VERSION   = 2;
+constexpr uint32_t SEGMENT_SIZE     = 1024 * 1024;
+constexpr int      EXT_FIELDS_SIZE  = 12;   // marker, version, flags, segment_size, name_len
+constexpr uint16_t FLAG_KEY_CHECK   = 0x0001;
+constexpr uint16_t FLAG_SESSION_KEY = 0x0002;
+constexpr uint16_t FLAG_KDF_ITERATIONS = 0x0004;
+constexpr uint16_t KNOWN_FLAGS      = FLAG_KEY_CHECK | FLAG_SESSION_KEY | FLAG_KDF_ITERATIONS;
+constexpr int      KEY_CHECK_SIZE   = 16;
+constexpr char     FILE_KEY_INFO[]  = "gfglock file key";
 
 // ── Internal helpers ──────────────────────────────────────────────────────────
 
@@ -70,6 +91,7 @@ std::string buildName(const std::string& src, bool encrypt_name, const std::stri
 }
 
 void fireProgress(const ProgressFn& cb, size_t& batch, size_t n) {
+    if (auto* sink = cb.target<CounterSink>()) { (*sink)(static_cast<double>(n)); return; }
     batch += n;
     if (cb && batch >= PROGRESS_INTERVAL) { cb(static_cast<double>(batch)); batch = 0; }
 }
@@ -119,91 +141,465 @@ bool feedDecrypted(
     return true;
 }
 
-} // anonymous namespace
+// Decrypt data_len bytes of a legacy single stream through ctx into fout (opened
+// by feedDecrypted once the name is known). The tag and EVP final stay with the caller.
+void decryptLegacyStream(
+    std::ifstream& fin, EVP_CIPHER_CTX* ctx, size_t data_len,
+    bool& got_meta, std::string& meta_buf,
+    std::string& original_name, const std::string& dir,
+    std::ofstream& fout, std::string& out_path_out, const ProgressFn& progress, FileStats& stats,
+    const EnginePools* pools)
+{
+    struct Chunk {
+        std::vector<uint8_t> in = std::vector<uint8_t>(BUFFER_SIZE);
+        std::vector<uint8_t> out = std::vector<uint8_t>(BUFFER_SIZE + EVP_MAX_BLOCK_LENGTH);
+        size_t n = 0;
+        int out_len = 0;
+    };
+    std::vector<Chunk> chunks(std::clamp<size_t>((data_len + BUFFER_SIZE - 1) / BUFFER_SIZE, 1, PIPELINE_DEPTH));
+    size_t remaining = data_len, progress_batch = 0;
+    stats.chunk_bytes = BUFFER_SIZE;
+    stats.pipeline_depth = chunks.size();
+    stats.buffer_bytes = chunks.size() * (2 * BUFFER_SIZE + EVP_MAX_BLOCK_LENGTH);
+
+    runPipeline(chunks.size(),
+        [&](size_t i) {
+            if (remaining == 0) return false;
+            Chunk& c = chunks[i];
+            {
+                PhaseTimer timer(stats, &FileStats::read_ns);
+                c.n = readChunk(fin, c.in, std::min(remaining, BUFFER_SIZE));
+            }
+            if (c.n == 0) return false;
+            stats.bytes_in += c.n;
+            remaining -= c.n;
+            return true;
+        },
+        [&](size_t i) {
+            Chunk& c = chunks[i];
+            PhaseTimer timer(stats, &FileStats::cipher_ns);
+            if (EVP_DecryptUpdate(ctx, c.out.data(), &c.out_len,
+                                  c.in.data(), static_cast<int>(c.n)) != 1)
+                throw std::runtime_error("EVP_DecryptUpdate failed");
+            return true;
+        },
+        [&](size_t i) {
+            Chunk& c = chunks[i];
+            PhaseTimer timer(stats, &FileStats::write_ns);
+            if (c.out_len > 0 && !feedDecrypted(c.out.data(), static_cast<size_t>(c.out_len),
+                    got_meta, meta_buf, original_name, dir, fout, out_path_out))
+                throw std::runtime_error("Cannot create output file");
+            fireProgress(progress, progress_batch, c.n);
+        },
+        pools ? pools->io : nullptr);
+    if (progress && progress_batch > 0) progress(static_cast<double>(progress_batch));
+}
 
-// ── AES-256-GCM ──────────────────────────────────────────────────────────────
+// ── Segmented container ──────────────────────────────────────────────────────
 
-std::pair<bool, std::string> encryptGcm(
+struct Suite {
+    const EVP_CIPHER* cipher;
+    int nonce_size;
+    int tag_size;   // 0 for CFB: segments carry no tag
+    const char* ext;
+};
+
+Suite suiteFor(Algo algo) {
+    switch (algo) {
+        case Algo::Gcm: return {EVP_aes_256_gcm(),       NONCE_SIZE, TAG_SIZE, ".gfglock"};
+        case Algo::Cfb: return {EVP_aes_256_cfb128(),    IV_SIZE,    0,        ".gfglck"};
+        default:        return {EVP_chacha20_poly1305(), NONCE_SIZE, TAG_SIZE, ".gfgcha"};
+    }
+}
+
+struct SegHeader {
+    std::vector<uint8_t> salt;
+    std::vector<uint8_t> nonce;
+    uint16_t flags        = 0;
+    uint32_t segment_size = SEGMENT_SIZE;
+    uint32_t name_len     = 0;
+    std::vector<uint8_t> key_check;
+    std::vector<uint8_t> file_salt;
+    uint32_t kdf_iterations = DEFAULT_KDF_ITERATIONS;
+};
+
+std::vector<uint8_t> packHeader(const SegHeader& h) {
+    std::vector<uint8_t> out(h.salt);
+    out.insert(out.end(), h.nonce.begin(), h.nonce.end());
+    uint8_t fields[EXT_FIELDS_SIZE];
+    fields[0] = EXT_MARKER;
+    fields[1] = FORMAT_VERSION;
+    fields[2] = static_cast<uint8_t>(h.flags >> 8);
+    fields[3] = static_cast<uint8_t>(h.flags & 0xFF);
+    packBE32(h.segment_size, fields + 4);
+    packBE32(h.name_len,     fields + 8);
+    out.insert(out.end(), fields, fields + EXT_FIELDS_SIZE);
+    if (h.flags & FLAG_KEY_CHECK)   out.insert(out.end(), h.key_check.begin(), h.key_check.end());
+    if (h.flags & FLAG_SESSION_KEY) out.insert(out.end(), h.file_salt.begin(), h.file_salt.end());
+    if (h.flags & FLAG_KDF_ITERATIONS) {
+        uint8_t iters[4];
+        packBE32(h.kdf_iterations, iters);
+        out.insert(out.end(), iters, iters + 4);
+    }
+    return out;
+}
+
+// Parse a segmented header; returns false (stream rewound) for the legacy layout.
+bool readHeader(std::istream& fin, const Suite& s, SegHeader& h) {
+    h.salt.assign(SALT_SIZE, 0);
+    h.nonce.assign(static_cast<size_t>(s.nonce_size), 0);
+    uint8_t fields[EXT_FIELDS_SIZE];
+    fin.read(reinterpret_cast<char*>(h.salt.data()),  SALT_SIZE);
+    fin.read(reinterpret_cast<char*>(h.nonce.data()), s.nonce_size);
+    fin.read(reinterpret_cast<char*>(fields), EXT_FIELDS_SIZE);
+    if (fin.gcount() < 4) throw std::runtime_error("file is too small or corrupted");
+    if (fields[0] != EXT_MARKER) {
+        fin.clear();
+        fin.seekg(0);
+        return false;
+    }
+    if (fin.gcount() != EXT_FIELDS_SIZE) throw std::runtime_error("file is too small or corrupted");
+    if (fields[1] != FORMAT_VERSION) throw std::runtime_error("unsupported format version");
+    h.flags        = static_cast<uint16_t>((fields[2] << 8) | fields[3]);
+    h.segment_size = unpackBE32(fields + 4);
+    h.name_len     = unpackBE32(fields + 8);
+    if (h.flags & ~KNOWN_FLAGS) throw std::runtime_error("unsupported header flags");
+    if (h.segment_size == 0) throw std::runtime_error("file is too small or corrupted");
+    auto readField = [&](std::vector<uint8_t>& field, int size) {
+        field.assign(static_cast<size_t>(size), 0);
+        fin.read(reinterpret_cast<char*>(field.data()), size);
+        if (fin.gcount() != size) throw std::runtime_error("file is too small or corrupted");
+    };
+    if (h.flags & FLAG_KEY_CHECK)   readField(h.key_check, KEY_CHECK_SIZE);
+    if (h.flags & FLAG_SESSION_KEY) readField(h.file_salt, SALT_SIZE);
+    if (h.flags & FLAG_KDF_ITERATIONS) {
+        std::vector<uint8_t> iters;
+        readField(iters, 4);
+        h.kdf_iterations = unpackBE32(iters.data());
+        if (h.kdf_iterations == 0 || h.kdf_iterations > static_cast<uint32_t>(MAX_KDF_ITERATIONS))
+            throw std::runtime_error("unsupported KDF iteration count");
+    }
+    return true;
+}
+
+bool isSegmented(const std::string& path, const Suite& s) {
+    std::ifstream fin(path, std::ios::binary);
+    if (!fin) return false;
+    SegHeader h;
+    try { return readHeader(fin, s, h); } catch (...) { return false; }
+}
+
+// PBKDF2 output for salt, reusing the caller's precomputed key when it matches.
+std::vector<uint8_t> baseKeyFor(const std::string& password, const std::vector<uint8_t>& salt,
+                                int iterations, const BaseKey& base)
+{
+    if (!base.key.empty() && base.salt == salt && base.iterations == iterations) return base.key;
+    return pbkdf2Sha256(password, salt, iterations, KEY_SIZE);
+}
+
+// Derive a segment's nonce by XOR-ing its index into the base nonce's low 8 bytes.
+std::vector<uint8_t> segmentNonce(const std::vector<uint8_t>& base, uint64_t index) {
+    std::vector<uint8_t> out(base);
+    size_t off = out.size() - 8;
+    for (int i = 0; i < 8; ++i)
+        out[off + i] ^= static_cast<uint8_t>(index >> (56 - 8 * i));
+    return out;
+}
+
+// Associated data binding a segment to its index and the final-segment flag.
+std::vector<uint8_t> segmentAad(uint64_t index, bool final) {
+    std::vector<uint8_t> aad(9);
+    for (int i = 0; i < 8; ++i) aad[i] = static_cast<uint8_t>(index >> (56 - 8 * i));
+    aad[8] = final ? 1 : 0;
+    return aad;
+}
+
+// Seal n bytes into out (ciphertext followed by the tag, if the suite has one).
+void sealSegment(const Suite& s, const std::vector<uint8_t>& key, const std::vector<uint8_t>& nonce,
+                 const std::vector<uint8_t>& aad, const uint8_t* in, size_t n, uint8_t* out)
+{
+    EvpCtx ctx;
+    if (!ctx) throw std::runtime_error("EVP_CIPHER_CTX_new failed");
+    if (EVP_EncryptInit_ex(ctx.get(), s.cipher, nullptr, nullptr, nullptr) != 1
+        || (s.tag_size > 0 && EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_AEAD_SET_IVLEN,
+                                                  s.nonce_size, nullptr) != 1)
+        || EVP_EncryptInit_ex(ctx.get(), nullptr, nullptr, key.data(), nonce.data()) != 1)
+        throw std::runtime_error("segment init failed");
+    int len = 0;
+    if (s.tag_size > 0 && EVP_EncryptUpdate(ctx.get(), nullptr, &len,
+                                            aad.data(), static_cast<int>(aad.size())) != 1)
+        throw std::runtime_error("segment AAD failed");
+    int out_len = 0;
+    if (n > 0 && EVP_EncryptUpdate(ctx.get(), out, &out_len, in, static_cast<int>(n)) != 1)
+        throw std::runtime_error("EVP_EncryptUpdate failed");
+    if (EVP_EncryptFinal_ex(ctx.get(), out + out_len, &len) != 1)
+        throw std::runtime_error("EVP_EncryptFinal_ex failed");
+    if (s.tag_size > 0 && EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_AEAD_GET_TAG,
+                                              s.tag_size, out + n) != 1)
+        throw std::runtime_error("get tag failed");
+}
+
+// Open n stored bytes (ciphertext + tag) into out; returns false when the tag fails.
+bool openSegment(const Suite& s, const std::vector<uint8_t>& key, const std::vector<uint8_t>& nonce,
+                 const std::vector<uint8_t>& aad, const uint8_t* in, size_t n, uint8_t* out)
+{
+    size_t ct_len = n - static_cast<size_t>(s.tag_size);
+    EvpCtx ctx;
+    if (!ctx) throw std::runtime_error("EVP_CIPHER_CTX_new failed");
+    if (EVP_DecryptInit_ex(ctx.get(), s.cipher, nullptr, nullptr, nullptr) != 1
+        || (s.tag_size > 0 && EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_AEAD_SET_IVLEN,
+                                                  s.nonce_size, nullptr) != 1)
+        || EVP_DecryptInit_ex(ctx.get(), nullptr, nullptr, key.data(), nonce.data()) != 1)
+        throw std::runtime_error("segment init failed");
+    int len = 0;
+    if (s.tag_size > 0 && EVP_DecryptUpdate(ctx.get(), nullptr, &len,
+                                            aad.data(), static_cast<int>(aad.size())) != 1)
+        throw std::runtime_error("segment AAD failed");
+    int out_len = 0;
+    if (ct_len > 0 && EVP_DecryptUpdate(ctx.get(), out, &out_len, in, static_cast<int>(ct_len)) != 1)
+        throw std::runtime_error("EVP_DecryptUpdate failed");
+    if (s.tag_size > 0) {
+        uint8_t tag[TAG_SIZE];
+        std::memcpy(tag, in + ct_len, TAG_SIZE);
+        if (EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_AEAD_SET_TAG, TAG_SIZE, tag) != 1)
+            throw std::runtime_error("set tag failed");
+    }
+    return EVP_DecryptFinal_ex(ctx.get(), out + out_len, &len) > 0;
+}
+
+// Header for a new container whose name block holds `name`, plus its file key:
+// HKDF from the caller's session key when one is given, PBKDF2 otherwise.
+SegHeader newHeader(const Suite& s, const std::string& name, const std::string& password,
+                    const BaseKey& base, std::vector<uint8_t>& key)
+{
+    if (base.iterations < MIN_KDF_ITERATIONS || base.iterations > MAX_KDF_ITERATIONS)
+        throw std::runtime_error("unsupported KDF iteration count for a new file");
+    SegHeader h;
+    h.nonce    = randBytes(s.nonce_size);
+    h.name_len = static_cast<uint32_t>(name.size());
+    h.flags    = FLAG_KDF_ITERATIONS;
+    h.kdf_iterations = static_cast<uint32_t>(base.iterations);
+    if (!base.key.empty()) {
+        // Session keys: shared batch salt, per-file key expanded from the batch key.
+        h.salt      = base.salt;
+        h.file_salt = randBytes(SALT_SIZE);
+        h.flags    |= FLAG_SESSION_KEY;
+        key = hkdfSha256(base.key, h.file_salt, FILE_KEY_INFO, KEY_SIZE);
+    } else {
+        h.salt = randBytes(SALT_SIZE);
+        key = pbkdf2Sha256(password, h.salt, base.iterations, KEY_SIZE);
+    }
+    h.flags    |= FLAG_KEY_CHECK;
+    h.key_check = keyCheckValue(key);
+    return h;
+}
+
+// File key for a parsed header; false when the header's key check rejects it.
+bool headerKey(const SegHeader& h, const std::string& password, const BaseKey& base,
+               std::vector<uint8_t>& key)
+{
+    key = baseKeyFor(password, h.salt, static_cast<int>(h.kdf_iterations), base);
+    if (h.flags & FLAG_SESSION_KEY) key = hkdfSha256(key, h.file_salt, FILE_KEY_INFO, KEY_SIZE);
+    return !(h.flags & FLAG_KEY_CHECK)
+        || CRYPTO_memcmp(keyCheckValue(key).data(), h.key_check.data(), KEY_CHECK_SIZE) == 0;
+}
+
+// Name block AAD: the packed header, so opening it authenticates every header field.
+std::vector<uint8_t> nameAad(const std::vector<uint8_t>& header) {
+    std::vector<uint8_t> aad(header);
+    auto idx0 = segmentAad(0, false);
+    aad.insert(aad.end(), idx0.begin(), idx0.end());
+    return aad;
+}
+
+// Sealed name block (name followed by the tag).
+std::vector<uint8_t> sealName(const Suite& s, const SegHeader& h, const std::vector<uint8_t>& header,
+                              const std::vector<uint8_t>& key, const std::string& name)
+{
+    std::vector<uint8_t> block(name.size() + static_cast<size_t>(s.tag_size) + EVP_MAX_BLOCK_LENGTH);
+    sealSegment(s, key, segmentNonce(h.nonce, 0), nameAad(header),
+                reinterpret_cast<const uint8_t*>(name.data()), name.size(), block.data());
+    block.resize(name.size() + static_cast<size_t>(s.tag_size));
+    return block;
+}
+
+// Open the h.name_len + tag bytes of a name block; false on authentication failure.
+bool openName(const Suite& s, const SegHeader& h, const std::vector<uint8_t>& header,
+              const std::vector<uint8_t>& key, const uint8_t* block, std::string& name)
+{
+    std::vector<uint8_t> plain(h.name_len + EVP_MAX_BLOCK_LENGTH);
+    if (!openSegment(s, key, segmentNonce(h.nonce, 0), nameAad(header),
+                     block, h.name_len + static_cast<size_t>(s.tag_size), plain.data()))
+        return false;
+    name.assign(reinterpret_cast<const char*>(plain.data()), h.name_len);
+    return true;
+}
+
+// Read-only istream source over caller-owned memory, so readHeader parses buffers in place.
+struct ViewBuf : std::streambuf {
+    explicit ViewBuf(std::string_view data) {
+        char* p = const_cast<char*>(data.data());
+        setg(p, p, p + data.size());
+    }
+};
+
+struct Batching {
+    size_t batch;   // segments per pipeline slot
+    size_t depth;   // slots in flight
+};
+
+// Segments per I/O batch: enough to feed every thread, or one chunk's worth, capped
+// so the input and output buffers of every pipeline slot fit in memory_budget
+// (0 = the default). A tight budget trades pipeline depth for batch size.
+Batching batchSegments(int threads, int chunk_size, uint32_t segment_size, uint64_t stored,
+                       uint64_t total, size_t memory_budget) {
+    size_t per_chunk = chunk_size > 0 ? static_cast<size_t>(chunk_size) / segment_size : 0;
+    size_t wanted = std::max({static_cast<size_t>(resolveThreads(threads)), per_chunk, size_t{1}});
+    uint64_t budget = memory_budget > 0 ? memory_budget : DEFAULT_MEMORY_BUDGET;
+    uint64_t fits = budget / (2 * stored);
+    if (fits == 0) throw std::runtime_error("segment size exceeds the memory budget");
+    size_t depth = static_cast<size_t>(std::min<uint64_t>(PIPELINE_DEPTH, fits));
+    size_t batch = static_cast<size_t>(std::min<uint64_t>({wanted, fits / depth, std::max<uint64_t>(total, 1)}));
+    depth = static_cast<size_t>(std::min<uint64_t>(depth, std::max<uint64_t>((total + batch - 1) / batch, 1)));
+    return {batch, depth};
+}
+
+// Input and output buffers of one pipeline slot: `count` segments starting at `first`.
+struct SegmentSlot {
+    std::vector<std::vector<uint8_t>> in, out;
+    std::vector<size_t> lens;
+    uint64_t first = 0;
+    size_t count = 0;
+};
+
+std::vector<SegmentSlot> segmentSlots(const Batching& b, size_t in_size, size_t out_size) {
+    std::vector<SegmentSlot> slots(b.depth);
+    for (auto& slot : slots) {
+        slot.in.assign(b.batch, std::vector<uint8_t>(in_size));
+        slot.out.assign(b.batch, std::vector<uint8_t>(out_size));
+        slot.lens.resize(b.batch);
+    }
+    return slots;
+}
+
+// Note the buffer layout segmentSlots() allocated for b.
+void recordBuffers(FileStats& st, const Batching& b, size_t in_size, size_t out_size) {
+    st.chunk_bytes = in_size;
+    st.batch_segments = b.batch;
+    st.pipeline_depth = b.depth;
+    st.buffer_bytes = b.depth * b.batch * (in_size + out_size);
+}
+
+// Delete the input once its output is complete, timed as the delete phase.
+void removeInput(FileStats& st, const std::string& input_path) {
+    PhaseTimer timer(st, &FileStats::delete_ns);
+    fs::remove(input_path);
+}
+
+std::pair<bool, std::string> encryptSegmented(
+    Algo algo,
     const std::string& input_path,
     const std::string& password,
     bool encrypt_name,
     int chunk_size,
-    const ProgressFn& progress)
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats,
+    const EnginePools* pools)
 {
+    const Suite s = suiteFor(algo);
+    FileStats local;
+    FileStats& st = stats ? *stats : local;
     std::string out_path;
     try {
         if (!fs::exists(input_path))
             return {false, "Critical error: " + input_path + " not found"};
-        if (input_path.ends_with(".gfglock"))
+        if (input_path.ends_with(s.ext))
             return {false, input_path + " is already encrypted"};
 
-        size_t file_size = fs::file_size(input_path);
-        if (file_size < SMALL_THRESHOLD) chunk_size = 0;
-
-        std::string out_name = buildName(input_path, encrypt_name, ".gfglock");
+        uint64_t file_size = fs::file_size(input_path);
+        std::string out_name = buildName(input_path, encrypt_name, s.ext);
         out_path = (fs::path(input_path).parent_path() / out_name).string();
 
-        auto salt  = randBytes(SALT_SIZE);
-        auto nonce = randBytes(NONCE_SIZE);
-        auto key   = pbkdf2Sha256(password, salt, KDF_ITERATIONS, KEY_SIZE);
-
-        EvpCtx ctx;
-        if (!ctx) throw std::runtime_error("EVP_CIPHER_CTX_new failed");
-        if (EVP_EncryptInit_ex(ctx.get(), EVP_aes_256_gcm(), nullptr, nullptr, nullptr) != 1
-            || EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_GCM_SET_IVLEN, NONCE_SIZE, nullptr) != 1
-            || EVP_EncryptInit_ex(ctx.get(), nullptr, nullptr, key.data(), nonce.data()) != 1)
-            throw std::runtime_error("GCM init failed");
+        std::string fn = fs::path(input_path).filename().string();
+        std::vector<uint8_t> key;
+        SegHeader h;
+        {
+            PhaseTimer timer(st, &FileStats::kdf_ns);
+            h = newHeader(s, fn, password, base, key);
+        }
+        auto header = packHeader(h);
 
         std::ifstream fin(input_path, std::ios::binary);
         std::ofstream fout(out_path, std::ios::binary);
         if (!fin || !fout) throw std::runtime_error("Cannot open file(s)");
-
-        fout.write(reinterpret_cast<const char*>(salt.data()),  SALT_SIZE);
-        fout.write(reinterpret_cast<const char*>(nonce.data()), NONCE_SIZE);
-        uint8_t cs_field[4]; packBE32(static_cast<uint32_t>(chunk_size), cs_field);
-        fout.write(reinterpret_cast<const char*>(cs_field), 4);
-
-        // Encrypt embedded filename metadata
-        std::string fn = fs::path(input_path).filename().string();
-        std::vector<uint8_t> name_meta(fn.begin(), fn.end());
-        name_meta.push_back(0);
-        std::vector<uint8_t> enc_buf(name_meta.size() + EVP_MAX_BLOCK_LENGTH);
-        int out_len = 0;
-        if (EVP_EncryptUpdate(ctx.get(), enc_buf.data(), &out_len,
-                              name_meta.data(), static_cast<int>(name_meta.size())) != 1)
-            throw std::runtime_error("EVP_EncryptUpdate (metadata) failed");
-        fout.write(reinterpret_cast<const char*>(enc_buf.data()), out_len);
-        if (progress) progress(static_cast<double>(name_meta.size()));
-
-        // Stream-encrypt file data
-        size_t io_buf_size = chunk_size > 0
-            ? std::max(static_cast<size_t>(chunk_size), BUFFER_SIZE) : BUFFER_SIZE;
-        std::vector<uint8_t> read_buf(io_buf_size);
-        std::vector<uint8_t> write_buf(io_buf_size + EVP_MAX_BLOCK_LENGTH);
+        auto name_block = sealName(s, h, header, key, fn);
+        {
+            PhaseTimer timer(st, &FileStats::write_ns);
+            fout.write(reinterpret_cast<const char*>(header.data()),
+                       static_cast<std::streamsize>(header.size()));
+            fout.write(reinterpret_cast<const char*>(name_block.data()),
+                       static_cast<std::streamsize>(name_block.size()));
+        }
+        st.bytes_out += header.size() + name_block.size();
+        if (progress) progress(static_cast<double>(fn.size()));
+
+        const uint64_t seg = h.segment_size;
+        uint64_t total = (file_size + seg - 1) / seg;
+        if (total == 0 && s.tag_size > 0) total = 1;   // AEAD: empty payload still gets a final tag
+
+        Batching b = batchSegments(threads, chunk_size, h.segment_size,
+                                   seg + s.tag_size, total, memory_budget);
+        auto slots = segmentSlots(b, seg, seg + s.tag_size + EVP_MAX_BLOCK_LENGTH);
+        recordBuffers(st, b, seg, seg + s.tag_size + EVP_MAX_BLOCK_LENGTH);
+        uint64_t next = 0;
         size_t progress_batch = 0;
 
-        while (true) {
-            size_t n = readChunk(fin, read_buf, io_buf_size);
-            if (n == 0) break;
-            if (EVP_EncryptUpdate(ctx.get(), write_buf.data(), &out_len,
-                                  read_buf.data(), static_cast<int>(n)) != 1)
-                throw std::runtime_error("EVP_EncryptUpdate (data) failed");
-            fout.write(reinterpret_cast<const char*>(write_buf.data()), out_len);
-            fireProgress(progress, progress_batch, n);
-        }
+        runPipeline(slots.size(),
+            [&](size_t n) {
+                if (next >= total) return false;
+                SegmentSlot& slot = slots[n];
+                slot.first = next;
+                slot.count = static_cast<size_t>(std::min<uint64_t>(b.batch, total - next));
+                PhaseTimer timer(st, &FileStats::read_ns);
+                for (size_t i = 0; i < slot.count; ++i) {
+                    uint64_t k = slot.first + i;
+                    uint64_t expected = (k + 1 == total) ? file_size - k * seg : seg;
+                    slot.lens[i] = readChunk(fin, slot.in[i], static_cast<size_t>(expected));
+                    if (slot.lens[i] != expected) throw std::runtime_error("file changed while reading");
+                    st.bytes_in += slot.lens[i];
+                }
+                next += slot.count;
+                return true;
+            },
+            [&](size_t n) {
+                SegmentSlot& slot = slots[n];
+                PhaseTimer timer(st, &FileStats::cipher_ns);
+                parallelFor(slot.count, threads, [&](size_t i) {
+                    uint64_t index = slot.first + i + 1;
+                    sealSegment(s, key, segmentNonce(h.nonce, index), segmentAad(index, index == total),
+                                slot.in[i].data(), slot.lens[i], slot.out[i].data());
+                }, pools ? pools->compute : nullptr);
+                return true;
+            },
+            [&](size_t n) {
+                SegmentSlot& slot = slots[n];
+                PhaseTimer timer(st, &FileStats::write_ns);
+                for (size_t i = 0; i < slot.count; ++i) {
+                    fout.write(reinterpret_cast<const char*>(slot.out[i].data()),
+                               static_cast<std::streamsize>(slot.lens[i] + s.tag_size));
+                    st.bytes_out += slot.lens[i] + s.tag_size;
+                    fireProgress(progress, progress_batch, slot.lens[i]);
+                }
+            },
+            pools ? pools->io : nullptr);
         if (progress && progress_batch > 0) progress(static_cast<double>(progress_batch));
 
-        if (EVP_EncryptFinal_ex(ctx.get(), write_buf.data(), &out_len) != 1)
-            throw std::runtime_error("EVP_EncryptFinal_ex failed");
-        fout.write(reinterpret_cast<const char*>(write_buf.data()), out_len);
-
-        uint8_t tag[TAG_SIZE];
-        if (EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_GCM_GET_TAG, TAG_SIZE, tag) != 1)
-            throw std::runtime_error("GCM get tag failed");
-        fout.write(reinterpret_cast<const char*>(tag), TAG_SIZE);
-
         fin.close(); fout.close();
-        fs::remove(input_path);
+        if (!fout) throw std::runtime_error("write failed");
+        removeInput(st, input_path);
         return {true, "Encrypted: " + input_path + " -> " + out_path};
     } catch (const std::exception& e) {
         try { if (!out_path.empty() && fs::exists(out_path)) fs::remove(out_path); } catch (...) {}
@@ -211,11 +607,162 @@ std::pair<bool, std::string> encryptGcm(
     }
 }
 
+std::pair<bool, std::string> decryptSegmented(
+    Algo algo,
+    const std::string& input_path,
+    const std::string& password,
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats& st,
+    const EnginePools* pools)
+{
+    const Suite s = suiteFor(algo);
+    std::string out_path;
+    const std::string auth_failed =
+        "Critical error while decrypting " + input_path + ": authentication failed";
+    try {
+        uint64_t total_size = fs::file_size(input_path);
+        std::ifstream fin(input_path, std::ios::binary);
+        if (!fin) throw std::runtime_error("Cannot open file");
+        SegHeader h;
+        if (!readHeader(fin, s, h)) throw std::runtime_error("not a segmented file");
+
+        auto header = packHeader(h);
+        uint64_t data_offset = header.size() + h.name_len + static_cast<uint64_t>(s.tag_size);
+        if (total_size < data_offset) throw std::runtime_error("file is too small or corrupted");
+        // Reject a wrong password before touching the payload or creating any output.
+        std::vector<uint8_t> key;
+        bool key_ok;
+        {
+            PhaseTimer timer(st, &FileStats::kdf_ns);
+            key_ok = headerKey(h, password, base, key);
+        }
+        if (!key_ok) return {false, auth_failed};
+
+        std::vector<uint8_t> name_block(h.name_len + static_cast<size_t>(s.tag_size));
+        {
+            PhaseTimer timer(st, &FileStats::read_ns);
+            fin.read(reinterpret_cast<char*>(name_block.data()),
+                     static_cast<std::streamsize>(name_block.size()));
+        }
+        st.bytes_in += data_offset;
+        std::string original_name;
+        if (!openName(s, h, header, key, name_block.data(), original_name))
+            return {false, auth_failed};
+        fs::path restored = fs::path(original_name).filename();
+        if (restored.empty()) restored = fs::path(input_path).stem();   // nameless stream
+        out_path = (fs::path(input_path).parent_path() / restored).string();
+
+        const uint64_t stored = h.segment_size + static_cast<uint64_t>(s.tag_size);
+        const uint64_t data_len = total_size - data_offset;
+        uint64_t total = (data_len + stored - 1) / stored;
+        if (s.tag_size > 0) {
+            total = std::max<uint64_t>(total, 1);
+            if (data_len - (total - 1) * stored < static_cast<uint64_t>(s.tag_size))
+                throw std::runtime_error("file is too small or corrupted");
+        }
+
+        std::ofstream fout(out_path, std::ios::binary);
+        if (!fout) throw std::runtime_error("Cannot create output file");
+
+        Batching b = batchSegments(threads, 0, h.segment_size, stored, total, memory_budget);
+        auto slots = segmentSlots(b, stored, stored + EVP_MAX_BLOCK_LENGTH);
+        recordBuffers(st, b, stored, stored + EVP_MAX_BLOCK_LENGTH);
+        uint64_t next = 0;
+        size_t progress_batch = 0;
+
+        // A slot that fails authentication stops the pipeline before it is written.
+        bool auth_ok = runPipeline(slots.size(),
+            [&](size_t n) {
+                if (next >= total) return false;
+                SegmentSlot& slot = slots[n];
+                slot.first = next;
+                slot.count = static_cast<size_t>(std::min<uint64_t>(b.batch, total - next));
+                PhaseTimer timer(st, &FileStats::read_ns);
+                for (size_t i = 0; i < slot.count; ++i) {
+                    uint64_t k = slot.first + i;
+                    uint64_t expected = (k + 1 == total) ? data_len - k * stored : stored;
+                    slot.lens[i] = readChunk(fin, slot.in[i], static_cast<size_t>(expected));
+                    if (slot.lens[i] != expected) throw std::runtime_error("file is too small or corrupted");
+                    st.bytes_in += slot.lens[i];
+                }
+                next += slot.count;
+                return true;
+            },
+            [&](size_t n) {
+                SegmentSlot& slot = slots[n];
+                PhaseTimer timer(st, &FileStats::cipher_ns);
+                std::atomic<bool> ok{true};
+                parallelFor(slot.count, threads, [&](size_t i) {
+                    uint64_t index = slot.first + i + 1;
+                    if (!openSegment(s, key, segmentNonce(h.nonce, index), segmentAad(index, index == total),
+                                     slot.in[i].data(), slot.lens[i], slot.out[i].data()))
+                        ok.store(false);
+                }, pools ? pools->compute : nullptr);
+                return ok.load();
+            },
+            [&](size_t n) {
+                SegmentSlot& slot = slots[n];
+                PhaseTimer timer(st, &FileStats::write_ns);
+                for (size_t i = 0; i < slot.count; ++i) {
+                    fout.write(reinterpret_cast<const char*>(slot.out[i].data()),
+                               static_cast<std::streamsize>(slot.lens[i] - s.tag_size));
+                    st.bytes_out += slot.lens[i] - s.tag_size;
+                    fireProgress(progress, progress_batch, slot.lens[i]);
+                }
+            },
+            pools ? pools->io : nullptr);
+        if (!auth_ok) {
+            fout.close();
+            try { fs::remove(out_path); } catch (...) {}
+            return {false, auth_failed};
+        }
+        if (progress && progress_batch > 0) progress(static_cast<double>(progress_batch));
+
+        fout.close(); fin.close();
+        if (!fout) throw std::runtime_error("write failed");
+        removeInput(st, input_path);
+        return {true, "Decrypted: " + input_path + " -> " + out_path};
+    } catch (const std::exception& e) {
+        try { if (!out_path.empty() && fs::exists(out_path)) fs::remove(out_path); } catch (...) {}
+        return {false, "Critical error while decrypting " + input_path + ": " + e.what()};
+    }
+}
+
+} // anonymous namespace
+
+// ── AES-256-GCM ──────────────────────────────────────────────────────────────
+
+std::pair<bool, std::string> encryptGcm(
+    const std::string& input_path,
+    const std::string& password,
+    bool encrypt_name,
+    int chunk_size,
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats,
+    const EnginePools* pools)
+{
+    return encryptSegmented(Algo::Gcm, input_path, password, encrypt_name,
+                            chunk_size, threads, memory_budget, base, progress, stats, pools);
+}
+
 std::pair<bool, std::string> decryptGcm(
     const std::string& input_path,
     const std::string& password,
-    const ProgressFn& progress)
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats,
+    const EnginePools* pools)
 {
+    FileStats local;
+    FileStats& st = stats ? *stats : local;
     std::string out_path;
     try {
         if (!fs::exists(input_path))
@@ -223,19 +770,27 @@ std::pair<bool, std::string> decryptGcm(
         if (!input_path.ends_with(".gfglock") && !input_path.ends_with(".gfglck"))
             return {false, input_path + " is already decrypted"};
 
-        size_t total_size = fs::file_size(input_path);
         bool is_gcm = input_path.ends_with(".gfglock");
+        Algo algo = is_gcm ? Algo::Gcm : Algo::Cfb;
+        if (isSegmented(input_path, suiteFor(algo)))
+            return decryptSegmented(algo, input_path, password, threads, memory_budget, base, progress, st, pools);
+
+        size_t total_size = fs::file_size(input_path);
 
         std::ifstream fin(input_path, std::ios::binary);
         if (!fin) throw std::runtime_error("Cannot open file");
 
-        uint8_t salt_buf[SALT_SIZE], nonce_buf[NONCE_SIZE], cs_buf[4];
+        uint8_t salt_buf[SALT_SIZE], nonce_buf[IV_SIZE], cs_buf[4];
         fin.read(reinterpret_cast<char*>(salt_buf), SALT_SIZE);
         fin.read(reinterpret_cast<char*>(nonce_buf), is_gcm ? NONCE_SIZE : IV_SIZE);
         fin.read(reinterpret_cast<char*>(cs_buf), 4);
 
         std::vector<uint8_t> salt(salt_buf, salt_buf + SALT_SIZE);
-        auto key = pbkdf2Sha256(password, salt, KDF_ITERATIONS, KEY_SIZE);
+        std::vector<uint8_t> key;
+        {
+            PhaseTimer timer(st, &FileStats::kdf_ns);
+            key = baseKeyFor(password, salt, DEFAULT_KDF_ITERATIONS, base);
+        }
 
         int hdr_size = SALT_SIZE + (is_gcm ? NONCE_SIZE : IV_SIZE) + 4;
         size_t data_len = total_size - static_cast<size_t>(hdr_size) - (is_gcm ? TAG_SIZE : 0);
@@ -253,29 +808,14 @@ std::pair<bool, std::string> decryptGcm(
                 throw std::runtime_error("CFB decrypt init failed");
         }
 
-        std::vector<uint8_t> read_buf(BUFFER_SIZE);
-        std::vector<uint8_t> dec_buf(BUFFER_SIZE + EVP_MAX_BLOCK_LENGTH);
         bool got_meta = false;
         std::string meta_buf, original_name;
         std::ofstream fout;
-        size_t remaining = data_len, progress_batch = 0;
-        int out_len = 0;
+        decryptLegacyStream(fin, ctx.get(), data_len, got_meta, meta_buf, original_name,
+                            fs::path(input_path).parent_path().string(), fout, out_path, progress, st, pools);
 
-        while (remaining > 0) {
-            size_t to_read = std::min(remaining, BUFFER_SIZE);
-            size_t n = readChunk(fin, read_buf, to_read);
-            if (n == 0) break;
-            remaining -= n;
-            if (EVP_DecryptUpdate(ctx.get(), dec_buf.data(), &out_len,
-                                  read_buf.data(), static_cast<int>(n)) != 1)
-                throw std::runtime_error("EVP_DecryptUpdate failed");
-            if (out_len > 0 && !feedDecrypted(dec_buf.data(), static_cast<size_t>(out_len),
-                    got_meta, meta_buf, original_name,
-                    fs::path(input_path).parent_path().string(), fout, out_path))
-                throw std::runtime_error("Cannot create output file");
-            fireProgress(progress, progress_batch, n);
-        }
-        if (progress && progress_batch > 0) progress(static_cast<double>(progress_batch));
+        std::vector<uint8_t> dec_buf(EVP_MAX_BLOCK_LENGTH);
+        int out_len = 0;
 
         if (is_gcm) {
             uint8_t tag[TAG_SIZE];
@@ -296,9 +836,11 @@ std::pair<bool, std::string> decryptGcm(
 
         if (!got_meta)
             throw std::runtime_error("metadata not found in decrypted stream");
-        if (fout.is_open()) fout.close();
+        st.bytes_in = total_size;
+        st.bytes_out = static_cast<uint64_t>(fout.tellp());
+        fout.close();
         fin.close();
-        fs::remove(input_path);
+        removeInput(st, input_path);
         return {true, "Decrypted: " + input_path + " -> " + out_path};
     } catch (const std::exception& e) {
         try { if (!out_path.empty() && fs::exists(out_path)) fs::remove(out_path); } catch (...) {}
@@ -313,88 +855,29 @@ std::pair<bool, std::string> encryptCfb(
     const std::string& password,
     bool encrypt_name,
     int chunk_size,
-    const ProgressFn& progress)
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats,
+    const EnginePools* pools)
 {
-    std::string out_path;
-    try {
-        if (!fs::exists(input_path))
-            return {false, "Critical error: " + input_path + " not found"};
-        if (input_path.ends_with(".gfglck"))
-            return {false, input_path + " is already encrypted"};
-
-        size_t file_size = fs::file_size(input_path);
-        if (file_size < SMALL_THRESHOLD) chunk_size = 0;
-
-        std::string out_name = buildName(input_path, encrypt_name, ".gfglck");
-        out_path = (fs::path(input_path).parent_path() / out_name).string();
-
-        auto salt = randBytes(SALT_SIZE);
-        auto iv   = randBytes(IV_SIZE);
-        auto key  = pbkdf2Sha256(password, salt, KDF_ITERATIONS, KEY_SIZE);
-
-        EvpCtx ctx;
-        if (!ctx) throw std::runtime_error("EVP_CIPHER_CTX_new failed");
-        if (EVP_EncryptInit_ex(ctx.get(), EVP_aes_256_cfb128(), nullptr,
-                               key.data(), iv.data()) != 1)
-            throw std::runtime_error("CFB init failed");
-
-        std::ifstream fin(input_path, std::ios::binary);
-        std::ofstream fout(out_path, std::ios::binary);
-        if (!fin || !fout) throw std::runtime_error("Cannot open file(s)");
-
-        fout.write(reinterpret_cast<const char*>(salt.data()), SALT_SIZE);
-        fout.write(reinterpret_cast<const char*>(iv.data()),   IV_SIZE);
-        uint8_t cs_field[4]; packBE32(static_cast<uint32_t>(chunk_size), cs_field);
-        fout.write(reinterpret_cast<const char*>(cs_field), 4);
-
-        std::string fn = fs::path(input_path).filename().string();
-        std::vector<uint8_t> name_meta(fn.begin(), fn.end());
-        name_meta.push_back(0);
-        std::vector<uint8_t> enc_buf(name_meta.size() + EVP_MAX_BLOCK_LENGTH);
-        int out_len = 0;
-        if (EVP_EncryptUpdate(ctx.get(), enc_buf.data(), &out_len,
-                              name_meta.data(), static_cast<int>(name_meta.size())) != 1)
-            throw std::runtime_error("EVP_EncryptUpdate (metadata) failed");
-        fout.write(reinterpret_cast<const char*>(enc_buf.data()), out_len);
-        if (progress) progress(static_cast<double>(name_meta.size()));
-
-        size_t io_buf_size = chunk_size > 0
-            ? std::max(static_cast<size_t>(chunk_size), BUFFER_SIZE) : BUFFER_SIZE;
-        std::vector<uint8_t> read_buf(io_buf_size);
-        std::vector<uint8_t> write_buf(io_buf_size + EVP_MAX_BLOCK_LENGTH);
-        size_t progress_batch = 0;
-
-        while (true) {
-            size_t n = readChunk(fin, read_buf, io_buf_size);
-            if (n == 0) break;
-            if (EVP_EncryptUpdate(ctx.get(), write_buf.data(), &out_len,
-                                  read_buf.data(), static_cast<int>(n)) != 1)
-                throw std::runtime_error("EVP_EncryptUpdate failed");
-            fout.write(reinterpret_cast<const char*>(write_buf.data()), out_len);
-            fireProgress(progress, progress_batch, n);
-        }
-        if (progress && progress_batch > 0) progress(static_cast<double>(progress_batch));
-
-        if (EVP_EncryptFinal_ex(ctx.get(), write_buf.data(), &out_len) != 1)
-            throw std::runtime_error("EVP_EncryptFinal_ex failed");
-        fout.write(reinterpret_cast<const char*>(write_buf.data()), out_len);
-
-        fin.close(); fout.close();
-        fs::remove(input_path);
-        return {true, "Encrypted: " + input_path + " -> " + out_path};
-    } catch (const std::exception& e) {
-        try { if (!out_path.empty() && fs::exists(out_path)) fs::remove(out_path); } catch (...) {}
-        return {false, "Critical error while encrypting " + input_path + ": " + e.what()};
-    }
+    return encryptSegmented(Algo::Cfb, input_path, password, encrypt_name,
+                            chunk_size, threads, memory_budget, base, progress, stats, pools);
 }
 
 std::pair<bool, std::string> decryptCfb(
     const std::string& input_path,
     const std::string& password,
-    const ProgressFn& progress)
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats,
+    const EnginePools* pools)
 {
     // CFB shares the GCM decrypt path (is_gcm = false selects CFB cipher + no tag)
-    return decryptGcm(input_path, password, progress);
+    return decryptGcm(input_path, password, threads, memory_budget, base, progress, stats, pools);
 }
 
 // ── ChaCha20-Poly1305 ─────────────────────────────────────────────────────────
@@ -404,98 +887,37 @@ std::pair<bool, std::string> encryptChacha(
     const std::string& password,
     bool encrypt_name,
     int chunk_size,
-    const ProgressFn& progress)
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats,
+    const EnginePools* pools)
 {
-    std::string out_path;
-    try {
-        if (!fs::exists(input_path))
-            return {false, "Critical error: " + input_path + " not found"};
-        if (input_path.ends_with(".gfgcha"))
-            return {false, input_path + " is already encrypted"};
-
-        size_t file_size = fs::file_size(input_path);
-        if (file_size < SMALL_THRESHOLD) chunk_size = 0;
-
-        std::string out_name = buildName(input_path, encrypt_name, ".gfgcha");
-        out_path = (fs::path(input_path).parent_path() / out_name).string();
-
-        auto salt  = randBytes(SALT_SIZE);
-        auto nonce = randBytes(NONCE_SIZE);
-        auto key   = pbkdf2Sha256(password, salt, KDF_ITERATIONS, KEY_SIZE);
-
-        EvpCtx ctx;
-        if (!ctx) throw std::runtime_error("EVP_CIPHER_CTX_new failed");
-        if (EVP_EncryptInit_ex(ctx.get(), EVP_chacha20_poly1305(), nullptr, nullptr, nullptr) != 1
-            || EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_AEAD_SET_IVLEN, NONCE_SIZE, nullptr) != 1
-            || EVP_EncryptInit_ex(ctx.get(), nullptr, nullptr, key.data(), nonce.data()) != 1)
-            throw std::runtime_error("ChaCha20-Poly1305 init failed");
-
-        std::ifstream fin(input_path, std::ios::binary);
-        std::ofstream fout(out_path, std::ios::binary);
-        if (!fin || !fout) throw std::runtime_error("Cannot open file(s)");
-
-        fout.write(reinterpret_cast<const char*>(salt.data()),  SALT_SIZE);
-        fout.write(reinterpret_cast<const char*>(nonce.data()), NONCE_SIZE);
-        uint8_t cs_field[4]; packBE32(static_cast<uint32_t>(chunk_size), cs_field);
-        fout.write(reinterpret_cast<const char*>(cs_field), 4);
-
-        std::string fn = fs::path(input_path).filename().string();
-        std::vector<uint8_t> name_meta(fn.begin(), fn.end());
-        name_meta.push_back(0);
-        std::vector<uint8_t> enc_buf(name_meta.size() + EVP_MAX_BLOCK_LENGTH);
-        int out_len = 0;
-        if (EVP_EncryptUpdate(ctx.get(), enc_buf.data(), &out_len,
-                              name_meta.data(), static_cast<int>(name_meta.size())) != 1)
-            throw std::runtime_error("EVP_EncryptUpdate (metadata) failed");
-        fout.write(reinterpret_cast<const char*>(enc_buf.data()), out_len);
-        if (progress) progress(static_cast<double>(name_meta.size()));
-
-        size_t io_buf_size = chunk_size > 0
-            ? std::max(static_cast<size_t>(chunk_size), BUFFER_SIZE) : BUFFER_SIZE;
-        std::vector<uint8_t> read_buf(io_buf_size);
-        std::vector<uint8_t> write_buf(io_buf_size + EVP_MAX_BLOCK_LENGTH);
-        size_t progress_batch = 0;
-
-        while (true) {
-            size_t n = readChunk(fin, read_buf, io_buf_size);
-            if (n == 0) break;
-            if (EVP_EncryptUpdate(ctx.get(), write_buf.data(), &out_len,
-                                  read_buf.data(), static_cast<int>(n)) != 1)
-                throw std::runtime_error("EVP_EncryptUpdate failed");
-            fout.write(reinterpret_cast<const char*>(write_buf.data()), out_len);
-            fireProgress(progress, progress_batch, n);
-        }
-        if (progress && progress_batch > 0) progress(static_cast<double>(progress_batch));
-
-        if (EVP_EncryptFinal_ex(ctx.get(), write_buf.data(), &out_len) != 1)
-            throw std::runtime_error("EVP_EncryptFinal_ex failed");
-        fout.write(reinterpret_cast<const char*>(write_buf.data()), out_len);
-
-        uint8_t tag[TAG_SIZE];
-        if (EVP_CIPHER_CTX_ctrl(ctx.get(), EVP_CTRL_AEAD_GET_TAG, TAG_SIZE, tag) != 1)
-            throw std::runtime_error("ChaCha20 get tag failed");
-        fout.write(reinterpret_cast<const char*>(tag), TAG_SIZE);
-
-        fin.close(); fout.close();
-        fs::remove(input_path);
-        return {true, "Encrypted: " + input_path + " -> " + out_path};
-    } catch (const std::exception& e) {
-        try { if (!out_path.empty() && fs::exists(out_path)) fs::remove(out_path); } catch (...) {}
-        return {false, "Critical error while encrypting " + input_path + ": " + e.what()};
-    }
+    return encryptSegmented(Algo::Chacha, input_path, password, encrypt_name,
+                            chunk_size, threads, memory_budget, base, progress, stats, pools);
 }
 
 std::pair<bool, std::string> decryptChacha(
     const std::string& input_path,
     const std::string& password,
-    const ProgressFn& progress)
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats,
+    const EnginePools* pools)
 {
+    FileStats local;
+    FileStats& st = stats ? *stats : local;
     std::string out_path;
     try {
         if (!fs::exists(input_path))
             return {false, "Critical error: " + input_path + " not found"};
         if (!input_path.ends_with(".gfgcha"))
             return {false, input_path + " is already decrypted"};
+        if (isSegmented(input_path, suiteFor(Algo::Chacha)))
+            return decryptSegmented(Algo::Chacha, input_path, password, threads, memory_budget, base, progress, st, pools);
 
         size_t total_size = fs::file_size(input_path);
         std::ifstream fin(input_path, std::ios::binary);
@@ -507,7 +929,11 @@ std::pair<bool, std::string> decryptChacha(
         fin.read(reinterpret_cast<char*>(cs_buf), 4);
 
         std::vector<uint8_t> salt(salt_buf, salt_buf + SALT_SIZE);
-        auto key = pbkdf2Sha256(password, salt, KDF_ITERATIONS, KEY_SIZE);
+        std::vector<uint8_t> key;
+        {
+            PhaseTimer timer(st, &FileStats::kdf_ns);
+            key = baseKeyFor(password, salt, DEFAULT_KDF_ITERATIONS, base);
+        }
 
         EvpCtx ctx;
         if (!ctx) throw std::runtime_error("EVP_CIPHER_CTX_new failed");
@@ -517,29 +943,14 @@ std::pair<bool, std::string> decryptChacha(
             throw std::runtime_error("ChaCha20-Poly1305 decrypt init failed");
 
         size_t data_len = total_size - SALT_SIZE - NONCE_SIZE - 4 - TAG_SIZE;
-        std::vector<uint8_t> read_buf(BUFFER_SIZE);
-        std::vector<uint8_t> dec_buf(BUFFER_SIZE + EVP_MAX_BLOCK_LENGTH);
         bool got_meta = false;
         std::string meta_buf, original_name;
         std::ofstream fout;
-        size_t remaining = data_len, progress_batch = 0;
-        int out_len = 0;
+        decryptLegacyStream(fin, ctx.get(), data_len, got_meta, meta_buf, original_name,
+                            fs::path(input_path).parent_path().string(), fout, out_path, progress, st, pools);
 
-        while (remaining > 0) {
-            size_t to_read = std::min(remaining, BUFFER_SIZE);
-            size_t n = readChunk(fin, read_buf, to_read);
-            if (n == 0) break;
-            remaining -= n;
-            if (EVP_DecryptUpdate(ctx.get(), dec_buf.data(), &out_len,
-                                  read_buf.data(), static_cast<int>(n)) != 1)
-                throw std::runtime_error("EVP_DecryptUpdate failed");
-            if (out_len > 0 && !feedDecrypted(dec_buf.data(), static_cast<size_t>(out_len),
-                    got_meta, meta_buf, original_name,
-                    fs::path(input_path).parent_path().string(), fout, out_path))
-                throw std::runtime_error("Cannot create output file");
-            fireProgress(progress, progress_batch, n);
-        }
-        if (progress && progress_batch > 0) progress(static_cast<double>(progress_batch));
+        std::vector<uint8_t> dec_buf(EVP_MAX_BLOCK_LENGTH);
+        int out_len = 0;
 
         uint8_t tag[TAG_SIZE];
         fin.read(reinterpret_cast<char*>(tag), TAG_SIZE);
@@ -554,9 +965,11 @@ std::pair<bool, std::string> decryptChacha(
             fout.write(reinterpret_cast<const char*>(dec_buf.data()), out_len);
 
         if (!got_meta) throw std::runtime_error("metadata not found");
-        if (fout.is_open()) fout.close();
+        st.bytes_in = total_size;
+        st.bytes_out = static_cast<uint64_t>(fout.tellp());
+        fout.close();
         fin.close();
-        fs::remove(input_path);
+        removeInput(st, input_path);
         return {true, "Decrypted: " + input_path + " -> " + out_path};
     } catch (const std::exception& e) {
         try { if (!out_path.empty() && fs::exists(out_path)) fs::remove(out_path); } catch (...) {}
@@ -564,4 +977,143 @@ std::pair<bool, std::string> decryptChacha(
     }
 }
 
+// ── Segment batches (streaming encrypt) ──────────────────────────────────────
+
+bool readKdfParams(const std::string& path, std::vector<uint8_t>& salt, int& iterations) {
+    Algo algo;
+    if (path.ends_with(".gfglock"))     algo = Algo::Gcm;
+    else if (path.ends_with(".gfglck")) algo = Algo::Cfb;
+    else if (path.ends_with(".gfgcha")) algo = Algo::Chacha;
+    else return false;
+    std::ifstream fin(path, std::ios::binary);
+    if (!fin) return false;
+    SegHeader h;
+    try {
+        if (readHeader(fin, suiteFor(algo), h)) {
+            salt = h.salt;
+            iterations = static_cast<int>(h.kdf_iterations);
+            return true;
+        }
+    } catch (...) {
+        return false;
+    }
+    salt.assign(SALT_SIZE, 0);
+    fin.read(reinterpret_cast<char*>(salt.data()), SALT_SIZE);
+    iterations = DEFAULT_KDF_ITERATIONS;
+    return fin.gcount() == SALT_SIZE;
+}
+
+std::vector<std::string> sealSegments(
+    Algo algo,
+    const std::vector<uint8_t>& key,
+    const std::vector<uint8_t>& nonce,
+    uint64_t first_index,
+    const std::vector<std::string_view>& segments,
+    bool final,
+    int threads)
+{
+    const Suite s = suiteFor(algo);
+    if (key.size() != static_cast<size_t>(KEY_SIZE))
+        throw std::invalid_argument("key must be 32 bytes");
+    if (nonce.size() != static_cast<size_t>(s.nonce_size))
+        throw std::invalid_argument("nonce has the wrong size for this algorithm");
+
+    std::vector<std::string> out(segments.size());
+    parallelFor(segments.size(), threads, [&](size_t i) {
+        const auto& seg = segments[i];
+        uint64_t index = first_index + i;
+        bool is_final = final && i + 1 == segments.size();
+        std::vector<uint8_t> buf(seg.size() + s.tag_size + EVP_MAX_BLOCK_LENGTH);
+        sealSegment(s, key, segmentNonce(nonce, index), segmentAad(index, is_final),
+                    reinterpret_cast<const uint8_t*>(seg.data()), seg.size(), buf.data());
+        out[i].assign(reinterpret_cast<const char*>(buf.data()), seg.size() + s.tag_size);
+    });
+    return out;
+}
+
+// ── In-memory containers ─────────────────────────────────────────────────────
+
+std::string encryptBuffer(
+    Algo algo,
+    std::string_view data,
+    const std::string& password,
+    const std::string& name,
+    int threads,
+    const BaseKey& base)
+{
+    const Suite s = suiteFor(algo);
+    std::vector<uint8_t> key;
+    SegHeader h = newHeader(s, name, password, base, key);
+    auto header = packHeader(h);
+    auto name_block = sealName(s, h, header, key, name);
+
+    const uint64_t seg = h.segment_size;
+    const uint64_t stored = seg + static_cast<uint64_t>(s.tag_size);
+    uint64_t total = (data.size() + seg - 1) / seg;
+    if (total == 0 && s.tag_size > 0) total = 1;   // AEAD: empty payload still gets a final tag
+
+    std::string out(header.size() + name_block.size() + data.size() + total * s.tag_size, '\0');
+    std::memcpy(out.data(), header.data(), header.size());
+    std::memcpy(out.data() + header.size(), name_block.data(), name_block.size());
+    auto* body = reinterpret_cast<uint8_t*>(out.data() + header.size() + name_block.size());
+    auto* plain = reinterpret_cast<const uint8_t*>(data.data());
+    // Every suite is a stream mode, so each segment seals to exactly its size
+    // plus the tag and segments can be written side by side from any thread.
+    parallelFor(static_cast<size_t>(total), threads, [&](size_t k) {
+        uint64_t index = k + 1;
+        size_t n = static_cast<size_t>(std::min<uint64_t>(seg, data.size() - k * seg));
+        sealSegment(s, key, segmentNonce(h.nonce, index), segmentAad(index, index == total),
+                    plain + k * seg, n, body + k * stored);
+    });
+    return out;
+}
+
+std::string decryptBuffer(
+    Algo algo,
+    std::string_view data,
+    const std::string& password,
+    int threads,
+    const BaseKey& base)
+{
+    const Suite s = suiteFor(algo);
+    ViewBuf view(data);
+    std::istream in(&view);
+    SegHeader h;
+    if (!readHeader(in, s, h))
+        throw std::runtime_error("legacy single-stream layout is not supported in memory");
+
+    auto header = packHeader(h);
+    uint64_t data_offset = header.size() + h.name_len + static_cast<uint64_t>(s.tag_size);
+    if (data.size() < data_offset) throw std::runtime_error("file is too small or corrupted");
+    std::vector<uint8_t> key;
+    std::string name;
+    if (!headerKey(h, password, base, key)
+        || !openName(s, h, header, key, reinterpret_cast<const uint8_t*>(data.data()) + header.size(), name))
+        throw std::runtime_error("authentication failed");
+
+    const uint64_t seg = h.segment_size;
+    const uint64_t stored = seg + static_cast<uint64_t>(s.tag_size);
+    const uint64_t data_len = data.size() - data_offset;
+    uint64_t total = (data_len + stored - 1) / stored;
+    if (s.tag_size > 0) {
+        total = std::max<uint64_t>(total, 1);
+        if (data_len - (total - 1) * stored < static_cast<uint64_t>(s.tag_size))
+            throw std::runtime_error("file is too small or corrupted");
+    }
+
+    std::string out(data_len - total * s.tag_size, '\0');
+    auto* body = reinterpret_cast<const uint8_t*>(data.data() + data_offset);
+    auto* plain = reinterpret_cast<uint8_t*>(out.data());
+    std::atomic<bool> auth_ok{true};
+    parallelFor(static_cast<size_t>(total), threads, [&](size_t k) {
+        uint64_t index = k + 1;
+        size_t n = static_cast<size_t>(std::min<uint64_t>(stored, data_len - k * stored));
+        if (!openSegment(s, key, segmentNonce(h.nonce, index), segmentAad(index, index == total),
+                         body + k * stored, n, plain + k * seg))
+            auth_ok.store(false);
+    });
+    if (!auth_ok.load()) throw std::runtime_error("authentication failed");
+    return out;
+}
+
 } // namespace gfglock
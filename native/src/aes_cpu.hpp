@@ -1,26 +1,136 @@
 #pragma once
+#include <atomic>
+#include <chrono>
+#include <cstddef>
+#include <cstdint>
 #include <functional>
 #include <string>
+#include <string_view>
 #include <utility>
+#include <vector>
 
 namespace gfglock {
 
 using ProgressFn = std::function<void(double)>;
 
+struct EnginePools;   // thread_pool.hpp
+
+/// Progress block shared by every engine of one operation and sampled from
+/// Python through a memoryview (three native-endian uint64 slots): bytes
+/// processed, files finished, and a cancel flag the reader sets to stop batch
+/// calls from starting further files. Engines only ever add, never lock.
+struct ProgressCounters {
+    enum Slot : size_t { Bytes, Files, Cancel, Count };
+    std::atomic<uint64_t> slots[Count] = {};
+
+    void add(Slot slot, uint64_t n) { slots[slot].fetch_add(n, std::memory_order_relaxed); }
+    uint64_t get(Slot slot) const { return slots[slot].load(std::memory_order_relaxed); }
+};
+static_assert(std::atomic<uint64_t>::is_always_lock_free && sizeof(std::atomic<uint64_t>) == sizeof(uint64_t),
+              "ProgressCounters slots must be plain 64-bit words for the Python memoryview");
+
+/// ProgressFn target that adds straight to a ProgressCounters block. The engines
+/// recognise it and report every write to it instead of batching, since it
+/// costs one relaxed atomic add rather than a GIL round trip.
+struct CounterSink {
+    ProgressCounters* counters;
+    void operator()(double bytes) const { counters->add(ProgressCounters::Bytes, static_cast<uint64_t>(bytes)); }
+};
+
+/// Where one file's time went, filled in by an engine that is handed one.
+/// Phases mirror gfglock.core.segmented.FileStats: kdf is PBKDF2/HKDF, read and
+/// write are the reader and writer stages, cipher is the wall time of each
+/// batch of EVP_*Update calls across the segment threads, delete is the
+/// fs::remove of the input. Every field is only ever written by one thread.
+struct FileStats {
+    uint64_t kdf_ns = 0;
+    uint64_t read_ns = 0;
+    uint64_t cipher_ns = 0;
+    uint64_t write_ns = 0;
+    uint64_t delete_ns = 0;
+    uint64_t elapsed_ns = 0;       // whole file, set by the batch API
+    uint64_t bytes_in = 0;         // read from the input file
+    uint64_t bytes_out = 0;        // written to the output file
+    uint64_t buffer_bytes = 0;     // input + output buffers held by the pipeline
+    uint64_t chunk_bytes = 0;      // bytes per read: a segment, or the legacy stream buffer
+    uint64_t batch_segments = 0;   // segments per pipeline slot (0 for legacy streams)
+    uint64_t pipeline_depth = 0;   // pipeline slots in flight
+};
+
+/// Adds the time until it goes out of scope to one FileStats field.
+class PhaseTimer {
+public:
+    PhaseTimer(FileStats& stats, uint64_t FileStats::* field)
+        : stats_(stats), field_(field), start_(std::chrono::steady_clock::now()) {}
+    ~PhaseTimer() {
+        stats_.*field_ += static_cast<uint64_t>(std::chrono::duration_cast<std::chrono::nanoseconds>(
+            std::chrono::steady_clock::now() - start_).count());
+    }
+    PhaseTimer(const PhaseTimer&) = delete;
+    PhaseTimer& operator=(const PhaseTimer&) = delete;
+
+private:
+    FileStats& stats_;
+    uint64_t FileStats::* const field_;
+    const std::chrono::steady_clock::time_point start_;
+};
+
+enum class Algo { Gcm, Cfb, Chacha };
+
+/// PBKDF2 count for files that do not record one (legacy and pre-0x0004 headers).
+constexpr int DEFAULT_KDF_ITERATIONS = 200000;
+/// Smallest count accepted when writing a new file (headers may record less).
+constexpr int MIN_KDF_ITERATIONS = 100000;
+/// Largest count accepted when writing or read back from a header.
+constexpr int MAX_KDF_ITERATIONS = 10000000;
+/// Bytes of segment buffers one encrypt/decrypt call may hold when none is given.
+constexpr size_t DEFAULT_MEMORY_BUDGET = 256u * 1024 * 1024;
+
+/// KDF parameters plus a PBKDF2 result the caller already derived for `salt`
+/// with `iterations` (empty key = derive here). On encrypt, `iterations` is the
+/// count recorded in the new file, and a key switches it to session keys: the
+/// header carries `salt` and the file key is HKDF(key, per-file salt). On
+/// decrypt the key replaces the PBKDF2 run whenever salt and count both match.
+struct BaseKey {
+    std::vector<uint8_t> salt;
+    std::vector<uint8_t> key;
+    int iterations = DEFAULT_KDF_ITERATIONS;
+};
+
+// Encryption always writes the segmented container (see aes_cpu.cpp); decryption
+// accepts both the segmented and the legacy single-stream layout. `threads` is the
+// number of threads sealing/opening segments of this one file (0 = all cores);
+// `memory_budget` caps the bytes of I/O buffers a call holds (0 = the default).
+// Fewer segments per batch keep a call under it; a single segment larger than
+// the budget is an error. Legacy files always stream in fixed-size buffers.
+// `stats`, when given, receives the call's phase timings and buffer sizes.
+// `pools`, when given, supplies long-lived threads for the segment workers and
+// the reader/writer stages (see EnginePools); otherwise the call starts its own.
+
 /// Encrypt a file using AES-256-GCM. C++ owns the full I/O loop; GIL released.
 std::pair<bool, std::string> encryptGcm(
     const std::string& input_path,
     const std::string& password,
     bool encrypt_name,
     int chunk_size,
-    const ProgressFn& progress
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats = nullptr,
+    const EnginePools* pools = nullptr
 );
 
 /// Decrypt a .gfglock file using AES-256-GCM.
 std::pair<bool, std::string> decryptGcm(
     const std::string& input_path,
     const std::string& password,
-    const ProgressFn& progress
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats = nullptr,
+    const EnginePools* pools = nullptr
 );
 
 /// Encrypt a file using AES-256-CFB.
@@ -29,14 +139,24 @@ std::pair<bool, std::string> encryptCfb(
     const std::string& password,
     bool encrypt_name,
     int chunk_size,
-    const ProgressFn& progress
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats = nullptr,
+    const EnginePools* pools = nullptr
 );
 
 /// Decrypt a .gfglck file using AES-256-CFB.
 std::pair<bool, std::string> decryptCfb(
     const std::string& input_path,
     const std::string& password,
-    const ProgressFn& progress
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats = nullptr,
+    const EnginePools* pools = nullptr
 );
 
 /// Encrypt a file using ChaCha20-Poly1305.
@@ -45,14 +165,65 @@ std::pair<bool, std::string> encryptChacha(
     const std::string& password,
     bool encrypt_name,
     int chunk_size,
-    const ProgressFn& progress
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats = nullptr,
+    const EnginePools* pools = nullptr
 );
 
 /// Decrypt a .gfgcha file using ChaCha20-Poly1305.
 std::pair<bool, std::string> decryptChacha(
     const std::string& input_path,
     const std::string& password,
-    const ProgressFn& progress
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const ProgressFn& progress,
+    FileStats* stats = nullptr,
+    const EnginePools* pools = nullptr
+);
+
+/// Salt and PBKDF2 count of an encrypted file in either layout, chosen by its
+/// extension. Returns false when the file is unreadable, corrupt or not a container.
+bool readKdfParams(const std::string& path, std::vector<uint8_t>& salt, int& iterations);
+
+/// Seal consecutive segments of the segmented container with an already-derived
+/// key, starting at segment index first_index; when `final` is set the last one
+/// carries the final-segment flag. Segments are sealed on up to `threads` threads
+/// and each result is ciphertext followed by the tag (none for CFB).
+std::vector<std::string> sealSegments(
+    Algo algo,
+    const std::vector<uint8_t>& key,
+    const std::vector<uint8_t>& nonce,
+    uint64_t first_index,
+    const std::vector<std::string_view>& segments,
+    bool final,
+    int threads
+);
+
+/// Encrypt an in-memory payload into a complete segmented container, byte for
+/// byte what the file functions write for a file named `name`. Segments are
+/// sealed straight out of `data` on up to `threads` threads.
+std::string encryptBuffer(
+    Algo algo,
+    std::string_view data,
+    const std::string& password,
+    const std::string& name,
+    int threads,
+    const BaseKey& base
+);
+
+/// Decrypt an in-memory segmented container and return its plaintext. Throws
+/// std::runtime_error("authentication failed") on a wrong password or tampering;
+/// legacy single-stream containers are rejected.
+std::string decryptBuffer(
+    Algo algo,
+    std::string_view data,
+    const std::string& password,
+    int threads,
+    const BaseKey& base
 );
 
 } // namespace gfglock
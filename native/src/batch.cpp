@@ -0,0 +1,275 @@
+// batch.cpp - encrypt/decrypt whole lists of files in one call.
+// Python pays for one GIL release per batch instead of one call, future and
+// progress closure per file; the GIL is only re-acquired for aggregate progress.
+
+#include "batch.hpp"
+#include "kdf.hpp"
+#include "thread_pool.hpp"
+
+#include <algorithm>
+#include <atomic>
+#include <future>
+#include <map>
+#include <mutex>
+#include <stdexcept>
+
+namespace gfglock {
+
+namespace {
+constexpr size_t PROGRESS_INTERVAL = 100 * 1024 * 1024;   // same cadence as the per-file engines
+constexpr int    KEY_SIZE          = 32;
+
+// Folds per-file progress from every worker into batch callbacks: one per
+// PROGRESS_INTERVAL bytes or per 1% of the files, whichever comes first. With a
+// counter block everything goes straight to its atomics instead.
+class BatchProgress {
+public:
+    BatchProgress(const BatchProgressFn& cb, ProgressCounters* counters, size_t files)
+        : cb_(cb), counters_(counters), file_step_(std::max<size_t>(1, files / 100)) {}
+
+    ProgressFn fileCallback() {
+        if (counters_) return CounterSink{counters_};
+        if (!cb_) return {};
+        return [this](double bytes) { add(bytes, 0); };
+    }
+
+    void fileDone() {
+        if (counters_) counters_->add(ProgressCounters::Files, 1);
+        else add(0, 1);
+    }
+
+    void flush() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        report();
+    }
+
+    bool cancelled() const {
+        return cancelled_.load() || (counters_ && counters_->get(ProgressCounters::Cancel) != 0);
+    }
+
+private:
+    void add(double bytes, size_t files) {
+        if (!cb_) return;
+        std::lock_guard<std::mutex> lock(mutex_);
+        bytes_ += bytes;
+        files_done_ += files;
+        if (bytes_ >= PROGRESS_INTERVAL || files_done_ - reported_files_ >= file_step_) report();
+    }
+
+    void report() {
+        if (!cb_ || (bytes_ == 0 && files_done_ == reported_files_)) return;
+        if (cb_(bytes_, files_done_)) cancelled_.store(true);
+        bytes_ = 0;
+        reported_files_ = files_done_;
+    }
+
+    const BatchProgressFn& cb_;
+    ProgressCounters* const counters_;
+    const size_t file_step_;
+    std::mutex mutex_;
+    double bytes_ = 0;
+    size_t files_done_ = 0;
+    size_t reported_files_ = 0;
+    std::atomic<bool> cancelled_{false};
+};
+
+// PBKDF2 results shared by the files of one batch, derived once per (salt,
+// iteration count); concurrent requests for the same parameters wait for one run.
+class KeyCache {
+public:
+    KeyCache(const std::string& password, const BaseKey& seed) : password_(password) {
+        if (!seed.key.empty()) {
+            std::promise<std::vector<uint8_t>> ready;
+            ready.set_value(seed.key);
+            keys_.emplace(Params{seed.salt, seed.iterations}, ready.get_future().share());
+        }
+    }
+
+    /// KDF parameters and key for path; an empty key lets the engine derive (and report) itself.
+    BaseKey forFile(const std::string& path) {
+        BaseKey base;
+        if (!readKdfParams(path, base.salt, base.iterations)) return base;
+        try {
+            base.key = derive(Params{base.salt, base.iterations}).get();
+        } catch (...) {
+            base.key.clear();
+        }
+        return base;
+    }
+
+    /// Start deriving path's key if nobody has yet; never waits on a run already under way.
+    void prefetch(const std::string& path) {
+        Params params;
+        if (readKdfParams(path, params.first, params.second)) derive(params);
+    }
+
+private:
+    using Params = std::pair<std::vector<uint8_t>, int>;
+
+    // The shared result for params, running PBKDF2 on this thread if it is the first to ask.
+    std::shared_future<std::vector<uint8_t>> derive(const Params& params) {
+        std::promise<std::vector<uint8_t>> mine;
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            auto [it, inserted] = keys_.try_emplace(params);
+            if (!inserted) return it->second;
+            it->second = mine.get_future().share();
+        }
+        try {
+            mine.set_value(pbkdf2Sha256(password_, params.first, params.second, KEY_SIZE));
+        } catch (...) {
+            mine.set_exception(std::current_exception());
+        }
+        std::lock_guard<std::mutex> lock(mutex_);
+        return keys_.at(params);
+    }
+
+    const std::string& password_;
+    std::mutex mutex_;
+    std::map<Params, std::shared_future<std::vector<uint8_t>>> keys_;
+};
+
+// The KDF stage of a decrypt batch: reads headers in input order and derives
+// their keys into a KeyCache on threads of its own, so the workers find keys
+// ready instead of running PBKDF2 between reads and writes. Stops queuing work
+// on a cancel or once stop() is called; the destructor waits for runs under way.
+class KeyPrefetch {
+public:
+    KeyPrefetch(KeyCache& keys, const std::vector<std::string>& paths, const BatchProgress& progress)
+        : pool_(std::min(paths.size(), static_cast<size_t>(resolveThreads(0)))) {
+        for (const auto& path : paths) {
+            pool_.submit([this, &keys, &path, &progress] {
+                if (!stopped_.load() && !progress.cancelled()) keys.prefetch(path);
+            });
+        }
+    }
+
+    void stop() { stopped_.store(true); }
+
+private:
+    std::atomic<bool> stopped_{false};
+    ThreadPool pool_;
+};
+
+// Files in flight at once: one per thread, unless there are fewer files.
+size_t batchWorkers(int threads, size_t files) {
+    return std::max<size_t>(1, std::min(files, static_cast<size_t>(resolveThreads(threads))));
+}
+
+// Threads each file may use for its own segments when every worker is busy.
+int segmentThreads(int threads, size_t files) {
+    return std::max(1, resolveThreads(threads) / static_cast<int>(batchWorkers(threads, files)));
+}
+
+// Threads started once per batch and lent to every file's engine: helpers for
+// each worker's spare segment threads, plus a reader and a writer per worker for
+// files big enough to pipeline. Without them each file would start and join
+// its own threads for every pipeline and segment batch.
+class BatchPools {
+public:
+    BatchPools(int threads, size_t files)
+        : compute_(batchWorkers(threads, files) * static_cast<size_t>(segmentThreads(threads, files) - 1)),
+          io_(2 * batchWorkers(threads, files)),
+          pools_{&compute_, &io_} {}
+
+    const EnginePools* engine() const { return &pools_; }
+
+private:
+    ThreadPool compute_;
+    ThreadPool io_;
+    EnginePools pools_;
+};
+
+// Run one (success, message) job per path on the pool, stopping at a cancel.
+// Each job fills its own FileStats; `stats` keeps them when the caller wants them,
+// and `completed` gets each file's outcome as soon as it is known.
+template <typename Job>
+std::vector<std::optional<FileResult>> runBatch(
+    const std::vector<std::string>& paths, int threads, BatchProgress& progress,
+    std::vector<FileStats>* stats, CompletionQueue* completed, Job&& job)
+{
+    std::vector<std::optional<FileResult>> results(paths.size());
+    std::vector<FileStats> local;
+    std::vector<FileStats>& file_stats = stats ? *stats : local;
+    file_stats.assign(paths.size(), FileStats{});
+    parallelFor(paths.size(), threads, [&](size_t i) {
+        if (progress.cancelled()) return;
+        {
+            PhaseTimer timer(file_stats[i], &FileStats::elapsed_ns);
+            try {
+                results[i] = job(paths[i], file_stats[i]);
+            } catch (const std::exception& e) {
+                results[i] = FileResult{false, "Critical error while processing " + paths[i] + ": " + e.what()};
+            }
+        }
+        if (completed) completed->push({i, *results[i], file_stats[i]});
+        progress.fileDone();
+    });
+    progress.flush();
+    return results;
+}
+
+} // anonymous namespace
+
+std::vector<std::optional<FileResult>> encryptFiles(
+    Algo algo,
+    const std::vector<std::string>& paths,
+    const std::string& password,
+    bool encrypt_name,
+    int chunk_size,
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const BatchProgressFn& progress,
+    ProgressCounters* counters,
+    std::vector<FileStats>* stats,
+    CompletionQueue* completed)
+{
+    auto encrypt = algo == Algo::Gcm ? encryptGcm : algo == Algo::Cfb ? encryptCfb : encryptChacha;
+    int seg_threads = segmentThreads(threads, paths.size());
+    BatchPools pools(threads, paths.size());
+    BatchProgress batch(progress, counters, paths.size());
+    ProgressFn file_progress = batch.fileCallback();
+    return runBatch(paths, threads, batch, stats, completed, [&](const std::string& path, FileStats& st) {
+        return encrypt(path, password, encrypt_name, chunk_size, seg_threads, memory_budget, base,
+                       file_progress, &st, pools.engine());
+    });
+}
+
+std::vector<std::optional<FileResult>> decryptFiles(
+    const std::vector<std::string>& paths,
+    const std::string& password,
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const BatchProgressFn& progress,
+    ProgressCounters* counters,
+    std::vector<FileStats>* stats,
+    CompletionQueue* completed)
+{
+    int seg_threads = segmentThreads(threads, paths.size());
+    BatchPools pools(threads, paths.size());
+    BatchProgress batch(progress, counters, paths.size());
+    ProgressFn file_progress = batch.fileCallback();
+    KeyCache keys(password, base);
+    KeyPrefetch prefetch(keys, paths, batch);
+    // Time spent in (or waiting on) the shared PBKDF2 run counts as the file's kdf phase;
+    // with the prefetch stage ahead of the workers that is usually just the header read.
+    auto keyFor = [&](const std::string& path, FileStats& st) {
+        PhaseTimer timer(st, &FileStats::kdf_ns);
+        return keys.forFile(path);
+    };
+    auto results = runBatch(paths, threads, batch, stats, completed, [&](const std::string& path, FileStats& st) -> FileResult {
+        if (path.ends_with(".gfglock") || path.ends_with(".gfglck"))
+            return decryptGcm(path, password, seg_threads, memory_budget, keyFor(path, st), file_progress, &st,
+                              pools.engine());
+        if (path.ends_with(".gfgcha"))
+            return decryptChacha(path, password, seg_threads, memory_budget, keyFor(path, st), file_progress, &st,
+                                 pools.engine());
+        return {false, "Skipping unknown encrypted file format: " + path};
+    });
+    prefetch.stop();
+    return results;
+}
+
+} // namespace gfglock
@@ -0,0 +1,87 @@
+#pragma once
+// batch.hpp - whole-batch file API: many files per call on one native thread pool.
+
+#include "aes_cpu.hpp"
+
+#include <functional>
+#include <mutex>
+#include <optional>
+#include <string>
+#include <utility>
+#include <vector>
+
+namespace gfglock {
+
+/// (success, message) of one file, as returned by the single-file functions.
+using FileResult = std::pair<bool, std::string>;
+
+/// Aggregate progress of a batch: bytes processed since the previous call and
+/// files finished so far. Returning true cancels the files not yet started.
+using BatchProgressFn = std::function<bool(double, size_t)>;
+
+/// Per-file results of a running batch, queued by the workers as each file
+/// finishes so another thread can report them before the whole call returns.
+class CompletionQueue {
+public:
+    struct Entry {
+        size_t index;       // position in the batch's path list
+        FileResult result;
+        FileStats stats;
+    };
+
+    void push(Entry entry) {
+        std::lock_guard<std::mutex> lock(mutex_);
+        entries_.push_back(std::move(entry));
+    }
+
+    /// Everything queued since the previous call, in completion order.
+    std::vector<Entry> drain() {
+        std::lock_guard<std::mutex> lock(mutex_);
+        return std::exchange(entries_, {});
+    }
+
+private:
+    std::mutex mutex_;
+    std::vector<Entry> entries_;
+};
+
+// Files are spread over `threads` workers (0 = all cores); spare threads go to
+// the segments of each file, as in EncryptDecryptWorker. Results come back in
+// input order; files skipped after a cancel have no result. Progress goes to
+// `counters` when given (its cancel slot stops the batch), else to `progress`.
+// `stats`, when given, is resized to one FileStats per path (left zero for
+// files never started), each with its elapsed_ns. `completed`, when given, gets
+// each started file's result and stats as soon as that file finishes.
+
+/// Encrypt every path with `algo`; `base` is passed to each file as in encryptGcm.
+std::vector<std::optional<FileResult>> encryptFiles(
+    Algo algo,
+    const std::vector<std::string>& paths,
+    const std::string& password,
+    bool encrypt_name,
+    int chunk_size,
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const BatchProgressFn& progress,
+    ProgressCounters* counters = nullptr,
+    std::vector<FileStats>* stats = nullptr,
+    CompletionQueue* completed = nullptr
+);
+
+/// Decrypt every path, picking the engine from its extension. PBKDF2 runs at
+/// most once per (salt, iteration count) across the batch; `base` seeds that cache,
+/// and a KDF stage on threads of its own derives keys ahead of the file workers.
+std::vector<std::optional<FileResult>> decryptFiles(
+    const std::vector<std::string>& paths,
+    const std::string& password,
+    int threads,
+    size_t memory_budget,
+    const BaseKey& base,
+    const BatchProgressFn& progress,
+    ProgressCounters* counters = nullptr,
+    std::vector<FileStats>* stats = nullptr,
+    CompletionQueue* completed = nullptr
+);
+
+} // namespace gfglock
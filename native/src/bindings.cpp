@@ -6,6 +6,7 @@
 #include <pybind11/stl.h>
 
 #include "aes_cpu.hpp"
+#include "batch.hpp"
 #include "kdf.hpp"
 
 namespace py = pybind11;
@@ -13,15 +14,113 @@ using namespace gfglock;
 
 namespace {
 
-// Wrap a Python callable so C++ can invoke it with GIL held.
+// Wrap a Python callable so C++ can invoke it with GIL held. A ProgressCounters
+// block is written directly instead, without ever taking the GIL.
 ProgressFn wrapCallback(py::object cb) {
     if (cb.is_none()) return {};
+    if (py::isinstance<ProgressCounters>(cb)) return CounterSink{cb.cast<ProgressCounters*>()};
     return [cb](double bytes) {
         py::gil_scoped_acquire acquire;
         cb(bytes);
     };
 }
 
+// Wrap a batch progress callable; a truthy return cancels the files not yet
+// started. An exception in the callback is reported as unraisable and ignored.
+BatchProgressFn wrapBatchCallback(py::object cb) {
+    if (cb.is_none() || py::isinstance<ProgressCounters>(cb)) return {};
+    return [cb](double bytes, size_t files_done) {
+        py::gil_scoped_acquire acquire;
+        try {
+            return py::bool_(cb(bytes, files_done)).cast<bool>();
+        } catch (py::error_already_set& e) {
+            e.discard_as_unraisable("gfglock batch progress callback");
+            return false;
+        }
+    };
+}
+
+// The counter block passed as a batch callback, if that is what it is.
+ProgressCounters* batchCounters(const py::object& cb) {
+    return py::isinstance<ProgressCounters>(cb) ? cb.cast<ProgressCounters*>() : nullptr;
+}
+
+// Batch results as a list of (success, message) tuples, None for cancelled files.
+py::list batchResults(const std::vector<std::optional<FileResult>>& results) {
+    py::list out;
+    for (const auto& r : results) {
+        if (r) out.append(py::make_tuple(r->first, r->second));
+        else out.append(py::none());
+    }
+    return out;
+}
+
+// FileStats keyed as in gfglock.core.segmented.FileStats.as_dict(), plus buffer sizes.
+py::dict statsDict(const FileStats& s) {
+    py::dict d;
+    d["bytes_in"] = s.bytes_in;
+    d["bytes_out"] = s.bytes_out;
+    d["elapsed_ns"] = s.elapsed_ns;
+    d["kdf_ns"] = s.kdf_ns;
+    d["read_ns"] = s.read_ns;
+    d["cipher_ns"] = s.cipher_ns;
+    d["write_ns"] = s.write_ns;
+    d["delete_ns"] = s.delete_ns;
+    d["buffer_bytes"] = s.buffer_bytes;
+    d["chunk_bytes"] = s.chunk_bytes;
+    d["batch_segments"] = s.batch_segments;
+    d["pipeline_depth"] = s.pipeline_depth;
+    return d;
+}
+
+// Copy a file's stats into the caller's dict, when it passed one.
+void fillStats(const py::object& target, const FileStats& s) {
+    if (!target.is_none()) target.attr("update")(statsDict(s));
+}
+
+// The completion queue passed as `completed`, if any.
+CompletionQueue* completionQueue(const py::object& completed) {
+    return completed.is_none() ? nullptr : completed.cast<CompletionQueue*>();
+}
+
+// Append one stats dict per started file (None for the rest) to the caller's list.
+void fillBatchStats(const py::object& target, const std::vector<std::optional<FileResult>>& results,
+                    const std::vector<FileStats>& stats) {
+    if (target.is_none()) return;
+    for (size_t i = 0; i < results.size(); ++i)
+        target.attr("append")(results[i] ? py::object(statsDict(stats[i])) : py::none());
+}
+
+Algo algoFromName(const std::string& name) {
+    if (name == "aes256_gcm")        return Algo::Gcm;
+    if (name == "aes256_cfb")        return Algo::Cfb;
+    if (name == "chacha20_poly1305") return Algo::Chacha;
+    throw std::invalid_argument("unknown algorithm: " + name);
+}
+
+std::vector<uint8_t> toVector(const py::bytes& b) {
+    auto sv = static_cast<std::string_view>(b);
+    return {sv.begin(), sv.end()};
+}
+
+// Borrow a contiguous view of any buffer-protocol object (bytes, bytearray,
+// memoryview, mmap, ...) without copying; released when it goes out of scope.
+class BufferView {
+public:
+    explicit BufferView(const py::object& obj) {
+        if (PyObject_GetBuffer(obj.ptr(), &view_, PyBUF_SIMPLE) != 0) throw py::error_already_set();
+    }
+    ~BufferView() { PyBuffer_Release(&view_); }
+    BufferView(const BufferView&) = delete;
+    BufferView& operator=(const BufferView&) = delete;
+    std::string_view data() const {
+        return {static_cast<const char*>(view_.buf), static_cast<size_t>(view_.len)};
+    }
+
+private:
+    Py_buffer view_{};
+};
+
 // Call a file-level function with GIL released, progress callback re-acquires.
 template<typename Fn>
 auto withGilReleased(Fn&& fn) {
@@ -34,6 +133,35 @@ auto withGilReleased(Fn&& fn) {
 PYBIND11_MODULE(gfglock_native, m) {
     m.doc() = "gfgLock native C++20 acceleration module (OpenSSL)";
 
+    // ── Progress ─────────────────────────────────────────────────────────────
+
+    py::class_<ProgressCounters>(m, "ProgressCounters", py::buffer_protocol(),
+        "Lock-free progress block (bytes, files, cancel); pass it as any callback and read it "
+        "through memoryview().")
+        .def(py::init<>())
+        .def("add", [](ProgressCounters& c, size_t slot, uint64_t n) {
+                if (slot >= ProgressCounters::Count) throw py::index_error("no such progress slot");
+                c.add(static_cast<ProgressCounters::Slot>(slot), n);
+            },
+            py::arg("slot"), py::arg("n"), "Atomically add n to a slot (0 bytes, 1 files, 2 cancel).")
+        .def_buffer([](ProgressCounters& c) {
+            return py::buffer_info(static_cast<void*>(c.slots), sizeof(uint64_t),
+                                   py::format_descriptor<uint64_t>::format(), 1,
+                                   {static_cast<py::ssize_t>(ProgressCounters::Count)},
+                                   {static_cast<py::ssize_t>(sizeof(uint64_t))});
+        });
+
+    py::class_<CompletionQueue>(m, "CompletionQueue",
+        "Per-file results of a running batch; pass it as completed= and drain() it from any thread.")
+        .def(py::init<>())
+        .def("drain", [](CompletionQueue& q) {
+                py::list out;
+                for (const auto& e : q.drain())
+                    out.append(py::make_tuple(e.index, e.result.first, e.result.second, statsDict(e.stats)));
+                return out;
+            },
+            "(index, success, message, stats) of every file finished since the previous call.");
+
     // ── KDF ──────────────────────────────────────────────────────────────────
 
     m.def("pbkdf2_sha256",
@@ -48,64 +176,257 @@ PYBIND11_MODULE(gfglock_native, m) {
         py::arg("password"), py::arg("salt"), py::arg("iterations"), py::arg("dklen"),
         "Derive a key with PBKDF2-HMAC-SHA256 (OpenSSL EVP).");
 
+    m.def("pbkdf2_sha256_batch",
+        [](const std::string& password, const std::vector<py::bytes>& salts_py,
+           int iterations, int dklen, int threads) {
+            std::vector<std::vector<uint8_t>> salts;
+            salts.reserve(salts_py.size());
+            for (const auto& s : salts_py) salts.push_back(toVector(s));
+            auto keys = withGilReleased([&] {
+                return pbkdf2Sha256Batch(password, salts, iterations, dklen, threads);
+            });
+            py::list out;
+            for (const auto& k : keys)
+                out.append(py::bytes(reinterpret_cast<const char*>(k.data()), k.size()));
+            return out;
+        },
+        py::arg("password"), py::arg("salts"), py::arg("iterations"), py::arg("dklen"),
+        py::arg("threads") = 0,
+        "Derive one PBKDF2-HMAC-SHA256 key per salt on a thread pool (GIL released).");
+
     // ── AES-256-GCM ──────────────────────────────────────────────────────────
 
     m.def("encrypt_gcm",
         [](const std::string& path, const std::string& pw, bool enc_name,
-           int chunk_size, py::object cb) {
+           int chunk_size, py::object cb, int threads, py::bytes base_salt, py::bytes base_key,
+           int iterations, size_t memory_budget, py::object stats) {
             auto progress = wrapCallback(cb);
-            return withGilReleased([&] { return encryptGcm(path, pw, enc_name, chunk_size, progress); });
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            FileStats st;
+            auto result = withGilReleased([&] {
+                return encryptGcm(path, pw, enc_name, chunk_size, threads, memory_budget, base, progress, &st);
+            });
+            fillStats(stats, st);
+            return result;
         },
         py::arg("path"), py::arg("password"), py::arg("encrypt_name") = false,
-        py::arg("chunk_size") = 0, py::arg("callback") = py::none(),
+        py::arg("chunk_size") = 0, py::arg("callback") = py::none(), py::arg("threads") = 1,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(),
         "Encrypt a file with AES-256-GCM (C++ + OpenSSL, GIL released).");
 
     m.def("decrypt_gcm",
-        [](const std::string& path, const std::string& pw, py::object cb) {
+        [](const std::string& path, const std::string& pw, py::object cb, int threads,
+           py::bytes base_salt, py::bytes base_key,
+           int iterations, size_t memory_budget, py::object stats) {
             auto progress = wrapCallback(cb);
-            return withGilReleased([&] { return decryptGcm(path, pw, progress); });
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            FileStats st;
+            auto result = withGilReleased([&] {
+                return decryptGcm(path, pw, threads, memory_budget, base, progress, &st);
+            });
+            fillStats(stats, st);
+            return result;
         },
-        py::arg("path"), py::arg("password"), py::arg("callback") = py::none(),
+        py::arg("path"), py::arg("password"), py::arg("callback") = py::none(), py::arg("threads") = 1,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(),
         "Decrypt a .gfglock file with AES-256-GCM (C++ + OpenSSL, GIL released).");
 
     // ── AES-256-CFB ──────────────────────────────────────────────────────────
 
     m.def("encrypt_cfb",
         [](const std::string& path, const std::string& pw, bool enc_name,
-           int chunk_size, py::object cb) {
+           int chunk_size, py::object cb, int threads, py::bytes base_salt, py::bytes base_key,
+           int iterations, size_t memory_budget, py::object stats) {
             auto progress = wrapCallback(cb);
-            return withGilReleased([&] { return encryptCfb(path, pw, enc_name, chunk_size, progress); });
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            FileStats st;
+            auto result = withGilReleased([&] {
+                return encryptCfb(path, pw, enc_name, chunk_size, threads, memory_budget, base, progress, &st);
+            });
+            fillStats(stats, st);
+            return result;
         },
         py::arg("path"), py::arg("password"), py::arg("encrypt_name") = false,
-        py::arg("chunk_size") = 0, py::arg("callback") = py::none(),
+        py::arg("chunk_size") = 0, py::arg("callback") = py::none(), py::arg("threads") = 1,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(),
         "Encrypt a file with AES-256-CFB (C++ + OpenSSL, GIL released).");
 
     m.def("decrypt_cfb",
-        [](const std::string& path, const std::string& pw, py::object cb) {
+        [](const std::string& path, const std::string& pw, py::object cb, int threads,
+           py::bytes base_salt, py::bytes base_key,
+           int iterations, size_t memory_budget, py::object stats) {
             auto progress = wrapCallback(cb);
-            return withGilReleased([&] { return decryptCfb(path, pw, progress); });
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            FileStats st;
+            auto result = withGilReleased([&] {
+                return decryptCfb(path, pw, threads, memory_budget, base, progress, &st);
+            });
+            fillStats(stats, st);
+            return result;
         },
-        py::arg("path"), py::arg("password"), py::arg("callback") = py::none(),
+        py::arg("path"), py::arg("password"), py::arg("callback") = py::none(), py::arg("threads") = 1,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(),
         "Decrypt a .gfglck file with AES-256-CFB (C++ + OpenSSL, GIL released).");
 
     // ── ChaCha20-Poly1305 ─────────────────────────────────────────────────────
 
     m.def("encrypt_chacha",
         [](const std::string& path, const std::string& pw, bool enc_name,
-           int chunk_size, py::object cb) {
+           int chunk_size, py::object cb, int threads, py::bytes base_salt, py::bytes base_key,
+           int iterations, size_t memory_budget, py::object stats) {
             auto progress = wrapCallback(cb);
-            return withGilReleased([&] { return encryptChacha(path, pw, enc_name, chunk_size, progress); });
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            FileStats st;
+            auto result = withGilReleased([&] {
+                return encryptChacha(path, pw, enc_name, chunk_size, threads, memory_budget, base, progress, &st);
+            });
+            fillStats(stats, st);
+            return result;
         },
         py::arg("path"), py::arg("password"), py::arg("encrypt_name") = false,
-        py::arg("chunk_size") = 0, py::arg("callback") = py::none(),
+        py::arg("chunk_size") = 0, py::arg("callback") = py::none(), py::arg("threads") = 1,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(),
         "Encrypt a file with ChaCha20-Poly1305 (C++ + OpenSSL, GIL released).");
 
     m.def("decrypt_chacha",
-        [](const std::string& path, const std::string& pw, py::object cb) {
+        [](const std::string& path, const std::string& pw, py::object cb, int threads,
+           py::bytes base_salt, py::bytes base_key,
+           int iterations, size_t memory_budget, py::object stats) {
             auto progress = wrapCallback(cb);
-            return withGilReleased([&] { return decryptChacha(path, pw, progress); });
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            FileStats st;
+            auto result = withGilReleased([&] {
+                return decryptChacha(path, pw, threads, memory_budget, base, progress, &st);
+            });
+            fillStats(stats, st);
+            return result;
         },
-        py::arg("path"), py::arg("password"), py::arg("callback") = py::none(),
+        py::arg("path"), py::arg("password"), py::arg("callback") = py::none(), py::arg("threads") = 1,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(),
         "Decrypt a .gfgcha file with ChaCha20-Poly1305 (C++ + OpenSSL, GIL released).");
 
+    // ── Batches of files ─────────────────────────────────────────────────────
+
+    m.def("encrypt_files",
+        [](const std::vector<std::string>& paths, const std::string& pw, const std::string& algo,
+           bool enc_name, int chunk_size, py::object cb, int threads, py::bytes base_salt,
+           py::bytes base_key, int iterations, size_t memory_budget, py::object stats,
+           py::object completed) {
+            Algo a = algoFromName(algo);
+            auto progress = wrapBatchCallback(cb);
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            ProgressCounters* counters = batchCounters(cb);
+            CompletionQueue* queue = completionQueue(completed);
+            std::vector<FileStats> file_stats;
+            auto results = withGilReleased([&] {
+                return encryptFiles(a, paths, pw, enc_name, chunk_size, threads, memory_budget, base,
+                                    progress, counters, &file_stats, queue);
+            });
+            fillBatchStats(stats, results, file_stats);
+            return batchResults(results);
+        },
+        py::arg("paths"), py::arg("password"), py::arg("algo") = "aes256_gcm",
+        py::arg("encrypt_name") = false, py::arg("chunk_size") = 0, py::arg("callback") = py::none(),
+        py::arg("threads") = 0, py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(), py::arg("completed") = py::none(),
+        "Encrypt a list of files on a native thread pool with one GIL release.");
+
+    m.def("decrypt_files",
+        [](const std::vector<std::string>& paths, const std::string& pw, py::object cb, int threads,
+           py::bytes base_salt, py::bytes base_key, int iterations, size_t memory_budget,
+           py::object stats, py::object completed) {
+            auto progress = wrapBatchCallback(cb);
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            ProgressCounters* counters = batchCounters(cb);
+            CompletionQueue* queue = completionQueue(completed);
+            std::vector<FileStats> file_stats;
+            auto results = withGilReleased([&] {
+                return decryptFiles(paths, pw, threads, memory_budget, base, progress, counters, &file_stats,
+                                    queue);
+            });
+            fillBatchStats(stats, results, file_stats);
+            return batchResults(results);
+        },
+        py::arg("paths"), py::arg("password"), py::arg("callback") = py::none(), py::arg("threads") = 0,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS, py::arg("memory_budget") = 0,
+        py::arg("stats") = py::none(), py::arg("completed") = py::none(),
+        "Decrypt a list of .gfglock/.gfglck/.gfgcha files on a native thread pool with one GIL release.");
+
+    // ── In-memory containers ─────────────────────────────────────────────────
+
+    m.def("encrypt_buffer",
+        [](py::object data, const std::string& pw, const std::string& algo, const std::string& name,
+           int threads, py::bytes base_salt, py::bytes base_key, int iterations) {
+            Algo a = algoFromName(algo);
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            BufferView view(data);
+            std::string out;
+            try {
+                out = withGilReleased([&] { return encryptBuffer(a, view.data(), pw, name, threads, base); });
+            } catch (const std::runtime_error& e) {
+                throw py::value_error(e.what());
+            }
+            return py::bytes(out);
+        },
+        py::arg("data"), py::arg("password"), py::arg("algo") = "aes256_gcm", py::arg("name") = "",
+        py::arg("threads") = 1, py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS,
+        "Encrypt a buffer into an in-memory container (zero-copy input, GIL released).");
+
+    m.def("decrypt_buffer",
+        [](py::object data, const std::string& pw, const std::string& algo, int threads,
+           py::bytes base_salt, py::bytes base_key, int iterations) {
+            Algo a = algoFromName(algo);
+            BaseKey base{toVector(base_salt), toVector(base_key), iterations};
+            BufferView view(data);
+            std::string out;
+            try {
+                out = withGilReleased([&] { return decryptBuffer(a, view.data(), pw, threads, base); });
+            } catch (const std::runtime_error& e) {
+                throw py::value_error(e.what());
+            }
+            return py::bytes(out);
+        },
+        py::arg("data"), py::arg("password"), py::arg("algo") = "aes256_gcm", py::arg("threads") = 1,
+        py::arg("base_salt") = py::bytes(), py::arg("base_key") = py::bytes(),
+        py::arg("iterations") = DEFAULT_KDF_ITERATIONS,
+        "Decrypt an in-memory container to its plaintext (zero-copy input, GIL released).");
+
+    // ── Segment batches ──────────────────────────────────────────────────────
+
+    m.def("seal_segments",
+        [](const std::string& algo, py::bytes key_py, py::bytes nonce_py, uint64_t first_index,
+           const std::vector<py::bytes>& segments_py, bool final, int threads) {
+            Algo a = algoFromName(algo);
+            auto key = toVector(key_py);
+            auto nonce = toVector(nonce_py);
+            // Views stay valid: segments_py holds references for the whole call.
+            std::vector<std::string_view> segments;
+            segments.reserve(segments_py.size());
+            for (const auto& b : segments_py) segments.push_back(static_cast<std::string_view>(b));
+            auto sealed = withGilReleased([&] {
+                return sealSegments(a, key, nonce, first_index, segments, final, threads);
+            });
+            py::list out;
+            for (const auto& s : sealed) out.append(py::bytes(s));
+            return out;
+        },
+        py::arg("algo"), py::arg("key"), py::arg("nonce"), py::arg("first_index"),
+        py::arg("segments"), py::arg("final"), py::arg("threads") = 1,
+        "Seal a batch of container segments with a derived key (GIL released).");
+
 }
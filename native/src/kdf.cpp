@@ -1,7 +1,11 @@
 // kdf.cpp - PBKDF2-HMAC-SHA256 key derivation via OpenSSL EVP
 
 #include "kdf.hpp"
+#include "thread_pool.hpp"
 #include <openssl/evp.h>
+#include <openssl/hmac.h>
+#include <openssl/kdf.h>
+#include <cstring>
 #include <stdexcept>
 
 namespace gfglock {
@@ -24,4 +28,52 @@ std::vector<uint8_t> pbkdf2Sha256(
     return key;
 }
 
+std::vector<std::vector<uint8_t>> pbkdf2Sha256Batch(
+    const std::string& password,
+    const std::vector<std::vector<uint8_t>>& salts,
+    int iterations,
+    int dklen,
+    int threads)
+{
+    std::vector<std::vector<uint8_t>> keys(salts.size());
+    parallelFor(salts.size(), threads, [&](size_t i) {
+        keys[i] = pbkdf2Sha256(password, salts[i], iterations, dklen);
+    });
+    return keys;
+}
+
+std::vector<uint8_t> hkdfSha256(
+    const std::vector<uint8_t>& key,
+    const std::vector<uint8_t>& salt,
+    const std::string& info,
+    int dklen)
+{
+    std::vector<uint8_t> out(static_cast<size_t>(dklen));
+    size_t out_len = out.size();
+    EVP_PKEY_CTX* pctx = EVP_PKEY_CTX_new_id(EVP_PKEY_HKDF, nullptr);
+    bool ok = pctx
+        && EVP_PKEY_derive_init(pctx) > 0
+        && EVP_PKEY_CTX_set_hkdf_md(pctx, EVP_sha256()) > 0
+        && EVP_PKEY_CTX_set1_hkdf_salt(pctx, salt.data(), static_cast<int>(salt.size())) > 0
+        && EVP_PKEY_CTX_set1_hkdf_key(pctx, key.data(), static_cast<int>(key.size())) > 0
+        && EVP_PKEY_CTX_add1_hkdf_info(pctx, reinterpret_cast<const uint8_t*>(info.data()),
+                                       static_cast<int>(info.size())) > 0
+        && EVP_PKEY_derive(pctx, out.data(), &out_len) > 0;
+    EVP_PKEY_CTX_free(pctx);
+    if (!ok || out_len != out.size())
+        throw std::runtime_error("HKDF-SHA256 failed");
+    return out;
+}
+
+std::vector<uint8_t> keyCheckValue(const std::vector<uint8_t>& key)
+{
+    static constexpr char LABEL[] = "gfglock key check";
+    uint8_t mac[EVP_MAX_MD_SIZE];
+    unsigned int mac_len = 0;
+    if (!HMAC(EVP_sha256(), key.data(), static_cast<int>(key.size()),
+              reinterpret_cast<const uint8_t*>(LABEL), std::strlen(LABEL), mac, &mac_len))
+        throw std::runtime_error("HMAC-SHA256 failed");
+    return {mac, mac + 16};
+}
+
 } // namespace gfglock
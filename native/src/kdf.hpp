@@ -13,4 +13,25 @@ std::vector<uint8_t> pbkdf2Sha256(
     int dklen
 );
 
+/// Derive one key per salt with PBKDF2-HMAC-SHA256 on up to `threads` threads
+/// (0 = all cores). Keys are returned in the order of `salts`.
+std::vector<std::vector<uint8_t>> pbkdf2Sha256Batch(
+    const std::string& password,
+    const std::vector<std::vector<uint8_t>>& salts,
+    int iterations,
+    int dklen,
+    int threads
+);
+
+/// Expand a key with HKDF-SHA256 (RFC 5869).
+std::vector<uint8_t> hkdfSha256(
+    const std::vector<uint8_t>& key,
+    const std::vector<uint8_t>& salt,
+    const std::string& info,
+    int dklen
+);
+
+/// Key-check value stored in container headers: HMAC-SHA256(key, "gfglock key check")[:16].
+std::vector<uint8_t> keyCheckValue(const std::vector<uint8_t>& key);
+
 } // namespace gfglock
@@ -0,0 +1,145 @@
+#pragma once
+// pipeline.hpp - bounded reader -> cipher -> writer pipeline shared by the native engines.
+
+#include "thread_pool.hpp"
+
+#include <condition_variable>
+#include <cstddef>
+#include <deque>
+#include <exception>
+#include <mutex>
+
+namespace gfglock {
+
+/// Slots (buffers) in flight per file: one being read, one in the cipher, one being written.
+constexpr size_t PIPELINE_DEPTH = 3;
+
+/// Blocking FIFO of slot indices. close() lets consumers drain what is queued;
+/// abort() drops it, so every pop() returns false straight away and pushes are ignored.
+class SlotQueue {
+public:
+    void push(size_t slot) {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            if (aborted_) return;
+            slots_.push_back(slot);
+        }
+        ready_.notify_one();
+    }
+
+    bool pop(size_t& slot) {
+        std::unique_lock<std::mutex> lock(mutex_);
+        ready_.wait(lock, [&] { return closed_ || !slots_.empty(); });
+        if (slots_.empty()) return false;
+        slot = slots_.front();
+        slots_.pop_front();
+        return true;
+    }
+
+    void close() {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            closed_ = true;
+        }
+        ready_.notify_all();
+    }
+
+    void abort() {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            closed_ = aborted_ = true;
+            slots_.clear();
+        }
+        ready_.notify_all();
+    }
+
+private:
+    std::mutex mutex_;
+    std::condition_variable ready_;
+    std::deque<size_t> slots_;
+    bool closed_ = false;
+    bool aborted_ = false;
+};
+
+/// Stream work through `depth` slots in order: read(i) fills slot i on a reader
+/// thread and returns false at end of input; process(i) runs on the calling
+/// thread and returns false to stop early (slot i and everything after it are
+/// never written); write(i) drains slot i on a writer thread. So disk reads,
+/// the cipher and disk writes overlap instead of taking turns. The reader and
+/// writer run on `io` when given (a batch's long-lived pool, which must have a
+/// thread free for each), else on two new threads. With a single slot there is
+/// nothing to overlap, so all three stages simply take turns on this thread.
+/// Returns false when process() stopped early; the first exception thrown by
+/// any stage is rethrown here once all threads have finished.
+template <typename Read, typename Process, typename Write>
+bool runPipeline(size_t depth, Read&& read, Process&& process, Write&& write, ThreadPool* io = nullptr) {
+    if (depth <= 1) {
+        while (read(0)) {
+            if (!process(0)) return false;
+            write(0);
+        }
+        return true;
+    }
+
+    SlotQueue free_slots, read_slots, done_slots;
+    for (size_t i = 0; i < depth; ++i) free_slots.push(i);
+
+    std::exception_ptr error;
+    std::mutex error_mutex;
+    auto fail = [&] {
+        {
+            std::lock_guard<std::mutex> lock(error_mutex);
+            if (!error) error = std::current_exception();
+        }
+        free_slots.abort();
+        read_slots.abort();
+        done_slots.abort();
+    };
+
+    BackgroundJob reader(io, [&] {
+        try {
+            size_t i;
+            while (free_slots.pop(i)) {
+                if (!read(i)) break;
+                read_slots.push(i);
+            }
+        } catch (...) {
+            fail();
+        }
+        read_slots.close();
+    });
+    BackgroundJob writer(io, [&] {
+        try {
+            size_t i;
+            while (done_slots.pop(i)) {
+                write(i);
+                free_slots.push(i);
+            }
+        } catch (...) {
+            fail();
+        }
+    });
+
+    bool completed = true;
+    try {
+        size_t i;
+        while (read_slots.pop(i)) {
+            if (!process(i)) {
+                completed = false;
+                free_slots.abort();
+                read_slots.abort();
+                break;
+            }
+            done_slots.push(i);
+        }
+    } catch (...) {
+        fail();
+    }
+    done_slots.close();
+    reader.join();
+    writer.join();
+    if (error) std::rethrow_exception(error);
+    return completed;
+}
+
+} // namespace gfglock
@@ -0,0 +1,211 @@
+#pragma once
+// thread_pool.hpp - fork/join helpers and the long-lived pools shared by the native engines.
+
+#include <algorithm>
+#include <atomic>
+#include <condition_variable>
+#include <cstddef>
+#include <deque>
+#include <exception>
+#include <functional>
+#include <future>
+#include <memory>
+#include <mutex>
+#include <thread>
+#include <type_traits>
+#include <vector>
+
+namespace gfglock {
+
+/// Resolve a requested thread count; 0 or less selects every hardware thread.
+inline int resolveThreads(int threads) {
+    if (threads > 0) return threads;
+    unsigned hc = std::thread::hardware_concurrency();
+    return hc > 0 ? static_cast<int>(hc) : 1;
+}
+
+/// Fixed set of threads running submitted tasks in FIFO order until destroyed.
+/// A batch owns one for its whole run so per-file engines don't create and
+/// join threads for every file. Tasks must not throw.
+class ThreadPool {
+public:
+    explicit ThreadPool(size_t threads) {
+        workers_.reserve(threads);
+        for (size_t i = 0; i < threads; ++i) workers_.emplace_back([this] { loop(); });
+    }
+
+    ~ThreadPool() {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            stopping_ = true;
+        }
+        ready_.notify_all();
+        for (auto& worker : workers_) worker.join();
+    }
+
+    ThreadPool(const ThreadPool&) = delete;
+    ThreadPool& operator=(const ThreadPool&) = delete;
+
+    size_t size() const { return workers_.size(); }
+
+    void submit(std::function<void()> task) {
+        {
+            std::lock_guard<std::mutex> lock(mutex_);
+            tasks_.push_back(std::move(task));
+        }
+        ready_.notify_one();
+    }
+
+private:
+    void loop() {
+        while (true) {
+            std::function<void()> task;
+            {
+                std::unique_lock<std::mutex> lock(mutex_);
+                ready_.wait(lock, [&] { return stopping_ || !tasks_.empty(); });
+                if (tasks_.empty()) return;
+                task = std::move(tasks_.front());
+                tasks_.pop_front();
+            }
+            task();
+        }
+    }
+
+    std::mutex mutex_;
+    std::condition_variable ready_;
+    std::deque<std::function<void()>> tasks_;
+    std::vector<std::thread> workers_;
+    bool stopping_ = false;
+};
+
+/// Pools a batch hands down to the per-file engines: `compute` helps seal/open
+/// segments, `io` hosts pipeline readers and writers (two per file in flight).
+/// A null pool makes the engine start its own threads, as standalone calls do.
+struct EnginePools {
+    ThreadPool* compute = nullptr;
+    ThreadPool* io = nullptr;
+};
+
+/// Run fn(i) for every i in [0, count) on up to `threads` threads.
+/// The calling thread takes part; the first exception thrown is rethrown here.
+template <typename Fn>
+void parallelFor(size_t count, int threads, Fn&& fn) {
+    size_t workers = std::min(count, static_cast<size_t>(resolveThreads(threads)));
+    if (workers <= 1) {
+        for (size_t i = 0; i < count; ++i) fn(i);
+        return;
+    }
+
+    std::atomic<size_t> next{0};
+    std::exception_ptr error;
+    std::mutex error_mutex;
+    auto run = [&] {
+        while (true) {
+            size_t i = next.fetch_add(1);
+            if (i >= count) return;
+            try {
+                fn(i);
+            } catch (...) {
+                std::lock_guard<std::mutex> lock(error_mutex);
+                if (!error) error = std::current_exception();
+                next.store(count);
+            }
+        }
+    };
+
+    std::vector<std::thread> pool;
+    pool.reserve(workers - 1);
+    for (size_t t = 1; t < workers; ++t) pool.emplace_back(run);
+    run();
+    for (auto& th : pool) th.join();
+    if (error) std::rethrow_exception(error);
+}
+
+/// parallelFor with helpers borrowed from `pool` instead of new threads (a null
+/// pool falls back to the overload above). The caller works through indices
+/// too and returns once every index is done, whether or not the queued helpers
+/// ever got a thread, so a busy or nested pool costs parallelism, never a deadlock.
+template <typename Fn>
+void parallelFor(size_t count, int threads, Fn&& fn, ThreadPool* pool) {
+    if (!pool) {
+        parallelFor(count, threads, fn);
+        return;
+    }
+    size_t workers = std::min({count, static_cast<size_t>(resolveThreads(threads)), pool->size() + 1});
+    if (workers <= 1) {
+        for (size_t i = 0; i < count; ++i) fn(i);
+        return;
+    }
+
+    // Shared with helpers that may start after this call returned; those find
+    // no index left to claim and never touch fn.
+    struct State {
+        std::atomic<size_t> next{0};
+        std::atomic<size_t> done{0};
+        std::atomic<bool> failed{false};
+        size_t count = 0;
+        std::exception_ptr error;
+        std::mutex mutex;
+        std::condition_variable finished;
+    };
+    auto state = std::make_shared<State>();
+    state->count = count;
+    auto* body = &fn;
+    auto run = [](State& s, std::remove_reference_t<Fn>& f) {
+        while (true) {
+            size_t i = s.next.fetch_add(1);
+            if (i >= s.count) return;
+            if (!s.failed.load()) {
+                try {
+                    f(i);
+                } catch (...) {
+                    std::lock_guard<std::mutex> lock(s.mutex);
+                    if (!s.error) s.error = std::current_exception();
+                    s.failed.store(true);
+                }
+            }
+            if (s.done.fetch_add(1) + 1 == s.count) {
+                std::lock_guard<std::mutex> lock(s.mutex);
+                s.finished.notify_all();
+            }
+        }
+    };
+
+    for (size_t t = 1; t < workers; ++t)
+        pool->submit([state, body, run] { run(*state, *body); });
+    run(*state, fn);
+    std::unique_lock<std::mutex> lock(state->mutex);
+    state->finished.wait(lock, [&] { return state->done.load() == count; });
+    if (state->error) std::rethrow_exception(state->error);
+}
+
+/// One background job: on a `pool` thread when given, else on its own thread.
+/// join() waits for it to return; the job must not throw.
+class BackgroundJob {
+public:
+    template <typename Fn>
+    BackgroundJob(ThreadPool* pool, Fn&& fn) {
+        if (!pool) {
+            thread_ = std::thread(std::forward<Fn>(fn));
+            return;
+        }
+        std::promise<void> finished;
+        done_ = finished.get_future();
+        pool->submit([job = std::forward<Fn>(fn), finished = std::make_shared<std::promise<void>>(
+                          std::move(finished))]() mutable {
+            job();
+            finished->set_value();
+        });
+    }
+
+    void join() {
+        if (thread_.joinable()) thread_.join();
+        else if (done_.valid()) done_.get();
+    }
+
+private:
+    std::thread thread_;
+    std::future<void> done_;
+};
+
+} // namespace gfglock
@@ -6,8 +6,11 @@ import shutil
 import tempfile
 import time
 from dataclasses import dataclass, field
+from functools import partial
 from typing import Callable, Optional
 
+from gfglock.core import aes256_gcm_cfb as aes_core
+from gfglock.core import chacha20_poly1305 as chacha_core
 from gfglock.core import native_bridge
 
 # ── Config ────────────────────────────────────────────────────────────────────
@@ -178,6 +181,41 @@ def _bench_all_cpu(suite: BenchSuite) -> None:
                 print(f"enc={result.enc_mbs:.2f} MB/s  dec={result.dec_mbs:.2f} MB/s")
 
 
+# ── Python fallback benchmarks ────────────────────────────────────────────────
+
+def _bench_all_python(suite: BenchSuite) -> None:
+    """Benchmark the Python fallback engines with plain reads and with mmap I/O."""
+    threads = os.cpu_count() or 1
+    modes = []
+    for io_label, use_mmap in (("read", False), ("mmap", True)):
+        modes += [
+            (f"PY   AES-256-GCM ({io_label})",
+             partial(aes_core._encrypt_file_py, encrypt_name=False, chunk_size=None, AEAD=True,
+                     progress_callback=None, threads=threads, use_mmap=use_mmap),
+             (".gfglock",),
+             partial(aes_core._decrypt_file_py, chunk_size=None, progress_callback=None,
+                     threads=threads, use_mmap=use_mmap)),
+            (f"PY   ChaCha20 ({io_label})",
+             partial(chacha_core._encrypt_file_py, threads=threads, use_mmap=use_mmap),
+             (".gfgcha",),
+             partial(chacha_core._decrypt_file_py, threads=threads, use_mmap=use_mmap)),
+        ]
+
+    for size_mb in FILE_SIZES_MB:
+        for label, enc_fn, dec_exts, dec_fn in modes:
+            print(f"  [{label}] {size_mb} MB ...", end=" ", flush=True)
+            dirpath = tempfile.mkdtemp(prefix="gfgbench_")
+            try:
+                result = _bench_cpu_mode(dirpath, size_mb, label, enc_fn, dec_exts, dec_fn)
+            finally:
+                shutil.rmtree(dirpath, ignore_errors=True)
+            suite.add(result)
+            if result.error:
+                print(f"ERROR: {result.error}")
+            else:
+                print(f"enc={result.enc_mbs:.2f} MB/s  dec={result.dec_mbs:.2f} MB/s")
+
+
 # ── Entry Point ───────────────────────────────────────────────────────────────
 
 def main() -> None:
@@ -192,6 +230,9 @@ def main() -> None:
     print("\n[CPU] Running CPU benchmarks ...")
     _bench_all_cpu(suite)
 
+    print("\n[PY] Running Python fallback benchmarks ...")
+    _bench_all_python(suite)
+
     suite.print_report()
 
 
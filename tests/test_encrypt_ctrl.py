@@ -239,6 +239,7 @@ class TestStartOperation:
         assert kwargs["threads"] == 3
         assert kwargs["chunk_size"] == 4096
         assert kwargs["enc_algo"] == "aes256_gcm"
+        assert kwargs["batch_keys"] is False   # opt-in, as in EncryptDecryptWorker
         assert controller.isBusy is True
         started_spy.assert_called_once()
         busy_spy.assert_called_once_with(True)
@@ -306,10 +307,9 @@ class TestConnectWorker:
         conn = Qt.ConnectionType.QueuedConnection
         worker.signals.progress.connect.assert_called_once_with(controller.progressChanged, conn)
         worker.signals.files_progress.connect.assert_called_once_with(controller.filesProgressChanged, conn)
-        worker.signals.file_changed.connect.assert_called_once_with(controller.currentFileChanged, conn)
         worker.signals.status.connect.assert_called_once_with(controller.statusChanged, conn)
         worker.signals.error.connect.assert_called_once_with(controller.errorOccurred, conn)
-        worker.signals.file_result.connect.assert_called_once_with(controller._log_file_result, conn)
+        worker.signals.results.connect.assert_called_once_with(controller._on_results, conn)
         worker.signals.finished.connect.assert_called_once_with(controller._on_finished, conn)
 
     def test_noop_without_worker(self, controller):
@@ -321,26 +321,33 @@ class TestConnectWorker:
             pytest.fail(f"_connect_worker() must not raise: {exc}")
 
 
-class TestLogFileResult:
-    """_log_file_result() must always log generally, and additionally on failure."""
+class TestOnResults:
+    """_on_results() must turn one batch of file results into one update per consumer."""
 
-    def test_success_logs_general_only(self, controller, monkeypatch):
-        """A successful result must only write to the general log."""
+    def test_batch_forwarded_once(self, controller, monkeypatch):
+        """One status update, the last file, and one log write per level for the whole batch."""
         log_mock = MagicMock()
-        monkeypatch.setattr(encrypt_ctrl, "write_log", log_mock)
-        controller._log_file_result(True, "done")
-        log_mock.assert_called_once_with("done", "general")
-
-    def test_failure_logs_general_and_critical(self, controller, monkeypatch):
-        """A failed result must additionally write to the critical log."""
-        log_mock = MagicMock()
-        monkeypatch.setattr(encrypt_ctrl, "write_log", log_mock)
-        controller._log_file_result(False, "oops")
+        monkeypatch.setattr(encrypt_ctrl, "write_logs", log_mock)
+        status, current = [], []
+        controller.statusChanged.connect(status.append)
+        controller.currentFileChanged.connect(current.append)
+        controller._on_results([("a", True, "done a"), ("b", False, "oops b"), ("c", True, "")])
+        assert status == ["done a\noops b"]
+        assert current == ["c"]
         assert log_mock.call_args_list == [
-            (("oops", "general"),),
-            (("oops", "critical"),),
+            ((["done a", "oops b"], "general"),),
+            ((["oops b"], "critical"),),
         ]
 
+    def test_empty_batch_is_ignored(self, controller, monkeypatch):
+        """An empty list must not emit or log anything."""
+        log_mock = MagicMock()
+        monkeypatch.setattr(encrypt_ctrl, "write_logs", log_mock)
+        current = []
+        controller.currentFileChanged.connect(current.append)
+        controller._on_results([])
+        assert current == [] and not log_mock.called
+
 
 class TestOnFinished:
     """_on_finished() must reset busy state, log a summary, and emit operationFinished."""
@@ -1,12 +1,21 @@
 import glob
+import io
+import mmap
 import os
+import shutil
+import subprocess
+import sys
+import tracemalloc
 from typing import Callable
 
 import pytest
+from Crypto.Cipher import ChaCha20_Poly1305  # type: ignore[import]
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from gfglock.core import aes256_gcm_cfb as aes_core
 from gfglock.core import chacha20_poly1305 as chacha_core
-from gfglock.core import native_bridge
+from gfglock.core import decrypt_buffer, decrypt_range, encrypt_buffer, encrypt_stream, native_bridge, segmented
 
 requires_native = pytest.mark.skipif(
     not native_bridge.NATIVE_AVAILABLE,
@@ -168,10 +177,287 @@ class TestNativeAcceleration:
             chacha_core.decrypt_file, ".gfgcha",
         )
 
+    def test_batch_without_native_module_fails_every_file(self, password, monkeypatch):
+        """The native check is explicit, so a batch still reports per-file failures under -O."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        completed = native_bridge.BatchCompletions()
+        results = native_bridge.decrypt_files(["a.gfglock", "b.gfgcha"], password, completed=completed)
+        assert results == [(False, f"Critical error while decrypting {p}: native module not loaded")
+                           for p in ("a.gfglock", "b.gfgcha")]
+        assert [(index, ok) for index, ok, _, _ in completed.drain()] == [(0, False), (1, False)]
+
+    def test_failed_batch_keeps_finished_results(self, password, monkeypatch):
+        """When the native call raises, files it already finished keep their outcome."""
+
+        class FakeQueue:
+            def __init__(self):
+                self.entries = [(1, True, "Encrypted: b", {"bytes_in": 1})]
+
+            def drain(self):
+                entries, self.entries = self.entries, []
+                return entries
+
+        def encrypt_files(*args):
+            raise MemoryError("out of memory")
+
+        fake = type("FakeNative", (), {"CompletionQueue": FakeQueue, "encrypt_files": staticmethod(encrypt_files)})
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", True)
+        monkeypatch.setattr(native_bridge, "_native", fake)
+        completed = native_bridge.BatchCompletions()
+        results = native_bridge.encrypt_files(["a", "b", "c"], password, completed=completed)
+        failed = "Critical error while encrypting {}: out of memory"
+        assert results == [(False, failed.format("a")), (True, "Encrypted: b"), (False, failed.format("c"))]
+        assert [(index, ok) for index, ok, _, _ in completed.drain()] == [(1, True), (0, False), (2, False)]
+
+    @pytest.mark.parametrize("core, ext", [(aes_core, ".gfglock"), (chacha_core, ".gfgcha")], ids=["gcm", "chacha"])
+    def test_file_stats_phases(self, core, ext, make_file, password, sample_data):
+        """The native engine must report every phase, the bytes moved and its buffer layout."""
+        src = make_file()
+        enc = segmented.FileStats()
+        assert core.encrypt_file(src, password, stats=enc)[0]
+        assert enc.bytes_in == len(sample_data)
+        assert enc.bytes_out == os.path.getsize(_find_enc(os.path.dirname(src), ext))
+        assert all(enc.ns[phase] > 0 for phase in segmented.PHASES)
+        assert enc.extra["pipeline_depth"] >= 1 and enc.extra["batch_segments"] >= 1
+        assert enc.extra["buffer_bytes"] >= 2 * enc.extra["chunk_bytes"]
+
+        dec = segmented.FileStats()
+        assert core.decrypt_file(_find_enc(os.path.dirname(src), ext), password, stats=dec)[0]
+        assert (dec.bytes_in, dec.bytes_out) == (enc.bytes_out, len(sample_data))
+        assert all(dec.ns[phase] > 0 for phase in segmented.PHASES)
+
+    def test_legacy_decrypt_stats(self, tmp_path, password):
+        """Legacy single-stream files report their phases and the streaming buffer layout."""
+        data = os.urandom(4096)
+        salt, nonce = os.urandom(16), os.urandom(12)
+        key = native_bridge.derive_key(password, salt)
+        ct, tag = ChaCha20_Poly1305.new(key=key, nonce=nonce).encrypt_and_digest(b"legacy.bin\0" + data)
+        enc = tmp_path / "legacy.gfgcha"
+        enc.write_bytes(salt + nonce + (0).to_bytes(4, "big") + ct + tag)
+        stats: dict = {}
+        ok, msg = native_bridge.decrypt_chacha(str(enc), password, stats=stats)
+        assert ok, msg
+        assert (stats["bytes_in"], stats["bytes_out"]) == (16 + 12 + 4 + len(ct) + 16, len(data))
+        assert stats["batch_segments"] == 0 and stats["chunk_bytes"] > 0
+        assert all(stats[f"{phase}_ns"] > 0 for phase in segmented.PHASES)
+
+
+@requires_native
+class TestNativeBatch:
+    """encrypt_files/decrypt_files must run many files per call with ordered per-file results."""
+
+    def test_roundtrip_results_in_order(self, tmp_path, password):
+        """Every file roundtrips; results line up with the input paths."""
+        data = {f"f{i}.bin": os.urandom(100 * i) for i in range(12)}
+        for name, payload in data.items():
+            (tmp_path / name).write_bytes(payload)
+        paths = [str(tmp_path / name) for name in data]
+        results = native_bridge.encrypt_files(paths, password, "chacha20_poly1305", threads=4)
+        assert len(results) == len(paths)
+        for path, (ok, msg) in zip(paths, results):
+            assert ok and path in msg
+        enc = sorted(glob.glob(str(tmp_path / "*.gfgcha")))
+        results = native_bridge.decrypt_files(enc, password, threads=4)
+        assert all(ok for ok, _ in results)
+        assert {name: (tmp_path / name).read_bytes() for name in data} == data
+
+    @pytest.mark.parametrize("algo, ext", [("aes256_gcm", ".gfglock"), ("chacha20_poly1305", ".gfgcha")])
+    def test_mixed_sizes_on_batch_pools(self, tmp_path, password, algo, ext):
+        """Large files pipeline on the batch's shared threads while single-slot files run inline."""
+        data = {
+            "big0.bin": os.urandom(3 * segmented.SEGMENT_SIZE + 123),
+            "big1.bin": os.urandom(4 * segmented.SEGMENT_SIZE),
+            "small.bin": os.urandom(100),
+        }
+        for name, payload in data.items():
+            (tmp_path / name).write_bytes(payload)
+        paths = [str(tmp_path / name) for name in data]
+        stats: list = []
+        results = native_bridge.encrypt_files(paths, password, algo, threads=6,
+                                              memory_budget=32 * 1024 * 1024, stats=stats)
+        assert all(ok for ok, _ in results)
+        assert [fields["pipeline_depth"] for fields in stats] == [2, 2, 1]
+        enc = sorted(glob.glob(str(tmp_path / f"*{ext}")))
+        results = native_bridge.decrypt_files(enc, password, threads=6, memory_budget=32 * 1024 * 1024)
+        assert all(ok for ok, _ in results)
+        assert {name: (tmp_path / name).read_bytes() for name in data} == data
+
+    def test_decrypt_derives_keys_ahead_of_workers(self, tmp_path, password):
+        """The KDF stage derives later files' keys while earlier files decrypt, so workers barely wait."""
+        big, small = tmp_path / "a.bin", tmp_path / "b.bin"
+        big.write_bytes(os.urandom(128 * 1024 * 1024))
+        small.write_bytes(b"small")
+        native_bridge.encrypt_files([str(big)], password)
+        native_bridge.encrypt_files([str(small)], password)
+        enc = sorted(glob.glob(str(tmp_path / "*.gfglock")))
+        stats: list = []
+        results = native_bridge.decrypt_files(enc, password, threads=1, stats=stats)
+        assert all(ok for ok, _ in results)
+        assert big.exists() and small.read_bytes() == b"small"
+        assert stats[1]["kdf_ns"] < stats[0]["kdf_ns"] / 2
+
+    def test_per_file_failures_and_skips(self, tmp_path, password):
+        """A wrong password fails its own file only; unknown extensions come back as skips."""
+        good, other = tmp_path / "good.bin", tmp_path / "other.bin"
+        good.write_bytes(b"good")
+        other.write_bytes(b"other")
+        native_bridge.encrypt_files([str(good)], password)
+        native_bridge.encrypt_files([str(other)], "another-password")
+        enc = sorted(glob.glob(str(tmp_path / "*.gfglock")))
+        plain = tmp_path / "notes.txt"
+        plain.write_bytes(b"x")
+        results = native_bridge.decrypt_files(enc + [str(plain)], password)
+        assert [ok for ok, _ in results] == [True, False, False]
+        assert "authentication failed" in results[1][1]
+        assert "unknown encrypted file format" in results[2][1]
+
+    def test_aggregate_progress_and_cancel(self, tmp_path, password):
+        """Progress arrives in aggregate, and a truthy callback return leaves later files untouched."""
+        paths = []
+        for i in range(300):
+            p = tmp_path / f"f{i}.bin"
+            p.write_bytes(b"x" * 10)
+            paths.append(str(p))
+        calls = []
+
+        def on_progress(nbytes, files_done):
+            calls.append((nbytes, files_done))
+            return files_done >= 30
+
+        results = native_bridge.encrypt_files(paths, password, callback=on_progress, threads=1,
+                                              **segmented.native_key_args(segmented.KeySession(password)))
+        done = [r for r in results if r is not None]
+        assert 30 <= len(done) < len(paths)
+        assert all(ok for ok, _ in done)
+        assert len(calls) < len(done)
+        assert calls[-1][1] == len(done)
+        assert results[-1] is None and os.path.exists(paths[-1])
+
+    def test_progress_counters_and_cancel(self, tmp_path, password):
+        """A ProgressCounters callback sees every file and byte; its cancel flag stops the next batch."""
+        paths = []
+        for i in range(20):
+            p = tmp_path / f"f{i}.bin"
+            p.write_bytes(os.urandom(1000))
+            paths.append(str(p))
+        counters = native_bridge.ProgressCounters()
+        results = native_bridge.encrypt_files(paths, password, callback=counters, threads=2,
+                                              **segmented.native_key_args(segmented.KeySession(password)))
+        assert all(ok for ok, _ in results)
+        assert counters.files == 20
+        assert counters.bytes >= 20 * 1000
+        counters.cancel()
+        enc = sorted(glob.glob(str(tmp_path / "*.gfglock")))
+        assert native_bridge.decrypt_files(enc, password, callback=counters) == [None] * 20
+        assert counters.files == 20
+
+    def test_per_file_stats(self, tmp_path, password):
+        """A stats list gets one timing dict per file, None for files a cancel skipped."""
+        paths = []
+        for i in range(3):
+            p = tmp_path / f"f{i}.bin"
+            p.write_bytes(os.urandom(5000))
+            paths.append(str(p))
+        stats: list = []
+        assert all(ok for ok, _ in native_bridge.encrypt_files(paths, password, threads=2, stats=stats))
+        assert len(stats) == 3
+        for fields in stats:
+            assert fields["bytes_in"] == 5000
+            assert fields["elapsed_ns"] >= fields["kdf_ns"] + fields["delete_ns"] > 0
+        counters = native_bridge.ProgressCounters()
+        counters.cancel()
+        stats = []
+        enc = sorted(glob.glob(str(tmp_path / "*.gfglock")))
+        native_bridge.decrypt_files(enc, password, callback=counters, stats=stats)
+        assert stats == [None] * 3
+
+    def test_completions_arrive_as_files_finish(self, tmp_path, password):
+        """Each file's result and stats are drainable while the batch is still running."""
+        paths = []
+        for i in range(5):
+            p = tmp_path / f"f{i}.bin"
+            p.write_bytes(os.urandom(1000))
+            paths.append(str(p))
+        completed = native_bridge.BatchCompletions()
+        seen: list = []
+
+        def on_progress(nbytes, files_done):
+            seen.extend(completed.drain())
+
+        results = native_bridge.encrypt_files(paths, password, callback=on_progress, threads=1,
+                                              completed=completed)
+        assert len(seen) == 5 and completed.drain() == []
+        assert [index for index, *_ in seen] == list(range(5))
+        for index, ok, msg, fields in seen:
+            assert (ok, msg) == results[index]
+            assert fields["bytes_in"] == 1000 and fields["elapsed_ns"] > 0
+
 
 class TestPythonFallback:
     """Round-trip tests with native C++ disabled - exercises the pure-Python path."""
 
+    def test_progress_counters_as_callback(self, make_file, password, sample_data, monkeypatch):
+        """Without the native block, ProgressCounters still counts what a Python engine reports."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        counters = native_bridge.ProgressCounters()
+        ok, _ = aes_core.encrypt_file(make_file(), password, AEAD=True, progress_callback=counters)
+        assert ok
+        assert counters.bytes >= len(sample_data)
+        counters.add_file()
+        assert (counters.files, counters.cancelled) == (1, False)
+        counters.cancel()
+        assert counters.cancelled
+
+    def test_batch_without_native_module_fails_every_file(self, password, monkeypatch):
+        """The native check is explicit, so a batch still reports per-file failures under -O."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        completed = native_bridge.BatchCompletions()
+        results = native_bridge.decrypt_files(["a.gfglock", "b.gfgcha"], password, completed=completed)
+        assert results == [(False, f"Critical error while decrypting {p}: native module not loaded")
+                           for p in ("a.gfglock", "b.gfgcha")]
+        assert [(index, ok) for index, ok, _, _ in completed.drain()] == [(0, False), (1, False)]
+
+    def test_failed_batch_keeps_finished_results(self, password, monkeypatch):
+        """When the native call raises, files it already finished keep their outcome."""
+
+        class FakeQueue:
+            def __init__(self):
+                self.entries = [(1, True, "Encrypted: b", {"bytes_in": 1})]
+
+            def drain(self):
+                entries, self.entries = self.entries, []
+                return entries
+
+        def encrypt_files(*args):
+            raise MemoryError("out of memory")
+
+        fake = type("FakeNative", (), {"CompletionQueue": FakeQueue, "encrypt_files": staticmethod(encrypt_files)})
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", True)
+        monkeypatch.setattr(native_bridge, "_native", fake)
+        completed = native_bridge.BatchCompletions()
+        results = native_bridge.encrypt_files(["a", "b", "c"], password, completed=completed)
+        failed = "Critical error while encrypting {}: out of memory"
+        assert results == [(False, failed.format("a")), (True, "Encrypted: b"), (False, failed.format("c"))]
+        assert [(index, ok) for index, ok, _, _ in completed.drain()] == [(1, True), (0, False), (2, False)]
+
+    @pytest.mark.parametrize("core, ext", [(aes_core, ".gfglock"), (chacha_core, ".gfgcha")], ids=["gcm", "chacha"])
+    def test_file_stats_phases(self, core, ext, make_file, password, sample_data, monkeypatch):
+        """FileStats passed to either engine must see every phase and the bytes moved."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = make_file()
+        enc = segmented.FileStats()
+        assert core.encrypt_file(src, password, stats=enc)[0]
+        assert enc.bytes_in == len(sample_data)
+        assert enc.bytes_out > enc.bytes_in
+        assert all(enc.ns[phase] > 0 for phase in segmented.PHASES)
+
+        enc_path = _find_enc(os.path.dirname(src), ext)
+        dec = segmented.FileStats()
+        assert core.decrypt_file(enc_path, password, stats=dec)[0]
+        assert dec.bytes_in == enc.bytes_out
+        assert dec.bytes_out == len(sample_data)
+        assert all(dec.ns[phase] > 0 for phase in segmented.PHASES)
+
     def test_gcm_roundtrip(self, make_file, password, sample_data, monkeypatch):
         """AES-256-GCM Python fallback encrypt → decrypt must recover original bytes."""
         monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
@@ -411,3 +697,830 @@ class TestChunkedProcessing:
         assert ok, f"Decrypt failed: {msg}"
         with open(str(tmp_path / "large.bin"), "rb") as f:
             assert f.read() == data
+
+
+_SEG = segmented.SEGMENT_SIZE
+
+
+class TestSegmentedFormat:
+    """Segmented container: parallel segments, tamper/truncation detection, legacy reads."""
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("aead,ext", [(True, ".gfglock"), (False, ".gfglck")], ids=["gcm", "cfb"])
+    def test_aes_parallel_roundtrip(self, tmp_path, password, aead, ext, use_native, monkeypatch):
+        """A multi-segment file must roundtrip with several threads per file."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(3 * _SEG + 123)
+        src = tmp_path / "multi.bin"
+        src.write_bytes(data)
+        ok, msg = aes_core.encrypt_file(str(src), password, AEAD=aead, threads=4)
+        assert ok, f"Encrypt failed: {msg}"
+        enc = _find_enc(str(tmp_path), ext)
+        assert segmented.is_segmented(enc)
+        ok, msg = aes_core.decrypt_file(enc, password, threads=4)
+        assert ok, f"Decrypt failed: {msg}"
+        assert src.read_bytes() == data
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_chacha_parallel_roundtrip(self, tmp_path, password, use_native, monkeypatch):
+        """A multi-segment ChaCha20 file must roundtrip with several threads per file."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(2 * _SEG + 7)
+        src = tmp_path / "multi.bin"
+        src.write_bytes(data)
+        ok, msg = chacha_core.encrypt_file(str(src), password, threads=3)
+        assert ok, f"Encrypt failed: {msg}"
+        ok, msg = chacha_core.decrypt_file(_find_enc(str(tmp_path), ".gfgcha"), password, threads=3)
+        assert ok, f"Decrypt failed: {msg}"
+        assert src.read_bytes() == data
+
+    @pytest.mark.parametrize("size", [0, _SEG], ids=["empty", "exact"])
+    def test_boundary_sizes(self, tmp_path, password, size, monkeypatch):
+        """Empty and exactly-one-segment payloads must roundtrip."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(size)
+        src = tmp_path / "edge.bin"
+        src.write_bytes(data)
+        ok, msg = aes_core.encrypt_file(str(src), password, AEAD=True)
+        assert ok, f"Encrypt failed: {msg}"
+        ok, msg = aes_core.decrypt_file(_find_enc(str(tmp_path), ".gfglock"), password)
+        assert ok, f"Decrypt failed: {msg}"
+        assert src.read_bytes() == data
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_swapped_segments_rejected(self, tmp_path, password, use_native, monkeypatch):
+        """Reordering two full segments must fail authentication and leave no plaintext."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = tmp_path / "multi.bin"
+        src.write_bytes(os.urandom(2 * _SEG + 10))
+        aes_core.encrypt_file(str(src), password, AEAD=True)
+        enc = _find_enc(str(tmp_path), ".gfglock")
+        raw = open(enc, "rb").read()
+        start = len(raw) - (2 * (_SEG + segmented.TAG_SIZE) + 10 + segmented.TAG_SIZE)
+        stored = _SEG + segmented.TAG_SIZE
+        first, second = raw[start:start + stored], raw[start + stored:start + 2 * stored]
+        with open(enc, "wb") as f:
+            f.write(raw[:start] + second + first + raw[start + 2 * stored:])
+        ok, msg = aes_core.decrypt_file(enc, password)
+        assert not ok
+        assert "auth" in msg.lower()
+        assert not (tmp_path / "multi.bin").exists()
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_many_batches_roundtrip_and_late_tamper(self, tmp_path, password, use_native, monkeypatch):
+        """One segment per batch keeps several batches in flight; a bad late segment still fails cleanly."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(7 * _SEG + 5)
+        src = tmp_path / "multi.bin"
+        src.write_bytes(data)
+        ok, msg = chacha_core.encrypt_file(str(src), password, threads=1)
+        assert ok, f"Encrypt failed: {msg}"
+        enc = _find_enc(str(tmp_path), ".gfgcha")
+        raw = bytearray(open(enc, "rb").read())
+        ok, msg = chacha_core.decrypt_file(enc, password, threads=1)
+        assert ok, f"Decrypt failed: {msg}"
+        assert src.read_bytes() == data
+        src.unlink()
+        raw[-(2 * (_SEG + segmented.TAG_SIZE))] ^= 0xFF   # inside segment 6 of 8
+        with open(enc, "wb") as f:
+            f.write(raw)
+        ok, msg = chacha_core.decrypt_file(enc, password, threads=1)
+        assert not ok
+        assert "auth" in msg.lower()
+        assert not src.exists()
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_truncation_rejected(self, tmp_path, password, use_native, monkeypatch):
+        """Dropping the final segment must be detected via the final-segment flag."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = tmp_path / "multi.bin"
+        src.write_bytes(os.urandom(2 * _SEG + 10))
+        chacha_core.encrypt_file(str(src), password)
+        enc = _find_enc(str(tmp_path), ".gfgcha")
+        raw = open(enc, "rb").read()
+        with open(enc, "wb") as f:
+            f.write(raw[:-(10 + segmented.TAG_SIZE)])
+        ok, msg = chacha_core.decrypt_file(enc, password)
+        assert not ok
+        assert not (tmp_path / "multi.bin").exists()
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_legacy_gcm_still_decrypts(self, tmp_path, password, use_native, monkeypatch):
+        """Files in the pre-segmented single-stream layout must still decrypt."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(4096)
+        salt, nonce = os.urandom(16), os.urandom(12)
+        key = native_bridge.derive_key(password, salt)
+        body = AESGCM(key).encrypt(nonce, b"legacy.bin\0" + data, None)
+        enc = tmp_path / "legacy.gfglock"
+        enc.write_bytes(salt + nonce + (0).to_bytes(4, "big") + body)
+        assert not segmented.is_segmented(str(enc))
+        ok, msg = aes_core.decrypt_file(str(enc), password)
+        assert ok, f"Decrypt failed: {msg}"
+        assert (tmp_path / "legacy.bin").read_bytes() == data
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("ext", [".gfglock", ".gfglck", ".gfgcha"])
+    def test_legacy_chunked_still_decrypts(self, tmp_path, password, use_native, ext, monkeypatch):
+        """Legacy files with a chunk-size field stream through the chunk loops, several chunks deep."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(3 * aes_core.BUFFER_SIZE + 123)
+        payload = b"legacy.bin\0" + data
+        salt = os.urandom(16)
+        key = native_bridge.derive_key(password, salt)
+        if ext == ".gfglock":
+            nonce = os.urandom(12)
+            body = AESGCM(key).encrypt(nonce, payload, None)
+        elif ext == ".gfglck":
+            nonce = os.urandom(16)
+            body = Cipher(algorithms.AES(key), modes.CFB(nonce)).encryptor().update(payload)
+        else:
+            nonce = os.urandom(12)
+            ct, tag = ChaCha20_Poly1305.new(key=key, nonce=nonce).encrypt_and_digest(payload)
+            body = ct + tag
+        enc = tmp_path / f"legacy{ext}"
+        enc.write_bytes(salt + nonce + (1).to_bytes(4, "big") + body)
+        core = chacha_core if ext == ".gfgcha" else aes_core
+        ok, msg = core.decrypt_file(str(enc), password)
+        assert ok, f"Decrypt failed: {msg}"
+        assert (tmp_path / "legacy.bin").read_bytes() == data
+
+    def test_read_segments_reuses_ring(self):
+        """_read_segments fills a fixed ring with readinto and yields exact segment views."""
+        data = os.urandom(5 * 100 + 7)
+        views = list(segmented._read_segments(io.BytesIO(data), 100, 3))
+        assert [len(v) for v in views] == [100] * 5 + [7]
+        assert views[0].obj is views[3].obj
+        assert bytes(views[-1]) == data[-7:]
+
+
+class TestKeyCheck:
+    """The header's key check must reject wrong passwords before any payload work."""
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_cfb_wrong_password_rejected(self, make_file, password, use_native, monkeypatch):
+        """CFB has no tags, so only the key check can catch a wrong password."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = make_file()
+        aes_core.encrypt_file(src, password, AEAD=False)
+        enc = _find_enc(os.path.dirname(src), ".gfglck")
+        ok, msg = aes_core.decrypt_file(enc, "wrong-password")
+        assert not ok
+        assert "auth" in msg.lower()
+        assert os.path.exists(enc)
+        assert not os.path.exists(src)
+
+    def test_wrong_password_skips_payload(self, make_file, password, monkeypatch):
+        """A key-check mismatch must fail before the segments are read."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = make_file()
+        chacha_core.encrypt_file(src, password)
+        enc = _find_enc(os.path.dirname(src), ".gfgcha")
+
+        def _unexpected(*_args, **_kwargs):
+            raise AssertionError("payload was read despite a wrong password")
+
+        monkeypatch.setattr(segmented, "open_name", _unexpected)
+        monkeypatch.setattr(segmented, "open_segments", _unexpected)
+        ok, msg = chacha_core.decrypt_file(enc, "wrong-password")
+        assert not ok
+        assert "authentication failed" in msg
+
+    def test_header_records_key_check(self, make_file, password, monkeypatch):
+        """New files carry the key-check flag and a value matching the derived key."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = make_file()
+        aes_core.encrypt_file(src, password, AEAD=True)
+        enc = _find_enc(os.path.dirname(src), ".gfglock")
+        with open(enc, "rb") as f:
+            header = segmented.read_header(f, segmented.GCM)
+        assert header.flags & segmented.FLAG_KEY_CHECK
+        key = native_bridge.derive_key(password, header.salt)
+        assert header.key_check == segmented.key_check_value(key)
+
+
+class TestKdfIterations:
+    """The PBKDF2 iteration count is recorded per file and honoured on decrypt."""
+
+    _ITERATIONS = 150000
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("algo", ["gcm", "chacha"])
+    def test_custom_count_recorded_and_roundtrips(self, make_file, password, use_native, algo, monkeypatch):
+        """A non-default count lands in the header, keys the file and decrypts on either engine."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = make_file()
+        original = open(src, "rb").read()
+        core, ext = (aes_core, ".gfglock") if algo == "gcm" else (chacha_core, ".gfgcha")
+        ok, msg = core.encrypt_file(src, password, iterations=self._ITERATIONS)
+        assert ok, msg
+        enc = _find_enc(os.path.dirname(src), ext)
+        with open(enc, "rb") as f:
+            header = segmented.read_header(f, segmented.suite_for_path(enc))
+        assert header.flags & segmented.FLAG_KDF_ITERATIONS
+        assert header.kdf_iterations == self._ITERATIONS
+        key = native_bridge.derive_key(password, header.salt, self._ITERATIONS)
+        assert header.key_check == segmented.key_check_value(key)
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        ok, msg = core.decrypt_file(enc, password)
+        assert ok, msg
+        assert open(src, "rb").read() == original
+
+    def test_session_count_recorded(self, tmp_path, password, monkeypatch):
+        """Session-key files record the session's count, not the default."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        keys = segmented.KeySession(password, self._ITERATIONS)
+        dst = io.BytesIO()
+        segmented.encrypt_stream([b"data"], dst, password, keys=keys)
+        dst.seek(0)
+        header = segmented.read_header(dst, segmented.GCM)
+        assert header.kdf_iterations == self._ITERATIONS
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_header_without_count_uses_default(self, tmp_path, password, use_native, monkeypatch):
+        """Files written before the 0x0004 field existed decrypt with 200,000 iterations."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        header = segmented.new_header(segmented.GCM, "old.txt")
+        header.flags &= ~segmented.FLAG_KDF_ITERATIONS
+        key = segmented.new_file_key(password, header)
+        enc = tmp_path / "old.txt.gfglock"
+        with open(enc, "wb") as fout:
+            fout.write(header.pack())
+            fout.write(segmented.seal_name(header, key, "old.txt"))
+            segmented.seal_segments(iter([b"old payload"]), fout, header, key)
+        ok, msg = aes_core.decrypt_file(str(enc), password)
+        assert ok, msg
+        assert (tmp_path / "old.txt").read_bytes() == b"old payload"
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("batch", [False, True], ids=["per-file", "session"])
+    def test_new_files_refuse_weak_counts(self, make_file, password, use_native, batch, monkeypatch):
+        """Encrypting with fewer than MIN_KDF_ITERATIONS fails and leaves no output."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = make_file()
+        weak = native_bridge.MIN_KDF_ITERATIONS - 1
+        if batch:
+            keys = segmented.KeySession(password, weak)
+            ok, msg = aes_core.encrypt_file(src, password, keys=keys)
+        else:
+            ok, msg = aes_core.encrypt_file(src, password, iterations=weak)
+        assert not ok
+        assert "iteration count" in msg
+        assert os.listdir(os.path.dirname(src)) == [os.path.basename(src)]
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_existing_files_with_weak_counts_still_decrypt(self, tmp_path, password, use_native, monkeypatch):
+        """The minimum applies to writing only: a header recording 1,000 iterations still decrypts."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        header = segmented.new_header(segmented.GCM, "weak.txt")
+        header.kdf_iterations = 1000
+        key = segmented.new_file_key(password, header)
+        enc = tmp_path / "weak.txt.gfglock"
+        with open(enc, "wb") as fout:
+            fout.write(header.pack())
+            fout.write(segmented.seal_name(header, key, "weak.txt"))
+            segmented.seal_segments(iter([b"weak payload"]), fout, header, key)
+        ok, msg = aes_core.decrypt_file(str(enc), password)
+        assert ok, msg
+        assert (tmp_path / "weak.txt").read_bytes() == b"weak payload"
+
+    @pytest.mark.parametrize("count", [0, native_bridge.MAX_KDF_ITERATIONS + 1])
+    def test_out_of_range_count_rejected(self, count):
+        """A header asking for zero or an absurd number of iterations is refused before any KDF."""
+        header = segmented.new_header(segmented.GCM, "x")
+        header.kdf_iterations = count
+        with pytest.raises(ValueError, match="iteration count"):
+            segmented.read_header(io.BytesIO(header.pack()), segmented.GCM)
+
+
+class TestMemoryBudget:
+    """Every engine keeps a file's I/O buffers within the configured memory budget."""
+
+    _BUDGET = 64 * 1024 * 1024
+
+    # Runs in a child process so ru_maxrss measures this one operation only.
+    _PEAK_SCRIPT = "\n".join([
+        "import resource, sys",
+        "from gfglock.core import aes256_gcm_cfb as aes_core, native_bridge",
+        "path, budget, engine = sys.argv[1], int(sys.argv[2]), sys.argv[3]",
+        "native_bridge.NATIVE_AVAILABLE = native_bridge.NATIVE_AVAILABLE and engine == 'native'",
+        "before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss",
+        "chunk = 128 * 1024 * 1024",
+        "ok, msg = aes_core.decrypt_file(path, 'pw', chunk, threads=8, memory_budget=budget)"
+        " if path.endswith('.gfglock') else aes_core.encrypt_file("
+        "path, 'pw', chunk_size=chunk, threads=8, memory_budget=budget)",
+        "assert ok, msg",
+        "print((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before) * 1024)",
+    ])
+
+    def _peak_growth(self, path: str, engine: str) -> int:
+        """Peak RSS growth, in bytes, of encrypting or decrypting path in a fresh interpreter."""
+        result = subprocess.run(
+            [sys.executable, "-c", self._PEAK_SCRIPT, path, str(self._BUDGET), engine],
+            capture_output=True, text=True, check=True,
+        )
+        return int(result.stdout.strip().splitlines()[-1])
+
+    def test_batch_capped_by_budget(self):
+        """Large chunk sizes and thread counts shrink to what the budget holds."""
+        seg = segmented.SEGMENT_SIZE
+        assert segmented._batch_segments(64, 512 * seg, seg, 16 * seg) == 16 * seg // (2 * (seg + 16)) - 1
+        assert segmented._batch_segments(2, None, seg) == 2
+        with pytest.raises(ValueError, match="memory budget"):
+            segmented._batch_segments(1, None, seg, 2 * seg)
+
+    def test_legacy_chunk_size(self):
+        """Legacy payloads are read whole only when that fits; otherwise they stream."""
+        mb = 1024 * 1024
+        assert segmented.legacy_chunk_size(None, mb, 64 * mb) is None
+        assert segmented.legacy_chunk_size(None, 40 * mb, 64 * mb) == 32 * mb
+        assert segmented.legacy_chunk_size(128 * mb, 1024 * mb, 64 * mb) == 32 * mb
+        assert segmented.legacy_chunk_size(8 * mb, 1024 * mb, 64 * mb) == 8 * mb
+
+    @pytest.mark.parametrize("ext", [".gfglock", ".gfgcha"])
+    def test_oversized_legacy_payload_streams(self, tmp_path, password, ext, monkeypatch):
+        """An unchunked legacy file bigger than the budget decrypts without one whole read."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(8 * 1024 * 1024)
+        salt, nonce = os.urandom(16), os.urandom(12)
+        key = native_bridge.derive_key(password, salt)
+        payload = b"legacy.bin\0" + data
+        if ext == ".gfglock":
+            body = AESGCM(key).encrypt(nonce, payload, None)
+        else:
+            ct, tag = ChaCha20_Poly1305.new(key=key, nonce=nonce).encrypt_and_digest(payload)
+            body = ct + tag
+        enc = tmp_path / f"legacy{ext}"
+        enc.write_bytes(salt + nonce + (0).to_bytes(4, "big") + body)
+        core = chacha_core if ext == ".gfgcha" else aes_core
+        tracemalloc.start()
+        try:
+            ok, msg = core.decrypt_file(str(enc), password, memory_budget=2 * 1024 * 1024)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert ok, msg
+        assert (tmp_path / "legacy.bin").read_bytes() == data
+        assert peak < len(data) // 2   # a whole read would hold at least twice the payload
+
+    @pytest.mark.skipif(not sys.platform.startswith("linux"), reason="ru_maxrss is in KiB on Linux only")
+    @pytest.mark.parametrize(
+        "engine", ["python", pytest.param("native", marks=requires_native)],
+    )
+    def test_multi_gb_file_peak_memory(self, tmp_path, engine):
+        """A 2 GiB file encrypts and decrypts with a 128 MB chunk size in well under the budget's RSS."""
+        if shutil.disk_usage(tmp_path).free < 6 * 1024 ** 3:
+            pytest.skip("needs 6 GiB of free disk")
+        size = 2 * 1024 ** 3 + 123
+        src = tmp_path / "big.bin"
+        with open(src, "wb") as f:
+            f.truncate(size)
+        slack = 32 * 1024 * 1024   # interpreter, thread stacks and allocator noise
+        assert self._peak_growth(str(src), engine) < self._BUDGET + slack
+        enc = _find_enc(str(tmp_path), ".gfglock")
+        assert self._peak_growth(enc, engine) < self._BUDGET + slack
+        assert src.stat().st_size == size
+        with open(src, "rb") as f:
+            f.seek(size - 4096)
+            assert f.read() == bytes(4096)
+
+
+class TestMmapIO:
+    """The Python fallback's mmap read path produces the same files as plain reads."""
+
+    @pytest.fixture
+    def mapped(self, monkeypatch) -> list:
+        """Map every file regardless of size and record each mapping made."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        monkeypatch.setattr(segmented, "MMAP_THRESHOLD", 1)
+        made = []
+        real_mmap = segmented.mmap.mmap
+
+        def _spy(*args, **kwargs):
+            made.append(args)
+            return real_mmap(*args, **kwargs)
+        monkeypatch.setattr(segmented.mmap, "mmap", _spy)
+        return made
+
+    @pytest.mark.parametrize("algo", ["gcm", "cfb", "chacha"])
+    def test_segmented_roundtrip(self, tmp_path, password, mapped, algo):
+        """Encrypt and decrypt both map the file and round-trip several segments."""
+        data = os.urandom(2 * segmented.SEGMENT_SIZE + 777)
+        src = tmp_path / "big.bin"
+        src.write_bytes(data)
+        if algo == "chacha":
+            core, ext, kwargs = chacha_core, ".gfgcha", {}
+        else:
+            core, ext, kwargs = aes_core, (".gfglock" if algo == "gcm" else ".gfglck"), {"AEAD": algo == "gcm"}
+        ok, msg = core.encrypt_file(str(src), password, threads=2, use_mmap=True, **kwargs)
+        assert ok, msg
+        ok, msg = core.decrypt_file(_find_enc(str(tmp_path), ext), password, threads=2, use_mmap=True)
+        assert ok, msg
+        assert src.read_bytes() == data
+        assert len(mapped) == 2
+
+    def test_disabled_by_default(self, make_file, password, mapped):
+        """Without use_mmap nothing is mapped."""
+        src = make_file()
+        ok, _ = aes_core.encrypt_file(src, password)
+        assert ok
+        assert mapped == []
+
+    @pytest.mark.parametrize("ext", [".gfglock", ".gfglck", ".gfgcha"])
+    def test_legacy_chunked_roundtrip(self, tmp_path, password, mapped, ext):
+        """Legacy chunk loops decrypt from the mapping and still verify the trailing tag."""
+        data = os.urandom(3 * aes_core.BUFFER_SIZE + 5)
+        payload = b"legacy.bin\0" + data
+        salt = os.urandom(16)
+        key = native_bridge.derive_key(password, salt)
+        if ext == ".gfglock":
+            nonce = os.urandom(12)
+            body = AESGCM(key).encrypt(nonce, payload, None)
+        elif ext == ".gfglck":
+            nonce = os.urandom(16)
+            body = Cipher(algorithms.AES(key), modes.CFB(nonce)).encryptor().update(payload)
+        else:
+            nonce = os.urandom(12)
+            ct, tag = ChaCha20_Poly1305.new(key=key, nonce=nonce).encrypt_and_digest(payload)
+            body = ct + tag
+        enc = tmp_path / f"legacy{ext}"
+        enc.write_bytes(salt + nonce + (1).to_bytes(4, "big") + body)
+        core = chacha_core if ext == ".gfgcha" else aes_core
+        ok, msg = core.decrypt_file(str(enc), password, use_mmap=True)
+        assert ok, msg
+        assert (tmp_path / "legacy.bin").read_bytes() == data
+        assert len(mapped) == 1
+        assert not enc.exists()
+
+    def test_tampered_segment_rejected(self, tmp_path, password, mapped):
+        """Authentication still fails on a corrupted segment read from the mapping."""
+        src = tmp_path / "t.bin"
+        src.write_bytes(os.urandom(segmented.SEGMENT_SIZE + 10))
+        ok, _ = aes_core.encrypt_file(str(src), password, use_mmap=True)
+        enc = _find_enc(str(tmp_path), ".gfglock")
+        with open(enc, "r+b") as f:
+            f.seek(-40, os.SEEK_END)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 1]))
+        ok, msg = aes_core.decrypt_file(enc, password, use_mmap=True)
+        assert not ok
+        assert "authentication failed" in msg
+        assert not src.exists()
+
+    def test_small_files_are_read(self, tmp_path, monkeypatch):
+        """Files under MMAP_THRESHOLD (and empty files) are not mapped."""
+        path = tmp_path / "small.bin"
+        path.write_bytes(b"abc")
+        with open(path, "rb") as fin, segmented.mapped_file(fin) as view:
+            assert view is None
+        monkeypatch.setattr(segmented, "MMAP_THRESHOLD", 0)
+        path.write_bytes(b"")
+        with open(path, "rb") as fin, segmented.mapped_file(fin) as view:
+            assert view is None
+
+    def test_read_views_advance_file(self, tmp_path, monkeypatch):
+        """Mapped views cover exactly the requested bytes and leave fin just past them."""
+        monkeypatch.setattr(segmented, "MMAP_THRESHOLD", 1)
+        data = os.urandom(1000)
+        path = tmp_path / "v.bin"
+        path.write_bytes(data)
+        with open(path, "rb", buffering=0) as fin, segmented.mapped_file(fin) as mapped:
+            fin.seek(10)
+            parts = [bytes(v) for v in segmented.read_views(fin, 900, 256, mapped)]
+            assert [len(p) for p in parts] == [256, 256, 256, 132]
+            assert b"".join(parts) == data[10:910]
+            assert fin.tell() == 910
+
+
+class TestSessionKeys:
+    """Batch session keys: one PBKDF2 per batch, an HKDF-expanded key per file."""
+
+    @staticmethod
+    def _count_kdf(monkeypatch) -> list:
+        """Record every PBKDF2 call made through native_bridge.derive_key."""
+        calls: list = []
+        real = native_bridge.derive_key
+
+        def _counting(password, salt, *args, **kwargs):
+            calls.append(salt)
+            return real(password, salt, *args, **kwargs)
+
+        monkeypatch.setattr(native_bridge, "derive_key", _counting)
+        return calls
+
+    def test_batch_runs_pbkdf2_once(self, tmp_path, password, monkeypatch):
+        """Encrypting and then decrypting several files costs one PBKDF2 each way."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        calls = self._count_kdf(monkeypatch)
+        data = {f"f{i}.txt": os.urandom(100 + i) for i in range(4)}
+        for name, payload in data.items():
+            (tmp_path / name).write_bytes(payload)
+        keys = segmented.KeySession(password)
+        for name in data:
+            ok, msg = aes_core.encrypt_file(str(tmp_path / name), password, keys=keys)
+            assert ok, msg
+        assert len(calls) == 1
+
+        calls.clear()
+        keys = segmented.KeySession(password)
+        for enc in glob.glob(str(tmp_path / "*.gfglock")):
+            ok, msg = aes_core.decrypt_file(enc, password, keys=keys)
+            assert ok, msg
+        assert len(calls) == 1
+        for name, payload in data.items():
+            assert (tmp_path / name).read_bytes() == payload
+
+    def test_files_get_distinct_keys(self, tmp_path, password, monkeypatch):
+        """Files of one batch share the batch salt but carry distinct per-file salts."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        keys = segmented.KeySession(password)
+        for name in ("a.txt", "b.txt"):
+            (tmp_path / name).write_bytes(b"same content")
+            chacha_core.encrypt_file(str(tmp_path / name), password, keys=keys)
+        headers = []
+        for enc in sorted(glob.glob(str(tmp_path / "*.gfgcha"))):
+            with open(enc, "rb") as f:
+                headers.append(segmented.read_header(f, segmented.CHACHA))
+        assert all(h.flags & segmented.FLAG_SESSION_KEY for h in headers)
+        assert headers[0].salt == headers[1].salt == keys.salt
+        assert headers[0].file_salt != headers[1].file_salt
+        assert headers[0].key_check != headers[1].key_check
+
+    def test_session_file_decrypts_without_session(self, make_file, password, monkeypatch):
+        """A batch-encrypted file needs nothing but the password to decrypt on its own."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = make_file()
+        original = open(src, "rb").read()
+        aes_core.encrypt_file(src, password, AEAD=False, keys=segmented.KeySession(password))
+        ok, msg = aes_core.decrypt_file(_find_enc(os.path.dirname(src), ".gfglck"), password)
+        assert ok, msg
+        assert open(src, "rb").read() == original
+
+    @requires_native
+    @pytest.mark.parametrize("py_first", [True, False], ids=["py→native", "native→py"])
+    def test_session_cross_compat(self, make_file, password, py_first, monkeypatch):
+        """Session-keyed files written by one engine decrypt with the other."""
+        src = make_file()
+        original = open(src, "rb").read()
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", not py_first)
+        ok, msg = aes_core.encrypt_file(src, password, keys=segmented.KeySession(password))
+        assert ok, msg
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", py_first)
+        enc = _find_enc(os.path.dirname(src), ".gfglock")
+        ok, msg = aes_core.decrypt_file(enc, password, keys=segmented.KeySession(password))
+        assert ok, msg
+        assert open(src, "rb").read() == original
+
+    def test_prefetch_derives_missing_salts_once(self, password, monkeypatch):
+        """prefetch fills the cache in one batch; base_key then never re-derives."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        batches: list = []
+        real = native_bridge.derive_keys
+
+        def _counting(pw, salts, *args, **kwargs):
+            batches.append(list(salts))
+            return real(pw, salts, *args, **kwargs)
+
+        monkeypatch.setattr(native_bridge, "derive_keys", _counting)
+        calls = self._count_kdf(monkeypatch)
+        keys = segmented.KeySession(password)
+        salts = [os.urandom(16) for _ in range(3)]
+        keys.prefetch(salts + salts[:1])
+        keys.prefetch(salts)
+        assert batches == [salts]
+        for salt in salts:
+            assert keys.base_key(salt) == native_bridge.derive_key(password, salt)
+        assert len(calls) == 3  # only the reference derivations above
+
+    def test_evict_drops_key_until_requested_again(self, password, monkeypatch):
+        """An evicted key is re-derived on the next request; others stay cached."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        calls = self._count_kdf(monkeypatch)
+        keys = segmented.KeySession(password)
+        kept, dropped = os.urandom(16), os.urandom(16)
+        first = keys.base_key(dropped)
+        keys.base_key(kept)
+        keys.evict(dropped)
+        keys.evict(os.urandom(16))  # unknown salts are ignored
+        assert keys.base_key(dropped) == first
+        keys.base_key(kept)
+        assert calls == [dropped, kept, dropped]
+
+
+class TestEncryptStream:
+    """encrypt_stream must produce containers the file-based decrypt paths accept."""
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("algo,ext", [
+        ("aes256_gcm", ".gfglock"), ("aes256_cfb", ".gfglck"), ("chacha20_poly1305", ".gfgcha"),
+    ], ids=["gcm", "cfb", "chacha"])
+    def test_fileobj_roundtrip(self, tmp_path, password, algo, ext, use_native, monkeypatch):
+        """A file object streamed through encrypt_stream decrypts with decrypt_file."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(2 * _SEG + 999)
+        enc = tmp_path / f"export{ext}"
+        with open(enc, "wb") as dst:
+            n = encrypt_stream(io.BytesIO(data), dst, password, algo, name="export.csv", threads=2)
+        assert n == len(data)
+        core = chacha_core if algo == "chacha20_poly1305" else aes_core
+        ok, msg = core.decrypt_file(str(enc), password)
+        assert ok, f"Decrypt failed: {msg}"
+        assert (tmp_path / "export.csv").read_bytes() == data
+
+    def test_iterable_of_uneven_chunks(self, tmp_path, password, monkeypatch):
+        """Generators with arbitrary chunk sizes are regrouped into fixed segments."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        pieces = [os.urandom(n) for n in (10, _SEG, 3, _SEG // 2, 0, _SEG + 5)]
+        data = b"".join(pieces)
+        enc = tmp_path / "gen.gfglock"
+        with open(enc, "wb") as dst:
+            encrypt_stream((p for p in pieces), dst, password)
+        assert decrypt_range(str(enc), password, 0, len(data)) == data
+        assert decrypt_range(str(enc), password, _SEG - 2, 10) == data[_SEG - 2:_SEG + 8]
+
+    def test_nameless_stream_restores_container_stem(self, tmp_path, password, monkeypatch):
+        """Without a name, decrypt_file writes the plaintext under the container's stem."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        enc = tmp_path / "report.gfglock"
+        with open(enc, "wb") as dst:
+            encrypt_stream([b"hello"], dst, password)
+        ok, msg = aes_core.decrypt_file(str(enc), password)
+        assert ok, msg
+        assert (tmp_path / "report").read_bytes() == b"hello"
+
+    def test_unknown_algo_rejected(self, password):
+        """An unsupported algo name is a caller error."""
+        with pytest.raises(ValueError):
+            encrypt_stream([b"x"], io.BytesIO(), password, "rot13")
+
+
+class TestBuffers:
+    """encrypt_buffer/decrypt_buffer must write the file container in memory, natively or not."""
+
+    _EXTS = [("aes256_gcm", ".gfglock"), ("aes256_cfb", ".gfglck"), ("chacha20_poly1305", ".gfgcha")]
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("algo,ext", _EXTS, ids=["gcm", "cfb", "chacha"])
+    def test_container_decrypts_as_file(self, tmp_path, password, algo, ext, use_native, monkeypatch):
+        """Bytes from encrypt_buffer, saved to disk, decrypt with decrypt_file and restore the name."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(2 * _SEG + 321)
+        enc = tmp_path / f"blob{ext}"
+        enc.write_bytes(encrypt_buffer(data, password, algo, name="blob.bin", threads=2))
+        core = chacha_core if algo == "chacha20_poly1305" else aes_core
+        ok, msg = core.decrypt_file(str(enc), password)
+        assert ok, f"Decrypt failed: {msg}"
+        assert (tmp_path / "blob.bin").read_bytes() == data
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("algo,ext", _EXTS, ids=["gcm", "cfb", "chacha"])
+    def test_file_decrypts_as_buffer(self, tmp_path, password, algo, ext, use_native, monkeypatch):
+        """A container written by encrypt_file decrypts from memory."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(_SEG + 5)
+        src = tmp_path / "doc.bin"
+        src.write_bytes(data)
+        if algo == "chacha20_poly1305":
+            ok, msg = chacha_core.encrypt_file(str(src), password)
+        else:
+            ok, msg = aes_core.encrypt_file(str(src), password, AEAD=algo == "aes256_gcm")
+        assert ok, msg
+        with open(_find_enc(str(tmp_path), ext), "rb") as f:
+            assert decrypt_buffer(f.read(), password, algo) == data
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_buffer_protocol_inputs(self, tmp_path, password, use_native, monkeypatch):
+        """bytearray, memoryview and mmap inputs are accepted for both directions."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(_SEG + 77)
+        sealed = encrypt_buffer(bytearray(data), password, "chacha20_poly1305")
+        assert decrypt_buffer(memoryview(sealed), password, "chacha20_poly1305") == data
+        path = tmp_path / "sealed.bin"
+        path.write_bytes(sealed)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            assert decrypt_buffer(mapped, password, "chacha20_poly1305") == data
+        assert decrypt_buffer(encrypt_buffer(memoryview(data)[10:], password), password) == data[10:]
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("size", [0, _SEG], ids=["empty", "exact"])
+    def test_boundary_sizes(self, password, size, use_native, monkeypatch):
+        """Empty and exactly-one-segment payloads roundtrip."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(size)
+        assert decrypt_buffer(encrypt_buffer(data, password), password) == data
+
+    @requires_native
+    def test_native_and_python_interoperate(self, password, monkeypatch):
+        """Containers sealed natively open in Python and vice versa."""
+        data = os.urandom(2 * _SEG + 1)
+        native_sealed = encrypt_buffer(data, password)
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        python_sealed = encrypt_buffer(data, password)
+        assert decrypt_buffer(native_sealed, password) == data
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", True)
+        assert decrypt_buffer(python_sealed, password) == data
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_wrong_password_and_tampering_rejected(self, password, use_native, monkeypatch):
+        """A wrong password or a flipped ciphertext byte raises authentication failed."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        sealed = bytearray(encrypt_buffer(os.urandom(_SEG + 10), password))
+        with pytest.raises(ValueError, match="authentication failed"):
+            decrypt_buffer(sealed, "wrong-password")
+        sealed[-5] ^= 0xFF
+        with pytest.raises(ValueError, match="authentication failed"):
+            decrypt_buffer(sealed, password)
+
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=requires_native)],
+        ids=["python", "native"],
+    )
+    def test_session_keys(self, password, use_native, monkeypatch):
+        """A KeySession derives PBKDF2 once for a batch of buffers."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        keys = segmented.KeySession(password)
+        sealed = [encrypt_buffer(os.urandom(100), password, keys=keys) for _ in range(3)]
+        assert len(keys._keys) == 1
+        for blob in sealed:
+            assert len(decrypt_buffer(blob, password, keys=keys)) == 100
+        assert len(keys._keys) == 1
+
+    def test_legacy_layout_rejected(self, password):
+        """Legacy single-stream containers are not supported in memory."""
+        legacy = os.urandom(16 + 12) + (0).to_bytes(4, "big") + os.urandom(64)
+        with pytest.raises(ValueError, match="legacy"):
+            decrypt_buffer(legacy, password)
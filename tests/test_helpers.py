@@ -191,26 +191,33 @@ class TestPredictEncryptedSize:
     """predict_encrypted_size must add the exact per-mode metadata overhead."""
 
     def test_gcm_overhead(self, tmp_path):
-        """GCM mode overhead is salt+nonce+tag+chunk_field+null = 49 bytes."""
+        """GCM overhead is header(40) + key check(16) + iterations(4) + name tag(16) + one segment tag(16) = 92 bytes."""
         f = tmp_path / "file.txt"
         f.write_bytes(b"x" * 100)
-        expected = 100 + len(b"file.txt") + 49
+        expected = 100 + len(b"file.txt") + 92
         assert helpers.predict_encrypted_size(str(f), "GCM") == expected
 
     def test_cfb_overhead(self, tmp_path):
-        """CFB mode overhead is salt+iv+chunk_field+null = 37 bytes."""
+        """CFB overhead is the 64-byte header only (salt+iv+marker+sizes+key check+iterations, no tags)."""
         f = tmp_path / "file.txt"
         f.write_bytes(b"x" * 100)
-        expected = 100 + len(b"file.txt") + 37
+        expected = 100 + len(b"file.txt") + 64
         assert helpers.predict_encrypted_size(str(f), "CFB") == expected
 
     def test_chacha_overhead_matches_gcm(self, tmp_path):
-        """CHACHA mode shares the same 49-byte overhead as GCM."""
+        """CHACHA mode shares the same 92-byte overhead as GCM."""
         f = tmp_path / "file.txt"
         f.write_bytes(b"x" * 100)
-        expected = 100 + len(b"file.txt") + 49
+        expected = 100 + len(b"file.txt") + 92
         assert helpers.predict_encrypted_size(str(f), "CHACHA") == expected
 
+    def test_one_tag_per_segment(self, tmp_path):
+        """Every additional 1 MiB segment must add exactly one 16-byte tag."""
+        f = tmp_path / "file.txt"
+        f.write_bytes(b"x" * (2 * 1024 * 1024 + 1))
+        expected = 2 * 1024 * 1024 + 1 + len(b"file.txt") + 92 + 2 * 16
+        assert helpers.predict_encrypted_size(str(f), "GCM") == expected
+
     def test_mode_is_case_insensitive(self, tmp_path):
         """Lowercase mode strings must be normalized the same as uppercase."""
         f = tmp_path / "file.txt"
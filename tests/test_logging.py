@@ -1,3 +1,5 @@
+import gzip
+import json
 import os
 import re
 
@@ -8,6 +10,13 @@ from gfglock.utils import logging as log_mod
 _SEP_PATTERN = re.compile(r"^─{68}\n\n$")
 
 
+@pytest.fixture(autouse=True)
+def _isolated_journal(monkeypatch, tmp_path):
+    """Keep clear_logs and write_journal away from the real journal and traces."""
+    monkeypatch.setattr(log_mod, "get_journal_file", lambda: str(tmp_path / "journal.jsonl"))
+    monkeypatch.setattr(log_mod, "get_trace_file", lambda: str(tmp_path / "gfglock_trace_new.json"))
+
+
 class TestGetLogsDir:
     """get_logs_dir must resolve to the frozen-app data directory and create it."""
 
@@ -45,13 +54,14 @@ class TestLogFilePaths:
 
 
 class TestWriteCriticalLog:
-    """write_critical_log must append a timestamped line to the critical log file."""
+    """write_critical_log must queue a timestamped line for the critical log file."""
 
     def test_appends_timestamped_entry(self, monkeypatch, tmp_path):
         """A single write must produce one timestamped line with the message."""
         target = tmp_path / "critical.log"
         monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
         assert log_mod.write_critical_log("hello") is True
+        log_mod.flush_logs()
         content = target.read_text(encoding="utf-8")
         assert re.match(r"^\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\] hello\n$", content)
 
@@ -61,30 +71,66 @@ class TestWriteCriticalLog:
         monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
         log_mod.write_critical_log("first")
         log_mod.write_critical_log("second")
+        log_mod.flush_logs()
         lines = target.read_text(encoding="utf-8").splitlines()
         assert len(lines) == 2
         assert lines[0].endswith("first")
         assert lines[1].endswith("second")
 
-    def test_returns_false_on_write_failure(self, monkeypatch, tmp_path):
-        """An unwritable path must return False instead of raising."""
-        bad_path = str(tmp_path / "missing_dir" / "critical.log")
-        monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: bad_path)
-        assert log_mod.write_critical_log("hello") is False
+    def test_lands_after_entries_queued_earlier(self, monkeypatch, tmp_path):
+        """Entries share write_logs' queue, so they keep their order relative to it."""
+        target = tmp_path / "critical.log"
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True}})
+        monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
+        log_mod.write_logs(["queued"], level="critical")
+        log_mod.write_critical_log("direct")
+        log_mod.flush_logs()
+        lines = target.read_text(encoding="utf-8").splitlines()
+        assert [line.split("] ", 1)[1] for line in lines] == ["queued", "direct"]
 
 
 class TestWriteGeneralLog:
-    """write_general_log must append a timestamped line to the general log file."""
+    """write_general_log must queue a timestamped line for the general log file."""
 
     def test_appends_timestamped_entry(self, monkeypatch, tmp_path):
         """A single write must produce one timestamped line with the message."""
         target = tmp_path / "general.log"
         monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(target))
         assert log_mod.write_general_log("world") is True
+        log_mod.flush_logs()
         content = target.read_text(encoding="utf-8")
         assert re.match(r"^\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\] world\n$", content)
 
 
+class TestWriteFatalStartupLog:
+    """write_fatal_startup_log must put its entry on disk before returning."""
+
+    def test_written_after_queued_entries_before_returning(self, monkeypatch, tmp_path):
+        """Earlier queued entries are flushed first; no flush_logs() is needed afterwards."""
+        target = tmp_path / "critical.log"
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True}})
+        monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
+        log_mod.write_log("queued", level="critical")
+        assert log_mod.write_fatal_startup_log("Startup failed: boom") is True
+        lines = target.read_text(encoding="utf-8").splitlines()
+        assert [line.split("] ", 1)[1] for line in lines] == ["queued", "Startup failed: boom"]
+
+    def test_disabled_returns_false(self, monkeypatch, tmp_path):
+        """When logging is disabled, nothing is written."""
+        target = tmp_path / "critical.log"
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": False}})
+        monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
+        assert log_mod.write_fatal_startup_log("boom") is False
+        assert not target.exists()
+
+    def test_returns_false_on_write_failure(self, monkeypatch, tmp_path):
+        """An unwritable path must return False instead of raising."""
+        bad_path = str(tmp_path / "missing_dir" / "critical.log")
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True}})
+        monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: bad_path)
+        assert log_mod.write_fatal_startup_log("hello") is False
+
+
 class TestWriteLog:
     """write_log must respect the enable_logs flag and the log_level setting."""
 
@@ -99,6 +145,7 @@ class TestWriteLog:
         monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True, "log_level": "critical"}})
         monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
         assert log_mod.write_log("boom", level="critical") is True
+        log_mod.flush_logs()
         assert "boom" in target.read_text(encoding="utf-8")
 
     def test_general_level_skipped_when_log_level_critical(self, monkeypatch, tmp_path):
@@ -115,6 +162,7 @@ class TestWriteLog:
         monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True, "log_level": "all"}})
         monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(target))
         assert log_mod.write_log("info", level="general") is True
+        log_mod.flush_logs()
         assert "info" in target.read_text(encoding="utf-8")
 
     def test_settings_exception_returns_false(self, monkeypatch):
@@ -125,6 +173,46 @@ class TestWriteLog:
         assert log_mod.write_log("msg") is False
 
 
+class TestWriteLogs:
+    """write_logs must apply write_log's settings to a whole batch in one append."""
+
+    def test_batch_written_in_order(self, monkeypatch, tmp_path):
+        """Every message becomes its own timestamped line, in order."""
+        target = tmp_path / "general.log"
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True, "log_level": "all"}})
+        monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(target))
+        assert log_mod.write_logs(["one", "two", "three"]) is True
+        log_mod.flush_logs()
+        lines = target.read_text(encoding="utf-8").splitlines()
+        assert [line.split("] ", 1)[1] for line in lines] == ["one", "two", "three"]
+
+    def test_many_entries_all_written_in_order(self, monkeypatch, tmp_path):
+        """Entries queued faster than they are written must all land, in order, by flush_logs()."""
+        target = tmp_path / "critical.log"
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True}})
+        monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
+        for i in range(3000):
+            log_mod.write_log(f"entry {i}", level="critical")
+        log_mod.flush_logs()
+        lines = target.read_text(encoding="utf-8").splitlines()
+        assert [line.split("] ", 1)[1] for line in lines] == [f"entry {i}" for i in range(3000)]
+
+    def test_general_batch_skipped_when_log_level_critical(self, monkeypatch, tmp_path):
+        """General-level batches follow the log_level setting like single entries."""
+        target = tmp_path / "general.log"
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True, "log_level": "critical"}})
+        monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(target))
+        assert log_mod.write_logs(["info"]) is False
+        assert not target.exists()
+
+    def test_empty_batch_skips_settings(self, monkeypatch):
+        """Nothing to write must not even load settings."""
+        def raiser():
+            raise AssertionError("settings loaded")
+        monkeypatch.setattr(log_mod, "load_settings", raiser)
+        assert log_mod.write_logs([], level="critical") is False
+
+
 class TestWriteSessionSeparator:
     """write_session_separator must append a divider, gated by the same settings."""
 
@@ -134,6 +222,7 @@ class TestWriteSessionSeparator:
         monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": False}})
         monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(crit))
         log_mod.write_session_separator()
+        log_mod.flush_logs()
         assert not crit.exists()
 
     def test_writes_critical_only_by_default(self, monkeypatch, tmp_path):
@@ -144,6 +233,7 @@ class TestWriteSessionSeparator:
         monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(crit))
         monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(gen))
         log_mod.write_session_separator()
+        log_mod.flush_logs()
         assert _SEP_PATTERN.match(crit.read_text(encoding="utf-8"))
         assert not gen.exists()
 
@@ -155,10 +245,96 @@ class TestWriteSessionSeparator:
         monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(crit))
         monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(gen))
         log_mod.write_session_separator()
+        log_mod.flush_logs()
         assert _SEP_PATTERN.match(crit.read_text(encoding="utf-8"))
         assert _SEP_PATTERN.match(gen.read_text(encoding="utf-8"))
 
 
+class TestWriteJournal:
+    """write_journal must append one compact JSON object per record when logging is on."""
+
+    def test_records_written_as_json_lines(self, monkeypatch, tmp_path):
+        """Each record becomes its own parseable line, in order."""
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True}})
+        records = [{"path": "a.txt", "result": "ok", "kdf_ns": 5}, {"path": "b.txt", "result": "failed"}]
+        assert log_mod.write_journal(records) is True
+        log_mod.flush_logs()
+        lines = (tmp_path / "journal.jsonl").read_text(encoding="utf-8").splitlines()
+        assert [json.loads(line) for line in lines] == records
+
+    def test_disabled_returns_false(self, monkeypatch, tmp_path):
+        """With logging off nothing is queued or written."""
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": False}})
+        assert log_mod.write_journal([{"path": "a.txt"}]) is False
+        log_mod.flush_logs()
+        assert not (tmp_path / "journal.jsonl").exists()
+
+
+class TestTraceEnabled:
+    """GFGLOCK_TRACE must override the trace_timeline setting."""
+
+    @pytest.mark.parametrize("env, setting, expected", [
+        ("", True, True), ("", False, False), ("1", False, True), ("0", True, False),
+    ])
+    def test_env_overrides_setting(self, monkeypatch, env, setting, expected):
+        """An empty variable defers to the setting; "0" forces tracing off."""
+        monkeypatch.setenv("GFGLOCK_TRACE", env)
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"trace_timeline": setting}})
+        assert log_mod.trace_enabled() is expected
+
+
+class TestRotation:
+    """Logs past LOG_MAX_BYTES must be rotated into a bounded set of gzip archives."""
+
+    def _write_batches(self, monkeypatch, target, batches: int) -> None:
+        monkeypatch.setattr(log_mod, "load_settings", lambda: {"advanced": {"enable_logs": True}})
+        monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(target))
+        for i in range(batches):
+            log_mod.write_logs([f"batch {i} line {j} " + "x" * 40 for j in range(10)], level="critical")
+            log_mod.flush_logs()
+
+    def test_rotates_and_keeps_newest_archives(self, monkeypatch, tmp_path):
+        """Each overflow moves the log to .1.gz, shifts older archives and drops the oldest."""
+        monkeypatch.setattr(log_mod, "LOG_MAX_BYTES", 1000)
+        monkeypatch.setattr(log_mod, "LOG_ARCHIVES", 2)
+        target = tmp_path / "critical.log"
+        self._write_batches(monkeypatch, target, 4)
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["critical.log", "critical.log.1.gz", "critical.log.2.gz"]
+        assert "batch 3" in target.read_text(encoding="utf-8")
+        assert "batch 2 line 0" in gzip.decompress((tmp_path / "critical.log.1.gz").read_bytes()).decode()
+        assert "batch 1 line 9" in gzip.decompress((tmp_path / "critical.log.2.gz").read_bytes()).decode()
+
+    def test_small_logs_are_not_rotated(self, monkeypatch, tmp_path):
+        """Logs under the limit stay a single file."""
+        target = tmp_path / "critical.log"
+        self._write_batches(monkeypatch, target, 3)
+        assert [p.name for p in tmp_path.iterdir()] == ["critical.log"]
+
+    def test_failed_rotation_keeps_every_entry(self, monkeypatch, tmp_path):
+        """If the full log can't be moved aside (e.g. held open on Windows), batches still append to it."""
+        monkeypatch.setattr(log_mod, "LOG_MAX_BYTES", 1000)
+
+        def locked(src, dst):
+            raise PermissionError("log file is in use")
+
+        monkeypatch.setattr(log_mod.os, "replace", locked)
+        target = tmp_path / "critical.log"
+        self._write_batches(monkeypatch, target, 4)
+        assert [p.name for p in tmp_path.iterdir()] == ["critical.log"]
+        text = target.read_text(encoding="utf-8")
+        assert all(f"batch {i} line 9" in text for i in range(4))
+
+    def test_clear_logs_removes_archives(self, monkeypatch, tmp_path):
+        """clear_logs wipes the archives along with the live log."""
+        monkeypatch.setattr(log_mod, "LOG_MAX_BYTES", 1000)
+        target = tmp_path / "critical.log"
+        self._write_batches(monkeypatch, target, 3)
+        monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(tmp_path / "general.log"))
+        assert log_mod.clear_logs() is True
+        assert [p.name for p in tmp_path.iterdir()] == ["critical.log"]
+        assert target.read_text(encoding="utf-8") == ""
+
+
 class TestClearLogs:
     """clear_logs must truncate existing log files and leave missing ones alone."""
 
@@ -166,13 +342,22 @@ class TestClearLogs:
         """Pre-populated log files must be emptied, not deleted."""
         crit = tmp_path / "critical.log"
         gen = tmp_path / "general.log"
+        journal = tmp_path / "journal.jsonl"
         crit.write_text("old critical data", encoding="utf-8")
         gen.write_text("old general data", encoding="utf-8")
+        journal.write_text('{"path":"old"}\n', encoding="utf-8")
         monkeypatch.setattr(log_mod, "get_critical_log_file", lambda: str(crit))
         monkeypatch.setattr(log_mod, "get_general_log_file", lambda: str(gen))
+        trace = tmp_path / "gfglock_trace_20260101_000000_000000.json"
+        trace.write_text("{}", encoding="utf-8")
+        profile = tmp_path / "gfglock_profile_worker_20260101_000000_000000.prof"
+        profile.write_bytes(b"prof")
         assert log_mod.clear_logs() is True
         assert crit.read_text(encoding="utf-8") == ""
         assert gen.read_text(encoding="utf-8") == ""
+        assert journal.read_text(encoding="utf-8") == ""
+        assert not trace.exists()
+        assert not profile.exists()
 
     def test_missing_files_are_left_untouched(self, monkeypatch, tmp_path):
         """Files that don't exist must not be created by clear_logs."""
@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from gfglock.utils import metrics
+
+
+@pytest.fixture
+def registry():
+    """A private registry so tests don't see the worker's process-wide metrics."""
+    return metrics.Registry()
+
+
+class TestRender:
+    """Registries must render the text exposition format the textfile collector parses."""
+
+    def test_counter_samples_per_label_set(self, registry):
+        """Each label set is one sample line under a single HELP/TYPE header."""
+        files = registry.counter("demo_files_total", "Files seen.", ("op", "result"))
+        files.inc(op="encrypt", result="ok")
+        files.inc(2, op="encrypt", result="ok")
+        files.inc(op="decrypt", result="failed")
+        assert registry.render().splitlines() == [
+            "# HELP demo_files_total Files seen.",
+            "# TYPE demo_files_total counter",
+            'demo_files_total{op="decrypt",result="failed"} 1',
+            'demo_files_total{op="encrypt",result="ok"} 3',
+            "# EOF",
+        ]
+
+    def test_histogram_buckets_are_cumulative(self, registry):
+        """Buckets count observations at or below their bound; +Inf, _sum and _count close the series."""
+        latency = registry.histogram("demo_seconds", "Latency.", ("op",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value, op="encrypt")
+        lines = registry.render().splitlines()
+        assert lines[2:8] == [
+            'demo_seconds_bucket{op="encrypt",le="0.1"} 2',
+            'demo_seconds_bucket{op="encrypt",le="1.0"} 3',
+            'demo_seconds_bucket{op="encrypt",le="+Inf"} 4',
+            'demo_seconds_sum{op="encrypt"} 3.65',
+            'demo_seconds_count{op="encrypt"} 4',
+            "# EOF",
+        ]
+
+    def test_label_values_are_escaped(self, registry):
+        """Quotes, backslashes and newlines in label values cannot break the line format."""
+        registry.counter("demo_total", "Demo.", ("algo",)).inc(algo='a"b\\c\nd')
+        assert 'demo_total{algo="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+class TestObserveFile:
+    """observe_file must turn one file's outcome and FileStats fields into metric updates."""
+
+    def test_success_feeds_counters_and_histograms(self):
+        """A successful file adds its bytes and one latency, KDF and throughput observation."""
+        labels = {"op": "encrypt", "algo": "demo-ok"}
+        metrics.observe_file("encrypt", "demo-ok", "ok",
+                             {"bytes_in": 2 * 1024 * 1024, "elapsed_ns": 500_000_000, "kdf_ns": 100_000_000})
+        assert metrics.FILES.value(result="ok", **labels) == 1
+        assert metrics.BYTES.value(**labels) == 2 * 1024 * 1024
+        assert metrics.FILE_SECONDS.count(**labels) == 1
+        assert metrics.KDF_SECONDS.count(**labels) == 1
+        assert 'gfglock_file_throughput_mbps_sum{op="encrypt",algo="demo-ok"} 4.0' in metrics.REGISTRY.render()
+
+    def test_failures_and_skips_only_counted(self):
+        """Failed and skipped files add to the outcome counter without timings; a missing algo is "unknown"."""
+        metrics.observe_file("decrypt", None, "failed", {"bytes_in": 10, "elapsed_ns": 5})
+        metrics.observe_file("decrypt", None, "skipped")
+        labels = {"op": "decrypt", "algo": "unknown"}
+        assert metrics.FILES.value(result="failed", **labels) == 1
+        assert metrics.FILES.value(result="skipped", **labels) == 1
+        assert metrics.BYTES.value(**labels) == 0
+        assert metrics.FILE_SECONDS.count(**labels) == 0
+
+
+class TestMetricsFile:
+    """get_metrics_file and write_metrics decide where metrics go and write them safely."""
+
+    def test_env_names_the_file(self, monkeypatch, tmp_path):
+        """GFGLOCK_METRICS_FILE turns exporting on regardless of the setting."""
+        target = str(tmp_path / "textfile" / "gfglock.prom")
+        monkeypatch.setenv("GFGLOCK_METRICS_FILE", target)
+        monkeypatch.setattr(metrics, "load_settings", lambda: {"advanced": {"export_metrics": False}})
+        assert metrics.get_metrics_file() == target
+
+    @pytest.mark.parametrize("enabled", [True, False])
+    def test_setting_uses_logs_folder(self, monkeypatch, tmp_path, enabled):
+        """Without the variable, the export_metrics setting writes gfglock.prom to the logs folder."""
+        monkeypatch.delenv("GFGLOCK_METRICS_FILE", raising=False)
+        monkeypatch.setattr(metrics, "load_settings", lambda: {"advanced": {"export_metrics": enabled}})
+        monkeypatch.setattr(metrics, "get_logs_dir", lambda: str(tmp_path))
+        expected = str(tmp_path / "gfglock.prom") if enabled else None
+        assert metrics.get_metrics_file() == expected
+
+    def test_write_replaces_file_without_leftovers(self, registry, tmp_path):
+        """The rendered text replaces the target and no temporary file remains."""
+        registry.counter("demo_total", "Demo.").inc()
+        target = tmp_path / "gfglock.prom"
+        target.write_text("stale", encoding="utf-8")
+        assert metrics.write_metrics(str(target), registry) is True
+        assert target.read_text(encoding="utf-8") == registry.render()
+        assert os.listdir(tmp_path) == ["gfglock.prom"]
+
+    def test_write_failure_returns_false(self, registry, tmp_path):
+        """An unwritable destination is reported, not raised."""
+        assert metrics.write_metrics(str(tmp_path / "missing" / "gfglock.prom"), registry) is False
@@ -5,7 +5,7 @@ import sys
 
 import pytest
 
-from gfglock.core import native_bridge
+from gfglock.core import native_bridge, segmented
 
 _MISSING = object()
 
@@ -57,7 +57,7 @@ class TestNativeAvailableFlag:
         """When native is available, every wrapped C++ function must be present and callable."""
         native = native_bridge._native
         assert native is not None
-        names = ("pbkdf2_sha256",) + _WRAPPER_NAMES
+        names = ("pbkdf2_sha256", "pbkdf2_sha256_batch", "seal_segments") + _WRAPPER_NAMES
         for name in names:
             func = getattr(native, name, None)
             assert callable(func), f"{name} missing or not callable on native module"
@@ -96,6 +96,53 @@ class TestDeriveKey:
         assert native_key == python_key
 
 
+class TestDeriveKeys:
+    """Coverage for the batched PBKDF2 wrapper used to pre-derive many salts."""
+
+    _SALTS = [bytes([i]) * 16 for i in range(5)]
+
+    def _expected(self) -> list:
+        return [hashlib.pbkdf2_hmac("sha256", b"secret", s, 1000, dklen=32) for s in self._SALTS]
+
+    def test_fallback_keys_in_order(self, monkeypatch):
+        """Without native, one key per salt comes back in input order."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        assert native_bridge.derive_keys("secret", self._SALTS, iterations=1000, threads=3) == self._expected()
+
+    def test_empty_batch(self):
+        """No salts means no work and an empty list."""
+        assert native_bridge.derive_keys("secret", []) == []
+
+    @requires_native
+    @pytest.mark.parametrize("threads", [0, 1, 4])
+    def test_native_matches_py(self, threads):
+        """The native thread pool must produce the same keys as hashlib, in order."""
+        assert native_bridge.derive_keys("secret", self._SALTS, iterations=1000, threads=threads) == self._expected()
+
+
+class TestCalibrateIterations:
+    """calibrate_iterations must scale measured PBKDF2 speed to the target latency."""
+
+    @staticmethod
+    def _fake_clock(monkeypatch, probe_seconds: float) -> None:
+        """Make every timed probe appear to take probe_seconds without running PBKDF2."""
+        ticks = iter(i * probe_seconds for i in range(100))
+        monkeypatch.setattr(native_bridge.time, "perf_counter", lambda: next(ticks))
+        monkeypatch.setattr(native_bridge, "derive_key", lambda *_a, **_k: b"")
+
+    def test_scales_and_rounds(self, monkeypatch):
+        """20,000 iterations in 10 ms is 2M/s, so a 500 ms target gives 1,000,000."""
+        self._fake_clock(monkeypatch, 0.01)
+        assert native_bridge.calibrate_iterations(500) == 1000000
+
+    def test_clamped_to_bounds(self, monkeypatch):
+        """Very slow and very fast machines stay within the supported range."""
+        self._fake_clock(monkeypatch, 10.0)
+        assert native_bridge.calibrate_iterations(500) == native_bridge.MIN_KDF_ITERATIONS
+        self._fake_clock(monkeypatch, 1e-6)
+        assert native_bridge.calibrate_iterations(500) == native_bridge.MAX_KDF_ITERATIONS
+
+
 class TestFallbackWrappers:
     """When NATIVE_AVAILABLE is False, every wrapper must degrade without raising."""
 
@@ -112,6 +159,30 @@ class TestFallbackWrappers:
         assert isinstance(msg, str) and msg
 
 
+class TestSealSegments:
+    """Coverage for the batch segment-sealing wrapper used by streaming encrypt."""
+
+    def test_fallback_returns_none(self, monkeypatch):
+        """Without native, seal_segments must return None so callers use the Python path."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        assert native_bridge.seal_segments("aes256_gcm", b"k" * 32, b"n" * 12, 1, [b"x"], True) is None
+
+    @requires_native
+    @pytest.mark.parametrize("algo", ["aes256_gcm", "aes256_cfb", "chacha20_poly1305"])
+    def test_native_matches_py(self, algo):
+        """Natively sealed segments must be byte-identical to the Python suite's output."""
+        suite = segmented.SUITES[algo]
+        key, nonce = os.urandom(32), os.urandom(suite.nonce_size)
+        parts = [os.urandom(1000), os.urandom(1000), os.urandom(17)]
+        sealed = native_bridge.seal_segments(algo, key, nonce, 5, parts, True, threads=2)
+        expected = [
+            suite.seal(key, segmented.segment_nonce(nonce, 5 + i),
+                       segmented.segment_aad(5 + i, i == len(parts) - 1), p)
+            for i, p in enumerate(parts)
+        ]
+        assert sealed == expected
+
+
 class TestPathHelpers:
     """Coverage for the directory-resolution helpers used to locate the .pyd."""
 
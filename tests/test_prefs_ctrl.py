@@ -5,8 +5,8 @@ from unittest.mock import MagicMock
 import pytest
 from PySide6.QtWidgets import QApplication
 
-from gfglock.config.defaults import EncryptionDefaults
-from gfglock.config.ui_config import ChunkSizeOptions, EncryptionModes
+from gfglock.config.defaults import EncryptionDefaults, PerformanceDefaults
+from gfglock.config.ui_config import ChunkSizeOptions, EncryptionModes, MemoryBudgetOptions
 from gfglock.controllers import prefs_ctrl
 from gfglock.controllers.prefs_ctrl import PrefsController
 from gfglock.core import native_bridge
@@ -30,13 +30,22 @@ def _make_settings() -> dict:
     return {
         "theme": "dark",
         "appearance": {"log_text_wrap": False},
-        "encryption": {"cpu_threads": 4, "chunk_size": 8 * 1024 * 1024, "encrypt_filenames": True},
+        "encryption": {
+            "cpu_threads": 4, "chunk_size": 8 * 1024 * 1024, "encrypt_filenames": True, "batch_keys": False,
+            "kdf_iterations": 400000, "kdf_target_ms": 250,
+        },
         "decryption": {"cpu_threads": 2, "chunk_size": None},
         "advanced": {
             "encryption_mode": "chacha20_poly1305",
             "enable_logs": True,
             "log_level": "all",
             "clamp_cpu_threads": False,
+            "memory_budget_mb": 512,
+            "mmap_io": True,
+            "trace_timeline": True,
+            "export_metrics": True,
+            "profile_operations": True,
+            "profile_memory": False,
             "operation_notifications": False,
         },
     }
@@ -57,11 +66,20 @@ class TestProperties:
         assert controller.theme == "dark"
         assert controller.encThreads == 4
         assert controller.encFilenames is True
+        assert controller.batchKeys is False
+        assert controller.kdfIterations == 400000
+        assert controller.kdfTargetMs == 250
         assert controller.decThreads == 2
         assert controller.encMode == "chacha20_poly1305"
         assert controller.enableLogs is True
         assert controller.logLevel == "all"
         assert controller.clampThreads is False
+        assert controller.memoryBudgetMb == 512
+        assert controller.mmapIo is True
+        assert controller.traceTimeline is True
+        assert controller.exportMetrics is True
+        assert controller.profileOperations is True
+        assert controller.profileMemory is False
         assert controller.logTextWrap is False
         assert controller.operationNotifications is False
 
@@ -96,6 +114,12 @@ class TestProperties:
         assert options[0] == {"label": expected_first_label, "value": -1}
         assert all(isinstance(o["value"], int) for o in options)
 
+    def test_memory_budget_options_from_ui_config(self, controller):
+        """memoryBudgetOptions must mirror MemoryBudgetOptions and include the default."""
+        options = controller.memoryBudgetOptions
+        assert options == [{"label": label, "value": val} for label, val in MemoryBudgetOptions.get_options()]
+        assert PerformanceDefaults.MEMORY_BUDGET_MB in [o["value"] for o in options]
+
     def test_native_available_reflects_bridge(self, controller, monkeypatch):
         """nativeAvailable must mirror native_bridge.NATIVE_AVAILABLE."""
         monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", True)
@@ -160,6 +184,14 @@ class TestLoadSettings:
         assert controller.theme == "light"
         spy.assert_called_once()
 
+    def test_invalidates_cache_before_reading(self, controller, monkeypatch):
+        """An explicit reload must bypass the settings cache."""
+        order = []
+        monkeypatch.setattr(prefs_ctrl, "invalidate_settings_cache", lambda: order.append("invalidate"))
+        monkeypatch.setattr(prefs_ctrl, "load_settings", lambda: order.append("load") or _make_settings())
+        controller.loadSettings()
+        assert order == ["invalidate", "load"]
+
     def test_swallows_failure(self, controller, monkeypatch):
         """A load_settings() failure must not propagate or change state."""
         old_theme = controller.theme
@@ -280,6 +312,25 @@ class TestResetDefaults:
             pytest.fail(f"resetDefaults() must not raise: {exc}")
 
 
+class TestCalibrateKdf:
+    """calibrateKdf() must return a measured iteration count without saving it."""
+
+    def test_returns_measured_count(self, controller, monkeypatch):
+        """The target latency is passed through and the measured count returned as-is."""
+        calibrate = MagicMock(return_value=750000)
+        monkeypatch.setattr(native_bridge, "calibrate_iterations", calibrate)
+        save_mock = MagicMock()
+        monkeypatch.setattr(prefs_ctrl, "save_settings", save_mock)
+        assert controller.calibrateKdf(300) == 750000
+        calibrate.assert_called_once_with(300)
+        save_mock.assert_not_called()
+
+    def test_failure_falls_back_to_current_setting(self, controller, monkeypatch):
+        """A failed measurement leaves the configured count in place."""
+        monkeypatch.setattr(native_bridge, "calibrate_iterations", _raise)
+        assert controller.calibrateKdf(300) == controller.kdfIterations
+
+
 class TestClearLogs:
     """clearLogs() must delete log files and notify QML."""
 
@@ -0,0 +1,65 @@
+import pstats
+import threading
+
+import pytest
+
+from gfglock.utils import profiling
+
+
+@pytest.fixture
+def logs_dir(monkeypatch, tmp_path):
+    """Send reports to a temporary logs folder."""
+    monkeypatch.setattr(profiling, "get_logs_dir", lambda: str(tmp_path))
+    return tmp_path
+
+
+def _busy_pool_work() -> int:
+    return sum(i * i for i in range(1000))
+
+
+class TestProfilingMode:
+    """GFGLOCK_PROFILE must override the profile_operations and profile_memory settings."""
+
+    @pytest.mark.parametrize("env, operations, memory, expected", [
+        ("", False, True, ""), ("", True, False, "cpu"), ("", True, True, "memory"),
+        ("1", False, False, "cpu"), ("memory", False, False, "memory"), ("0", True, True, ""),
+    ])
+    def test_env_overrides_settings(self, monkeypatch, env, operations, memory, expected):
+        """An empty variable defers to the settings; "0" forces profiling off."""
+        monkeypatch.setenv("GFGLOCK_PROFILE", env)
+        monkeypatch.setattr(profiling, "load_settings", lambda: {
+            "advanced": {"profile_operations": operations, "profile_memory": memory}})
+        assert profiling.profiling_mode() == expected
+
+    def test_start_profiler_off_returns_none(self, monkeypatch):
+        """Nothing is started while profiling is off."""
+        monkeypatch.setenv("GFGLOCK_PROFILE", "0")
+        assert profiling.start_profiler("worker") is None
+
+
+class TestProfiler:
+    """A Profiler must capture its own thread and wrapped pool work, then write its reports."""
+
+    def test_prof_includes_wrapped_pool_threads(self, logs_dir):
+        """Work run through wrap() on another thread lands in the saved .prof."""
+        profiler = profiling.Profiler("worker").start()
+        worker = threading.Thread(target=profiler.wrap(_busy_pool_work))
+        worker.start()
+        worker.join()
+        paths = profiler.save()
+        assert len(paths) == 1 and paths[0].endswith(".prof")
+        assert paths[0].startswith(str(logs_dir / "gfglock_profile_worker_"))
+        functions = {name for _file, _line, name in pstats.Stats(paths[0]).stats}
+        assert "_busy_pool_work" in functions
+
+    def test_memory_report_lists_top_allocations(self, logs_dir):
+        """With memory on, a tracemalloc report is written next to the profile and tracing stops."""
+        profiler = profiling.Profiler("boot", memory=True).start()
+        held = [bytearray(64 * 1024) for _ in range(16)]
+        paths = profiler.save()
+        assert len(held) == 16
+        assert paths[1] == paths[0][:-len(".prof")] + "_memory.txt"
+        report = open(paths[1], encoding="utf-8").read()
+        assert "Top 30 allocation sites by growth since start:" in report
+        assert "test_profiling.py" in report
+        assert not profiling.tracemalloc.is_tracing()
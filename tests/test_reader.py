@@ -0,0 +1,148 @@
+import glob
+import hashlib
+import os
+
+import pytest
+
+from gfglock.core import aes256_gcm_cfb as aes_core
+from gfglock.core import chacha20_poly1305 as chacha_core
+from gfglock.core import decrypt_range, native_bridge, open_encrypted, segmented
+
+_SEG = segmented.SEGMENT_SIZE
+
+
+@pytest.fixture
+def big_gcm(tmp_path, password, monkeypatch):
+    """A three-and-a-bit segment .gfglock file and its plaintext."""
+    monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+    data = os.urandom(3 * _SEG + 4321)
+    src = tmp_path / "archive.bin"
+    src.write_bytes(data)
+    ok, msg = aes_core.encrypt_file(str(src), password, AEAD=True)
+    assert ok, msg
+    return glob.glob(str(tmp_path / "*.gfglock"))[0], data
+
+
+class TestDecryptRange:
+    """decrypt_range must return exact plaintext slices and authenticate what it reads."""
+
+    @pytest.mark.parametrize("offset,length", [
+        (0, 10),
+        (_SEG - 5, 10),            # straddles a segment boundary
+        (_SEG, _SEG),              # exactly one segment
+        (123, 2 * _SEG + 7),       # spans three segments
+        (3 * _SEG + 4000, 1000),   # runs past the end
+    ])
+    def test_slices_match_plaintext(self, big_gcm, password, offset, length):
+        """Each range must equal the same slice of the original plaintext."""
+        enc, data = big_gcm
+        assert decrypt_range(enc, password, offset, length) == data[offset:offset + length]
+
+    def test_source_file_left_untouched(self, big_gcm, password):
+        """Range reads must neither remove the container nor write plaintext to disk."""
+        enc, _ = big_gcm
+        before = sorted(os.listdir(os.path.dirname(enc)))
+        decrypt_range(enc, password, 0, 100)
+        assert sorted(os.listdir(os.path.dirname(enc))) == before
+
+    def test_empty_and_out_of_bounds(self, big_gcm, password):
+        """Zero-length and beyond-EOF reads return empty bytes."""
+        enc, data = big_gcm
+        assert decrypt_range(enc, password, 10, 0) == b""
+        assert decrypt_range(enc, password, len(data) + 1, 10) == b""
+
+    def test_negative_arguments_rejected(self, big_gcm, password):
+        """A negative offset is a caller error."""
+        enc, _ = big_gcm
+        with pytest.raises(ValueError):
+            decrypt_range(enc, password, -1, 10)
+
+    def test_wrong_password_rejected(self, big_gcm):
+        """A wrong password fails on the name block before any segment is read."""
+        enc, _ = big_gcm
+        with pytest.raises(ValueError, match="authentication failed"):
+            decrypt_range(enc, "wrong-password", 0, 10)
+
+    def test_tampered_segment_rejected_only_when_touched(self, big_gcm, password):
+        """Corruption in segment 2 fails ranges inside it but not ranges in segment 1."""
+        enc, data = big_gcm
+        with open(enc, "r+b") as f:
+            header = segmented.read_header(f, segmented.GCM)
+            f.seek(header.data_offset + header.stored_segment_size + 50)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        assert decrypt_range(enc, password, 0, 100) == data[:100]
+        with pytest.raises(ValueError, match="authentication failed"):
+            decrypt_range(enc, password, _SEG + 10, 100)
+
+    def test_chacha_range(self, tmp_path, password, monkeypatch):
+        """ChaCha20-Poly1305 containers support range reads too."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        data = os.urandom(_SEG + 99)
+        src = tmp_path / "c.bin"
+        src.write_bytes(data)
+        chacha_core.encrypt_file(str(src), password)
+        enc = glob.glob(str(tmp_path / "*.gfgcha"))[0]
+        assert decrypt_range(enc, password, _SEG - 1, 50) == data[_SEG - 1:_SEG + 49]
+
+    def test_legacy_layout_rejected(self, tmp_path, password):
+        """Legacy single-stream files cannot be range-read."""
+        legacy = tmp_path / "old.gfglock"
+        legacy.write_bytes(os.urandom(16 + 12) + (0).to_bytes(4, "big") + os.urandom(64))
+        with pytest.raises(ValueError, match="legacy"):
+            decrypt_range(str(legacy), password, 0, 10)
+
+
+class TestOpenEncrypted:
+    """open_encrypted must behave like a read-only binary file over the plaintext."""
+
+    def test_read_all(self, big_gcm, password):
+        """Reading to EOF yields the full plaintext."""
+        enc, data = big_gcm
+        with open_encrypted(enc, password) as f:
+            assert f.read() == data
+
+    def test_incremental_reads_and_hash(self, big_gcm, password):
+        """Small sequential reads across segment boundaries reassemble the plaintext."""
+        enc, data = big_gcm
+        digest = hashlib.sha256()
+        with open_encrypted(enc, password) as f:
+            for block in iter(lambda: f.read(77777), b""):
+                digest.update(block)
+        assert digest.digest() == hashlib.sha256(data).digest()
+
+    def test_seek_and_tell(self, big_gcm, password):
+        """Seeking from start, current and end positions lands on the right bytes."""
+        enc, data = big_gcm
+        with open_encrypted(enc, password) as f:
+            f.seek(_SEG + 3)
+            assert f.read(5) == data[_SEG + 3:_SEG + 8]
+            f.seek(-10, os.SEEK_END)
+            assert f.read() == data[-10:]
+            f.seek(0)
+            f.seek(100, os.SEEK_CUR)
+            assert f.tell() == 100
+            assert f.read(1) == data[100:101]
+
+    def test_leaves_container_in_place(self, big_gcm, password):
+        """Streaming must not write plaintext next to the container or delete it."""
+        enc, _ = big_gcm
+        before = sorted(os.listdir(os.path.dirname(enc)))
+        with open_encrypted(enc, password) as f:
+            f.read(10)
+        assert sorted(os.listdir(os.path.dirname(enc))) == before
+
+    def test_wrong_password_rejected_on_open(self, big_gcm):
+        """Authentication of the header happens before a reader is returned."""
+        enc, _ = big_gcm
+        with pytest.raises(ValueError, match="authentication failed"):
+            open_encrypted(enc, "wrong-password")
+
+    def test_read_after_close_fails(self, big_gcm, password):
+        """A closed reader refuses further reads."""
+        enc, _ = big_gcm
+        f = open_encrypted(enc, password)
+        f.close()
+        with pytest.raises(ValueError):
+            f.read(1)
@@ -77,6 +77,44 @@ class TestLoadSettings:
         assert settings_mod.load_settings() == settings_mod.get_default_settings()
 
 
+class TestSettingsCache:
+    """load_settings must parse settings.json once per on-disk version."""
+
+    def test_unchanged_file_parsed_once(self, monkeypatch, tmp_path):
+        """Repeated loads of an unchanged file must not re-read it, and return independent copies."""
+        target = tmp_path / "settings.json"
+        target.write_text(json.dumps({"theme": "dark"}), encoding="utf-8")
+        monkeypatch.setattr(settings_mod, "get_settings_file", lambda: str(target))
+        reads = []
+        real_read = settings_mod._read_settings
+        monkeypatch.setattr(settings_mod, "_read_settings", lambda path: reads.append(path) or real_read(path))
+        first = settings_mod.load_settings()
+        first["theme"] = "mutated"
+        assert settings_mod.load_settings()["theme"] == "dark"
+        assert len(reads) == 1
+
+    def test_external_change_is_picked_up(self, monkeypatch, tmp_path):
+        """A file rewritten behind the cache's back (new size or mtime) must be re-read."""
+        target = tmp_path / "settings.json"
+        target.write_text(json.dumps({"theme": "dark"}), encoding="utf-8")
+        monkeypatch.setattr(settings_mod, "get_settings_file", lambda: str(target))
+        assert settings_mod.load_settings()["theme"] == "dark"
+        target.write_text(json.dumps({"theme": "light", "x": 1}), encoding="utf-8")
+        assert settings_mod.load_settings()["theme"] == "light"
+
+    def test_save_and_invalidate_drop_the_cache(self, monkeypatch, tmp_path):
+        """save_settings and invalidate_settings_cache both force the next load to re-read."""
+        target = tmp_path / "settings.json"
+        monkeypatch.setattr(settings_mod, "get_settings_file", lambda: str(target))
+        settings_mod.load_settings()
+        assert settings_mod._cache is not None
+        settings_mod.save_settings({"theme": "light"})
+        assert settings_mod._cache is None
+        assert settings_mod.load_settings()["theme"] == "light"
+        settings_mod.invalidate_settings_cache()
+        assert settings_mod._cache is None
+
+
 class TestSaveSettings:
     """save_settings must persist a settings dict to disk as JSON."""
 
@@ -0,0 +1,66 @@
+import json
+import threading
+
+import pytest
+
+from gfglock.core import tracing
+
+
+@pytest.fixture(autouse=True)
+def _no_leftover_tracer():
+    """Never leave a tracer active for other tests."""
+    yield
+    tracing.stop()
+
+
+class TestInactive:
+    """Without an active tracer, span() and record() must do nothing."""
+
+    def test_span_and_record_are_noops(self):
+        """Nothing is collected and no tracer appears."""
+        with tracing.span("idle", "test"):
+            pass
+        tracing.record("idle", "test", 0, 1)
+        assert tracing.stop() is None
+
+
+class TestTracer:
+    """An active tracer must collect complete events tagged by thread."""
+
+    def test_spans_from_several_threads(self):
+        """Each thread's spans carry its native id, and its name appears as metadata."""
+        tracer = tracing.start()
+        with tracing.span("outer", "test", path="a.bin"):
+            worker = threading.Thread(target=lambda: tracing.record("inner", "test", 10, 20), name="helper")
+            worker.start()
+            worker.join()
+        assert tracing.stop() is tracer
+        spans = {e["name"]: e for e in tracer.events() if e["ph"] == "X"}
+        assert spans["outer"]["args"] == {"path": "a.bin"}
+        assert spans["outer"]["tid"] == threading.get_native_id()
+        assert spans["inner"]["tid"] != spans["outer"]["tid"]
+        assert spans["inner"]["dur"] == pytest.approx(0.01)
+        names = {e["tid"]: e["args"]["name"] for e in tracer.events() if e["name"] == "thread_name"}
+        assert names[spans["inner"]["tid"]] == "helper"
+
+    def test_save_writes_trace_event_json(self, tmp_path):
+        """The saved file is a traceEvents object chrome://tracing and Perfetto accept."""
+        tracer = tracing.start()
+        with tracing.span("work", "test"):
+            pass
+        tracing.stop()
+        out = tmp_path / "trace.json"
+        tracer.save(str(out))
+        trace = json.loads(out.read_text(encoding="utf-8"))
+        assert trace["displayTimeUnit"] == "ms"
+        work = [e for e in trace["traceEvents"] if e["name"] == "work"]
+        assert len(work) == 1 and work[0]["ph"] == "X" and work[0]["dur"] >= 0
+
+    def test_events_past_the_cap_are_counted(self, monkeypatch):
+        """Beyond MAX_TRACE_EVENTS spans are dropped and counted instead of stored."""
+        monkeypatch.setattr(tracing, "MAX_TRACE_EVENTS", 2)
+        tracer = tracing.start()
+        for i in range(5):
+            tracing.record(f"s{i}", "test", 0, 1)
+        assert [e["name"] for e in tracer.events() if e["ph"] == "X"] == ["s0", "s1"]
+        assert tracer.dropped == 3
@@ -1,5 +1,8 @@
 import glob
+import json
 import os
+import pstats
+import threading
 from functools import partial
 from typing import Callable, cast
 
@@ -11,7 +14,7 @@ from gfglock.core import chacha20_poly1305 as xchacha_core
 from gfglock.core import native_bridge
 from gfglock.services import worker as worker_mod
 from gfglock.services.worker import EncryptDecryptWorker, WorkerSignals
-from gfglock.utils import predict_encrypted_size
+from gfglock.utils import metrics, predict_encrypted_size, profiling
 
 
 @pytest.fixture(scope="session")
@@ -23,6 +26,15 @@ def qapp():
     return app
 
 
+@pytest.fixture(autouse=True)
+def _no_journal(monkeypatch):
+    """Keep runs from journaling, tracing, exporting metrics or profiling into the real logs folder; tests opt back in."""
+    monkeypatch.setattr(worker_mod, "logs_enabled", lambda: False)
+    monkeypatch.setattr(worker_mod, "trace_enabled", lambda: False)
+    monkeypatch.setattr(worker_mod, "get_metrics_file", lambda: None)
+    monkeypatch.setattr(worker_mod, "start_profiler", lambda name: None)
+
+
 class _Recorder:
     """Collects every argument tuple emitted by a connected Qt signal."""
 
@@ -51,25 +63,23 @@ class TestWorkerSignals:
     def test_all_signals_deliver_exact_arguments(self, qapp):
         """Every declared signal must deliver its emitted arguments unchanged to a slot."""
         signals = WorkerSignals()
-        names = ("progress", "files_progress", "file_changed", "status", "error", "file_result", "finished")
+        names = ("progress", "files_progress", "status", "error", "results", "finished")
         recorders = {name: _Recorder() for name in names}
         for name in names:
             getattr(signals, name).connect(recorders[name], Qt.ConnectionType.DirectConnection)
 
         signals.progress.emit(1.0, 2.0)
         signals.files_progress.emit(1, 2)
-        signals.file_changed.emit("f.txt")
         signals.status.emit("running")
         signals.error.emit("oops")
-        signals.file_result.emit(True, "ok")
+        signals.results.emit([("f.txt", True, "ok")])
         signals.finished.emit(1.5, 2, 1, 1, 0)
 
         assert recorders["progress"].calls == [(1.0, 2.0)]
         assert recorders["files_progress"].calls == [(1, 2)]
-        assert recorders["file_changed"].calls == [("f.txt",)]
         assert recorders["status"].calls == [("running",)]
         assert recorders["error"].calls == [("oops",)]
-        assert recorders["file_result"].calls == [(True, "ok")]
+        assert recorders["results"].calls == [([("f.txt", True, "ok")],)]
         assert recorders["finished"].calls == [(1.5, 2, 1, 1, 0)]
 
 
@@ -98,6 +108,27 @@ class TestCalcTotalSize:
         worker = EncryptDecryptWorker([src], password, mode="encrypt")
         assert worker.total_bytes == pytest.approx(predict_encrypted_size(src, "CHACHA"))
 
+    @pytest.mark.parametrize(
+        "use_native", [False, pytest.param(True, marks=pytest.mark.skipif(
+            not native_bridge.NATIVE_AVAILABLE, reason="Native C++ extension not loaded"))],
+        ids=["python", "native"],
+    )
+    @pytest.mark.parametrize("batch_keys", [False, True], ids=["per-file", "batch-keys"])
+    @pytest.mark.parametrize("algo, ext", [
+        ("aes256_gcm", ".gfglock"), ("aes256_cfb", ".gfglck"), ("chacha20_poly1305", ".gfgcha"),
+    ])
+    def test_prediction_matches_encrypted_output(self, qapp, password, tmp_path, monkeypatch,
+                                                 use_native, batch_keys, algo, ext):
+        """total_bytes equals the size of the file the run actually writes, with or without batch keys."""
+        if not use_native:
+            monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        src = tmp_path / "file.bin"
+        src.write_bytes(os.urandom(5000))
+        worker = EncryptDecryptWorker([str(src)], password, mode="encrypt", enc_algo=algo, batch_keys=batch_keys)
+        predicted = worker.total_bytes
+        worker.run()
+        assert os.path.getsize(_find_encrypted(str(tmp_path), ext)) == predicted
+
     def test_decrypt_uses_raw_file_size(self, make_file, password):
         """Decrypt-mode total_bytes must equal the actual on-disk file size."""
         src = make_file()
@@ -155,6 +186,73 @@ class TestBuildJob:
         job = _as_partial(worker._build_job("file.gfgcha", lambda _b: None))
         assert job.func is xchacha_core.decrypt_file
 
+    def test_single_file_gets_every_thread(self, make_file, password):
+        """With one file in flight, all worker threads go to its segments."""
+        src = make_file()
+        worker = EncryptDecryptWorker([src], password, mode="encrypt", threads=4)
+        job = _as_partial(worker._build_job(src, lambda _b: None))
+        assert job.keywords["threads"] == 4
+
+    def test_threads_split_across_files(self, password):
+        """Segment threads are split across the files running concurrently."""
+        paths = ["a.gfglock", "b.gfglock"]
+        worker = EncryptDecryptWorker(paths, password, mode="decrypt", threads=4)
+        job = _as_partial(worker._build_job(paths[0], lambda _b: None))
+        assert job.keywords["threads"] == 2
+
+    def test_batch_keys_share_one_session(self, password):
+        """In batch mode every encrypt job receives the worker's single KeySession."""
+        paths = ["a.txt", "b.txt"]
+        worker = EncryptDecryptWorker(paths, password, mode="encrypt", batch_keys=True)
+        jobs = [_as_partial(worker._build_job(p, lambda _b: None)) for p in paths]
+        assert jobs[0].keywords["keys"] is not None
+        assert jobs[0].keywords["keys"] is jobs[1].keywords["keys"]
+
+    def test_encrypt_without_batch_keys_derives_per_file(self, password):
+        """Without batch mode, encrypt jobs get no session and derive their own keys."""
+        worker = EncryptDecryptWorker(["a.txt"], password, mode="encrypt")
+        job = _as_partial(worker._build_job("a.txt", lambda _b: None))
+        assert job.keywords["keys"] is None
+
+    def test_encrypt_jobs_record_configured_iterations(self, password):
+        """The configured KDF count reaches every encrypt job and the worker's session."""
+        worker = EncryptDecryptWorker(["a.txt"], password, mode="encrypt", kdf_iterations=300000)
+        job = _as_partial(worker._build_job("a.txt", lambda _b: None))
+        assert job.keywords["iterations"] == 300000
+        assert worker._keys.iterations == 300000
+
+    @pytest.mark.parametrize("setting, expected", [
+        (5, native_bridge.MIN_KDF_ITERATIONS),
+        (native_bridge.MAX_KDF_ITERATIONS * 2, native_bridge.MAX_KDF_ITERATIONS),
+    ])
+    def test_iteration_setting_clamped(self, password, setting, expected):
+        """A hand-edited kdf_iterations outside the allowed range is clamped before any file is written."""
+        worker = EncryptDecryptWorker(["a.txt"], password, mode="encrypt", kdf_iterations=setting)
+        job = _as_partial(worker._build_job("a.txt", lambda _b: None))
+        assert job.keywords["iterations"] == expected
+        assert worker._keys.iterations == expected
+
+    @pytest.mark.parametrize("mode,path", [("encrypt", "a.txt"), ("decrypt", "a.gfgcha")])
+    def test_jobs_carry_memory_budget(self, password, mode, path):
+        """The per-file memory budget reaches encrypt and decrypt jobs alike."""
+        worker = EncryptDecryptWorker([path], password, mode=mode, memory_budget=32 * 1024 * 1024)
+        job = _as_partial(worker._build_job(path, lambda _b: None))
+        assert job.keywords["memory_budget"] == 32 * 1024 * 1024
+        assert job.keywords["use_mmap"] is False
+
+    def test_jobs_carry_mmap_setting(self, password):
+        """Enabling mmap I/O reaches the jobs the worker builds."""
+        worker = EncryptDecryptWorker(["a.gfglock"], password, mode="decrypt", use_mmap=True)
+        job = _as_partial(worker._build_job("a.gfglock", lambda _b: None))
+        assert job.keywords["use_mmap"] is True
+
+    def test_decrypt_jobs_share_key_cache(self, password):
+        """Decrypt jobs always share a KeySession so repeated salts derive once."""
+        worker = EncryptDecryptWorker(["a.gfglock", "b.gfgcha"], password, mode="decrypt")
+        first = _as_partial(worker._build_job("a.gfglock", lambda _b: None))
+        second = _as_partial(worker._build_job("b.gfgcha", lambda _b: None))
+        assert first.keywords["keys"] is second.keywords["keys"] is not None
+
     def test_decrypt_unknown_extension_returns_skip_job(self, password):
         """An unrecognized extension must build a job that fails with a clear message."""
         worker = EncryptDecryptWorker(["plain.txt"], password, mode="decrypt")
@@ -212,7 +310,7 @@ class TestCancel:
 class TestRun:
     """run() must drive the thread pool and emit accurate progress/result signals."""
 
-    _SIGNAL_NAMES = ("progress", "files_progress", "file_changed", "status", "error", "file_result", "finished")
+    _SIGNAL_NAMES = ("progress", "files_progress", "status", "error", "results", "finished")
 
     def _connect(self, worker: EncryptDecryptWorker) -> dict:
         """Attach a direct-connection recorder to every signal on the worker."""
@@ -223,6 +321,11 @@ class TestRun:
             recorders[name] = rec
         return recorders
 
+    @staticmethod
+    def _results(recorders: dict) -> list:
+        """Every (path, ok, message) delivered through the batched results signal, in order."""
+        return [entry for (batch,) in recorders["results"].calls for entry in batch]
+
     def test_encrypt_success_emits_finished_and_result(self, qapp, make_file, password, monkeypatch):
         """A clean encrypt run must report one success and the file must be renamed."""
         monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
@@ -233,8 +336,8 @@ class TestRun:
         elapsed, total, succeeded, failed, skipped = recorders["finished"].calls[0]
         assert (total, succeeded, failed, skipped) == (1, 1, 0, 0)
         assert elapsed >= 0
-        assert recorders["file_result"].calls[0][0] is True
-        assert recorders["file_changed"].calls == [(src,)]
+        assert self._results(recorders)[0][1] is True
+        assert [path for path, _, _ in self._results(recorders)] == [src]
         assert recorders["files_progress"].calls[-1] == (1, 1)
         assert recorders["progress"].calls[-1] == (worker.total_bytes, worker.total_bytes)
         assert not os.path.exists(src)
@@ -251,7 +354,7 @@ class TestRun:
         worker.run()
         elapsed, total, succeeded, failed, skipped = recorders["finished"].calls[0]
         assert (total, succeeded, failed, skipped) == (1, 1, 0, 0)
-        assert recorders["file_result"].calls[0][0] is True
+        assert self._results(recorders)[0][1] is True
 
     def test_wrong_password_reports_failure(self, qapp, make_file, password, monkeypatch):
         """A wrong password on decrypt must count as a failure, not a skip."""
@@ -264,7 +367,7 @@ class TestRun:
         worker.run()
         elapsed, total, succeeded, failed, skipped = recorders["finished"].calls[0]
         assert (total, succeeded, failed, skipped) == (1, 0, 1, 0)
-        assert recorders["file_result"].calls[0][0] is False
+        assert self._results(recorders)[0][1] is False
 
     def test_already_encrypted_file_is_skipped(self, qapp, password, tmp_path, monkeypatch):
         """Re-encrypting an already-encrypted file must be counted as skipped, not failed."""
@@ -297,7 +400,7 @@ class TestRun:
         worker.run()
         elapsed, total, succeeded, failed, skipped = recorders["finished"].calls[0]
         assert (total, succeeded, failed, skipped) == (1, 0, 0, 0)
-        assert recorders["file_result"].calls == []
+        assert self._results(recorders) == []
         assert os.path.exists(src)
 
     def test_job_exception_emits_error_and_counts_as_failed(self, qapp, make_file, password, monkeypatch):
@@ -331,4 +434,274 @@ class TestRun:
         elapsed, total, succeeded, failed, skipped = recorders["finished"].calls[0]
         assert (total, succeeded, failed, skipped) == (3, 3, 0, 0)
         assert recorders["files_progress"].calls[-1] == (3, 3)
-        assert len(recorders["file_changed"].calls) == 3
+        assert len(self._results(recorders)) == 3
+
+    def test_journal_records_phase_timings_per_file(self, qapp, password, tmp_path, monkeypatch):
+        """With logging on, each file yields one journal record carrying its outcome and phase timings."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        monkeypatch.setattr(worker_mod, "logs_enabled", lambda: True)
+        journal = []
+        monkeypatch.setattr(worker_mod, "write_journal", journal.extend)
+        paths = []
+        for i in range(2):
+            p = tmp_path / f"file{i}.bin"
+            p.write_bytes(os.urandom(4096))
+            paths.append(str(p))
+        worker = EncryptDecryptWorker(paths, password, mode="encrypt", enc_algo="chacha20_poly1305", threads=2)
+        worker.run()
+        assert sorted(r["path"] for r in journal) == paths
+        for record in journal:
+            assert (record["op"], record["result"], record["algo"], record["engine"]) == (
+                "encrypt", "ok", "chacha20_poly1305", "python")
+            assert record["bytes_in"] == 4096
+            assert record["elapsed_ns"] >= record["kdf_ns"] + record["cipher_ns"] > 0
+            assert record["write_ns"] > 0 and record["delete_ns"] > 0
+
+    def test_journal_carries_native_batch_stats(self, qapp, password, tmp_path, monkeypatch):
+        """Native batch rows are journaled with the engine's per-file timings and buffer sizes."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", True)
+        monkeypatch.setattr(worker_mod, "logs_enabled", lambda: True)
+        journal = []
+        monkeypatch.setattr(worker_mod, "write_journal", journal.extend)
+
+        def fake_decrypt_files(paths, password, callback, completed=None, **kwargs):
+            completed.add(0, True, f"Decrypted: {paths[0]}",
+                          {"bytes_in": 100, "kdf_ns": 5, "cipher_ns": 7, "pipeline_depth": 3})
+            return [(True, f"Decrypted: {paths[0]}"), None]
+
+        monkeypatch.setattr(native_bridge, "decrypt_files", fake_decrypt_files)
+        paths = [str(tmp_path / "a.gfgcha"), str(tmp_path / "b.gfgcha")]
+        EncryptDecryptWorker(paths, password, mode="decrypt").run()
+        assert len(journal) == 1
+        record = journal[0]
+        assert (record["path"], record["algo"], record["engine"]) == (paths[0], "chacha20_poly1305", "native")
+        assert (record["bytes_in"], record["kdf_ns"], record["cipher_ns"], record["read_ns"]) == (100, 5, 7, 0)
+        assert record["pipeline_depth"] == 3
+
+    def test_trace_timeline_written_when_enabled(self, qapp, password, tmp_path, monkeypatch):
+        """With tracing on, a run saves run, file and engine phase spans tagged by thread."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        monkeypatch.setattr(worker_mod, "trace_enabled", lambda: True)
+        trace_file = tmp_path / "trace.json"
+        monkeypatch.setattr(worker_mod, "get_trace_file", lambda: str(trace_file))
+        paths = []
+        for i in range(2):
+            p = tmp_path / f"file{i}.bin"
+            p.write_bytes(os.urandom(4096))
+            paths.append(str(p))
+        EncryptDecryptWorker(paths, password, mode="encrypt", threads=2).run()
+        events = json.loads(trace_file.read_text(encoding="utf-8"))["traceEvents"]
+        spans = [e for e in events if e["ph"] == "X"]
+        assert {"run", "file", "kdf", "read", "cipher", "write", "delete"} <= {e["name"] for e in spans}
+        assert sorted(e["args"]["path"] for e in spans if e["name"] == "file") == paths
+        run = next(e for e in spans if e["name"] == "run")
+        assert {e["tid"] for e in spans if e["name"] == "file"}.isdisjoint({run["tid"]})
+        assert worker_mod.tracing.stop() is None
+
+    def test_metrics_exported_when_enabled(self, qapp, password, tmp_path, monkeypatch):
+        """With metrics on, each file is counted and the text file is rewritten when the run ends."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        prom = tmp_path / "gfglock.prom"
+        monkeypatch.setattr(worker_mod, "get_metrics_file", lambda: str(prom))
+        labels = {"op": "encrypt", "algo": "chacha20_poly1305"}
+        ok_before = metrics.FILES.value(result="ok", **labels)
+        timed_before = metrics.FILE_SECONDS.count(**labels)
+        paths = []
+        for i in range(2):
+            p = tmp_path / f"file{i}.bin"
+            p.write_bytes(os.urandom(4096))
+            paths.append(str(p))
+        EncryptDecryptWorker(paths, password, mode="encrypt", enc_algo="chacha20_poly1305", threads=2).run()
+        assert metrics.FILES.value(result="ok", **labels) == ok_before + 2
+        assert metrics.FILE_SECONDS.count(**labels) == timed_before + 2
+        text = prom.read_text(encoding="utf-8")
+        assert 'gfglock_files_total{op="encrypt",algo="chacha20_poly1305",result="ok"}' in text
+        assert text.endswith("# EOF\n")
+
+    def test_profile_saved_when_enabled(self, qapp, password, tmp_path, monkeypatch):
+        """With profiling on, the saved .prof covers the pool's file jobs and its path is reported."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        logs = tmp_path / "logs"
+        logs.mkdir()
+        monkeypatch.setattr(profiling, "get_logs_dir", lambda: str(logs))
+        monkeypatch.setattr(worker_mod, "start_profiler", lambda name: profiling.Profiler(name).start())
+        paths = []
+        for i in range(2):
+            p = tmp_path / f"file{i}.bin"
+            p.write_bytes(os.urandom(4096))
+            paths.append(str(p))
+        worker = EncryptDecryptWorker(paths, password, mode="encrypt", threads=2)
+        recorders = self._connect(worker)
+        worker.run()
+        prof = glob.glob(str(logs / "gfglock_profile_worker_*.prof"))
+        assert len(prof) == 1
+        assert any(msg == f"Profile saved: {prof[0]}" for (msg,) in recorders["status"].calls)
+        assert "_timed" in {name for _file, _line, name in pstats.Stats(prof[0]).stats}
+
+    def test_journal_off_when_logging_disabled(self, qapp, make_file, password, monkeypatch):
+        """No journal records are built while logging is off."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        monkeypatch.setattr(worker_mod, "logs_enabled", lambda: False)
+        journal = []
+        monkeypatch.setattr(worker_mod, "write_journal", journal.extend)
+        EncryptDecryptWorker([make_file()], password, mode="encrypt").run()
+        assert journal == []
+
+    def test_results_and_progress_coalesced_per_flush(self, qapp, password):
+        """Everything finished between two flushes goes out as one results list and one progress pair."""
+        worker = EncryptDecryptWorker(["a", "b", "c"], password, mode="decrypt")
+        recorders = self._connect(worker)
+        for p in worker.paths:
+            worker._queue_result(p, p != "b", f"done {p}")
+            worker._counters(1.0)
+            worker._counters.add_file()
+        stop = threading.Event()
+        stop.set()
+        worker._emit_events(stop)
+        assert recorders["results"].calls == [([("a", True, "done a"), ("b", False, "done b"), ("c", True, "done c")],)]
+        assert recorders["files_progress"].calls == [(3, 3)]
+        assert recorders["progress"].calls == [(1.0, worker.total_bytes)]
+
+    def _encrypted_files(self, password, tmp_path, monkeypatch, count):
+        """count small .gfglock files, each with its own salt, written by the Python engines."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", False)
+        plain = []
+        for i in range(count):
+            p = tmp_path / f"file{i}.bin"
+            p.write_bytes(os.urandom(256))
+            plain.append(str(p))
+        EncryptDecryptWorker(plain, password, mode="encrypt", enc_algo="aes256_gcm").run()
+        paths = sorted(glob.glob(str(tmp_path / "*.gfglock")))
+        assert len(paths) == count
+        return paths
+
+    def test_decrypt_keys_are_prefetched_on_kdf_stage(self, qapp, password, tmp_path, monkeypatch):
+        """Every PBKDF2 of a decrypt run happens in one derive_keys batch on the KDF stage, not in I/O jobs."""
+        paths = self._encrypted_files(password, tmp_path, monkeypatch, 3)
+        single: list = []
+        batches: list = []
+        real_keys = native_bridge.derive_keys
+
+        def _recording(pw, salts, *args, **kwargs):
+            batches.append((threading.current_thread().name, len(salts)))
+            return real_keys(pw, salts, *args, **kwargs)
+
+        monkeypatch.setattr(native_bridge, "derive_key", lambda *a, **k: single.append(a))
+        monkeypatch.setattr(native_bridge, "derive_keys", _recording)
+        worker = EncryptDecryptWorker(paths, password, mode="decrypt", threads=2)
+        recorders = self._connect(worker)
+        worker.run()
+        _, total, succeeded, failed, _ = recorders["finished"].calls[0]
+        assert (total, succeeded, failed) == (3, 3, 0)
+        assert single == []
+        assert batches == [("gfglock-kdf", 3)]
+
+    def test_kdf_stage_is_windowed_and_evicts(self, qapp, password, tmp_path, monkeypatch):
+        """The KDF stage keys a bounded window ahead of the finished files and drops keys once used."""
+        paths = self._encrypted_files(password, tmp_path, monkeypatch, 7)
+        monkeypatch.setattr(worker_mod, "KDF_WINDOW", 2)
+        worker = EncryptDecryptWorker(paths, password, mode="decrypt", threads=1)
+        batches: list = []
+        real_keys = native_bridge.derive_keys
+
+        def _recording(pw, salts, *args, **kwargs):
+            batches.append((len(salts), worker._counters.files))
+            return real_keys(pw, salts, *args, **kwargs)
+
+        monkeypatch.setattr(native_bridge, "derive_keys", _recording)
+        recorders = self._connect(worker)
+        worker.run()
+        assert recorders["finished"].calls[0][1:] == (7, 7, 0, 0)
+        assert [size for size, _ in batches] == [2, 2, 2, 1]
+        # Window n (files 2n, 2n+1) may only start once 2n - 3 files have finished.
+        assert all(done >= 2 * n - 3 for n, (_, done) in enumerate(batches))
+        assert worker._keys._keys == {}
+
+    def test_native_build_runs_one_batch_call(self, qapp, password, tmp_path, monkeypatch):
+        """With the native module, the whole list goes to encrypt_files in one call."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", True)
+        calls: list = []
+
+        def fake_encrypt_files(paths, password, algo, encrypt_name, chunk_size, callback, **kwargs):
+            calls.append((list(paths), algo, kwargs))
+            callback(10.0)
+            for index, result in enumerate([(True, f"Encrypted: {paths[0]}"), (False, "already encrypted")]):
+                kwargs["completed"].add(index, *result)
+                callback.add_file()
+            return [(True, f"Encrypted: {paths[0]}"), (False, "already encrypted"), None]
+
+        monkeypatch.setattr(native_bridge, "encrypt_files", fake_encrypt_files)
+        paths = [str(tmp_path / name) for name in ("a.bin", "b.gfglock", "c.bin")]
+        worker = EncryptDecryptWorker(paths, password, mode="encrypt", enc_algo="chacha20_poly1305",
+                                      threads=3, memory_budget=1 << 20)
+        recorders = self._connect(worker)
+        worker.run()
+        assert len(calls) == 1
+        assert calls[0][:2] == (paths, "chacha20_poly1305")
+        assert calls[0][2]["threads"] == 3 and calls[0][2]["memory_budget"] == 1 << 20
+        _, total, succeeded, failed, skipped = recorders["finished"].calls[0]
+        assert (total, succeeded, failed, skipped) == (3, 1, 0, 1)
+        assert [path for path, _, _ in self._results(recorders)] == paths[:2]
+        assert recorders["files_progress"].calls[-1] == (2, 3)
+
+    def test_native_results_reported_before_batch_returns(self, qapp, password, tmp_path, monkeypatch):
+        """Files the native batch has finished reach the results signal while it is still running."""
+        monkeypatch.setattr(native_bridge, "NATIVE_AVAILABLE", True)
+        reported = threading.Event()
+        seen_early: list = []
+
+        def fake_decrypt_files(paths, password, callback, completed=None, **kwargs):
+            completed.add(1, True, f"Decrypted: {paths[1]}")
+            seen_early.append(reported.wait(5))
+            completed.add(0, False, f"Critical error while decrypting {paths[0]}: boom")
+            return [(False, "boom"), (True, f"Decrypted: {paths[1]}")]
+
+        monkeypatch.setattr(native_bridge, "decrypt_files", fake_decrypt_files)
+        paths = [str(tmp_path / "a.gfgcha"), str(tmp_path / "b.gfgcha")]
+        worker = EncryptDecryptWorker(paths, password, mode="decrypt")
+        recorders = self._connect(worker)
+        worker.signals.results.connect(lambda results: reported.set(), Qt.ConnectionType.DirectConnection)
+        worker.run()
+        assert seen_early == [True]
+        assert [batch for (batch,) in recorders["results"].calls] == [
+            [(paths[1], True, f"Decrypted: {paths[1]}")],
+            [(paths[0], False, f"Critical error while decrypting {paths[0]}: boom")],
+        ]
+        assert recorders["finished"].calls[0][1:] == (2, 1, 1, 0)
+
+    @pytest.mark.skipif(not native_bridge.NATIVE_AVAILABLE, reason="Native C++ extension not loaded")
+    def test_native_batch_roundtrip_and_cancel(self, qapp, password, tmp_path):
+        """A native batch encrypts and decrypts every file; cancelling stops files not yet started."""
+        data = {}
+        for i in range(4):
+            p = tmp_path / f"file{i}.bin"
+            data[p.name] = os.urandom(1000 + i)
+            p.write_bytes(data[p.name])
+        paths = sorted(str(p) for p in tmp_path.iterdir())
+        worker = EncryptDecryptWorker(paths, password, mode="encrypt", enc_algo="aes256_gcm",
+                                      threads=2, batch_keys=True)
+        recorders = self._connect(worker)
+        worker.run()
+        assert recorders["finished"].calls[0][1:] == (4, 4, 0, 0)
+        enc = sorted(glob.glob(str(tmp_path / "*.gfglock")))
+        worker = EncryptDecryptWorker(enc, password, mode="decrypt", threads=2)
+        recorders = self._connect(worker)
+        worker.run()
+        assert recorders["finished"].calls[0][1:] == (4, 4, 0, 0)
+        assert {p.name: p.read_bytes() for p in tmp_path.iterdir()} == data
+
+        worker = EncryptDecryptWorker(paths * 50, password, mode="encrypt", enc_algo="aes256_gcm", threads=1)
+        recorders = self._connect(worker)
+        worker.signals.files_progress.connect(lambda done, total: worker.cancel(),
+                                              Qt.ConnectionType.DirectConnection)
+        worker.run()
+        _, total, succeeded, failed, skipped = recorders["finished"].calls[0]
+        assert total == 200
+        assert 0 < succeeded + failed + skipped < total
+        assert len(self._results(recorders)) == succeeded + failed + skipped
+        assert glob.glob(str(tmp_path / "*.bin"))
+
+    def test_encrypt_run_has_no_kdf_stage(self, password):
+        """Encrypt salts are generated per run, so there is nothing to prefetch."""
+        worker = EncryptDecryptWorker(["a.txt"], password, mode="encrypt")
+        assert worker._start_kdf_stage() is None